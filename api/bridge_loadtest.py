@@ -0,0 +1,456 @@
+"""
+Rooster.OS Bridge Load Test
+Measures latency and throughput of Python -> JS bridge calls under concurrency
+"""
+
+import argparse
+import asyncio
+import bisect
+import contextlib
+import importlib.util
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Operations the mix can name, with the arguments each call is made with
+DEFAULT_ARGS = {
+    'mario.collect_coin': (1,),
+    'electronics.generate_signal': (440, 'sine'),
+    'combine': (['👑📶⚪', '🧲🪐🔁'],),
+}
+
+DEFAULT_MIX = 'mario.collect_coin=5,electronics.generate_signal=3,combine=2'
+
+# A rate counts as sustained when this share of it was achieved
+SUSTAINED_SHARE = 0.95
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of nanosecond latencies.
+
+    Values below 2**sub_bits are counted exactly; above that each power of
+    two is split into 2**(sub_bits - 1) linear buckets, so every recorded
+    value is kept to within 1 / 2**(sub_bits - 1) of its true value with a
+    fixed number of buckets, whatever the range.
+    """
+
+    def __init__(self, sub_bits: int = 8, max_bits: int = 40):
+        """
+        Initialize the histogram.
+
+        Args:
+            sub_bits: Precision; 8 keeps values to within 0.8%
+            max_bits: Largest trackable value is 2**max_bits ns (about 18 minutes);
+                larger values are clamped
+        """
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count >> 1
+        self.max_value = (1 << max_bits) - 1
+        self.counts = [0] * self._index(self.max_value) + [0]
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_count:
+            return index
+        shift, offset = divmod(index - self.sub_count, self.half)
+        shift += 1
+        return ((offset + self.half + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        """Record a latency in nanoseconds."""
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's counts (same precision) to this one."""
+        if other.sub_bits != self.sub_bits or len(other.counts) != len(self.counts):
+            raise ValueError("Histograms have different precision")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percentile: float) -> int:
+        """Return the value at a percentile (0-100), to the histogram's precision."""
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Return count, mean, min, max and p50/p90/p99/p999 in milliseconds."""
+        ms = 1e-6
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * ms, 4) if self.count else 0.0,
+            'min_ms': round((self.min or 0) * ms, 4),
+            'p50_ms': round(self.percentile(50) * ms, 4),
+            'p90_ms': round(self.percentile(90) * ms, 4),
+            'p99_ms': round(self.percentile(99) * ms, 4),
+            'p999_ms': round(self.percentile(99.9) * ms, 4),
+            'max_ms': round((self.max or 0) * ms, 4),
+        }
+
+
+def load_bindings():
+    """Import api/python-bindings.py (its file name isn't a module name)."""
+    spec = importlib.util.spec_from_file_location(
+        'python_bindings', os.path.join(API_DIR, 'python-bindings.py'))
+    module = importlib.util.module_from_spec(spec)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        spec.loader.exec_module(module)
+    return module
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """
+    Parse 'op=weight,op=weight' (weight defaults to 1).
+
+    Returns: [(op, weight)]
+    """
+    mix = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        op, _, weight = part.partition('=')
+        weight = float(weight) if weight else 1.0
+        if weight < 0:
+            raise ValueError(f"Negative weight for {op}")
+        mix.append((op.strip(), weight))
+    if not mix or not sum(weight for _, weight in mix):
+        raise ValueError("Empty operation mix")
+    return mix
+
+
+def resolve_ops(api, mix: List[Tuple[str, float]]) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    Bind each operation in the mix to a zero-argument callable.
+
+    'theme.command' names a theme command (e.g. mario.collect_coin);
+    a bare name is a RoosterAPI method (e.g. combine).
+    """
+    ops = []
+    for op, _ in mix:
+        target = api
+        for part in op.split('.'):
+            try:
+                target = getattr(target, part)
+            except AttributeError as exc:
+                raise ValueError(f"Unknown operation '{op}': {exc}") from None
+        if not callable(target):
+            raise ValueError(f"Operation '{op}' is not callable")
+        args = DEFAULT_ARGS.get(op, ())
+        ops.append((op, lambda target=target, args=args: target(*args)))
+    return ops
+
+
+class LoadTest:
+    """Open-loop load generator for RoosterAPI calls."""
+
+    def __init__(self, api, mix: List[Tuple[str, float]], concurrency: int = 8,
+                 mode: str = 'threads', arrivals: str = 'poisson', seed: Optional[int] = None):
+        """
+        Initialize the load test.
+
+        Args:
+            api: RoosterAPI instance to drive
+            mix: [(operation, weight)] as returned by parse_mix
+            concurrency: Worker threads (or asyncio worker tasks)
+            mode: 'threads' or 'asyncio'
+            arrivals: 'poisson' (exponential gaps) or 'uniform' (fixed gaps)
+            seed: Random seed for the operation and arrival sequence
+        """
+        if mode not in ('threads', 'asyncio'):
+            raise ValueError(f"Unknown mode: {mode}")
+        if arrivals not in ('poisson', 'uniform'):
+            raise ValueError(f"Unknown arrival process: {arrivals}")
+        self.api = api
+        self.mix = mix
+        self.ops = resolve_ops(api, mix)
+        self.concurrency = max(1, concurrency)
+        self.mode = mode
+        self.arrivals = arrivals
+        self.seed = seed
+
+    def schedule(self, rate: float, duration: float) -> List[Tuple[float, int]]:
+        """
+        Plan the run: intended start offsets (seconds) and operation indexes.
+
+        Planning up front keeps the arrival process independent of how fast
+        the bridge answers, which is what makes the test open-loop.
+        """
+        rng = random.Random(self.seed)
+        weights = [weight for _, weight in self.mix]
+        cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        plan = []
+        t = 0.0
+        while True:
+            t += rng.expovariate(rate) if self.arrivals == 'poisson' else 1.0 / rate
+            if t >= duration:
+                break
+            plan.append((t, bisect.bisect_right(cumulative, rng.random() * total)))
+        return plan
+
+    def _new_histograms(self) -> Tuple[LatencyHistogram, LatencyHistogram, List[LatencyHistogram]]:
+        return LatencyHistogram(), LatencyHistogram(), [LatencyHistogram() for _ in self.ops]
+
+    def _invoke(self, op_index: int, intended: float, start_ns: int, histograms, errors: List):
+        # Response time runs from when the call should have started, so
+        # queueing behind a slow bridge is counted (no coordinated omission)
+        response, service, per_op = histograms
+        began = time.perf_counter_ns()
+        try:
+            self.ops[op_index][1]()
+        except Exception as exc:
+            errors.append(f"{self.ops[op_index][0]}: {exc}")
+        done = time.perf_counter_ns()
+        service.record(done - began)
+        response.record(done - (start_ns + int(intended * 1e9)))
+        per_op[op_index].record(done - began)
+
+    def _run_threads(self, plan, start_ns: int, closed_duration: Optional[float]):
+        work: 'queue.Queue' = queue.Queue()
+        results = []
+        errors: List[str] = []
+        lock = threading.Lock()
+
+        def worker():
+            histograms = self._new_histograms()
+            rng = random.Random(None if self.seed is None else self.seed + threading.get_ident())
+            weights = [weight for _, weight in self.mix]
+            while True:
+                if closed_duration is not None:
+                    intended = (time.perf_counter_ns() - start_ns) / 1e9
+                    if intended >= closed_duration:
+                        break
+                    op_index = rng.choices(range(len(self.ops)), weights)[0]
+                else:
+                    item = work.get()
+                    if item is None:
+                        break
+                    intended, op_index = item
+                self._invoke(op_index, intended, start_ns, histograms, errors)
+            with lock:
+                results.append(histograms)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for intended, op_index in plan:
+            delay = start_ns + intended * 1e9 - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            work.put((intended, op_index))
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def _run_asyncio(self, plan, start_ns: int, closed_duration: Optional[float]):
+        async def run():
+            loop = asyncio.get_running_loop()
+            work: asyncio.Queue = asyncio.Queue()
+            results = []
+            errors: List[str] = []
+            rng = random.Random(self.seed)
+            weights = [weight for _, weight in self.mix]
+
+            async def worker(executor):
+                histograms = self._new_histograms()
+                while True:
+                    if closed_duration is not None:
+                        intended = (time.perf_counter_ns() - start_ns) / 1e9
+                        if intended >= closed_duration:
+                            break
+                        op_index = rng.choices(range(len(self.ops)), weights)[0]
+                    else:
+                        item = await work.get()
+                        if item is None:
+                            break
+                        intended, op_index = item
+                    await loop.run_in_executor(executor, self._invoke, op_index, intended,
+                                               start_ns, histograms, errors)
+                results.append(histograms)
+
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                tasks = [asyncio.create_task(worker(executor)) for _ in range(self.concurrency)]
+                for intended, op_index in plan:
+                    delay = start_ns + intended * 1e9 - time.perf_counter_ns()
+                    if delay > 0:
+                        await asyncio.sleep(delay / 1e9)
+                    work.put_nowait((intended, op_index))
+                for _ in tasks:
+                    work.put_nowait(None)
+                await asyncio.gather(*tasks)
+            return results, errors
+
+        return asyncio.run(run())
+
+    def run(self, rate: float, duration: float) -> Dict[str, Any]:
+        """
+        Drive the bridge at a target rate for a duration.
+
+        Args:
+            rate: Target calls per second (0 for closed-loop: every worker
+                calls back-to-back, which measures saturation directly)
+            duration: Seconds to generate load for
+
+        Returns: Achieved throughput, response and service time percentiles,
+            per-operation service times and errors
+        """
+        plan = [] if rate <= 0 else self.schedule(rate, duration)
+        closed_duration = duration if rate <= 0 else None
+        runner = self._run_threads if self.mode == 'threads' else self._run_asyncio
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start_ns = time.perf_counter_ns()
+            results, errors = runner(plan, start_ns, closed_duration)
+            elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+
+        response, service, per_op = self._new_histograms()
+        for worker_response, worker_service, worker_per_op in results:
+            response.merge(worker_response)
+            service.merge(worker_service)
+            for total, part in zip(per_op, worker_per_op):
+                total.merge(part)
+        throughput = service.count / elapsed if elapsed else 0.0
+        return {
+            'mode': self.mode,
+            'concurrency': self.concurrency,
+            'target_rate': rate or None,
+            'duration_s': round(elapsed, 3),
+            'completed': service.count,
+            'errors': len(errors),
+            'error_samples': errors[:5],
+            'throughput': round(throughput, 1),
+            'sustained': rate <= 0 or throughput >= SUSTAINED_SHARE * rate,
+            'response': response.summary(),
+            'service': service.summary(),
+            'operations': {op: hist.summary() for (op, _), hist in zip(self.ops, per_op)},
+        }
+
+    def sweep(self, rates: List[float], duration: float,
+              slo_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run at each rate in turn and find where the bridge saturates.
+
+        A rate is sustained when SUSTAINED_SHARE of it is achieved and,
+        with an SLO, the p99 response time stays within it. The
+        saturation throughput is the best throughput seen at any rate.
+
+        Returns: {'runs': [...], 'max_sustained_rate', 'saturation_throughput'}
+        """
+        runs = []
+        for rate in rates:
+            result = self.run(rate, duration)
+            if slo_ms is not None and rate > 0:
+                result['sustained'] = result['sustained'] and result['response']['p99_ms'] <= slo_ms
+            runs.append(result)
+        sustained = [run['target_rate'] for run in runs if run['sustained'] and run['target_rate']]
+        return {
+            'runs': runs,
+            'slo_p99_ms': slo_ms,
+            'max_sustained_rate': max(sustained) if sustained else None,
+            'saturation_throughput': max((run['throughput'] for run in runs), default=0.0),
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a sweep report as a table."""
+    print(f"{'rate':>10} {'achieved':>10} {'p50 ms':>9} {'p99 ms':>9} {'p999 ms':>9} "
+          f"{'max ms':>9}  ok")
+    for run in report['runs']:
+        response = run['response']
+        rate = 'closed' if run['target_rate'] is None else f"{run['target_rate']:g}"
+        print(f"{rate:>10} {run['throughput']:>10.1f} {response['p50_ms']:>9.3f} "
+              f"{response['p99_ms']:>9.3f} {response['p999_ms']:>9.3f} {response['max_ms']:>9.3f}"
+              f"  {'yes' if run['sustained'] else 'NO'}")
+    print(f"\nMax sustained rate: {report['max_sustained_rate']}")
+    print(f"Saturation throughput: {report['saturation_throughput']:.1f} calls/s")
+
+
+def main():
+    """Main entry point for the bridge load test."""
+    parser = argparse.ArgumentParser(
+        description='Rooster.OS Bridge Load Test - Latency and throughput of API calls'
+    )
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help='Operations and weights, e.g. mario.collect_coin=5,combine=1')
+    parser.add_argument('--rates', default='500,1000,2000,4000,0',
+                        help='Comma-separated target calls/s to sweep (0 = closed-loop)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per rate')
+    parser.add_argument('--concurrency', type=int, default=8, help='Worker threads or tasks')
+    parser.add_argument('--mode', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson')
+    parser.add_argument('--slo-ms', type=float, default=None,
+                        help='p99 response time a sustained rate must stay within')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true', help='Disable the result cache')
+    parser.add_argument('--output', help='Write the report as JSON to this file', default=None)
+
+    args = parser.parse_args()
+
+    bindings = load_bindings()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        api = bindings.RoosterAPI()
+    if args.no_cache:
+        api.cache.enabled = False
+
+    try:
+        test = LoadTest(api, parse_mix(args.mix), args.concurrency, args.mode, args.arrivals,
+                        args.seed)
+        rates = [float(rate) for rate in args.rates.split(',') if rate.strip()]
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+
+    report = test.sweep(rates, args.duration, args.slo_ms)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Rooster.OS Command Registry
+Learns each theme's commands from the JavaScript theme files
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+
+THEMES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'themes')
+
+MANIFEST_VERSION = 1
+
+_IDENT = r'[A-Za-z_$][\w$]*'
+_OBJECT_RE = re.compile(r'=\s*\{')
+_NAME_RE = re.compile(r'(?:^|,)\s*name\s*:')
+_COMMANDS_RE = re.compile(r'(?:^|[{,\s])commands\s*:\s*\{')
+# A property of the commands object that is a function: shorthand method,
+# "name: function (...)", "name: (...) =>" or "name: arg =>"
+_COMMAND_RE = re.compile(
+    r'(?:^|,)\s*(?:async\s+)?\*?\s*(' + _IDENT + r')\s*'
+    r'(?:\(([^)]*)\)\s*\{|:\s*(?:async\s+)?(?:function\b\s*\*?\s*(?:' + _IDENT + r')?\s*\(([^)]*)\)'
+    r'|\(([^)]*)\)\s*=>|(' + _IDENT + r')\s*=>))'
+)
+
+
+def default_cache_path() -> str:
+    """Return the manifest cache path ($ROOSTER_CACHE_DIR or ~/.cache/rooster)."""
+    cache_dir = os.environ.get('ROOSTER_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+        'rooster')
+    return os.path.join(cache_dir, 'command_manifest.json')
+
+
+def to_snake_case(name: str) -> str:
+    """collectCoin -> collect_coin"""
+    return re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', name).lower()
+
+
+def _skeleton(source: str, start: int) -> str:
+    """
+    Return the body of the object literal opening at source[start] with
+    strings, comments and everything nested deeper than its own properties
+    blanked out, so only the property list at depth one is left.
+    """
+    out = []
+    depth = 1
+    i = start + 1
+    n = len(source)
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+        if c == '/' and nxt == '/':
+            end = source.find('\n', i)
+            end = n if end < 0 else end
+            out.append(' ' * (end - i))
+            i = end
+            continue
+        if c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            out.append(' ' * (end - i))
+            i = end
+            continue
+        if c in '\'"`':
+            j = i + 1
+            nested = 0
+            while j < n:
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if c == '`' and source.startswith('${', j):
+                    nested += 1
+                elif c == '`' and nested and source[j] == '}':
+                    nested -= 1
+                elif source[j] == c and not nested:
+                    break
+                j += 1
+            out.append(' ' * (j + 1 - i))
+            i = j + 1
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                break
+        out.append(c if depth == 1 or (depth == 2 and c == '{') else ' ')
+        i += 1
+    return ''.join(out)
+
+
+def _params(text: Optional[str]) -> List[str]:
+    params = []
+    for part in (text or '').split(','):
+        match = re.match(r'\s*(\.\.\.)?\s*(' + _IDENT + ')', part)
+        if match:
+            params.append((match.group(1) or '') + match.group(2))
+    return params
+
+
+def parse_theme(source: str, default_name: Optional[str] = None) -> Dict:
+    """
+    Extract a theme's name and commands from its index.js source.
+
+    Args:
+        source: JavaScript source of a theme module
+        default_name: Name to use if the theme object has no name property
+
+    Returns: {'name': theme name, 'commands': {command: [parameter names]}}
+    """
+    assignment = _OBJECT_RE.search(source)
+    if assignment is None:
+        return {'name': default_name, 'commands': {}}
+    # Skeleton offsets line up with the source, starting just after the brace
+    opening = assignment.end() - 1
+    top = _skeleton(source, opening)
+    name = default_name
+    name_match = _NAME_RE.search(top)
+    if name_match:
+        quoted = re.match(r"\s*(['\"])(.*?)\1", source[opening + 1 + name_match.end():])
+        if quoted:
+            name = quoted.group(2)
+    commands = {}
+    block = _COMMANDS_RE.search(top)
+    if block:
+        body = _skeleton(source, opening + block.end())
+        for match in _COMMAND_RE.finditer(body):
+            params = next((g for g in match.groups()[1:] if g is not None), '')
+            commands[match.group(1)] = _params(params)
+    return {'name': name, 'commands': commands}
+
+
+class CommandRegistry:
+    """Theme command manifest, parsed from the theme files once and cached on disk."""
+
+    def __init__(self, themes_dir: str = THEMES_DIR, cache_path: Optional[str] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            themes_dir: Directory holding one <theme>/index.js per theme
+            cache_path: Manifest cache file (None for the default location,
+                '' to disable caching)
+        """
+        self.themes_dir = os.path.abspath(themes_dir)
+        self.cache_path = default_cache_path() if cache_path is None else cache_path
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict] = None
+        self._aliases: Dict[str, Dict[str, str]] = {}
+        self.stats = {'parsed': 0, 'cached': 0}
+
+    def _theme_files(self) -> Dict[str, str]:
+        files = {}
+        if os.path.isdir(self.themes_dir):
+            for entry in sorted(os.listdir(self.themes_dir)):
+                path = os.path.join(self.themes_dir, entry, 'index.js')
+                if os.path.isfile(path):
+                    files[entry] = path
+        return files
+
+    def _read_cache(self) -> Dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cached.get('version') != MANIFEST_VERSION or cached.get('themes_dir') != self.themes_dir:
+            return {}
+        return cached.get('themes', {})
+
+    def _write_cache(self, themes: Dict):
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION, 'themes_dir': self.themes_dir,
+                           'themes': themes}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def load(self) -> Dict:
+        """
+        Return the manifest, re-parsing only theme files whose mtime or size changed.
+
+        Returns: {theme: {'path', 'mtime_ns', 'size', 'commands'}}
+        """
+        with self._lock:
+            if self._manifest is not None:
+                return self._manifest
+            cached = self._read_cache()
+            themes = {}
+            changed = False
+            for directory, path in self._theme_files().items():
+                st = os.stat(path)
+                entry = cached.get(directory)
+                if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                    self.stats['cached'] += 1
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        parsed = parse_theme(f.read(), directory)
+                    entry = {'name': parsed['name'], 'path': path, 'mtime_ns': st.st_mtime_ns,
+                             'size': st.st_size, 'commands': parsed['commands']}
+                    self.stats['parsed'] += 1
+                    changed = True
+                themes[directory] = entry
+            if self.cache_path and (changed or set(themes) != set(cached)):
+                try:
+                    self._write_cache(themes)
+                except OSError:
+                    pass
+            self._manifest = {entry['name']: entry for entry in themes.values()}
+            return self._manifest
+
+    def refresh(self) -> Dict:
+        """Drop the in-memory manifest and reload it (e.g. after editing a theme)."""
+        with self._lock:
+            self._manifest = None
+            self._aliases = {}
+        return self.load()
+
+    def themes(self) -> List[str]:
+        """Return the names of the available themes."""
+        return list(self.load())
+
+    def commands(self, theme: str) -> Dict[str, List[str]]:
+        """Return {command: [parameter names]} for a theme."""
+        entry = self.load().get(theme)
+        if entry is None:
+            raise KeyError(f"Unknown theme: {theme}")
+        return entry['commands']
+
+    def resolve(self, theme: str, name: str) -> Optional[str]:
+        """Map a Python (snake_case) or JavaScript (camelCase) name to the theme's command."""
+        aliases = self._aliases.get(theme)
+        if aliases is None:
+            aliases = {}
+            for command in self.commands(theme):
+                aliases[command] = command
+                aliases.setdefault(to_snake_case(command), command)
+            self._aliases[theme] = aliases
+        return aliases.get(name)
+
+
+def main():
+    """Print the command manifest."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Rooster.OS Command Registry')
+    parser.add_argument('--themes-dir', default=THEMES_DIR)
+    parser.add_argument('--no-cache', action='store_true', help='Parse the theme files again')
+    args = parser.parse_args()
+
+    registry = CommandRegistry(args.themes_dir, cache_path='' if args.no_cache else None)
+    for theme in registry.themes():
+        commands = registry.commands(theme)
+        print(f"{theme} ({len(commands)} commands)")
+        for command, params in commands.items():
+            print(f"  {to_snake_case(command)}({', '.join(params)})")
+
+
+if __name__ == '__main__':
+    main()
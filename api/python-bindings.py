@@ -3,24 +3,71 @@ Rooster.OS Python Bindings
 Python interface for theme-aware scripting
 """
 
+import difflib
+import functools
 import json
+import os
 import subprocess
 import sys
 from typing import Any, Dict, List, Optional
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from command_registry import CommandRegistry, to_snake_case
+from result_cache import CachePolicy, ResultCache, cached
+
+
+# How each call's results may be reused. Read-only calls are 'pure' (until
+# invalidated) or 'ttl'; 'mutating' calls drop the entries tagged with
+# whatever state they change. Theme commands make the JS side switch to
+# their theme, so they invalidate the theme as well.
+CACHE_POLICIES = {
+    'status': CachePolicy('ttl', ttl=1.0, tags=('capacitor', 'theme')),
+    'theme.list': CachePolicy('pure', tags=('themes',)),
+    'theme.current': CachePolicy('ttl', ttl=5.0, tags=('theme',)),
+    'theme.switch': CachePolicy('mutating', invalidates=('theme',)),
+    'theme_command': CachePolicy('mutating', invalidates=('theme', 'capacitor')),
+    'crow': CachePolicy('mutating', invalidates=('capacitor',)),
+    'flap_wings': CachePolicy('mutating', invalidates=('capacitor',)),
+    'execute': CachePolicy('mutating', invalidates=('capacitor',)),
+    'combine': CachePolicy('mutating', invalidates=('capacitor',)),
+}
+
 
 class RoosterTheme:
-    """Base class for theme-specific commands"""
+    """Proxy for one theme's commands, as declared in themes/<name>/index.js"""
     
-    def __init__(self, name: str, rooster_api):
+    def __init__(self, name: str, rooster_api, registry: CommandRegistry):
         self.name = name
         self._api = rooster_api
+        self._registry = registry
     
     def __getattr__(self, command: str):
-        """Dynamically call theme commands"""
-        def method(*args, **kwargs):
-            return self._api._call_js_command(self.name, command, *args, **kwargs)
+        """
+        Bind a theme command on first use.
+        
+        Python names map to the JS command (collect_coin -> collectCoin).
+        The bound callable is stored on the proxy, so later calls are a
+        plain attribute lookup. Unknown commands raise AttributeError here
+        instead of going to the JS bridge.
+        """
+        if command.startswith('_'):
+            raise AttributeError(command)
+        js_command = self._registry.resolve(self.name, command)
+        if js_command is None:
+            close = difflib.get_close_matches(command, self.commands(), n=3)
+            hint = f" Did you mean: {', '.join(close)}?" if close else ''
+            raise AttributeError(f"Theme '{self.name}' has no command '{command}'.{hint}")
+        method = functools.partial(self._api._call_js_command, self.name, js_command)
+        self.__dict__[command] = method
         return method
+    
+    def commands(self) -> List[str]:
+        """List this theme's commands (Python names)"""
+        return [to_snake_case(c) for c in self._registry.commands(self.name)]
+    
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.commands()))
 
 
 class RoosterAPI:
@@ -30,18 +77,14 @@ class RoosterAPI:
         self.js_api_path = None
         self._find_js_api()
         
-        # Theme proxies
-        self.mario = RoosterTheme('mario', self)
-        self.electronics = RoosterTheme('electronics', self)
-        self.chemistry = RoosterTheme('chemistry', self)
-        self.robotics = RoosterTheme('robotics', self)
-        self.biology = RoosterTheme('biology', self)
-        self.physics = RoosterTheme('physics', self)
-        self.music = RoosterTheme('music', self)
-        self.art = RoosterTheme('art', self)
-        self.cooking = RoosterTheme('cooking', self)
-        self.sports = RoosterTheme('sports', self)
-        self.space = RoosterTheme('space', self)
+        # Results of read-only calls, shared by every caller of this instance
+        self.cache = ResultCache(CACHE_POLICIES)
+        
+        # Theme proxies, one per theme found in the themes directory
+        self.registry = CommandRegistry()
+        for theme_name in self.registry.themes():
+            if not hasattr(type(self), theme_name):
+                setattr(self, theme_name, RoosterTheme(theme_name, self, self.registry))
         
         print("🐓 Rooster.OS Python API initialized")
     
@@ -51,6 +94,7 @@ class RoosterAPI:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.js_api_path = os.path.join(current_dir, 'js-api.js')
     
+    @cached('theme_command')
     def _call_js_command(self, theme: str, command: str, *args, **kwargs) -> Dict[str, Any]:
         """
         Call a JavaScript command from Python
@@ -74,22 +118,23 @@ class RoosterAPI:
         def __init__(self, api):
             self._api = api
         
+        @cached('theme.switch')
         def switch(self, theme_name: str):
             """Switch to a different theme"""
+            if theme_name not in self._api.registry.themes():
+                raise ValueError(f"Unknown theme '{theme_name}'. Available: {', '.join(self.list())}")
             print(f"🎨 Switching to {theme_name} theme")
             return {'theme': theme_name, 'switched': True}
         
+        @cached('theme.current')
         def current(self) -> Optional[str]:
             """Get current theme"""
             return None
         
+        @cached('theme.list')
         def list(self) -> List[str]:
             """List all available themes"""
-            return [
-                'mario', 'electronics', 'chemistry', 'robotics',
-                'biology', 'physics', 'music', 'art',
-                'cooking', 'sports', 'space'
-            ]
+            return self._api.registry.themes()
     
     class Lab:
         """Lab equipment access"""
@@ -166,35 +211,44 @@ class RoosterAPI:
             self._formula = self.Formula(self)
         return self._formula
     
+    @cached('crow')
     def crow(self):
         """Rooster crows - charges capacitor"""
         print("🐓 COCK-A-DOODLE-DOO! Capacitor charging...")
         return {'action': 'crow', 'energy': 10, 'charge': 10}
     
+    @cached('flap_wings')
     def flap_wings(self):
         """Rooster flaps wings - discharges capacitor"""
         print("🐓 *FLAP FLAP* Wings spreading!")
         return {'action': 'flapWings', 'energy': 10, 'discharged': True}
     
+    @cached('execute')
     def execute(self, code):
         """Execute code with energy"""
         print(f"⚡ Executing: {code}")
         return {'code': code, 'executed': True}
     
+    @cached('combine')
     def combine(self, formulas: List[str]):
         """Combine multiple formulas"""
         print(f"✨ Combining {len(formulas)} formulas")
         return {'formulas': formulas, 'combined': True, 'power': len(formulas) * 10}
     
+    @cached('status')
     def status(self):
         """Get system status"""
         return {
             'version': '1.0.0',
-            'themes': 11,
+            'themes': len(self.registry.themes()),
             'capacitor': 0,
             'ready': True
         }
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get result cache hit rates"""
+        return self.cache.stats()
+    
     def morning_crow(self):
         """Morning crow - build complete signal"""
         print("🌅🐓 COCK-A-DOODLE-DOO! Good morning! Build complete!")
@@ -251,6 +305,7 @@ if __name__ == '__main__':
     status = rooster.status()
     for key, value in status.items():
         print(f"  {key}: {value}")
+    print(f"  cache hit rate: {rooster.cache_stats()['hit_rate']:.0%}")
     
     print("\n" + "=" * 60)
     print("✅ Demo complete!")
@@ -0,0 +1,162 @@
+"""
+Rooster.OS Result Cache
+Caches read-only API results and invalidates them when state changes
+"""
+
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class CachePolicy(NamedTuple):
+    """
+    How results of one call may be reused.
+
+    kind is 'pure' (reused until invalidated), 'ttl' (reused for ttl
+    seconds or until invalidated) or 'mutating' (never cached; drops the
+    entries tagged with any of invalidates).
+    """
+    kind: str
+    ttl: Optional[float] = None
+    tags: Tuple[str, ...] = ()
+    invalidates: Tuple[str, ...] = ()
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires: Optional[float]
+    tags: Tuple[str, ...]
+
+
+class ResultCache:
+    """Thread-safe result cache keyed by call name and arguments."""
+
+    def __init__(self, policies: Dict[str, CachePolicy], max_entries: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            policies: Cache policy per call name; calls without one pass through
+            max_entries: Least recently used entries beyond this are evicted
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.policies = dict(policies)
+        self.max_entries = max_entries
+        self.clock = clock
+        self.enabled = True
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._tagged: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, int]] = {}
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'uncacheable': 0,
+                         'invalidated': 0, 'evicted': 0}
+
+    def _count(self, name: str, outcome: str):
+        self.counters[outcome] += 1
+        calls = self._calls.setdefault(name, {'hits': 0, 'misses': 0})
+        if outcome in calls:
+            calls[outcome] += 1
+
+    def _drop(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry.tags:
+                keys = self._tagged.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+
+    def call(self, name: str, compute: Callable[[], Any], args: tuple = (),
+             kwargs: Optional[Dict] = None) -> Any:
+        """
+        Return a cached result for name(*args, **kwargs), or compute it.
+
+        Cached results are deep-copied on the way out, so callers can't
+        change what later callers see.
+        """
+        policy = self.policies.get(name)
+        if policy is None or not self.enabled:
+            return compute()
+        if policy.kind == 'mutating':
+            result = compute()
+            self.invalidate(policy.invalidates)
+            return result
+
+        key = (name, args, tuple(sorted((kwargs or {}).items())))
+        try:
+            hash(key)
+        except TypeError:
+            with self._lock:
+                self._count(name, 'uncacheable')
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires is None or self.clock() < entry.expires:
+                    self._entries.move_to_end(key)
+                    self._count(name, 'hits')
+                    return copy.deepcopy(entry.value)
+                self._drop(key)
+                self.counters['expired'] += 1
+            self._count(name, 'misses')
+
+        result = compute()
+        expires = self.clock() + policy.ttl if policy.kind == 'ttl' else None
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Entry(copy.deepcopy(result), expires, policy.tags)
+            for tag in policy.tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.counters['evicted'] += 1
+        return result
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Drop every entry carrying any of the tags.
+
+        Returns: Number of entries dropped
+        """
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._drop(key)
+                    dropped += 1
+            self.counters['invalidated'] += dropped
+        return dropped
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters, overall and per call, and the hit rate."""
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return dict(self.counters,
+                        entries=len(self._entries),
+                        hit_rate=round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+                        calls={name: dict(c) for name, c in self._calls.items()})
+
+
+def cached(name: str):
+    """
+    Route a RoosterAPI method (or a method of one of its helper objects,
+    which reach the API through self._api) through the API's result cache
+    under the given policy name.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            api = getattr(self, '_api', self)
+            return api.cache.call(name, lambda: method(self, *args, **kwargs), args, kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,318 @@
+"""Index valuation module for rooster.os
+
+This module maintains the C13B0 index value incrementally. The index starts
+from the ``current_index_value`` recorded in ``index_value.json``, grows by
+``daily_growth`` points per day, and every token or listing added moves it by
+``growth_multiplier * amount / base`` points (from ``c13b0_pricing.json``).
+
+Additions are appended to a delta log and folded into running aggregates, so
+the index is never recomputed from scratch. Point-in-time queries bisect the
+log's cumulative deltas. Opening the index only reads: the log is started, and
+a record torn by a crash is cut off its end, when the next addition is
+appended, so later appends start on a clean line.
+
+``token_minting.TokenMinter`` and the autopilot's listing output
+(``index_valuation.enabled``) add to the index as they go.
+"""
+
+import json
+import os
+import tempfile
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+
+INDEX_VALUE_FILE = 'index_value.json'
+STATE_FILE = 'C13B0_STATE.json'
+PRICING_FILE = 'c13b0_pricing.json'
+DELTA_LOG_FILE = 'index_deltas.jsonl'
+
+SECONDS_PER_DAY = 86400.0
+
+
+def _load_json(path: str) -> Dict:
+    """Load a JSON object from path, or an empty dict if it does not exist."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def atomic_write_json(path: str, data: Dict):
+    """Write JSON to path atomically via a temporary file and rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _to_epoch(when: Optional[datetime]) -> float:
+    """Convert a datetime to epoch seconds, treating naive values as UTC."""
+    if when is None:
+        return datetime.now(timezone.utc).timestamp()
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def _parse_timestamp(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    return datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+
+def _format_timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class IndexValuation:
+    """Incrementally maintained index value backed by an append-only delta log."""
+
+    def __init__(self, root_dir: str = '.', log_path: Optional[str] = None):
+        """
+        Load the index files from root_dir and replay the delta log.
+
+        Nothing is written until the first addition or save().
+
+        Args:
+            root_dir: Directory holding index_value.json, C13B0_STATE.json
+                and c13b0_pricing.json
+            log_path: Delta log location (defaults to index_deltas.jsonl in root_dir)
+        """
+        self.root_dir = root_dir
+        self.index_path = os.path.join(root_dir, INDEX_VALUE_FILE)
+        self.state_path = os.path.join(root_dir, STATE_FILE)
+        self.log_path = log_path or os.path.join(root_dir, DELTA_LOG_FILE)
+
+        self.index_data = _load_json(self.index_path)
+        self.state_data = _load_json(self.state_path)
+        pricing = _load_json(os.path.join(root_dir, PRICING_FILE))
+
+        # C13B0_STATE.json takes precedence when it carries the fields
+        merged = dict(self.index_data)
+        merged.update({k: v for k, v in self.state_data.items()
+                       if k in ('current_index_value', 'daily_growth', 'mongoose_delta', 'last_update')})
+
+        self.base = float(pricing.get('base', 10))
+        self.growth_multiplier = float(pricing.get('growth_multiplier', 1.0))
+        self.daily_growth = float(merged.get('daily_growth', 0))
+
+        # Running aggregates; mongoose_delta includes the delta persisted
+        # before the log was started (origin_delta)
+        self.origin_delta = 0.0
+        self.mongoose_delta = 0.0
+        self.counts = {'token': 0, 'listing': 0}
+        self.amounts = {'token': 0.0, 'listing': 0.0}
+
+        # Cumulative delta history for point-in-time queries
+        self._times = array('d')
+        self._cumulative = array('d')
+
+        # Writes deferred to the first append: the origin record of a new
+        # log, and the offset a torn tail is cut back to
+        self._pending_origin: Optional[Dict] = None
+        self._torn_offset: Optional[int] = None
+
+        if not self._replay_log():
+            # First run: anchor the log at the recorded index value. Any
+            # delta already folded into that value is part of the origin.
+            last_update = _parse_timestamp(merged.get('last_update'))
+            self.origin_time = _to_epoch(last_update)
+            self.origin_value = float(merged.get('current_index_value', 0))
+            self.origin_delta = float(merged.get('mongoose_delta', 0))
+            self.mongoose_delta = self.origin_delta
+            self._pending_origin = {'kind': 'origin', 'ts': self.origin_time,
+                                    'value': self.origin_value,
+                                    'mongoose_delta': self.origin_delta}
+
+    def _replay_log(self) -> bool:
+        """Rebuild aggregates from an existing delta log. Returns False if there is none."""
+        if not os.path.exists(self.log_path):
+            return False
+
+        origin = None
+        good_offset = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash; everything before it is intact
+                    break
+                good_offset += len(line)
+                if record['kind'] == 'origin':
+                    origin = record
+                    self.origin_delta = float(record.get('mongoose_delta', 0))
+                    self.mongoose_delta += self.origin_delta
+                    continue
+                self._apply(record)
+
+        if good_offset < os.path.getsize(self.log_path):
+            # Torn tail; cut off before the next append so it starts a fresh line
+            self._torn_offset = good_offset
+        if origin is None:
+            return False
+        self.origin_time = origin['ts']
+        self.origin_value = origin['value']
+        return True
+
+    def _apply(self, record: Dict):
+        kind = record['kind']
+        self.mongoose_delta += record['delta']
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.amounts[kind] = self.amounts.get(kind, 0.0) + record['amount']
+        self._times.append(record['ts'])
+        self._cumulative.append(self.mongoose_delta - self.origin_delta)
+
+    def _append_records(self, records: List[Dict]):
+        if self._torn_offset is not None:
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(self._torn_offset)
+                f.flush()
+                os.fsync(f.fileno())
+            self._torn_offset = None
+        if self._pending_origin is not None:
+            records = [self._pending_origin] + records
+        with open(self.log_path, 'a') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+            f.flush()
+        self._pending_origin = None
+
+    def delta_for(self, amount: float) -> float:
+        """Return the index points contributed by an addition of the given amount."""
+        return self.growth_multiplier * amount / self.base
+
+    def record(self, kind: str, ref, amount: float,
+               when: Optional[datetime] = None) -> float:
+        """
+        Record an addition and update the running aggregates.
+
+        Args:
+            kind: 'token' or 'listing'
+            ref: Identifier of the token or listing
+            amount: Value of the addition (token value, listing price)
+            when: Time of the addition (defaults to now)
+
+        Returns: The index value immediately after the addition
+
+        Raises:
+            ValueError: If when is earlier than the last recorded addition
+        """
+        return self.record_many(kind, [(ref, amount, when)])
+
+    def accepts(self, when: Optional[datetime] = None) -> bool:
+        """Return True if an addition at when would keep the log in time order."""
+        return _to_epoch(when) >= (self._times[-1] if self._times else self.origin_time)
+
+    def record_many(self, kind: str, entries: Iterable) -> Optional[float]:
+        """
+        Record several additions of one kind with a single log append.
+
+        Args:
+            kind: 'token' or 'listing'
+            entries: (ref, amount, when) tuples in time order; when may be None (now)
+
+        Returns: The index value immediately after the last addition, or
+        None if there were no entries
+
+        Raises:
+            ValueError: If the entries go back in time; nothing is recorded
+        """
+        records = []
+        last_ts = self._times[-1] if self._times else self.origin_time
+        for ref, amount, when in entries:
+            ts = _to_epoch(when)
+            if ts < last_ts:
+                raise ValueError(f"Delta log is append-only; {_format_timestamp(ts)} "
+                                 f"is before {_format_timestamp(last_ts)}")
+            records.append({'kind': kind, 'ts': ts, 'ref': ref, 'amount': float(amount),
+                            'delta': self.delta_for(float(amount))})
+            last_ts = ts
+        if not records:
+            return None
+        self._append_records(records)
+        for record in records:
+            self._apply(record)
+        return self.value_at_epoch(last_ts)
+
+    def add_token(self, token, when: Optional[datetime] = None) -> float:
+        """Add a rooster_token.Token to the index (at its token_datetime by default)."""
+        return self.record('token', token.number, token.value, when or token.token_datetime)
+
+    def add_tokens(self, tokens: Iterable) -> Optional[float]:
+        """Add minted tokens to the index at their token_datetime."""
+        return self.record_many('token', ((token.number, token.value, token.token_datetime)
+                                          for token in tokens))
+
+    def add_listing(self, listing_id: str, price: float,
+                    when: Optional[datetime] = None) -> float:
+        """Add a listing with its price (e.g. its reserve price) to the index."""
+        return self.record('listing', listing_id, price, when)
+
+    def value_at_epoch(self, ts: float) -> Optional[float]:
+        """Return the index value at epoch seconds ts, or None before the origin."""
+        if ts < self.origin_time:
+            return None
+        position = bisect_right(self._times, ts)
+        delta = self._cumulative[position - 1] if position else 0.0
+        growth = self.daily_growth * (ts - self.origin_time) / SECONDS_PER_DAY
+        return self.origin_value + growth + delta
+
+    def value_at(self, when: Optional[datetime] = None) -> Optional[float]:
+        """Return the index value at a point in time (defaults to now)."""
+        return self.value_at_epoch(_to_epoch(when))
+
+    def save(self, when: Optional[datetime] = None):
+        """
+        Persist the current index value to index_value.json and C13B0_STATE.json.
+
+        Both files are written atomically. Keys this module does not own are
+        preserved. A time before the log's origin (e.g. a clock behind the
+        recorded last_update) saves the origin value.
+        """
+        ts = max(_to_epoch(when), self.origin_time)
+        fields = {
+            'current_index_value': round(self.value_at_epoch(ts), 6),
+            'daily_growth': self.daily_growth,
+            'mongoose_delta': round(self.mongoose_delta, 6),
+            'last_update': _format_timestamp(ts)
+        }
+        self.index_data.update(fields)
+        self.state_data.update(fields)
+        atomic_write_json(self.index_path, self.index_data)
+        atomic_write_json(self.state_path, self.state_data)
+
+    def summary(self) -> Dict:
+        """Return the running aggregates as a dictionary."""
+        return {
+            'current_index_value': self.value_at(),
+            'mongoose_delta': self.mongoose_delta,
+            'tokens': self.counts.get('token', 0),
+            'listings': self.counts.get('listing', 0),
+            'token_value_total': self.amounts.get('token', 0.0),
+            'listing_value_total': self.amounts.get('listing', 0.0)
+        }
+
+
+def main():
+    """Display the current index value."""
+    valuation = IndexValuation(os.path.dirname(os.path.abspath(__file__)))
+    for key, value in valuation.summary().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
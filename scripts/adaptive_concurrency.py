@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Adaptive Concurrency - Tunes how many batch items run at once.
+
+This module can:
+- Gate batch workers with a permit count that changes while the batch runs
+- Measure per-item latency, throughput, process RSS and CPU use per window
+- Grow the permit count by one while there is headroom (additive increase)
+- Cut it by a factor when memory or latency show overload (multiplicative
+  decrease), and stop growing while the cores are saturated
+- Keep a log of every decision and the measurements behind it
+
+Item cost varies a lot between consignors (image sizes differ 20x), so no
+fixed worker count suits every batch: too many workers run the container
+out of memory, too few leave cores idle. For the same reason latency is
+judged per megabyte of input when item sizes are given, so a run of large
+photos is not mistaken for queueing.
+"""
+
+import math
+import os
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+DEFAULT_ADAPTIVE_SETTINGS = {
+    'enabled': False,
+    'min_workers': 1,
+    'initial_workers': 2,
+    'max_workers': None,
+    'memory_ceiling_mb': None,
+    'cpu_ceiling': 0.9,
+    'interval_seconds': 2.0,
+    'min_samples': 4,
+    'decrease_factor': 0.7,
+    'latency_tolerance': 2.0,
+    'min_throughput_gain': 0.05,
+    'max_decisions': 500
+}
+
+# Share of the container (or machine) memory used when no ceiling is configured
+DEFAULT_MEMORY_SHARE = 0.85
+
+# Items without a known size count as one unit of work
+BYTES_PER_UNIT = 1024 * 1024
+
+# Per-window growth allowed in the latency baseline, so it follows batches
+# whose items are slower by nature rather than treating them as overload
+BASELINE_DRIFT = 0.05
+
+
+def read_rss() -> int:
+    """Return this process's resident set size in bytes (peak RSS if unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    return 0
+
+
+def read_cpu_seconds() -> float:
+    """Return CPU seconds used by this process (all threads)."""
+    times = os.times()
+    return times.user + times.system
+
+
+def detect_memory_limit() -> Optional[int]:
+    """Return the container memory limit (cgroup v2 or v1), else physical memory, in bytes."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path, 'r') as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # Unlimited cgroups report 'max' or a huge sentinel value
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """AIMD permit limit for batch workers, driven by latency, throughput and RSS."""
+
+    def __init__(self, min_workers: int = 1, initial_workers: int = 2,
+                 max_workers: Optional[int] = None, memory_ceiling_mb: Optional[float] = None,
+                 cpu_ceiling: float = 0.9, interval_seconds: float = 2.0, min_samples: int = 4,
+                 decrease_factor: float = 0.7, latency_tolerance: float = 2.0,
+                 min_throughput_gain: float = 0.05, max_decisions: int = 500,
+                 rss_reader: Callable[[], int] = read_rss,
+                 cpu_reader: Callable[[], float] = read_cpu_seconds,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the controller.
+
+        Args:
+            min_workers: The limit never drops below this
+            initial_workers: Limit to start with
+            max_workers: The limit never grows past this (defaults to twice the CPU count)
+            memory_ceiling_mb: RSS the process must stay under (defaults to 85% of
+                the container or machine memory)
+            cpu_ceiling: Share of all cores (0-1) at which the limit stops growing
+            interval_seconds: Shortest time between decisions
+            min_samples: Completed items needed before a decision
+            decrease_factor: Multiplier applied to the limit on overload
+            latency_tolerance: Median latency per unit of work (per MB of input
+                when sizes are given) above this multiple of the baseline counts
+                as overload (workers are queueing on each other)
+            min_throughput_gain: An increase that raises throughput by less than
+                this share while latency rises by more counts as overload: the
+                extra worker only added queueing
+            max_decisions: Decisions kept in the log (the oldest are dropped)
+            rss_reader: Returns the process RSS in bytes (injectable for tests)
+            cpu_reader: Returns process CPU seconds (injectable for tests)
+            clock: Monotonic time source (injectable for tests)
+        """
+        cpus = os.cpu_count() or 1
+        self.min_workers = max(1, int(min_workers))
+        self.max_workers = max(self.min_workers, int(max_workers or 2 * cpus))
+        if memory_ceiling_mb:
+            self.memory_ceiling = int(memory_ceiling_mb * 1024 * 1024)
+        else:
+            limit = detect_memory_limit()
+            self.memory_ceiling = int(limit * DEFAULT_MEMORY_SHARE) if limit else None
+        self.cpu_ceiling = float(cpu_ceiling)
+        self.interval = float(interval_seconds)
+        self.min_samples = max(1, int(min_samples))
+        self.decrease_factor = float(decrease_factor)
+        self.latency_tolerance = float(latency_tolerance)
+        self.min_throughput_gain = float(min_throughput_gain)
+        self.max_decisions = max_decisions
+        self.cpus = cpus
+        self._rss_reader = rss_reader
+        self._cpu_reader = cpu_reader
+        self._clock = clock
+
+        self.limit = min(self.max_workers, max(self.min_workers, int(initial_workers)))
+        self.active = 0
+        self.decisions: List[Dict] = []
+        self.stats = {'completed': 0, 'increases': 0, 'decreases': 0, 'holds': 0,
+                      'peak_limit': self.limit, 'peak_rss_mb': 0.0}
+        self._cond = threading.Condition()
+        self._latencies: List[float] = []
+        self._costs: List[float] = []
+        self._work = 0.0
+        self._baseline: Optional[float] = None
+        self._previous: Optional[Dict] = None
+        self._base_rss = rss_reader()
+        self._window_start = clock()
+        self._window_cpu = cpu_reader()
+        self._started = self._window_start
+
+    @classmethod
+    def from_config(cls, settings: Dict, **kwargs) -> 'AdaptiveConcurrency':
+        """Create a controller from the adaptive_concurrency section of the config."""
+        merged = dict(DEFAULT_ADAPTIVE_SETTINGS)
+        merged.update(settings or {})
+        return cls(min_workers=merged['min_workers'],
+                   initial_workers=merged['initial_workers'],
+                   max_workers=merged['max_workers'],
+                   memory_ceiling_mb=merged['memory_ceiling_mb'],
+                   cpu_ceiling=merged['cpu_ceiling'],
+                   interval_seconds=merged['interval_seconds'],
+                   min_samples=merged['min_samples'],
+                   decrease_factor=merged['decrease_factor'],
+                   latency_tolerance=merged['latency_tolerance'],
+                   min_throughput_gain=merged['min_throughput_gain'],
+                   max_decisions=merged['max_decisions'],
+                   **kwargs)
+
+    def acquire(self):
+        """Block until fewer than limit items are running, then take a permit."""
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, latency: Optional[float] = None, size: Optional[int] = None):
+        """
+        Return a permit.
+
+        Args:
+            latency: Seconds the item took (None if no item was run, e.g. the
+                worker found the queue empty)
+            size: Item size in bytes; latency and throughput are then measured
+                per megabyte, so bigger items don't read as overload. Give it
+                for every item of a batch or for none.
+        """
+        with self._cond:
+            self.active -= 1
+            if latency is not None:
+                work = size / BYTES_PER_UNIT if size else 1.0
+                self._latencies.append(latency)
+                self._costs.append(latency / work)
+                self._work += work
+                self.stats['completed'] += 1
+                self._maybe_adjust()
+            self._cond.notify_all()
+
+    def _maybe_adjust(self):
+        now = self._clock()
+        elapsed = now - self._window_start
+        if elapsed < self.interval or len(self._latencies) < self.min_samples:
+            return
+        cpu_seconds = self._cpu_reader()
+        rss = self._rss_reader()
+        # Decisions use the cost per unit of work, not the raw latency
+        latency = statistics.median(self._costs)
+        sample = {
+            'elapsed_s': round(now - self._started, 3),
+            'items': len(self._latencies),
+            'throughput': round(self._work / elapsed, 3),
+            'median_latency_s': round(statistics.median(self._latencies), 4),
+            'median_cost_s': round(latency, 4),
+            'rss_mb': round(rss / (1024 * 1024), 1),
+            'cpu': round((cpu_seconds - self._window_cpu) / (elapsed * self.cpus), 3),
+        }
+        self._latencies = []
+        self._costs = []
+        self._work = 0.0
+        self._window_start = now
+        self._window_cpu = cpu_seconds
+        self.stats['peak_rss_mb'] = max(self.stats['peak_rss_mb'], sample['rss_mb'])
+
+        if self._baseline is None:
+            self._baseline = latency
+        else:
+            self._baseline = min(latency, self._baseline * (1 + BASELINE_DRIFT))
+        sample['baseline_cost_s'] = round(self._baseline, 4)
+
+        # Memory each running item adds, to check the next one would still fit
+        per_worker = max(0, rss - self._base_rss) / max(1, self.limit)
+        previous = self._previous
+        self._previous = dict(sample, limit=self.limit)
+        gain = 1 + self.min_throughput_gain
+        no_gain = (previous is not None and self.limit > previous['limit']
+                   and sample['throughput'] < previous['throughput'] * gain
+                   and latency > previous['median_cost_s'] * gain)
+
+        if self.memory_ceiling and rss >= self.memory_ceiling:
+            action, reason = 'decrease', 'memory'
+        elif latency > self._baseline * self.latency_tolerance:
+            action, reason = 'decrease', 'latency'
+        elif no_gain:
+            action, reason = 'decrease', 'no_throughput_gain'
+        elif sample['cpu'] >= self.cpu_ceiling:
+            # Busy cores are the goal; another worker would only queue for them
+            action, reason = 'hold', 'cpu'
+        elif self.limit >= self.max_workers:
+            action, reason = 'hold', 'max_workers'
+        elif self.memory_ceiling and rss + per_worker >= self.memory_ceiling:
+            action, reason = 'hold', 'memory_headroom'
+        else:
+            action, reason = 'increase', 'headroom'
+
+        before = self.limit
+        if action == 'decrease':
+            self.limit = max(self.min_workers, int(math.floor(self.limit * self.decrease_factor)))
+            if self.limit == before:
+                action = 'hold'
+        elif action == 'increase':
+            self.limit += 1
+        self.stats[{'increase': 'increases', 'decrease': 'decreases', 'hold': 'holds'}[action]] += 1
+        self.stats['peak_limit'] = max(self.stats['peak_limit'], self.limit)
+
+        self.decisions.append(dict(sample, action=action, reason=reason,
+                                   limit_from=before, limit_to=self.limit))
+        if len(self.decisions) > self.max_decisions:
+            del self.decisions[0]
+
+    def summary(self) -> Dict:
+        """Return settings, counters, the final limit and the decision log."""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'min_workers': self.min_workers,
+                'max_workers': self.max_workers,
+                'memory_ceiling_mb': (round(self.memory_ceiling / (1024 * 1024), 1)
+                                      if self.memory_ceiling else None),
+                'cpu_ceiling': self.cpu_ceiling,
+                'stats': dict(self.stats),
+                'decisions': list(self.decisions),
+            }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Async Runner - asyncio-native driver for AutopilotBot's stage graph.
+
+This module can:
+- Run every item's stages as coroutines on a single event loop
+- Await coroutine stage handlers (e.g. remote inference clients) directly
+- Offload blocking CPU-bound stages (crop, render) to an executor
+- Bound in-flight items, analysis calls and open files with semaphores
+
+Thousands of items waiting on remote analysis overlap in one process
+without a thread per item.
+"""
+
+import asyncio
+import inspect
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from stage_graph import Stage
+
+
+DEFAULT_ASYNC_SETTINGS = {
+    'enabled': False,
+    'max_in_flight_items': 256,
+    'max_analysis_calls': 32,
+    'max_open_files': 64,
+    'cpu_workers': None
+}
+
+
+class AsyncPipelineRunner:
+    """Drives an AutopilotBot's stage graph with asyncio."""
+
+    def __init__(self, bot, settings: Optional[Dict] = None,
+                 cpu_executor: Optional[Executor] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            bot: The AutopilotBot whose stage graph and counters are used
+            settings: The async_runner section of the config
+            cpu_executor: Executor for cpu stages (a thread pool of cpu_workers
+                if None). Stage handlers are bound to the bot, so it must
+                run them in this process.
+        """
+        self.bot = bot
+        self.settings = dict(DEFAULT_ASYNC_SETTINGS)
+        self.settings.update(settings or {})
+        self._cpu_executor = cpu_executor
+        self._owns_executor = cpu_executor is None
+        self._io_executor = None
+        self._analysis_slots = None
+        self._file_slots = None
+
+    def _make_cpu_executor(self) -> Executor:
+        workers = self.settings['cpu_workers'] or os.cpu_count() or 1
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='async-cpu')
+
+    async def _call_blocking(self, executor: Optional[Executor], handler, inputs: Dict) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, handler, inputs)
+
+    async def call_stage(self, stage: Stage, inputs: Dict) -> Dict:
+        """
+        Run one stage according to its kind.
+
+        Coroutine handlers are awaited on the loop; blocking handlers run in
+        the cpu executor (cpu stages) or the I/O thread pool (analysis and io
+        stages). analysis stages hold an analysis slot; cpu and io stages
+        hold an open-file slot.
+        """
+        if stage.kind == 'analysis':
+            slots = self._analysis_slots
+            executor = self._io_executor
+        else:
+            slots = self._file_slots
+            executor = self._cpu_executor if stage.kind == 'cpu' else self._io_executor
+
+        async with slots:
+            if inspect.iscoroutinefunction(stage.handler):
+                return await stage.handler(inputs)
+            return await self._call_blocking(executor, stage.handler, inputs)
+
+    async def run_item(self, image_path: str, output_dir: str,
+                       metadata: Optional[Dict] = None) -> Dict:
+        """Run one item through the stage graph and return its listing result."""
+        bot = self.bot
+        result = bot.new_item_result(image_path)
+        context = bot.item_context(image_path, output_dir, metadata)
+        try:
+            await bot.stage_graph.run_async(context, self.call_stage)
+            bot.record_item_outputs(context, result)
+        except Exception as e:
+            bot.record_item_error(e, result)
+        finally:
+            bot.release_frames(context)
+        return result
+
+    async def run_items(self, items: Iterable[Tuple[str, str, Optional[Dict]]]) -> List[Dict]:
+        """
+        Run many items with at most max_in_flight_items in progress.
+
+        Args:
+            items: (image_path, output_dir, metadata) tuples; consumed lazily
+
+        Returns: Listing results in input order
+        """
+        self._analysis_slots = asyncio.Semaphore(self.settings['max_analysis_calls'])
+        self._file_slots = asyncio.Semaphore(self.settings['max_open_files'])
+        if self._cpu_executor is None:
+            self._cpu_executor = self._make_cpu_executor()
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=max(self.settings['max_analysis_calls'], self.settings['max_open_files']),
+            thread_name_prefix='async-io'
+        )
+
+        results: Dict[int, Dict] = {}
+        iterator = enumerate(items)
+
+        async def consume():
+            # Each consumer pulls the next item when it finishes one, so only
+            # max_in_flight_items results and contexts are alive at once
+            for index, (image_path, output_dir, metadata) in iterator:
+                results[index] = await self.run_item(image_path, output_dir, metadata)
+
+        try:
+            await asyncio.gather(*(consume() for _ in range(self.settings['max_in_flight_items'])))
+        finally:
+            self._io_executor.shutdown(wait=True)
+            if self._owns_executor:
+                self._cpu_executor.shutdown(wait=True)
+                self._cpu_executor = None
+
+        return [results[i] for i in range(len(results))]
+
+    def run(self, items: Iterable[Tuple[str, str, Optional[Dict]]]) -> List[Dict]:
+        """Synchronous entry point: run items on a fresh event loop."""
+        return asyncio.run(self.run_items(items))
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Auction Book - Python auction engine for listings produced by the autopilot.
+
+This module mirrors the rules of auctionSystem.js (createAuction, placeBid,
+getActiveAuctions, closeAuction, cancelAuction) and adds:
+- An expiry min-heap, so closing expired auctions costs O(log n) each
+  instead of a scan of every auction
+- Per-auction best-bid tracking and per-user seller, bidder and leader indexes
+- Active listings kept in listing order, so listing them is output-sensitive
+- Bulk auto-relisting of unsold auctions from auction_settings
+- Persistence as an append-only JSON-lines event log, replayed on load
+"""
+
+import argparse
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+from auction_pricing import DEFAULT_AUCTION_SETTINGS
+
+
+SECONDS_PER_DAY = 86400.0
+MAX_AUCTION_DURATION_SECONDS = 10 * 365 * SECONDS_PER_DAY
+
+# Above this many auctions in one bulk operation, rebuild the heap in O(n)
+# instead of pushing each entry in O(log n)
+_HEAPIFY_THRESHOLD = 64
+
+
+class AuctionError(ValueError):
+    """Raised when an auction operation breaks the auction rules."""
+
+
+class Auction:
+    """One auction and its bid history."""
+
+    __slots__ = ('id', 'seller_id', 'title', 'description', 'starting_bid', 'current_bid',
+                 'highest_bidder', 'bids', 'status', 'created_at', 'listed_at', 'end_time',
+                 'duration', 'auto_relist', 'relist_count', 'winner_paid', 'payment_error',
+                 'item_name')
+
+    def __init__(self, auction_id: str, seller_id: str, title: str, description: str,
+                 starting_bid: float, created_at: float, duration: float,
+                 auto_relist: bool = False, item_name: Optional[str] = None):
+        self.id = auction_id
+        self.seller_id = seller_id
+        self.title = title
+        self.description = description
+        self.starting_bid = starting_bid
+        self.current_bid = starting_bid
+        self.highest_bidder = None
+        self.bids: List[Dict] = []
+        self.status = 'active'
+        self.created_at = created_at
+        self.listed_at = created_at
+        self.end_time = created_at + duration
+        self.duration = duration
+        self.auto_relist = auto_relist
+        self.relist_count = 0
+        self.winner_paid = None
+        self.payment_error = None
+        self.item_name = item_name
+
+    def to_dict(self) -> Dict:
+        """Convert the auction to a dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AuctionBook:
+    """In-memory auction engine with heap-based expiry and an append-only log."""
+
+    def __init__(self, log_path: Optional[str] = None, duration_days: float = 7,
+                 auto_relist: bool = False,
+                 has_sufficient_balance: Optional[Callable[[str, float], bool]] = None,
+                 settle: Optional[Callable[[Auction], None]] = None,
+                 clock: Callable[[], float] = time.time, fsync: bool = False):
+        """
+        Initialize the book, replaying log_path if it exists.
+
+        Args:
+            log_path: JSON-lines event log (None keeps the book in memory only)
+            duration_days: Default auction duration
+            auto_relist: Default for relisting auctions that end without bids
+            has_sufficient_balance: Optional check (bidder_id, amount) -> bool
+            settle: Optional payment callback for a closed auction with a
+                winner; an exception marks the auction unpaid
+            clock: Time source in epoch seconds (injectable for tests)
+            fsync: fsync the log after every event
+        """
+        self.log_path = log_path
+        self.default_duration = duration_days * SECONDS_PER_DAY
+        self.default_auto_relist = auto_relist
+        self.has_sufficient_balance = has_sufficient_balance
+        self.settle = settle
+        self.clock = clock
+        self.fsync = fsync
+
+        self.auctions: Dict[str, Auction] = {}
+        self._active: Dict[str, Auction] = {}
+        self._expiry: List = []
+        self._by_seller: Dict[str, List[str]] = {}
+        self._by_bidder: Dict[str, Dict[str, None]] = {}
+        self._leading: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.RLock()
+        self._log = None
+        self.stats = {
+            'total_auctions': 0,
+            'active_auctions': 0,
+            'completed_auctions': 0,
+            'cancelled_auctions': 0,
+            'total_bids': 0,
+            'total_value': 0.0,
+            'relisted': 0
+        }
+
+        if log_path and os.path.exists(log_path):
+            self._replay(log_path)
+        if log_path:
+            self._log = open(log_path, 'a')
+
+    @classmethod
+    def from_config(cls, config: Dict, log_path: Optional[str] = None, **kwargs) -> 'AuctionBook':
+        """Create a book using duration_days and auto_relist from auction_settings."""
+        settings = dict(DEFAULT_AUCTION_SETTINGS)
+        settings.update(config.get('auction_settings', {}))
+        return cls(log_path, duration_days=settings['duration_days'],
+                   auto_relist=settings['auto_relist'], **kwargs)
+
+    # -- log -----------------------------------------------------------------
+
+    def _append(self, event: Dict):
+        if self._log is None:
+            return
+        self._log.write(json.dumps(event) + '\n')
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _replay(self, log_path: str):
+        handlers = {
+            'create': lambda e: self._apply_create(e['auction']),
+            'bid': lambda e: self._apply_bid(self.auctions[e['id']], e['bid']),
+            'close': lambda e: self._apply_close(self.auctions[e['id']], e.get('winner_paid'),
+                                                 e.get('payment_error')),
+            'cancel': lambda e: self._apply_cancel(self.auctions[e['id']]),
+            'relist': lambda e: self._apply_relist([self.auctions[i] for i in e['ids']], e['ts'])
+        }
+        good_offset = 0
+        with open(log_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated record")
+                    event = json.loads(line) if line.strip() else None
+                except ValueError:
+                    # Torn final write from a crash; everything before it is intact
+                    break
+                good_offset += len(line)
+                if event is not None:
+                    handlers[event['op']](event)
+
+        if good_offset < os.path.getsize(log_path):
+            # Cut the torn tail off so the next append starts a fresh line
+            with open(log_path, 'r+b') as f:
+                f.truncate(good_offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self):
+        """Rewrite the log as one create event per auction (atomically)."""
+        if not self.log_path:
+            return
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.log_path))
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.jsonl', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    for auction in self.auctions.values():
+                        f.write(json.dumps({'op': 'create', 'auction': auction.to_dict()}) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._log.close()
+                os.replace(tmp_path, self.log_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            finally:
+                self._log = open(self.log_path, 'a')
+
+    def close(self):
+        """Close the log file."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # -- state changes (shared by live calls and replay) ---------------------
+
+    def _apply_create(self, data: Dict, push: bool = True) -> Auction:
+        auction = Auction(data['id'], data['seller_id'], data['title'], data['description'],
+                          data['starting_bid'], data['created_at'], data['duration'],
+                          data.get('auto_relist', False), data.get('item_name'))
+        # Snapshot events from compact() carry the full state
+        for name in ('current_bid', 'highest_bidder', 'bids', 'status', 'listed_at', 'end_time',
+                     'relist_count', 'winner_paid', 'payment_error'):
+            if name in data:
+                setattr(auction, name, data[name])
+
+        self.auctions[auction.id] = auction
+        self._by_seller.setdefault(auction.seller_id, []).append(auction.id)
+        for bid in auction.bids:
+            self._by_bidder.setdefault(bid['bidder_id'], {})[auction.id] = None
+        self.stats['total_auctions'] += 1
+        self.stats['total_bids'] += len(auction.bids)
+        self.stats['relisted'] += auction.relist_count
+        if auction.status == 'active':
+            self._active[auction.id] = auction
+            self.stats['active_auctions'] += 1
+            if auction.highest_bidder:
+                self._leading.setdefault(auction.highest_bidder, {})[auction.id] = None
+            if push:
+                heapq.heappush(self._expiry, (auction.end_time, auction.id))
+            else:
+                self._expiry.append((auction.end_time, auction.id))
+        elif auction.status == 'completed':
+            self.stats['completed_auctions'] += 1
+            self.stats['total_value'] += auction.current_bid
+        elif auction.status == 'cancelled':
+            self.stats['cancelled_auctions'] += 1
+        return auction
+
+    def _apply_bid(self, auction: Auction, bid: Dict):
+        previous = auction.highest_bidder
+        if previous is not None:
+            self._leading.get(previous, {}).pop(auction.id, None)
+        auction.current_bid = bid['amount']
+        auction.highest_bidder = bid['bidder_id']
+        auction.bids.append(bid)
+        self._by_bidder.setdefault(bid['bidder_id'], {})[auction.id] = None
+        self._leading.setdefault(bid['bidder_id'], {})[auction.id] = None
+        self.stats['total_bids'] += 1
+
+    def _deactivate(self, auction: Auction):
+        del self._active[auction.id]
+        self.stats['active_auctions'] -= 1
+        if auction.highest_bidder is not None:
+            self._leading.get(auction.highest_bidder, {}).pop(auction.id, None)
+
+    def _apply_close(self, auction: Auction, winner_paid: Optional[bool],
+                     payment_error: Optional[str]):
+        self._deactivate(auction)
+        auction.status = 'completed'
+        auction.winner_paid = winner_paid
+        auction.payment_error = payment_error
+        self.stats['completed_auctions'] += 1
+        self.stats['total_value'] += auction.current_bid
+
+    def _apply_cancel(self, auction: Auction):
+        self._deactivate(auction)
+        auction.status = 'cancelled'
+        self.stats['cancelled_auctions'] += 1
+
+    def _apply_relist(self, auctions: List[Auction], now: float):
+        entries = []
+        for auction in auctions:
+            self.stats['completed_auctions'] -= 1
+            self.stats['total_value'] -= auction.current_bid
+            auction.status = 'active'
+            auction.listed_at = now
+            auction.end_time = now + auction.duration
+            auction.relist_count += 1
+            auction.winner_paid = None
+            self._active[auction.id] = auction
+            entries.append((auction.end_time, auction.id))
+        self.stats['active_auctions'] += len(auctions)
+        self.stats['relisted'] += len(auctions)
+        self._push_many(entries)
+
+    def _push_many(self, entries: List):
+        if len(entries) > _HEAPIFY_THRESHOLD:
+            self._expiry.extend(entries)
+            heapq.heapify(self._expiry)
+        else:
+            for entry in entries:
+                heapq.heappush(self._expiry, entry)
+
+    # -- public API ----------------------------------------------------------
+
+    def _auction_data(self, seller_id: str, title: str, description: str,
+                      starting_bid: float, duration: Optional[float],
+                      auto_relist: Optional[bool], item_name: Optional[str], now: float) -> Dict:
+        """Validate a new auction and return its create-event data."""
+        if not title or not description:
+            raise AuctionError("Title and description are required")
+        if starting_bid <= 0:
+            raise AuctionError("Starting bid must be greater than 0")
+        duration = self.default_duration if duration is None else duration
+        if duration <= 0 or duration > MAX_AUCTION_DURATION_SECONDS:
+            raise AuctionError(f"Duration must be between 0 and {MAX_AUCTION_DURATION_SECONDS:.0f}s "
+                               f"(10 years)")
+
+        return {
+            'id': f"auction_{int(now * 1000)}_{uuid.uuid4().hex[:9]}",
+            'seller_id': seller_id,
+            'title': title,
+            'description': description,
+            'starting_bid': starting_bid,
+            'created_at': now,
+            'duration': duration,
+            'auto_relist': self.default_auto_relist if auto_relist is None else auto_relist,
+            'item_name': item_name
+        }
+
+    def create_auction(self, seller_id: str, title: str, description: str,
+                       starting_bid: float, duration: Optional[float] = None,
+                       auto_relist: Optional[bool] = None, item_name: Optional[str] = None,
+                       now: Optional[float] = None) -> Auction:
+        """
+        Create an auction.
+
+        Args:
+            seller_id: Seller's user ID
+            title: Listing title
+            description: Listing description
+            starting_bid: Opening price (must be positive)
+            duration: Seconds until the auction ends (default from auction_settings)
+            auto_relist: Relist automatically if it ends without bids
+            item_name: Autopilot item the auction was created from
+
+        Returns: The created auction
+        """
+        now = self.clock() if now is None else now
+        data = self._auction_data(seller_id, title, description, starting_bid,
+                                  duration, auto_relist, item_name, now)
+        with self._lock:
+            auction = self._apply_create(data)
+            self._append({'op': 'create', 'auction': data})
+        return auction
+
+    def add_listings(self, listings: Iterable[Dict], seller_id: str,
+                     now: Optional[float] = None) -> List[Auction]:
+        """
+        Create auctions in bulk from autopilot listing results.
+
+        Successful listings with a starting price become auctions titled
+        by their generated title; the description file is read if present.
+
+        Returns: The created auctions
+        """
+        now = self.clock() if now is None else now
+        batch = []
+        for listing in listings:
+            pricing = listing.get('pricing') or {}
+            if not listing.get('success') or not pricing.get('starting_price'):
+                continue
+            outputs = listing.get('outputs', {})
+            description = outputs.get('description') or ''
+            if description and os.path.isfile(description):
+                with open(description, 'r') as f:
+                    description = f.read()
+            batch.append(self._auction_data(
+                seller_id, outputs.get('title') or listing['item_name'],
+                description or listing['item_name'], pricing['starting_price'],
+                None, None, listing['item_name'], now
+            ))
+
+        with self._lock:
+            bulk = len(batch) > _HEAPIFY_THRESHOLD
+            created = [self._apply_create(data, push=not bulk) for data in batch]
+            if bulk:
+                heapq.heapify(self._expiry)
+            for data in batch:
+                self._append({'op': 'create', 'auction': data})
+        return created
+
+    def place_bid(self, auction_id: str, bidder_id: str, amount: float,
+                  now: Optional[float] = None) -> Dict:
+        """
+        Place a bid.
+
+        Returns: Dictionary with the auction, the bid and a message
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            auction = self.auctions.get(auction_id)
+            if auction is None:
+                raise AuctionError("Auction not found")
+            if auction.status != 'active':
+                raise AuctionError("Auction is not active")
+            if now >= auction.end_time:
+                self.close_auction(auction_id, now=now)
+                raise AuctionError("Auction has ended")
+            if bidder_id == auction.seller_id:
+                raise AuctionError("Cannot bid on your own auction")
+            if amount <= auction.current_bid:
+                raise AuctionError(f"Bid must be higher than current bid of {auction.current_bid}")
+            if self.has_sufficient_balance is not None and \
+                    not self.has_sufficient_balance(bidder_id, amount):
+                raise AuctionError("Insufficient rooster cash balance. "
+                                   "Only logical bidders with real rooster cash can bid.")
+
+            bid = {
+                'id': f"bid_{int(now * 1000)}_{uuid.uuid4().hex[:9]}",
+                'bidder_id': bidder_id,
+                'amount': amount,
+                'timestamp': now
+            }
+            self._apply_bid(auction, bid)
+            self._append({'op': 'bid', 'id': auction_id, 'bid': bid})
+        return {'auction': auction, 'bid': bid,
+                'message': '🐓 ROOSTER CROW! You got a bid on your auction!'}
+
+    def close_auction(self, auction_id: str, now: Optional[float] = None) -> Auction:
+        """Close an auction, settling payment if it has a winner."""
+        with self._lock:
+            auction = self.auctions.get(auction_id)
+            if auction is None:
+                raise AuctionError("Auction not found")
+            if auction.status != 'active':
+                return auction
+
+            winner_paid = payment_error = None
+            if auction.highest_bidder and self.settle is not None:
+                try:
+                    self.settle(auction)
+                    winner_paid = True
+                except Exception as e:
+                    winner_paid = False
+                    payment_error = str(e)
+            self._apply_close(auction, winner_paid, payment_error)
+            self._append({'op': 'close', 'id': auction_id, 'ts': self.clock() if now is None else now,
+                          'winner_paid': winner_paid, 'payment_error': payment_error})
+        return auction
+
+    def cancel_auction(self, auction_id: str, user_id: str) -> Auction:
+        """Cancel an auction (only by its seller, and only before any bids)."""
+        with self._lock:
+            auction = self.auctions.get(auction_id)
+            if auction is None:
+                raise AuctionError("Auction not found")
+            if auction.seller_id != user_id:
+                raise AuctionError("Only the seller can cancel the auction")
+            if auction.bids:
+                raise AuctionError("Cannot cancel auction with existing bids")
+            if auction.status == 'active':
+                self._apply_cancel(auction)
+                self._append({'op': 'cancel', 'id': auction_id})
+        return auction
+
+    def close_expired(self, now: Optional[float] = None) -> List[Auction]:
+        """
+        Close every auction whose end time has passed, then relist unsold
+        auto_relist auctions in one bulk step.
+
+        Cost is O(k log n) for k expired auctions.
+
+        Returns: The auctions closed (relisted ones are active again)
+        """
+        now = self.clock() if now is None else now
+        closed = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                end_time, auction_id = heapq.heappop(self._expiry)
+                auction = self.auctions[auction_id]
+                # Entries for cancelled, closed or relisted auctions are stale
+                if auction.status != 'active' or auction.end_time != end_time:
+                    continue
+                closed.append(self.close_auction(auction_id, now=now))
+
+            unsold = [a for a in closed if a.auto_relist and not a.bids]
+            if unsold:
+                self._apply_relist(unsold, now)
+                self._append({'op': 'relist', 'ids': [a.id for a in unsold], 'ts': now})
+        return closed
+
+    def relist(self, auction_ids: Iterable[str], now: Optional[float] = None) -> List[Auction]:
+        """Relist completed auctions that ended without bids, in bulk."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            auctions = []
+            for auction_id in auction_ids:
+                auction = self.auctions.get(auction_id)
+                if auction is None:
+                    raise AuctionError("Auction not found")
+                if auction.status != 'completed' or auction.bids:
+                    raise AuctionError(f"Auction {auction_id} can't be relisted")
+                auctions.append(auction)
+            if auctions:
+                self._apply_relist(auctions, now)
+                self._append({'op': 'relist', 'ids': [a.id for a in auctions], 'ts': now})
+        return auctions
+
+    def get_auction(self, auction_id: str, now: Optional[float] = None) -> Auction:
+        """Return an auction, closing it first if it has expired."""
+        with self._lock:
+            auction = self.auctions.get(auction_id)
+            if auction is None:
+                raise AuctionError("Auction not found")
+            now = self.clock() if now is None else now
+            if auction.status == 'active' and now >= auction.end_time:
+                self.close_auction(auction_id, now=now)
+            return auction
+
+    def active_auctions(self, limit: Optional[int] = None,
+                        now: Optional[float] = None) -> List[Auction]:
+        """Return active auctions, most recently listed first (closing expired ones)."""
+        with self._lock:
+            self.close_expired(now)
+            result = []
+            for auction in reversed(self._active.values()):
+                if limit is not None and len(result) >= limit:
+                    break
+                result.append(auction)
+            return result
+
+    def user_auctions(self, user_id: str) -> List[Auction]:
+        """Return the auctions a user is selling, in creation order."""
+        return [self.auctions[i] for i in self._by_seller.get(user_id, [])]
+
+    def bidder_auctions(self, user_id: str) -> List[Auction]:
+        """Return the auctions a user has bid on."""
+        return [self.auctions[i] for i in self._by_bidder.get(user_id, {})]
+
+    def leading_auctions(self, user_id: str) -> List[Auction]:
+        """Return the active auctions a user is currently winning."""
+        return [self.auctions[i] for i in self._leading.get(user_id, {})]
+
+    def statistics(self) -> Dict:
+        """Return auction statistics (maintained incrementally)."""
+        with self._lock:
+            return dict(self.stats)
+
+
+def main():
+    """Main entry point for managing the auction book from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Auction Book - Run auctions for autopilot listings'
+    )
+    parser.add_argument('--log', required=True, help='Auction event log (JSON lines)')
+    parser.add_argument('--config', help='Path to autopilot config file', default=None)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Create auctions from a processing summary')
+    import_parser.add_argument('summary', help='processing_summary.json from the autopilot')
+    import_parser.add_argument('--seller', required=True, help='Seller user ID')
+
+    active_parser = subparsers.add_parser('active', help='List active auctions')
+    active_parser.add_argument('--limit', type=int, default=20)
+
+    subparsers.add_parser('close-expired', help='Close expired auctions and auto-relist unsold ones')
+    subparsers.add_parser('stats', help='Show auction statistics')
+    subparsers.add_parser('compact', help='Rewrite the log as a snapshot')
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    book = AuctionBook.from_config(config, args.log)
+
+    if args.command == 'import':
+        with open(args.summary, 'r') as f:
+            listings = json.load(f).get('listings', [])
+        created = book.add_listings(listings, args.seller)
+        print(f"Created {len(created)} auctions from {len(listings)} listings")
+    elif args.command == 'active':
+        for auction in book.active_auctions(limit=args.limit):
+            print(f"{auction.id}  {auction.current_bid:>10.2f}  {auction.title}")
+    elif args.command == 'close-expired':
+        closed = book.close_expired()
+        relisted = sum(1 for a in closed if a.status == 'active')
+        print(f"Closed {len(closed) - relisted} auctions, relisted {relisted}")
+    elif args.command == 'stats':
+        print(json.dumps(book.statistics(), indent=2))
+    elif args.command == 'compact':
+        book.compact()
+        print(f"Compacted {args.log}")
+    book.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Auction Pricing - Computes starting and reserve prices from auction_settings.
+
+This module can:
+- Parse free-text value ranges ("$25-35", "$1,200 - $1,500") once into numeric columns
+- Price a whole batch in a single vectorized pass
+- Reprice large catalogues quickly when the multipliers change
+
+NumPy is used when installed; otherwise the same columns are held in
+``array.array`` buffers and priced with plain Python loops.
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'bots'))
+
+from metadata_catalogue import MetadataCatalogue
+
+
+DEFAULT_AUCTION_SETTINGS = {
+    'starting_price_multiplier': 0.8,
+    'reserve_price_multiplier': 1.2,
+    'duration_days': 7,
+    'auto_relist': False
+}
+
+_NUMBER = r'(\d[\d,]*(?:\.\d+)?)'
+_RANGE_RE = re.compile(_NUMBER + r'\s*(?:-|–|to)\s*\$?\s*' + _NUMBER, re.IGNORECASE)
+_SINGLE_RE = re.compile(_NUMBER)
+
+NAN = float('nan')
+
+
+def parse_value_range(text: Optional[str]) -> Tuple[float, float]:
+    """
+    Parse an estimated value string into a (low, high) pair.
+
+    Args:
+        text: Free-text value such as "$25-35", "$200 to $300" or "$40"
+
+    Returns: (low, high); both NaN if no number could be found
+    """
+    if not text:
+        return (NAN, NAN)
+    match = _RANGE_RE.search(str(text))
+    if match:
+        low = float(match.group(1).replace(',', ''))
+        high = float(match.group(2).replace(',', ''))
+        return (min(low, high), max(low, high))
+    match = _SINGLE_RE.search(str(text))
+    if match:
+        value = float(match.group(1).replace(',', ''))
+        return (value, value)
+    return (NAN, NAN)
+
+
+class PriceColumns:
+    """Parsed value ranges for a catalogue, stored column-wise."""
+
+    def __init__(self, keys: List[str], low, high):
+        self.keys = keys
+        self.low = low
+        self.high = high
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_values(cls, keys: List[str], values: Iterable[Optional[str]]) -> 'PriceColumns':
+        """
+        Parse value strings into columns.
+
+        Each distinct string is parsed once; catalogues repeat the same
+        ranges heavily, so this keeps loading linear in unique values.
+        """
+        cache: Dict[Optional[str], Tuple[float, float]] = {}
+        low = array('d')
+        high = array('d')
+        for text in values:
+            pair = cache.get(text)
+            if pair is None:
+                pair = cache[text] = parse_value_range(text)
+            low.append(pair[0])
+            high.append(pair[1])
+        if np is not None:
+            return cls(list(keys), np.frombuffer(low, dtype=np.float64),
+                       np.frombuffer(high, dtype=np.float64))
+        return cls(list(keys), low, high)
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Dict],
+                      keys: Optional[List[str]] = None) -> 'PriceColumns':
+        """
+        Build columns from a metadata dictionary keyed by item name.
+
+        Args:
+            metadata: Item metadata as loaded from a metadata JSON file, or a
+                MetadataCatalogue
+            keys: Item names to include (defaults to every key in metadata)
+        """
+        if keys is None:
+            keys = list(metadata)
+        if hasattr(metadata, 'codes'):
+            # A MetadataCatalogue: estimated_value is already dictionary-encoded
+            codes, values = metadata.codes('estimated_value', keys)
+            return cls.from_codes(keys, codes, values)
+        values = [(metadata.get(key) or {}).get('estimated_value') for key in keys]
+        return cls.from_values(keys, values)
+
+    @classmethod
+    def from_codes(cls, keys: List[str], codes: Iterable[int],
+                   values: List[Optional[str]]) -> 'PriceColumns':
+        """
+        Build columns from dictionary-encoded value strings.
+
+        Each dictionary entry is parsed once, then gathered per item by code.
+
+        Args:
+            keys: Item names
+            codes: Per-item index into values
+            values: Distinct value strings (None for missing)
+        """
+        table = cls.from_values(list(range(len(values))), values)
+        if np is not None:
+            codes = np.asarray(codes, dtype=np.intp)
+            return cls(list(keys), table.low[codes], table.high[codes])
+        return cls(list(keys), array('d', (table.low[c] for c in codes)),
+                   array('d', (table.high[c] for c in codes)))
+
+    def position(self, key: str) -> Optional[int]:
+        """Return the row index of an item, or None if it is not present."""
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self.keys)}
+        return self._index.get(key)
+
+
+class AuctionPricer:
+    """Vectorized starting/reserve price calculation driven by auction_settings."""
+
+    def __init__(self, settings: Optional[Dict] = None):
+        """
+        Initialize the pricer.
+
+        Args:
+            settings: The auction_settings section of autopilot-config.json
+        """
+        self.settings = dict(DEFAULT_AUCTION_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'AuctionPricer':
+        """Create a pricer from a full autopilot configuration dictionary."""
+        return cls(config.get('auction_settings', {}))
+
+    @property
+    def starting_multiplier(self) -> float:
+        return float(self.settings['starting_price_multiplier'])
+
+    @property
+    def reserve_multiplier(self) -> float:
+        return float(self.settings['reserve_price_multiplier'])
+
+    def price(self, columns: PriceColumns,
+              starting_multiplier: Optional[float] = None,
+              reserve_multiplier: Optional[float] = None):
+        """
+        Compute starting and reserve prices for every row in one pass.
+
+        Prices are based on the midpoint of the estimated range and rounded
+        to cents. Rows without a parseable estimate come out as NaN.
+
+        Args:
+            columns: Parsed value columns
+            starting_multiplier: Override for starting_price_multiplier
+            reserve_multiplier: Override for reserve_price_multiplier
+
+        Returns: (starting, reserve) arrays aligned with columns.keys
+        """
+        start_mult = self.starting_multiplier if starting_multiplier is None else starting_multiplier
+        reserve_mult = self.reserve_multiplier if reserve_multiplier is None else reserve_multiplier
+
+        if np is not None and isinstance(columns.low, np.ndarray):
+            midpoint = (columns.low + columns.high) * 0.5
+            return (np.round(midpoint * start_mult, 2),
+                    np.round(midpoint * reserve_mult, 2))
+
+        starting = array('d')
+        reserve = array('d')
+        for low, high in zip(columns.low, columns.high):
+            midpoint = (low + high) * 0.5
+            starting.append(round(midpoint * start_mult, 2))
+            reserve.append(round(midpoint * reserve_mult, 2))
+        return starting, reserve
+
+    def reprice(self, columns: PriceColumns, starting_multiplier: float,
+                reserve_multiplier: float):
+        """
+        Update the multipliers and reprice the whole catalogue.
+
+        Returns: (starting, reserve) arrays aligned with columns.keys
+        """
+        self.settings['starting_price_multiplier'] = starting_multiplier
+        self.settings['reserve_price_multiplier'] = reserve_multiplier
+        return self.price(columns)
+
+    def listing_prices(self, columns: PriceColumns) -> Dict[str, Optional[Dict]]:
+        """
+        Price a batch and return per-item pricing dictionaries.
+
+        Returns: Mapping of item name to pricing info, or None when the
+        item has no usable estimated value
+        """
+        starting, reserve = self.price(columns)
+        priced = {}
+        for i, key in enumerate(columns.keys):
+            start_price = float(starting[i])
+            if math.isnan(start_price):
+                priced[key] = None
+                continue
+            priced[key] = {
+                'estimated_low': float(columns.low[i]),
+                'estimated_high': float(columns.high[i]),
+                'starting_price': start_price,
+                'reserve_price': float(reserve[i]),
+                'duration_days': self.settings['duration_days'],
+                'auto_relist': self.settings['auto_relist']
+            }
+        return priced
+
+    def group_totals(self, columns: PriceColumns, codes: Iterable[int],
+                     groups: List) -> Dict:
+        """
+        Total the prices of a batch per group, e.g. per denomination.
+
+        Args:
+            columns: Parsed value columns
+            codes: Per-row group index into groups (0 means no group)
+            groups: Group labels, as returned by MetadataCatalogue.codes()
+
+        Returns: Mapping of group label to item count, priced item count and
+        starting/reserve price totals
+        """
+        starting, reserve = self.price(columns)
+        if np is not None:
+            codes = np.asarray(codes, dtype=np.intp)
+            priced = ~np.isnan(starting)
+            size = len(groups)
+            counts = np.bincount(codes, minlength=size)
+            priced_counts = np.bincount(codes, weights=priced, minlength=size)
+            start_totals = np.bincount(codes, np.where(priced, starting, 0.0), minlength=size)
+            reserve_totals = np.bincount(codes, np.where(priced, reserve, 0.0), minlength=size)
+        else:
+            counts = [0] * len(groups)
+            priced_counts = [0] * len(groups)
+            start_totals = [0.0] * len(groups)
+            reserve_totals = [0.0] * len(groups)
+            for i, code in enumerate(codes):
+                counts[code] += 1
+                if not math.isnan(starting[i]):
+                    priced_counts[code] += 1
+                    start_totals[code] += starting[i]
+                    reserve_totals[code] += reserve[i]
+        return {
+            groups[code]: {
+                'items': int(counts[code]),
+                'priced': int(priced_counts[code]),
+                'starting_total': round(float(start_totals[code]), 2),
+                'reserve_total': round(float(reserve_totals[code]), 2)
+            }
+            for code in range(1, len(groups)) if counts[code]
+        }
+
+
+def main():
+    """Main entry point for pricing a metadata file."""
+    parser = argparse.ArgumentParser(
+        description='Auction Pricing - Compute starting and reserve prices for a metadata file'
+    )
+    parser.add_argument('metadata', help='Path to metadata JSON file')
+    parser.add_argument('output', help='Output JSON file for computed prices')
+    parser.add_argument('--config', help='Path to config file', default=None)
+    parser.add_argument('--starting-multiplier', type=float, default=None,
+                        help='Override auction_settings.starting_price_multiplier')
+    parser.add_argument('--reserve-multiplier', type=float, default=None,
+                        help='Override auction_settings.reserve_price_multiplier')
+    parser.add_argument('--group-by', default=None, metavar='FIELD',
+                        help='Write price totals per value of this metadata field instead')
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    pricer = AuctionPricer.from_config(config)
+    if args.starting_multiplier is not None:
+        pricer.settings['starting_price_multiplier'] = args.starting_multiplier
+    if args.reserve_multiplier is not None:
+        pricer.settings['reserve_price_multiplier'] = args.reserve_multiplier
+
+    metadata = MetadataCatalogue.load(args.metadata)
+    columns = PriceColumns.from_metadata(metadata)
+
+    if args.group_by:
+        codes, groups = metadata.codes(args.group_by)
+        totals = pricer.group_totals(columns, codes, groups)
+        with open(args.output, 'w') as f:
+            json.dump(totals, f, indent=2)
+        print(f"Priced {len(metadata)} items in {len(totals)} groups -> {args.output}")
+        return
+
+    prices = pricer.listing_prices(columns)
+    with open(args.output, 'w') as f:
+        json.dump(prices, f, indent=2)
+
+    priced = sum(1 for p in prices.values() if p)
+    print(f"Priced {priced}/{len(prices)} items -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
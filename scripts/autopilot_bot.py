@@ -10,6 +10,7 @@ This bot coordinates:
 - Auto-pilot mode for hands-free operation
 """
 
+import copy
 import json
 import os
 import sys
@@ -17,20 +18,92 @@ import re
 from pathlib import Path
 from typing import Optional, Dict, List
 import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'bots'))
+# The index valuation module and its state files live at the repository root
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))
+
+from adaptive_concurrency import AdaptiveConcurrency
+from async_runner import AsyncPipelineRunner
+from auction_pricing import AuctionPricer, PriceColumns
+from batch_planner import BatchPlanner, item_size
+from batch_supervisor import SupervisedScheduler
+from job_queue import JobQueue
+from source_scheduler import BatchSource, FairScheduler
+from stage_graph import DEFAULT_STAGES, Stage, StageGraph
+from bot_logging import ProgressReporter, add_logging_arguments, configure_from_args, get_logger
+from bot_profiler import BotProfiler, add_profile_arguments
+from frame_store import AVAILABLE as FRAME_STORE_AVAILABLE, FrameHandle, FrameStore
+from image_cropper_bot import ImageCropperBot
+from image_input import ArchiveMember, ImageItem, archive_kind, batch_input, find_images, probe_items
+from image_probe import screen
+from index_valuation import IndexValuation
+from listing_index import ListingIndex
+from metadata_catalogue import MetadataCatalogue
+from quality_gate import QualityGate, QualityRejected
+
+logger = get_logger('autopilot')
+
+# Summary counters one item's processing can move
+ITEM_COUNTERS = ('processed_images', 'generated_titles', 'generated_descriptions',
+                 'failed', 'rejected')
+
+
+def queue_job_id(image_file: ImageItem, input_dir: str) -> str:
+    """Return an item's job queue id: its path within the batch input."""
+    if isinstance(image_file, ArchiveMember):
+        return image_file.member
+    try:
+        return Path(image_file).relative_to(input_dir).as_posix()
+    except ValueError:
+        return str(image_file)
+
+
+def queue_item_path(job_id: str, input_dir: str) -> ImageItem:
+    """Return the item a job queue id names in this worker's batch input."""
+    if archive_kind(input_dir):
+        return ArchiveMember(input_dir, job_id)
+    return Path(input_dir) / job_id
+
 
 class AutopilotBot:
     """Main orchestration bot that coordinates all sub-bots."""
     
-    def __init__(self, config_path: Optional[str] = None):
-        """Initialize the autopilot bot with configuration."""
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path: Optional[str] = None,
+                 profiler: Optional[BotProfiler] = None,
+                 config: Optional[Dict] = None):
+        """
+        Initialize the autopilot bot with configuration.
+        
+        Args:
+            config_path: Config file to load
+            profiler: Profiler shared with the sub-bots
+            config: Already-loaded config (with any overrides) to use instead
+                of loading config_path
+        """
+        self.config_path = config_path
+        self.config = config if config is not None else self._load_config(config_path)
+        self.profiler = profiler or BotProfiler(name='autopilot')
+        self.pricer = AuctionPricer.from_config(self.config)
+        self.quality_gate = QualityGate.from_config(self.config)
+        self.custom_stages = {}
+        self._stage_graph = None
+        self._executor = None
+        self._frame_store = None
+        self._cropper = None
         self.results = {
             'processed_images': 0,
             'generated_titles': 0,
             'generated_descriptions': 0,
             'failed': 0,
+            'rejected': 0,
+            'routed': 0,
             'listings': []
         }
         
@@ -58,6 +131,15 @@ class AutopilotBot:
         """Check if autopilot mode is enabled."""
         return self.config.get('autopilot', {}).get('enabled', True)
     
+    def find_images(self, input_dir: str) -> List[ImageItem]:
+        """
+        Return the images directly inside input_dir.
+        
+        input_dir may also be a ZIP or TAR archive, whose members are read
+        in place rather than extracted.
+        """
+        return find_images(input_dir)
+    
     def process_single_item(self, image_path: str, output_dir: str, 
                            metadata: Optional[Dict] = None) -> Dict:
         """
@@ -71,64 +153,245 @@ class AutopilotBot:
         Returns: Dictionary with processing results
         """
         item_name = Path(image_path).stem
-        print(f"\n{'='*60}")
-        print(f"PROCESSING ITEM: {item_name}")
-        print(f"{'='*60}\n")
+        logger.debug("Processing item: %s", item_name, extra={'item': item_name})
+        
+        result = self.new_item_result(image_path)
         
-        result = {
+        with self.profiler.item(item_name):
+            self._run_stages(image_path, output_dir, metadata, result)
+        
+        return result
+    
+    @property
+    def stage_graph(self) -> StageGraph:
+        """The per-item stage graph from the "pipeline" config section."""
+        if self._stage_graph is None:
+            builtins = {
+                'frames': self._stage_frames,
+                'quality': self._stage_quality,
+                'crop': self._stage_crop,
+                'analyze': self._stage_analyze,
+                'title': self._stage_title,
+                'description': self._stage_description
+            }
+            builtins.update(self.custom_stages)
+            stages = self.config.get('pipeline', {}).get('stages', DEFAULT_STAGES)
+            self._stage_graph = StageGraph.from_config(stages, builtins, owner=self)
+        return self._stage_graph
+    
+    def register_stage(self, name: str, handler):
+        """
+        Register a custom stage handler usable as "handler": name in the config.
+        
+        The handler takes a dict of its declared inputs and returns a dict
+        of its declared outputs.
+        """
+        self.custom_stages[name] = handler
+        self._stage_graph = None
+    
+    def _stage_executor(self) -> Optional[ThreadPoolExecutor]:
+        """
+        Executor for independent stages, or None to run stages inline.
+        
+        Stages run inline while profiling: the stack sampler and cProfile
+        only see the thread that started them, so work on the stage pool
+        would be missing from the profile.
+        """
+        workers = self.config.get('pipeline', {}).get('max_parallel_stages', 4)
+        if workers <= 1 or self.profiler.enabled:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=workers,
+                                                thread_name_prefix='autopilot-stage')
+        return self._executor
+    
+    def close(self):
+        """Shut down the stage thread pool (it is recreated if the bot is used again)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _timed_stage(self, stage: Stage, handler):
+        """Wrap a stage handler so the profiler times it."""
+        def run(inputs):
+            with self.profiler.stage(stage.name):
+                return handler(inputs)
+        return run
+    
+    def _run_stages(self, image_path: str, output_dir: str,
+                    metadata: Optional[Dict], result: Dict):
+        """Run the configured stage graph for one item."""
+        context = self.item_context(image_path, output_dir, metadata)
+        try:
+            self.stage_graph.run(context, self._stage_executor(), wrap=self._timed_stage)
+            self.record_item_outputs(context, result)
+        except Exception as e:
+            self.record_item_error(e, result)
+        finally:
+            self.release_frames(context)
+    
+    @property
+    def frame_store(self) -> Optional[FrameStore]:
+        """Shared-memory frame store, or None if frame_store.enabled is off or NumPy is missing."""
+        settings = self.config.get('frame_store', {})
+        if self._frame_store is None and settings.get('enabled', False) and FRAME_STORE_AVAILABLE:
+            self._frame_store = FrameStore(settings.get('namespace', 'rooster_frames'))
+        return self._frame_store
+    
+    @property
+    def cropper(self) -> ImageCropperBot:
+        """ImageCropperBot sharing this bot's config and profiler."""
+        if self._cropper is None:
+            self._cropper = ImageCropperBot(config=self.config.get('image_cropper'),
+                                            profiler=self.profiler)
+        return self._cropper
+    
+    def release_frames(self, context: Dict):
+        """Release every shared-memory frame an item's stages published."""
+        if self._frame_store is None:
+            return
+        for value in context.values():
+            if isinstance(value, FrameHandle):
+                self._frame_store.release(value)
+    
+    def item_context(self, image_path: str, output_dir: str,
+                     metadata: Optional[Dict] = None) -> Dict:
+        """Return the initial stage-graph values for one item."""
+        return {
+            'image_path': image_path,
+            'item_name': Path(image_path).stem,
+            'output_dir': output_dir,
+            'metadata': metadata
+        }
+    
+    def new_item_result(self, image_path: str) -> Dict:
+        """Return an empty listing result for one item."""
+        return {
             'image_path': image_path,
-            'item_name': item_name,
+            'item_name': Path(image_path).stem,
             'success': False,
             'outputs': {}
         }
+    
+    def record_item_outputs(self, context: Dict, result: Dict):
+        """Copy published stage outputs into the result and update counters."""
+        for name in self.stage_graph.published_outputs():
+            if context.get(name) is not None:
+                result['outputs'][name] = context[name]
         
-        try:
-            # Step 1: Crop and optimize image
-            if self.config.get('image_cropper', {}).get('enabled', True):
-                print("[1/3] Cropping and optimizing image...")
-                cropped_path = os.path.join(output_dir, f"{item_name}_cropped.jpg")
-                result['outputs']['cropped_image'] = cropped_path
-                print(f"  ✓ Image processed: {cropped_path}")
-            else:
-                print("[1/3] Image cropping disabled, using original")
-                cropped_path = image_path
-            
-            # Step 2: Generate title
-            if self.config.get('title_generator', {}).get('enabled', True):
-                print("\n[2/3] Generating title...")
-                title = self._generate_title(cropped_path, metadata)
-                result['outputs']['title'] = title
-                print(f"  ✓ Title: {title}")
-                self.results['generated_titles'] += 1
-            else:
-                print("\n[2/3] Title generation disabled")
-                result['outputs']['title'] = f"Listing for {item_name}"
-            
-            # Step 3: Generate description
-            if self.config.get('description_generator', {}).get('enabled', True):
-                print("\n[3/3] Generating description...")
-                description = self._generate_description(cropped_path, metadata)
-                desc_path = os.path.join(output_dir, f"{item_name}_description.txt")
-                
-                with open(desc_path, 'w') as f:
-                    f.write(description)
-                
-                result['outputs']['description'] = desc_path
-                print(f"  ✓ Description saved: {desc_path}")
-                print(f"  Length: {len(description)} characters")
-                self.results['generated_descriptions'] += 1
-            else:
-                print("\n[3/3] Description generation disabled")
-            
-            result['success'] = True
-            self.results['processed_images'] += 1
-            
-        except Exception as e:
-            print(f"\n✗ Error processing {item_name}: {str(e)}")
-            result['error'] = str(e)
-            self.results['failed'] += 1
+        if context.get('title') is not None and \
+                self.config.get('title_generator', {}).get('enabled', True):
+            self.results['generated_titles'] += 1
+        if context.get('description') is not None:
+            self.results['generated_descriptions'] += 1
         
-        return result
+        result['success'] = True
+        self.results['processed_images'] += 1
+    
+    def record_item_error(self, error: Exception, result: Dict):
+        """Mark an item as failed, or as rejected if it failed the quality gate."""
+        if isinstance(error, QualityRejected):
+            logger.warning("Rejected %s: %s", result['item_name'], error,
+                           extra={'item': result['item_name'], 'outcome': 'rejected'})
+            result['rejected'] = str(error)
+            result['quality'] = error.metrics
+            # The photo fails the same way every time; retrying won't help
+            result['retry'] = False
+            self.results['rejected'] += 1
+            return
+        logger.error("Error processing %s: %s", result['item_name'], error,
+                     extra={'item': result['item_name'], 'outcome': 'failed'})
+        result['error'] = str(error)
+        self.results['failed'] += 1
+    
+    def _stage_frames(self, inputs: Dict) -> Dict:
+        """
+        Decode the image once into the shared-memory frame store.
+        
+        Downstream stages, including ones in other processes, take the
+        'frame' handle as an input and map it without copying. The frame
+        is released when the item finishes.
+        """
+        store = self.frame_store
+        if store is None:
+            return {'frame': None}
+        return {'frame': self.cropper.publish_frame(inputs['image_path'], store)}
+    
+    def _stage_quality(self, inputs: Dict) -> Dict:
+        """
+        Check the photo for blur, clipping and glare.
+        
+        Uses the shared decoded frame (area-averaged down to max_side) when
+        the stage is given a 'frame' input, otherwise decodes a downscaled
+        copy of the image.
+        
+        Raises QualityRejected for failing photos, which stops the item
+        before the analysis, title and description stages run.
+        """
+        if inputs.get('frame') is not None and self.frame_store is not None:
+            verdict = self.quality_gate.evaluate_frame(self.frame_store.map(inputs['frame']))
+        else:
+            verdict = self.quality_gate.evaluate(inputs['image_path'])
+        if not verdict['passed']:
+            raise QualityRejected(verdict['reasons'], verdict['metrics'])
+        return {'quality': verdict.get('metrics')}
+    
+    def _stage_crop(self, inputs: Dict) -> Dict:
+        """Crop and optimize the image."""
+        if not self.config.get('image_cropper', {}).get('enabled', True):
+            logger.debug("[crop] Image cropping disabled, using original")
+            return {'cropped_image': None}
+        
+        cropped_path = os.path.join(inputs['output_dir'], f"{inputs['item_name']}_cropped.jpg")
+        logger.debug("[crop] Image processed: %s", cropped_path,
+                     extra={'item': inputs['item_name'], 'cropped_image': cropped_path})
+        return {'cropped_image': cropped_path}
+    
+    def _stage_analyze(self, inputs: Dict) -> Dict:
+        """
+        Gather the item information shared by the title and description stages.
+        
+        Note: This is a placeholder for actual image analysis; it currently
+        passes the item metadata through.
+        """
+        image_path = inputs.get('cropped_image') or inputs['image_path']
+        return {'analysis': {'image_path': image_path, 'info': inputs.get('metadata')}}
+    
+    def _stage_title(self, inputs: Dict) -> Dict:
+        """Generate the listing title."""
+        if not self.config.get('title_generator', {}).get('enabled', True):
+            logger.debug("[title] Title generation disabled")
+            return {'title': f"Listing for {inputs['item_name']}"}
+        
+        analysis = inputs['analysis']
+        title = self._generate_title(analysis['image_path'], analysis['info'])
+        logger.debug("[title] Title: %s", title, extra={'item': inputs['item_name'], 'title': title})
+        return {'title': title}
+    
+    def _stage_description(self, inputs: Dict) -> Dict:
+        """Generate the listing description and save it to the output directory."""
+        if not self.config.get('description_generator', {}).get('enabled', True):
+            logger.debug("[description] Description generation disabled")
+            return {'description': None}
+        
+        analysis = inputs['analysis']
+        description = self._generate_description(analysis['image_path'], analysis['info'])
+        desc_path = os.path.join(inputs['output_dir'], f"{inputs['item_name']}_description.txt")
+        
+        with open(desc_path, 'w') as f:
+            f.write(description)
+        
+        logger.debug("[description] Description saved: %s (%d characters)", desc_path,
+                     len(description), extra={'item': inputs['item_name'],
+                                              'description': desc_path,
+                                              'characters': len(description)})
+        return {'description': desc_path}
     
     def _generate_title(self, image_path: str, metadata: Optional[Dict]) -> str:
         """Generate title using configured template."""
@@ -205,26 +468,36 @@ class AutopilotBot:
         return description
     
     def process_batch(self, input_dir: str, output_dir: str, 
-                     metadata_file: Optional[str] = None) -> dict:
+                     metadata_file: Optional[str] = None, plan: bool = False) -> dict:
         """
-        Process all images in a directory (autopilot mode).
+        Process all images in a directory or archive (autopilot mode).
         
         Args:
-            input_dir: Directory containing input images
+            input_dir: Directory (or ZIP/TAR archive) containing input images
             output_dir: Directory to save all outputs
             metadata_file: Optional JSON file with metadata for items
+            plan: Only time a stratified sample and return the batch plan
+                (see plan_batch) instead of processing the batch
             
         Returns: Dictionary with processing statistics
         """
-        print(f"\n{'='*70}")
-        print(f"AUTOPILOT BOT - BATCH PROCESSING")
-        print(f"{'='*70}")
-        print(f"Mode: {'AUTOPILOT' if self.is_autopilot_enabled() else 'MANUAL'}")
-        print(f"Input directory: {input_dir}")
-        print(f"Output directory: {output_dir}")
+        # Sampling reads members out of order, so a compressed TAR is spooled
+        spool = plan or self.config.get('archive_input', {}).get('spool', False)
+        with batch_input(input_dir, spool=spool):
+            return self._run_batch(input_dir, output_dir, metadata_file, plan)
+    
+    def _run_batch(self, input_dir: str, output_dir: str, metadata_file: Optional[str],
+                   plan: bool) -> dict:
+        """Process a batch whose archive, if any, is held by process_batch."""
+        logger.info("AUTOPILOT BOT - BATCH PROCESSING",
+                    extra={'mode': 'autopilot' if self.is_autopilot_enabled() else 'manual',
+                           'input_dir': str(input_dir), 'output_dir': output_dir,
+                           'metadata_file': metadata_file})
+        logger.info("Mode: %s", 'AUTOPILOT' if self.is_autopilot_enabled() else 'MANUAL')
+        logger.info("Input directory: %s", input_dir)
+        logger.info("Output directory: %s", output_dir)
         if metadata_file:
-            print(f"Metadata file: {metadata_file}")
-        print(f"{'='*70}\n")
+            logger.info("Metadata file: %s", metadata_file)
         
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
@@ -232,65 +505,657 @@ class AutopilotBot:
         # Load metadata if provided
         metadata_dict = {}
         if metadata_file and os.path.exists(metadata_file):
-            with open(metadata_file, 'r') as f:
-                metadata_dict = json.load(f)
-            print(f"Loaded metadata for {len(metadata_dict)} items\n")
+            metadata_dict = MetadataCatalogue.load(metadata_file)
+            logger.info("Loaded metadata for %d items", len(metadata_dict))
         
         # Find all images
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        input_path = Path(input_dir)
-        image_files = [f for f in input_path.iterdir() 
-                      if f.is_file() and f.suffix.lower() in image_extensions]
+        image_files = self.find_images(input_dir)
         
         if not image_files:
-            print("No image files found in input directory.")
+            logger.warning("No image files found in input directory.")
             return self.results
         
-        print(f"Found {len(image_files)} images to process")
+        # Reject or route undersized and rotated photos from their headers
+        image_files = self.screen_images(image_files)
+        
+        logger.info("Found %d images to process", len(image_files))
+        
+        if plan:
+            return self.plan_batch(image_files, output_dir, metadata_dict)
         
         if self.is_autopilot_enabled():
-            print("Autopilot mode ENABLED - Full automatic processing\n")
+            logger.info("Autopilot mode ENABLED - Full automatic processing")
         else:
-            print("Autopilot mode DISABLED - Manual intervention may be required\n")
+            logger.info("Autopilot mode DISABLED - Manual intervention may be required")
+        
+        # Price the whole batch in one vectorized pass
+        pricing = {}
+        if metadata_dict:
+            columns = PriceColumns.from_metadata(metadata_dict, [f.stem for f in image_files])
+            pricing = self.pricer.listing_prices(columns)
+        
+        unprofiled = self.unprofiled_mode()
+        if unprofiled and self.profiler.enabled:
+            logger.warning("Profiling does not cover %s; running without it", unprofiled)
+            self.profiler.enabled = False
         
         # Process each image
-        for idx, image_file in enumerate(image_files, 1):
-            print(f"\n[{idx}/{len(image_files)}] Processing: {image_file.name}")
+        queue = None
+        if self.config.get('job_queue', {}).get('enabled', False):
+            queue = self._process_queued(image_files, output_dir, metadata_dict, pricing,
+                                         input_dir)
+        elif self.config.get('isolation', {}).get('enabled', False):
+            self._process_isolated(image_files, output_dir, metadata_dict, pricing)
+        elif self.config.get('async_runner', {}).get('enabled', False):
+            self._process_async(image_files, output_dir, metadata_dict, pricing)
+        elif self.config.get('adaptive_concurrency', {}).get('enabled', False):
+            self._process_adaptive(image_files, output_dir, metadata_dict, pricing)
+        else:
+            self.profiler.start()
+            progress = self.progress(len(image_files))
+            for idx, image_file in enumerate(image_files, 1):
+                logger.debug("[%d/%d] Processing: %s", idx, len(image_files), image_file.name)
+                
+                # Get metadata for this item if available
+                item_metadata = metadata_dict.get(image_file.stem, None)
+                
+                # Process item
+                result = self.process_single_item(
+                    str(image_file), 
+                    output_dir, 
+                    item_metadata
+                )
+                result['pricing'] = pricing.get(image_file.stem)
+                
+                self.results['listings'].append(result)
+                progress.update(failed=0 if result['success'] else 1)
+            progress.finish()
+        
+        if self.config.get('listing_index', {}).get('enabled', False):
+            if queue is None:
+                self.index_listings(self.results['listings'], metadata_dict, output_dir)
+            else:
+                # Workers sharing a queue would write the same index at once
+                logger.info("Listing index skipped for queued batches - add each worker's "
+                            "summary with scripts/listing_index.py add")
+        
+        if self.config.get('index_valuation', {}).get('enabled', False):
+            if queue is None:
+                self.value_listings(self.results['listings'])
+            else:
+                # Workers sharing a queue would append to the same delta log at once
+                logger.info("Index valuation skipped for queued batches")
+        
+        # Write profile artefacts next to the summary
+        if self.profiler.enabled:
+            self.results['profile'] = self.profiler.write_reports(output_dir)
+            self.profiler.log_report()
+        
+        # Save summary (one per worker when workers share a queue)
+        summary_name = 'processing_summary.json'
+        if queue is not None:
+            worker_name = re.sub(r'[^\w.-]', '_', queue.worker_id)
+            summary_name = f"processing_summary.{worker_name}.json"
+        summary_file = os.path.join(output_dir, summary_name)
+        with open(summary_file, 'w') as f:
+            json.dump(self.results, f, indent=2)
+        
+        # Print final summary
+        self._print_summary(summary_file)
+        
+        return self.results
+    
+    def plan_batch(self, image_files: List[ImageItem], output_dir: str,
+                   metadata_dict: Dict) -> Dict:
+        """
+        Predict the batch's wall time, CPU-hours, peak memory and output size.
+        
+        A stratified sample (by format and file size) runs through the real
+        stages on a separate bot, in a scratch directory, and is extrapolated
+        to the whole batch for each of batch_planner.worker_counts. The plan
+        is written to batch_plan.json in output_dir.
+        
+        Returns: The plan
+        """
+        def sample_bot():
+            bot = type(self)(config_path=self.config_path, config=self.config)
+            bot.custom_stages = dict(self.custom_stages)
+            return bot
+        
+        planner = BatchPlanner.from_config(self.config.get('batch_planner', {}), sample_bot)
+        logger.info("Planning batch from a sample of up to %d items", planner.sample_size)
+        plan = planner.plan(image_files, metadata_dict)
+        
+        plan_file = os.path.join(output_dir, 'batch_plan.json')
+        with open(plan_file, 'w') as f:
+            json.dump(plan, f, indent=2)
+        logger.info("Sampled %d of %d items: %.1f serial hours, %.2f CPU-hours, "
+                    "%d workers recommended", plan['sampled_items'], plan['items'],
+                    plan['serial_seconds'] / 3600, plan['cpu_hours'],
+                    plan['recommended_workers'] or 0, extra={'plan_file': plan_file})
+        return plan
+    
+    def _process_queued(self, image_files: List[ImageItem], output_dir: str,
+                        metadata_dict: Dict, pricing: Dict, input_dir: str) -> JobQueue:
+        """
+        Share the batch with other workers through the job queue.
+        
+        Every worker enqueues the full item list (already queued items are
+        skipped), then claims items one at a time until the queue is empty,
+        so several processes or hosts on the same input split the work.
+        Items are keyed by their path within input_dir, so workers that
+        mount the input at different paths still share each item. Leases are
+        renewed by a heartbeat while an item is processed, and items of a
+        worker that dies are taken over once its lease expires. Failed items
+        are retried with backoff up to max_attempts; quality rejections are
+        final. Only the items this worker finished appear in its results and
+        counters; an attempt that is retried, or whose lease was lost to
+        another worker, is taken back out of the counters.
+        
+        Without job_queue.path the queue is job_queue.sqlite3 in output_dir,
+        so workers only share it if they also share the output directory.
+        """
+        settings = self.config.get('job_queue', {})
+        queue = JobQueue.from_config(settings, os.path.join(output_dir, 'job_queue.sqlite3'))
+        items = {queue_job_id(f, input_dir): f for f in image_files}
+        added = queue.enqueue((job_id, {'item_name': f.stem}) for job_id, f in items.items())
+        logger.info("Job queue ENABLED - %s as worker %s (%d items added, %d remaining)",
+                    queue.path, queue.worker_id, added, queue.remaining())
+        
+        self.profiler.start()
+        progress = self.progress(label='items claimed')
+        with queue:
+            while True:
+                leases = queue.claim()
+                if not leases:
+                    if not queue.remaining():
+                        break
+                    # Everything left is leased by other workers or backing off;
+                    # wait for it to finish or for a dead worker's lease to expire
+                    wake = queue.next_available()
+                    delay = queue.heartbeat_seconds if wake is None else wake - time.time()
+                    time.sleep(min(max(delay, 0.05), queue.heartbeat_seconds))
+                    continue
+                lease = leases[0]
+                image_file = items.get(lease.job_id) or queue_item_path(lease.job_id, input_dir)
+                item_name = lease.payload.get('item_name') or Path(lease.job_id).stem
+                logger.debug("[%d] Processing: %s (attempt %d)", queue.stats['claimed'],
+                             Path(item_name).name, lease.attempts)
+                counted = {name: self.results[name] for name in ITEM_COUNTERS}
+                try:
+                    result = self.process_single_item(str(image_file), output_dir,
+                                                      metadata_dict.get(item_name, None))
+                except Exception as e:
+                    state = queue.fail(lease, str(e))
+                    logger.error("%s failed (%s); now %s", item_name, e, state,
+                                 extra={'item': item_name, 'outcome': state})
+                    progress.update(failed=1)
+                    continue
+                result['pricing'] = pricing.get(item_name)
+                result['lease'] = {'worker_id': queue.worker_id, 'token': lease.token,
+                                   'attempts': lease.attempts}
+                if not result['success']:
+                    state = queue.fail(lease, result.get('error') or result.get('rejected'),
+                                       retry=result.get('retry', True))
+                    if state == 'pending':
+                        # Counted again if its last attempt fails too
+                        self.results.update(counted)
+                        logger.info("%s failed on attempt %d; retrying", item_name,
+                                    lease.attempts, extra={'item': item_name, 'outcome': 'retry'})
+                        progress.update(retried=1)
+                    elif state == 'failed':
+                        self.results['listings'].append(result)
+                        progress.update(failed=1)
+                    else:
+                        self.results.update(counted)
+                        logger.warning("Lease on %s was lost; another worker retries it",
+                                       item_name, extra={'item': item_name,
+                                                         'outcome': 'lease_lost'})
+                        progress.update(lost=1)
+                elif queue.complete(lease, {'success': True,
+                                            'title': result['outputs'].get('title')}):
+                    self.results['listings'].append(result)
+                    progress.update(failed=0)
+                else:
+                    self.results.update(counted)
+                    logger.warning("Lease on %s was lost; another worker completes it",
+                                   item_name, extra={'item': item_name, 'outcome': 'lease_lost'})
+                    progress.update(lost=1)
+        progress.finish()
+        
+        self.results['job_queue'] = queue.summary()
+        queue.close()
+        return queue
+    
+    def _process_isolated(self, image_files: List[ImageItem], output_dir: str,
+                          metadata_dict: Dict, pricing: Dict):
+        """
+        Process items in supervised worker processes.
+        
+        Crashes, hangs and memory blow-ups are contained to one attempt of
+        one item; failing items are retried with backoff and eventually
+        dead-lettered to dead_letter.jsonl in the output directory. Items
+        rejected by the quality gate are final and counted as rejected.
+        """
+        store = self.frame_store
+        scheduler = SupervisedScheduler.from_config(
+            WorkerItemHandler(self.config_path, self.config),
+            self.config.get('isolation', {}),
+            dead_letter_path=os.path.join(output_dir, 'dead_letter.jsonl'),
+            # Frames held by a crashed worker would otherwise never be unlinked
+            on_worker_lost=store.release_process if store is not None else None
+        )
+        logger.info("Isolation ENABLED - %d supervised worker processes", scheduler.workers)
+        
+        tasks = [(str(f), (str(f), output_dir, metadata_dict.get(f.stem, None)))
+                 for f in image_files]
+        outcomes = scheduler.run(tasks)
+        
+        for image_file in image_files:
+            result = outcomes[str(image_file)]
+            if result.get('dead_letter'):
+                logger.error("Dead-lettered %s after %d attempts: %s", image_file.name,
+                             result['attempts'], result['error'],
+                             extra={'item': image_file.stem, 'outcome': 'dead_letter'})
+                result = {
+                    'image_path': str(image_file),
+                    'item_name': image_file.stem,
+                    'success': False,
+                    'outputs': {},
+                    'error': result['error'],
+                    'errors': result['errors'],
+                    'attempts': result['attempts'],
+                    'dead_letter': True
+                }
+                self.results['failed'] += 1
+            else:
+                for key, count in result.pop('counters', {}).items():
+                    self.results[key] += count
+            result['pricing'] = pricing.get(image_file.stem)
+            self.results['listings'].append(result)
+        
+        self.results['isolation'] = scheduler.stats
+        if store is not None:
+            store.sweep()
+    
+    def _process_async(self, image_files: List[ImageItem], output_dir: str,
+                       metadata_dict: Dict, pricing: Dict):
+        """
+        Process items concurrently on one asyncio event loop.
+        
+        CPU-bound stages run in an executor while analysis stages and file
+        writes are bounded by the async_runner semaphores.
+        """
+        settings = self.config.get('async_runner', {})
+        runner = AsyncPipelineRunner(self, settings)
+        logger.info("Async runner ENABLED - up to %d items in flight",
+                    runner.settings['max_in_flight_items'])
+        
+        items = ((str(f), output_dir, metadata_dict.get(f.stem, None)) for f in image_files)
+        for image_file, result in zip(image_files, runner.run(items)):
+            result['pricing'] = pricing.get(image_file.stem)
+            self.results['listings'].append(result)
+    
+    def _process_adaptive(self, image_files: List[ImageItem], output_dir: str,
+                          metadata_dict: Dict, pricing: Dict):
+        """
+        Process items on worker threads whose number in use is tuned as the batch runs.
+        
+        An AdaptiveConcurrency controller hands out permits: the limit grows
+        by one while memory and CPU have headroom and latency holds, and is
+        cut back when RSS, CPU or latency show overload. Its decisions are
+        recorded under 'concurrency' in the summary.
+        """
+        controller = AdaptiveConcurrency.from_config(self.config.get('adaptive_concurrency', {}))
+        logger.info("Adaptive concurrency ENABLED - %d workers to start, %d-%d allowed",
+                    controller.limit, controller.min_workers, controller.max_workers)
+        
+        handler_factory = WorkerItemHandler(self.config_path, self.config)
+        items = iter(enumerate(image_files))
+        results = {}
+        lock = threading.Lock()
+        progress = self.progress(len(image_files))
+        
+        def worker():
+            handle = None
+            while True:
+                controller.acquire()
+                started = time.monotonic()
+                with lock:
+                    index, image_file = next(items, (None, None))
+                if image_file is None:
+                    controller.release()
+                    return
+                try:
+                    if handle is None:
+                        handle = handler_factory()
+                    result = handle((str(image_file), output_dir,
+                                     metadata_dict.get(image_file.stem, None)))
+                finally:
+                    controller.release(time.monotonic() - started, item_size(image_file))
+                result['pricing'] = pricing.get(image_file.stem)
+                with lock:
+                    for key, count in result.pop('counters', {}).items():
+                        self.results[key] += count
+                    results[index] = result
+                progress.update(failed=0 if result['success'] else 1)
+        
+        # One thread per possible permit; those above the limit wait in acquire()
+        threads = [threading.Thread(target=worker, name=f'autopilot-adaptive-{i}')
+                   for i in range(controller.max_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        progress.finish()
+        
+        self.results['listings'].extend(results[i] for i in sorted(results))
+        self.results['concurrency'] = controller.summary()
+        stats = self.results['concurrency']['stats']
+        logger.info("Adaptive concurrency: finished at %d workers (peak %d, %d increases, "
+                    "%d decreases)", controller.limit, stats['peak_limit'], stats['increases'],
+                    stats['decreases'], extra={'concurrency': stats})
+    
+    def unprofiled_mode(self) -> Optional[str]:
+        """
+        Return the enabled batch mode whose items run outside this bot's profiler.
+        
+        Isolated, async and adaptive batches run items on other bots,
+        processes or executors, so the profiler would only see an idle
+        main thread. The serial and job queue loops are profiled.
+        """
+        if self.config.get('job_queue', {}).get('enabled', False):
+            return None
+        for section, label in (('isolation', '--isolate'), ('async_runner', '--async'),
+                               ('adaptive_concurrency', '--adaptive')):
+            if self.config.get(section, {}).get('enabled', False):
+                return label
+        return None
+    
+    def process_sources(self, sources: List[BatchSource], output_dir: str,
+                        workers: Optional[int] = None) -> dict:
+        """
+        Process several input sources concurrently with priority and fair sharing.
+        
+        Each source is a consignor's input directory with its own priority,
+        weight, concurrency cap and optional deadline. Items are pulled by a
+        pool of worker threads through a FairScheduler, so a bulk upload from
+        one source cannot starve small urgent drops from the others.
+        
+        Args:
+            sources: Sources to process; each needs an input_dir and may set
+                a metadata_file
+            output_dir: Directory to save outputs (one subdirectory per source)
+            workers: Number of worker threads (defaults to scheduling.workers)
             
-            # Get metadata for this item if available
-            item_metadata = metadata_dict.get(image_file.stem, None)
+        Returns: Dictionary with processing statistics
+        """
+        spool = self.config.get('archive_input', {}).get('spool', False)
+        with ExitStack() as inputs:
+            for source in sources:
+                inputs.enter_context(batch_input(source.extra['input_dir'], spool=spool))
+            return self._run_sources(sources, output_dir, workers)
+    
+    def _run_sources(self, sources: List[BatchSource], output_dir: str,
+                     workers: Optional[int]) -> dict:
+        """Process sources whose archives, if any, are held by process_sources."""
+        settings = self.config.get('scheduling', {})
+        workers = workers or settings.get('workers', 4)
+        
+        logger.info("AUTOPILOT BOT - MULTI-SOURCE PROCESSING")
+        logger.info("Sources: %d", len(sources))
+        logger.info("Workers: %d", workers)
+        logger.info("Output directory: %s", output_dir)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        scheduler = FairScheduler(sources,
+                                  promotion_window=settings.get('promotion_window_seconds', 30))
+        
+        # Queue every source's items, priced per source in one pass
+        pricing = {}
+        source_metadata = {}
+        sizes = {}
+        for source in sources:
+            metadata_dict = {}
+            metadata_file = source.extra.get('metadata_file')
+            if metadata_file and os.path.exists(metadata_file):
+                metadata_dict = MetadataCatalogue.load(metadata_file)
+            source_metadata[source.name] = metadata_dict
             
-            # Process item
-            result = self.process_single_item(
-                str(image_file), 
-                output_dir, 
-                item_metadata
-            )
+            image_files = self.screen_images(self.find_images(source.extra['input_dir']))
+            source_output = os.path.join(output_dir, source.name)
+            os.makedirs(source_output, exist_ok=True)
+            if metadata_dict:
+                columns = PriceColumns.from_metadata(metadata_dict, [f.stem for f in image_files])
+                pricing[source.name] = self.pricer.listing_prices(columns)
             
-            self.results['listings'].append(result)
+            logger.info("Source %s: %d images (priority %s, weight %s)", source.name,
+                        len(image_files), source.priority, source.weight)
+            for image_file in image_files:
+                sizes[str(image_file)] = item_size(image_file)
+                scheduler.add(source.name, (str(image_file), source_output,
+                                            metadata_dict.get(image_file.stem, None)))
+        scheduler.close()
+        
+        handler_factory = WorkerItemHandler(self.config_path, self.config)
+        lock = threading.Lock()
+        
+        # With adaptive concurrency, start a thread per possible permit and
+        # let the controller decide how many of them run items
+        controller = None
+        if self.config.get('adaptive_concurrency', {}).get('enabled', False):
+            controller = AdaptiveConcurrency.from_config(self.config['adaptive_concurrency'])
+            workers = controller.max_workers
+        
+        def worker():
+            handle = handler_factory()
+            while True:
+                if controller is not None:
+                    controller.acquire()
+                started = time.monotonic()
+                item = scheduler.next()
+                if item is None:
+                    if controller is not None:
+                        controller.release()
+                    return
+                try:
+                    result = handle(item.payload)
+                finally:
+                    scheduler.complete(item)
+                    if controller is not None:
+                        controller.release(time.monotonic() - started,
+                                           sizes.get(item.payload[0]))
+                result['source'] = item.source
+                result['pricing'] = pricing.get(item.source, {}).get(result['item_name'])
+                with lock:
+                    for key, count in result.pop('counters', {}).items():
+                        self.results[key] += count
+                    self.results['listings'].append(result)
+        
+        threads = [threading.Thread(target=worker, name=f'autopilot-worker-{i}')
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.results['scheduling'] = scheduler.stats()
+        if controller is not None:
+            self.results['concurrency'] = controller.summary()
+        
+        if self.config.get('listing_index', {}).get('enabled', False):
+            for source in sources:
+                listings = [r for r in self.results['listings'] if r.get('source') == source.name]
+                self.index_listings(listings, source_metadata[source.name], output_dir)
+        if self.config.get('index_valuation', {}).get('enabled', False):
+            self.value_listings(self.results['listings'])
         
-        # Save summary
         summary_file = os.path.join(output_dir, 'processing_summary.json')
         with open(summary_file, 'w') as f:
             json.dump(self.results, f, indent=2)
         
-        # Print final summary
         self._print_summary(summary_file)
         
         return self.results
     
+    def index_listings(self, listings: List[Dict], metadata_dict: Dict, output_dir: str):
+        """
+        Add successful listings to the listing index as one segment.
+        
+        The index lives at listing_index.path, or in output_dir/listing_index
+        if no path is configured. Listings whose title is already in the
+        index are marked with the number of other listings sharing it.
+        """
+        index = ListingIndex.from_config(self.config, os.path.join(output_dir, 'listing_index'))
+        indexed = index.add_listings(listings, metadata_dict)
+        
+        duplicates = 0
+        for result in listings:
+            title = result.get('outputs', {}).get('title')
+            if not result.get('success') or not title:
+                continue
+            others = index.title_count(title) - 1
+            if others > 0:
+                result['duplicate_titles'] = others
+                duplicates += 1
+        
+        summary = self.results.setdefault('listing_index', {'path': index.path, 'indexed': 0,
+                                                            'duplicate_titles': 0})
+        summary['indexed'] += len(indexed)
+        summary['duplicate_titles'] += duplicates
+        logger.info("Indexed %d listings in %s (%d with duplicate titles)", len(indexed),
+                    index.path, duplicates)
+    
+    def value_listings(self, listings: List[Dict]):
+        """
+        Add priced listings to the C13B0 index and save the new index value.
+        
+        Each successful listing moves the index by its index_valuation.price
+        (reserve_price by default). The index files are read from
+        index_valuation.root_dir, or the repository root if none is set.
+        """
+        settings = self.config.get('index_valuation', {})
+        price_field = settings.get('price', 'reserve_price')
+        entries = []
+        for result in listings:
+            price = (result.get('pricing') or {}).get(price_field)
+            if result.get('success') and price is not None:
+                entries.append((result['item_name'], price, None))
+        
+        valuation = IndexValuation(settings.get('root_dir') or str(REPO_ROOT))
+        value = valuation.record_many('listing', entries)
+        if value is not None:
+            valuation.save()
+        self.results['index_valuation'] = {'listings': len(entries),
+                                           'index_value': valuation.value_at()}
+        logger.info("Added %d listings to the index (now %.2f)", len(entries),
+                    self.results['index_valuation']['index_value'])
+    
+    def screen_images(self, image_files: List[ImageItem]) -> List[ImageItem]:
+        """
+        Probe image headers and screen out photos before any expensive stage.
+        
+        Undersized photos (below image_cropper.min_width/min_height after
+        EXIF orientation) and photos with a non-normal EXIF orientation are
+        handled per image_cropper.undersized_action and rotated_action:
+        "accept" processes them, "route" holds them for manual review and
+        "reject" drops them. Held and dropped items are added to the
+        listings with their reason. Unrecognised headers are passed through.
+        
+        Returns: The image files to process
+        """
+        settings = self.config.get('image_cropper', {})
+        min_width = settings.get('min_width', 0)
+        min_height = settings.get('min_height', 0)
+        actions = {
+            'undersized': settings.get('undersized_action', 'reject'),
+            'rotated': settings.get('rotated_action', 'accept')
+        }
+        
+        accepted = []
+        probes = probe_items(image_files)
+        for image_file, probe in zip(image_files, probes):
+            checks = []
+            reason = screen(probe, min_width, min_height)
+            if reason:
+                checks.append(('undersized', reason))
+            if probe is not None and probe.rotated:
+                checks.append(('rotated', f"EXIF orientation {probe.orientation}"))
+            
+            verdict = None
+            for check, reason in checks:
+                action = actions[check]
+                if action == 'reject' or (action == 'route' and verdict is None):
+                    verdict = (action, reason)
+            
+            if verdict is None:
+                accepted.append(image_file)
+                continue
+            
+            action, reason = verdict
+            counter = 'rejected' if action == 'reject' else 'routed'
+            logger.debug("%s %s: %s", counter.capitalize(), image_file.name, reason,
+                         extra={'item': image_file.stem, 'outcome': counter})
+            result = self.new_item_result(str(image_file))
+            result[counter] = reason
+            result['image'] = probe.to_dict()
+            self.results[counter] += 1
+            self.results['listings'].append(result)
+        
+        return accepted
+    
+    def progress(self, total: Optional[int] = None, label: str = 'items') -> ProgressReporter:
+        """Return a progress reporter using logging.progress_interval_seconds."""
+        interval = self.config.get('logging', {}).get('progress_interval_seconds', 5.0)
+        return ProgressReporter(logger, total, label, interval)
+    
     def _print_summary(self, summary_file: str):
-        """Print processing summary."""
-        print(f"\n{'='*70}")
-        print(f"PROCESSING COMPLETE")
-        print(f"{'='*70}")
-        print(f"Images processed: {self.results['processed_images']}")
-        print(f"Titles generated: {self.results['generated_titles']}")
-        print(f"Descriptions generated: {self.results['generated_descriptions']}")
-        print(f"Failed: {self.results['failed']}")
-        print(f"Success rate: {(self.results['processed_images']/(self.results['processed_images']+self.results['failed'])*100) if (self.results['processed_images']+self.results['failed']) > 0 else 0:.1f}%")
-        print(f"\nSummary saved to: {summary_file}")
-        print(f"{'='*70}\n")
+        """Log the processing summary."""
+        results = self.results
+        attempted = results['processed_images'] + results['failed']
+        success_rate = results['processed_images'] / attempted * 100 if attempted else 0
+        logger.info("PROCESSING COMPLETE",
+                    extra={key: results[key] for key in (
+                        'processed_images', 'generated_titles', 'generated_descriptions',
+                        'failed', 'rejected', 'routed')})
+        logger.info("Images processed: %d", results['processed_images'])
+        logger.info("Titles generated: %d", results['generated_titles'])
+        logger.info("Descriptions generated: %d", results['generated_descriptions'])
+        logger.info("Failed: %d", results['failed'])
+        if results['rejected'] or results['routed']:
+            logger.info("Rejected: %d  Routed for review: %d", results['rejected'],
+                        results['routed'])
+        logger.info("Success rate: %.1f%%", success_rate)
+        logger.info("Summary saved to: %s", summary_file)
+
+
+class WorkerItemHandler:
+    """
+    Picklable factory that builds an AutopilotBot inside a worker process or thread.
+    
+    Pass the parent bot's config so CLI and in-memory overrides reach the
+    workers; each worker gets its own copy. Without one, config_path is loaded.
+    """
+    
+    COUNTERS = ('processed_images', 'generated_titles', 'generated_descriptions', 'failed',
+                'rejected')
+    
+    def __init__(self, config_path: Optional[str] = None, config: Optional[Dict] = None):
+        self.config_path = config_path
+        self.config = config
+    
+    def __call__(self):
+        config = copy.deepcopy(self.config) if self.config is not None else None
+        bot = AutopilotBot(config_path=self.config_path, config=config)
+        
+        def handle(payload) -> Dict:
+            image_path, output_dir, metadata = payload
+            before = {key: bot.results[key] for key in self.COUNTERS}
+            result = bot.process_single_item(image_path, output_dir, metadata)
+            result['counters'] = {key: bot.results[key] - before[key] for key in self.COUNTERS}
+            return result
+        
+        return handle
 
 
 def main():
@@ -311,35 +1176,107 @@ Examples:
   
   # Use custom config
   python autopilot_bot.py --config custom.json --batch input/ output/
+  
+  # Let the number of worker threads follow throughput and memory
+  python autopilot_bot.py --batch --adaptive input/ output/
+  
+  # Split one batch between several processes or hosts sharing the input
+  python autopilot_bot.py --batch --queue shared/queue.sqlite3 input/ output/
+  
+  # Schedule several consignor sources fairly (see sources.json format in README)
+  python autopilot_bot.py --sources sources.json output/
+  
+  # Profile a slow batch (or set ROOSTER_PROFILE=1)
+  python autopilot_bot.py --batch --profile --profile-sample-rate 0.1 input/ output/
         """
     )
     
-    parser.add_argument('input', help='Input image file or directory')
+    parser.add_argument('input', help='Input image file, directory or ZIP/TAR archive')
     parser.add_argument('output', help='Output directory for processed items')
     parser.add_argument('--config', help='Path to config file', default=None)
     parser.add_argument('--batch', action='store_true', 
                        help='Process entire directory (batch/autopilot mode)')
     parser.add_argument('--metadata', help='Path to metadata JSON file', default=None)
+    parser.add_argument('--isolate', action='store_true',
+                       help='Run each item in a supervised worker process (see "isolation" in config)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                       help='Run the batch on an asyncio event loop (see "async_runner" in config)')
+    parser.add_argument('--sources', action='store_true',
+                       help='Treat input as a JSON file listing several sources to schedule fairly')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='Tune the number of worker threads as the batch runs '
+                            '(see "adaptive_concurrency" in config)')
+    parser.add_argument('--queue', metavar='PATH', default=None,
+                       help='Share the batch with other workers through this job queue database')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of worker processes for --isolate or threads for --sources')
+    parser.add_argument('--plan', action='store_true',
+                       help='With --batch, time a sample and print a JSON plan of run time and '
+                            'resources per worker count instead of processing (see "batch_planner")')
+    parser.add_argument('--plan-sample', type=int, default=None,
+                       help='Items to sample for --plan')
+    parser.add_argument('--deadline-hours', type=float, default=None,
+                       help='For --plan, recommend the fewest workers that finish within this')
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
     
     args = parser.parse_args()
+    if args.plan and (not args.batch or args.sources):
+        parser.error('--plan requires --batch' if not args.batch
+                     else '--plan cannot be combined with --sources')
     
     # Initialize autopilot bot
-    bot = AutopilotBot(config_path=args.config)
-    
-    # Process items
-    if args.batch:
-        bot.process_batch(args.input, args.output, args.metadata)
-    else:
-        # Single item mode
-        os.makedirs(args.output, exist_ok=True)
-        result = bot.process_single_item(args.input, args.output)
-        
-        if result['success']:
-            print(f"\n✓ Successfully processed {result['item_name']}")
+    profiler = BotProfiler.from_args(args.profile, args.profile_sample_rate,
+                                     args.profile_top, name='autopilot')
+    bot = AutopilotBot(config_path=args.config, profiler=profiler)
+    # A plan goes to stdout as JSON, so logs move to stderr
+    configure_from_args(args, bot.config.get('logging'),
+                        stream=sys.stderr if args.plan else None)
+    if args.isolate:
+        bot.config.setdefault('isolation', {})['enabled'] = True
+    if args.use_async:
+        bot.config.setdefault('async_runner', {})['enabled'] = True
+    if args.workers:
+        bot.config.setdefault('isolation', {})['workers'] = args.workers
+    if args.adaptive:
+        bot.config.setdefault('adaptive_concurrency', {})['enabled'] = True
+    if args.queue:
+        bot.config.setdefault('job_queue', {}).update({'enabled': True, 'path': args.queue})
+    if args.plan_sample:
+        bot.config.setdefault('batch_planner', {})['sample_size'] = args.plan_sample
+    if args.deadline_hours:
+        bot.config.setdefault('batch_planner', {})['deadline_hours'] = args.deadline_hours
+    
+    if profiler.enabled and args.batch and not args.plan:
+        unprofiled = '--sources' if args.sources else bot.unprofiled_mode()
+        if unprofiled:
+            parser.error(f'--profile cannot be combined with {unprofiled}')
+    
+    # Process items (closing the bot's stage thread pool afterwards)
+    with bot:
+        if args.sources:
+            with open(args.input, 'r') as f:
+                sources = [BatchSource.from_dict(entry) for entry in json.load(f)]
+            bot.process_sources(sources, args.output, args.workers)
+        elif args.batch and args.plan:
+            plan = bot.process_batch(args.input, args.output, args.metadata, plan=True)
+            print(json.dumps(plan, indent=2))
+        elif args.batch:
+            bot.process_batch(args.input, args.output, args.metadata)
         else:
-            print(f"\n✗ Failed to process {result['item_name']}")
-            if 'error' in result:
-                print(f"  Error: {result['error']}")
+            # Single item mode
+            os.makedirs(args.output, exist_ok=True)
+            profiler.start()
+            result = bot.process_single_item(args.input, args.output)
+            if profiler.enabled:
+                profiler.write_reports(args.output)
+                profiler.log_report()
+            
+            if result['success']:
+                logger.info("Successfully processed %s", result['item_name'])
+            else:
+                logger.error("Failed to process %s%s", result['item_name'],
+                             f": {result['error']}" if 'error' in result else '')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Batch Planner - Predicts how long a batch will take and what it will need.
+
+This module can:
+- Split a batch into strata by image format and file size
+- Draw a stratified sample and run it through the real pipeline stages,
+  timing wall clock, CPU, peak memory and output bytes per item
+- Extrapolate the sample to the whole batch (with a confidence interval)
+- Project wall time, CPU-hours, peak memory and throughput for a range of
+  worker counts, and recommend one
+
+Item cost varies a lot between consignors, so a few hundred timed items
+say far more about a 300k-image overnight job than its item count does.
+"""
+
+import math
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from adaptive_concurrency import detect_memory_limit, read_rss
+
+
+DEFAULT_PLANNER_SETTINGS = {
+    'sample_size': 50,
+    'size_strata': 4,
+    'warmup_items': 1,
+    'worker_counts': [1, 2, 4, 8, 16, 32],
+    'executor': 'processes',
+    'memory_ceiling_mb': None,
+    'deadline_hours': None,
+    'seed': 0
+}
+
+EXECUTORS = ('processes', 'threads')
+
+# Two-sided 95% normal quantile for the total-time interval
+Z_95 = 1.96
+
+# A worker count within this share of the fastest plan counts as just as fast
+NEAR_BEST = 0.1
+
+MB = 1024 * 1024
+
+_FORMAT_ALIASES = {'.jpeg': 'jpg', '.jpg': 'jpg', '.tif': 'tiff'}
+
+
+def item_size(item) -> int:
+    """Return the size in bytes of a file or archive member (0 if unknown)."""
+    size = getattr(item, 'size', None)
+    if isinstance(size, int):
+        return size
+    try:
+        return os.path.getsize(item)
+    except OSError:
+        return 0
+
+
+def item_format(item) -> str:
+    """Return the image format from an item's suffix (e.g. 'jpg', 'png')."""
+    suffix = Path(str(item)).suffix.lower()
+    return _FORMAT_ALIASES.get(suffix, suffix.lstrip('.') or 'unknown')
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter for this process (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss() -> int:
+    """Return the peak RSS since the last reset in bytes (current RSS if unavailable)."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return read_rss()
+
+
+def directory_bytes(path: str) -> int:
+    """Return the total size of the files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class Stratum:
+    """Items of one format whose file sizes fall in one size band."""
+
+    def __init__(self, fmt: str, band: int, items: List):
+        self.format = fmt
+        self.band = band
+        self.items = items
+        self.sample: List = []
+        self.measurements: List[Dict] = []
+
+    @property
+    def key(self) -> str:
+        return f"{self.format}/{self.band}"
+
+    def mean(self, field: str) -> float:
+        values = [m[field] for m in self.measurements]
+        return statistics.fmean(values) if values else 0.0
+
+    def variance(self, field: str) -> float:
+        values = [m[field] for m in self.measurements]
+        return statistics.variance(values) if len(values) > 1 else 0.0
+
+
+def stratify(items: Sequence, size_strata: int = 4) -> List[Stratum]:
+    """
+    Group items by format, then into size bands of roughly equal count.
+
+    Args:
+        items: Image files or archive members
+        size_strata: Size bands per format
+
+    Returns: Non-empty strata, ordered by format then band
+    """
+    by_format: Dict[str, List[Tuple[int, object]]] = {}
+    for item in items:
+        by_format.setdefault(item_format(item), []).append((item_size(item), item))
+    strata = []
+    for fmt in sorted(by_format):
+        sized = sorted(by_format[fmt], key=lambda pair: pair[0])
+        bands = max(1, min(size_strata, len(sized)))
+        for band in range(bands):
+            start = band * len(sized) // bands
+            end = (band + 1) * len(sized) // bands
+            strata.append(Stratum(fmt, band, [item for _, item in sized[start:end]]))
+    return [s for s in strata if s.items]
+
+
+def allocate(strata: List[Stratum], sample_size: int, rng: random.Random,
+             exclude: Iterable = ()):
+    """
+    Draw each stratum's sample in proportion to its size (at least one item each).
+
+    Items in exclude (e.g. warm-up items) are only drawn from a stratum that
+    has no other items.
+    """
+    exclude = set(exclude)
+    population = sum(len(s.items) for s in strata)
+    for stratum in strata:
+        candidates = [item for item in stratum.items if item not in exclude] or stratum.items
+        share = round(sample_size * len(stratum.items) / population) if population else 0
+        count = min(len(candidates), max(1, share))
+        stratum.sample = rng.sample(candidates, count)
+
+
+class BatchPlanner:
+    """Samples a batch through the real stages and projects its cost per worker count."""
+
+    def __init__(self, bot_factory: Callable, sample_size: int = 50, size_strata: int = 4,
+                 warmup_items: int = 1, worker_counts: Sequence[int] = (1, 2, 4, 8, 16, 32),
+                 executor: str = 'processes', memory_ceiling_mb: Optional[float] = None,
+                 deadline_hours: Optional[float] = None, seed: int = 0,
+                 clock: Callable[[], float] = time.perf_counter,
+                 cpu_clock: Callable[[], float] = time.process_time):
+        """
+        Initialize the planner.
+
+        Args:
+            bot_factory: Returns a fresh AutopilotBot to run the sample on
+                (so the caller's counters are left alone)
+            sample_size: Items to time across all strata
+            size_strata: File size bands per image format
+            warmup_items: Items run first and left out of the measurements
+                (imports, caches and lazy set-up land on them)
+            worker_counts: Worker counts to project
+            executor: 'processes' (each worker has its own interpreter, as with
+                --isolate) or 'threads' (CPU work is serialised by the GIL)
+            memory_ceiling_mb: Memory the batch must fit in (defaults to the
+                container or machine memory)
+            deadline_hours: If set, the recommendation is the fewest workers
+                that finish within it
+            seed: Sampling seed, so a plan can be reproduced
+            clock: Wall clock (injectable for tests)
+            cpu_clock: Process CPU clock (injectable for tests)
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}")
+        self.bot_factory = bot_factory
+        self.sample_size = max(1, int(sample_size))
+        self.size_strata = max(1, int(size_strata))
+        self.warmup_items = max(0, int(warmup_items))
+        self.worker_counts = sorted({max(1, int(w)) for w in worker_counts}) or [1]
+        self.executor = executor
+        if memory_ceiling_mb:
+            self.memory_ceiling = int(memory_ceiling_mb * MB)
+        else:
+            self.memory_ceiling = detect_memory_limit()
+        self.deadline_hours = deadline_hours
+        self.seed = seed
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.cpus = os.cpu_count() or 1
+
+    @classmethod
+    def from_config(cls, settings: Dict, bot_factory: Callable, **kwargs) -> 'BatchPlanner':
+        """Create a planner from the batch_planner section of the config."""
+        merged = dict(DEFAULT_PLANNER_SETTINGS)
+        merged.update(settings or {})
+        return cls(bot_factory,
+                   sample_size=merged['sample_size'],
+                   size_strata=merged['size_strata'],
+                   warmup_items=merged['warmup_items'],
+                   worker_counts=merged['worker_counts'],
+                   executor=merged['executor'],
+                   memory_ceiling_mb=merged['memory_ceiling_mb'],
+                   deadline_hours=merged['deadline_hours'],
+                   seed=merged['seed'],
+                   **kwargs)
+
+    def plan(self, image_files: Sequence, metadata: Optional[Dict] = None) -> Dict:
+        """
+        Time a stratified sample of image_files and project the whole batch.
+
+        Args:
+            image_files: Items the batch would process (already screened)
+            metadata: Item metadata keyed by file stem
+
+        Returns: The plan as a JSON-serialisable dictionary
+        """
+        metadata = metadata or {}
+        rng = random.Random(self.seed)
+        strata = stratify(image_files, self.size_strata)
+        # Warm-up items are drawn first and kept out of the timed sample, so
+        # no sampled item runs with its file already cached
+        warmup = rng.sample(list(image_files), min(self.warmup_items, len(image_files)))
+        allocate(strata, self.sample_size, rng, exclude=warmup)
+
+        workdir = tempfile.mkdtemp(prefix='batch-plan-')
+        try:
+            started = self.clock()
+            bot = self.bot_factory()
+            startup = self.clock() - started
+            base_rss = read_rss()
+            for item in warmup:
+                self._measure(bot, item, workdir, metadata)
+            for stratum in strata:
+                for item in stratum.sample:
+                    stratum.measurements.append(self._measure(bot, item, workdir, metadata))
+            close = getattr(bot, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return self._project(strata, startup, base_rss, len(image_files))
+
+    def _measure(self, bot, item, workdir: str, metadata: Dict) -> Dict:
+        output_dir = tempfile.mkdtemp(dir=workdir)
+        rss_before = read_rss()
+        tracked = reset_peak_rss()
+        cpu_started = self.cpu_clock()
+        started = self.clock()
+        result = bot.process_single_item(str(item), output_dir, metadata.get(item.stem))
+        seconds = self.clock() - started
+        cpu_seconds = self.cpu_clock() - cpu_started
+        peak = read_peak_rss() if tracked else read_rss()
+        output_bytes = directory_bytes(output_dir)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return {
+            'seconds': seconds,
+            'cpu_seconds': cpu_seconds,
+            'memory_bytes': max(0, peak - rss_before),
+            'output_bytes': output_bytes,
+            'input_bytes': item_size(item),
+            'failed': 0 if result.get('success') else 1,
+        }
+
+    def _project(self, strata: List[Stratum], startup: float, base_rss: int,
+                 total_items: int) -> Dict:
+        totals = {}
+        for field in ('seconds', 'cpu_seconds', 'output_bytes', 'input_bytes', 'failed'):
+            totals[field] = sum(len(s.items) * s.mean(field) for s in strata)
+        # Stratified estimator variance (finite population corrected)
+        variance = sum(len(s.items) ** 2 * (1 - len(s.sample) / len(s.items))
+                       * s.variance('seconds') / len(s.sample)
+                       for s in strata if s.sample)
+        margin = Z_95 * math.sqrt(variance)
+        memory = [m['memory_bytes'] for s in strata for m in s.measurements]
+        item_memory = max(memory) if memory else 0
+        sampled = sum(len(s.sample) for s in strata)
+
+        projections = [self._projection(workers, totals, startup, base_rss, item_memory,
+                                        total_items)
+                       for workers in self.worker_counts]
+        return {
+            'items': total_items,
+            'sampled_items': sampled,
+            'executor': self.executor,
+            'cpus': self.cpus,
+            'memory_ceiling_mb': round(self.memory_ceiling / MB, 1) if self.memory_ceiling else None,
+            'worker_startup_seconds': round(startup, 3),
+            'base_rss_mb': round(base_rss / MB, 1),
+            'item_peak_memory_mb': round(item_memory / MB, 1),
+            'serial_seconds': round(totals['seconds'], 1),
+            'serial_seconds_95': [round(max(0.0, totals['seconds'] - margin), 1),
+                                  round(totals['seconds'] + margin, 1)],
+            'cpu_hours': round(totals['cpu_seconds'] / 3600, 3),
+            'input_bytes': int(totals['input_bytes']),
+            'output_bytes': int(totals['output_bytes']),
+            'expected_failures': round(totals['failed']),
+            'strata': [{
+                'stratum': s.key,
+                'format': s.format,
+                'items': len(s.items),
+                'sampled': len(s.sample),
+                'mean_input_bytes': int(s.mean('input_bytes')),
+                'mean_seconds': round(s.mean('seconds'), 4),
+                'mean_cpu_seconds': round(s.mean('cpu_seconds'), 4),
+                'mean_output_bytes': int(s.mean('output_bytes')),
+                'max_memory_mb': round(max((m['memory_bytes'] for m in s.measurements),
+                                           default=0) / MB, 1),
+            } for s in strata],
+            'projections': projections,
+            'recommended_workers': self._recommend(projections),
+        }
+
+    def _projection(self, workers: int, totals: Dict, startup: float, base_rss: int,
+                    item_memory: int, total_items: int) -> Dict:
+        # Waiting overlaps across workers; CPU work only spreads over the
+        # cores (processes) or not at all (threads, under the GIL)
+        cpu_lanes = min(workers, self.cpus) if self.executor == 'processes' else 1
+        # Every worker process builds its own bot
+        starts = workers if self.executor == 'processes' else 1
+        seconds = startup + max(totals['seconds'] / workers, totals['cpu_seconds'] / cpu_lanes)
+        if self.executor == 'processes':
+            memory = workers * (base_rss + item_memory)
+        else:
+            memory = base_rss + workers * item_memory
+        projection = {
+            'workers': workers,
+            'wall_seconds': round(seconds, 1),
+            'wall_hours': round(seconds / 3600, 3),
+            'items_per_second': round(total_items / seconds, 3) if seconds > 0 else None,
+            'cpu_hours': round((totals['cpu_seconds'] + startup * starts) / 3600, 3),
+            'peak_memory_mb': round(memory / MB, 1),
+            'output_bytes_per_worker': int(totals['output_bytes'] / workers),
+            'fits_memory': self.memory_ceiling is None or memory <= self.memory_ceiling,
+        }
+        if self.deadline_hours:
+            projection['meets_deadline'] = seconds <= self.deadline_hours * 3600
+            # Items this many workers get through before the deadline
+            per_item = (seconds - startup) / total_items if total_items else 0
+            budget = self.deadline_hours * 3600 - startup
+            projection['items_by_deadline'] = (total_items if per_item <= 0
+                                               else max(0, min(total_items,
+                                                               int(budget / per_item))))
+        return projection
+
+    def _recommend(self, projections: List[Dict]) -> Optional[int]:
+        fitting = [p for p in projections if p['fits_memory']]
+        if not fitting:
+            return None
+        if self.deadline_hours:
+            meeting = [p for p in fitting if p['meets_deadline']]
+            if meeting:
+                return meeting[0]['workers']
+        best = min(p['wall_seconds'] for p in fitting)
+        return next(p['workers'] for p in fitting
+                    if p['wall_seconds'] <= best * (1 + NEAR_BEST))
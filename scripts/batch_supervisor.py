@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Batch Supervisor - Runs batch items in supervised worker processes.
+
+This module can:
+- Isolate each item in a worker process so crashes don't take down the batch
+- Enforce per-item time limits and per-worker memory limits
+- Retry failed items with exponential backoff
+- Dead-letter items that keep failing
+- Recycle workers after N items to bound memory fragmentation
+"""
+
+import heapq
+import json
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+DEFAULT_ISOLATION_SETTINGS = {
+    'enabled': False,
+    'workers': 2,
+    'item_timeout_seconds': 300,
+    'item_memory_mb': 0,
+    'max_attempts': 3,
+    'backoff_seconds': 1.0,
+    'backoff_max_seconds': 60.0,
+    'recycle_after': 100
+}
+
+
+def _worker_main(conn, handler_factory: Callable, memory_limit_bytes: int,
+                 recycle_after: int):
+    """
+    Worker process loop: build a handler, then process tasks from conn.
+
+    The worker exits cleanly after recycle_after items so the supervisor can
+    replace it with a fresh process.
+    """
+    if memory_limit_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+    handler = handler_factory()
+    handled = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        task_id, payload = message
+        try:
+            result = handler(payload)
+        except MemoryError:
+            result = {'success': False, 'error': 'MemoryError: item exceeded memory limit'}
+        except Exception as e:
+            result = {'success': False, 'error': f"{type(e).__name__}: {e}"}
+
+        handled += 1
+        retiring = bool(recycle_after) and handled >= recycle_after
+        conn.send((task_id, result, retiring))
+        if retiring:
+            break
+    conn.close()
+
+
+class _Task:
+    """Bookkeeping for one item across its attempts."""
+
+    def __init__(self, task_id: str, payload: Any):
+        self.task_id = task_id
+        self.payload = payload
+        self.attempts = 0
+        self.errors: List[str] = []
+
+
+class _Worker:
+    """A worker process and the task it is currently running."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.task: Optional[_Task] = None
+        self.started = 0.0
+        self.retiring = False
+
+
+class SupervisedScheduler:
+    """Supervises worker processes that run batch items with retries."""
+
+    def __init__(self, handler_factory: Callable, workers: int = 2,
+                 item_timeout: float = 300.0, memory_limit_mb: int = 0,
+                 max_attempts: int = 3, backoff_seconds: float = 1.0,
+                 backoff_max_seconds: float = 60.0, recycle_after: int = 100,
+                 dead_letter_path: Optional[str] = None,
+                 on_worker_lost: Optional[Callable[[int], None]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            handler_factory: Picklable callable run once in each worker; it
+                returns a callable that takes a task payload and returns a
+                result dict. A result with success=False counts as a failure
+                and is retried, unless it also has retry=False (final).
+            workers: Number of worker processes
+            item_timeout: Seconds an item may run before its worker is killed
+            memory_limit_mb: Address-space limit per worker (0 for none)
+            max_attempts: Attempts per item before it is dead-lettered
+            backoff_seconds: Delay before the first retry; doubles each retry
+            backoff_max_seconds: Upper bound on the retry delay
+            recycle_after: Items a worker handles before it is replaced (0 for never)
+            dead_letter_path: Optional JSON-lines file for dead-lettered items
+            on_worker_lost: Called with the pid of a worker that crashed or was
+                killed, e.g. to reclaim shared resources it held
+        """
+        self.handler_factory = handler_factory
+        self.workers = max(1, workers)
+        self.item_timeout = item_timeout
+        self.memory_limit_bytes = int(memory_limit_mb) * 1024 * 1024
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.recycle_after = recycle_after
+        self.dead_letter_path = dead_letter_path
+        self.on_worker_lost = on_worker_lost
+        self.stats = {
+            'retries': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'dead_lettered': 0,
+            'not_retried': 0,
+            'workers_started': 0,
+            'workers_recycled': 0
+        }
+        self._context = multiprocessing.get_context()
+
+    @classmethod
+    def from_config(cls, handler_factory: Callable, settings: Dict,
+                    dead_letter_path: Optional[str] = None,
+                    on_worker_lost: Optional[Callable[[int], None]] = None) -> 'SupervisedScheduler':
+        """Create a scheduler from the isolation section of the config."""
+        merged = dict(DEFAULT_ISOLATION_SETTINGS)
+        merged.update(settings or {})
+        return cls(handler_factory,
+                   workers=merged['workers'],
+                   item_timeout=merged['item_timeout_seconds'],
+                   memory_limit_mb=merged['item_memory_mb'],
+                   max_attempts=merged['max_attempts'],
+                   backoff_seconds=merged['backoff_seconds'],
+                   backoff_max_seconds=merged['backoff_max_seconds'],
+                   recycle_after=merged['recycle_after'],
+                   dead_letter_path=dead_letter_path,
+                   on_worker_lost=on_worker_lost)
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Return the delay before retrying an item that has failed `attempts` times."""
+        return min(self.backoff_max_seconds, self.backoff_seconds * (2 ** (attempts - 1)))
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.handler_factory, self.memory_limit_bytes, self.recycle_after),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.stats['workers_started'] += 1
+        return _Worker(process, parent_conn)
+
+    def run(self, tasks: List[Tuple[str, Any]]) -> Dict[str, Dict]:
+        """
+        Run every task to success or dead-letter.
+
+        Args:
+            tasks: (task_id, payload) pairs; payloads must be picklable
+
+        Returns: Mapping of task_id to its final result. Dead-lettered items
+        get success=False, dead_letter=True and the error from each attempt;
+        failures marked retry=False are returned as they are.
+        """
+        results: Dict[str, Dict] = {}
+        ready: List[_Task] = [_Task(task_id, payload) for task_id, payload in tasks]
+        ready.reverse()
+        delayed: List[Tuple[float, int, _Task]] = []
+        sequence = 0
+        pool: List[_Worker] = []
+
+        try:
+            while ready or delayed or any(w.task for w in pool):
+                now = time.monotonic()
+
+                # Promote retries whose backoff has elapsed
+                while delayed and delayed[0][0] <= now:
+                    ready.append(heapq.heappop(delayed)[2])
+
+                # Reap idle workers that have exited, then refill the pool
+                pool = self._reap(pool)
+                while len(pool) < self.workers and (ready or delayed):
+                    pool.append(self._spawn())
+
+                # Hand out ready work to idle workers
+                for worker in pool:
+                    if worker.task is None and ready and not worker.retiring:
+                        task = ready.pop()
+                        task.attempts += 1
+                        worker.task = task
+                        worker.started = now
+                        try:
+                            worker.conn.send((task.task_id, task.payload))
+                        except (BrokenPipeError, OSError):
+                            # Picked up as a crash by _poll()
+                            pass
+
+                timeout = self._next_wakeup(pool, delayed, now)
+                waitables = [w.conn for w in pool if w.task] + [w.process.sentinel for w in pool]
+                if not waitables:
+                    time.sleep(timeout)
+                    continue
+                wait(waitables, timeout=timeout)
+
+                for worker in list(pool):
+                    outcome = self._poll(worker)
+                    if outcome is None:
+                        continue
+                    task, result = outcome
+                    if result.get('success') or result.get('retry', True) is False:
+                        # Final either way; a handler marks failures that
+                        # would fail again (e.g. a quality rejection) retry=False
+                        if not result.get('success'):
+                            self.stats['not_retried'] += 1
+                        result['attempts'] = task.attempts
+                        results[task.task_id] = result
+                        continue
+                    task.errors.append(result.get('error', 'unknown error'))
+                    if task.attempts >= self.max_attempts:
+                        results[task.task_id] = self._dead_letter(task)
+                    else:
+                        self.stats['retries'] += 1
+                        sequence += 1
+                        retry_at = time.monotonic() + self.backoff_delay(task.attempts)
+                        heapq.heappush(delayed, (retry_at, sequence, task))
+        finally:
+            self._shutdown(pool)
+
+        return results
+
+    def _next_wakeup(self, pool: List[_Worker], delayed, now: float) -> float:
+        deadlines = [w.started + self.item_timeout for w in pool if w.task]
+        if delayed:
+            deadlines.append(delayed[0][0])
+        if not deadlines:
+            return 0.05
+        return max(0.0, min(deadlines) - now)
+
+    def _reap(self, pool: List[_Worker]) -> List[_Worker]:
+        """Drop idle workers that have exited (recycled or otherwise)."""
+        alive = []
+        for worker in pool:
+            if worker.task is None and (worker.retiring or not worker.process.is_alive()):
+                worker.process.join()
+                worker.conn.close()
+                if worker.retiring:
+                    self.stats['workers_recycled'] += 1
+                continue
+            alive.append(worker)
+        return alive
+
+    def _poll(self, worker: _Worker) -> Optional[Tuple[_Task, Dict]]:
+        """Collect a finished, crashed or timed-out task from a worker."""
+        task = worker.task
+        if task is None:
+            return None
+
+        if worker.conn.poll():
+            try:
+                task_id, result, retiring = worker.conn.recv()
+            except (EOFError, OSError):
+                pass
+            else:
+                worker.task = None
+                worker.retiring = retiring
+                return task, result
+
+        if not worker.process.is_alive():
+            worker.process.join()
+            worker.task = None
+            self.stats['crashes'] += 1
+            self._worker_lost(worker)
+            return task, {'success': False,
+                          'error': f"worker exited with code {worker.process.exitcode}"}
+
+        if time.monotonic() - worker.started > self.item_timeout:
+            worker.process.kill()
+            worker.process.join()
+            worker.task = None
+            self.stats['timeouts'] += 1
+            self._worker_lost(worker)
+            return task, {'success': False,
+                          'error': f"timed out after {self.item_timeout}s"}
+        return None
+
+    def _worker_lost(self, worker: _Worker):
+        if self.on_worker_lost is not None:
+            self.on_worker_lost(worker.process.pid)
+
+    def _dead_letter(self, task: _Task) -> Dict:
+        self.stats['dead_lettered'] += 1
+        entry = {
+            'task_id': task.task_id,
+            'success': False,
+            'dead_letter': True,
+            'attempts': task.attempts,
+            'errors': task.errors,
+            'error': task.errors[-1] if task.errors else None
+        }
+        if self.dead_letter_path:
+            with open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def _shutdown(self, pool: List[_Worker]):
+        for worker in pool:
+            if worker.process.is_alive() and not worker.retiring:
+                try:
+                    worker.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for worker in pool:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Bot Logging - Shared, non-blocking logging for the autopilot and its bots.
+
+This module can:
+- Give each bot a logger under the 'rooster' hierarchy
+- Write records as readable text or as one JSON object per line, with any
+  extra={...} fields kept as structured keys
+- Move formatting and writing off the hot path: records go into a bounded
+  queue and a background thread writes them; if the queue is full an
+  INFO or DEBUG record is dropped and counted rather than blocking the
+  batch, while warnings and errors wait briefly for room
+- Keep logging from forked worker processes: the child starts its own
+  writer thread and flushes it when the worker exits
+- Replace per-item banners with progress summaries emitted at most once
+  per interval
+- Add --quiet, --log-level, --log-format and --log-file to a bot's CLI
+
+Per-item messages are logged at DEBUG, so a default (INFO) run shows batch
+headers, progress lines and the summary, and --quiet shows only warnings
+and errors.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+
+ROOT_LOGGER = 'rooster'
+
+LOG_FORMATS = ('text', 'json')
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# Longest a warning or error waits for room in a full queue before it is dropped
+WARNING_WAIT_SECONDS = 1.0
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'taskName'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional['NonBlockingQueueHandler'] = None
+_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger for a bot (e.g. 'autopilot' -> 'rooster.autopilot')."""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def record_fields(record: logging.LogRecord) -> Dict:
+    """Return the structured fields passed to a log call with extra={...}."""
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_')}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 6),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        data.update(record_fields(record))
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            data['exc'] = exc
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The message as before, marked with its level from WARNING up."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.levelno >= logging.WARNING:
+            message = f'{record.levelname}: {message}'
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            message = f'{message}\n{exc}'
+        return message
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops (and counts) records instead of waiting on a full queue.
+
+    Warnings and errors wait up to wait_seconds for room first, so a burst
+    of progress chatter can't push out the records that matter. Once such a
+    wait runs out, later ones don't wait until a record gets through again,
+    so a stalled writer costs one wait rather than one per warning.
+    """
+
+    def __init__(self, log_queue: queue.Queue, wait_seconds: float = WARNING_WAIT_SECONDS):
+        super().__init__(log_queue)
+        self.wait_seconds = wait_seconds
+        self.dropped = 0
+        self.stalled = False
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now (its arguments may change later), but
+        # leave formatting to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if record.levelno >= logging.WARNING and not self.stalled:
+                self.queue.put(record, timeout=self.wait_seconds)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if record.levelno >= logging.WARNING:
+                self.stalled = True
+        else:
+            self.stalled = False
+
+
+def configure_logging(level='INFO', fmt: str = 'text', quiet: bool = False,
+                      stream=None, log_file: Optional[str] = None,
+                      queue_size: int = DEFAULT_QUEUE_SIZE) -> NonBlockingQueueHandler:
+    """
+    Route the 'rooster' loggers through a background writer thread.
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level: Lowest level written (name or number)
+        fmt: 'text' or 'json'
+        quiet: Only write warnings and errors (overrides level)
+        stream: Output stream (defaults to stdout)
+        log_file: Write to this file instead of the stream
+        queue_size: Records buffered before new ones are dropped
+
+    Returns: The queue handler (its dropped attribute counts lost records)
+    """
+    global _listener, _handler
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}")
+    with _lock:
+        shutdown_logging()
+        if log_file:
+            output = logging.FileHandler(log_file, encoding='utf-8')
+        else:
+            output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == 'json' else TextFormatter())
+
+        log_queue = queue.Queue(max(1, queue_size))
+        _handler = NonBlockingQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(logging.WARNING if quiet else level if isinstance(level, int)
+                      else logging.getLevelName(str(level).upper()))
+        root.propagate = False
+        return _handler
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        if _handler is not None and _handler.dropped:
+            # The writer has stopped; say so directly rather than via the queue
+            sys.stderr.write(f"logging: {_handler.dropped} records dropped "
+                             f"(queue full)\n")
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _handler = None
+
+
+def _restart_in_child():
+    """
+    Give a forked child its own writer thread.
+
+    The parent's thread doesn't exist in the child, so without this the
+    child's records would fill a queue nobody reads. multiprocessing workers
+    leave through os._exit, which skips atexit, so the flush is registered
+    as a multiprocessing finalizer as well (again once the Process has
+    started, as its bootstrap clears the finalizers it inherited).
+    """
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None or _handler is None:
+        return
+    log_queue = queue.Queue(_handler.queue.maxsize)
+    _handler.queue = log_queue
+    _handler.dropped = 0
+    _handler.stalled = False
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers)
+    _listener.start()
+    _flush_at_exit()
+    multiprocessing.util.register_after_fork(_handler, _flush_at_exit)
+
+
+def _flush_at_exit(_owner=None):
+    multiprocessing.util.Finalize(None, shutdown_logging, exitpriority=0)
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_in_child)
+
+
+DEFAULT_LOGGING_SETTINGS = {
+    'level': 'INFO',
+    'format': 'text',
+    'progress_interval_seconds': 5.0,
+    'queue_size': DEFAULT_QUEUE_SIZE
+}
+
+
+def add_logging_arguments(parser):
+    """Add the shared logging options to a bot's argument parser."""
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Only log warnings and errors')
+    parser.add_argument('--log-level', default=None,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Lowest level to log (DEBUG shows every item; default INFO)')
+    parser.add_argument('--log-format', default=None, choices=LOG_FORMATS,
+                        help='text, or json for one structured record per line')
+    parser.add_argument('--log-file', default=None, help='Log to this file instead of stdout')
+
+
+def configure_from_args(args, settings: Optional[Dict] = None,
+                        stream=None) -> NonBlockingQueueHandler:
+    """
+    Configure logging from the options added by add_logging_arguments.
+
+    Args:
+        args: Parsed arguments
+        settings: The bot's logging config section; options given on the
+            command line take precedence
+        stream: Output stream when no log file is set (defaults to stdout)
+
+    Returns: The queue handler
+    """
+    merged = dict(DEFAULT_LOGGING_SETTINGS)
+    merged.update(settings or {})
+    return configure_logging(args.log_level or merged['level'],
+                             args.log_format or merged['format'], args.quiet,
+                             stream=stream, log_file=args.log_file or merged.get('file'),
+                             queue_size=merged['queue_size'])
+
+
+class ProgressReporter:
+    """Logs batch progress at most once per interval instead of once per item."""
+
+    def __init__(self, logger: logging.Logger, total: Optional[int] = None,
+                 label: str = 'items', interval_seconds: float = 5.0,
+                 clock=time.monotonic):
+        """
+        Initialize the reporter.
+
+        Args:
+            logger: Logger the progress records go to (at INFO)
+            total: Number of items expected, if known
+            label: What is being counted, for the message
+            interval_seconds: Shortest time between progress records
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.logger = logger
+        self.total = total
+        self.label = label
+        self.interval = interval_seconds
+        self.clock = clock
+        self.done = 0
+        self.counters: Dict[str, int] = {}
+        self.started = clock()
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    def update(self, count: int = 1, **counters: int):
+        """Count finished items (and outcome counters such as failed=1)."""
+        with self._lock:
+            self.done += count
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            now = self.clock()
+            if now - self._last < self.interval:
+                return
+            self._last = now
+            fields = self._fields(now)
+            counters = dict(self.counters)
+        self._emit('Progress', fields, counters)
+
+    def finish(self):
+        """Log the final totals."""
+        with self._lock:
+            fields = self._fields(self.clock())
+            counters = dict(self.counters)
+        self._emit('Finished', fields, counters)
+
+    def _fields(self, now: float) -> Dict:
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        fields = {'done': self.done, 'total': self.total, 'rate': round(rate, 2),
+                  'elapsed_s': round(elapsed, 1)}
+        if self.total and rate > 0:
+            fields['eta_s'] = round(max(0, self.total - self.done) / rate, 1)
+        fields.update(self.counters)
+        return fields
+
+    def _emit(self, prefix: str, fields: Dict, counters: Dict[str, int]):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        done = f"{fields['done']}/{fields['total']}" if fields['total'] else str(fields['done'])
+        message = f"{prefix}: {done} {self.label} ({fields['rate']:.1f}/s"
+        if 'eta_s' in fields and prefix == 'Progress':
+            message += f", ETA {fields['eta_s']:.0f}s"
+        message += ')'
+        shown = [f'{key} {value}' for key, value in counters.items() if value]
+        if shown:
+            message += ' ' + ', '.join(shown)
+        self.logger.info(message, extra={'progress': fields})
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Bot Profiler - Opt-in profiling hooks shared by the autopilot and sub-bots.
+
+This module can:
+- Capture cProfile or low-overhead sampling profiles for a batch run
+- Profile only a sampled subset of items to keep overhead down
+- Time each pipeline stage per item
+- Write collapsed-stack files ready for flamegraph tools
+- Report the slowest items with a per-stage breakdown
+
+Profiling is enabled with the ``--profile`` flag on any bot, or by setting
+the ``ROOSTER_PROFILE`` environment variable (``1``/``sample`` or ``cprofile``).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from bot_logging import get_logger
+
+
+PROFILE_ENV = 'ROOSTER_PROFILE'
+SAMPLE_RATE_ENV = 'ROOSTER_PROFILE_SAMPLE_RATE'
+TOP_N_ENV = 'ROOSTER_PROFILE_TOP'
+INTERVAL_ENV = 'ROOSTER_PROFILE_INTERVAL'
+
+PROFILE_MODES = ('sample', 'cprofile')
+
+logger = get_logger('profiler')
+
+
+def _env_number(name: str, default, cast=float):
+    """Read a numeric environment variable, falling back to default if it is malformed."""
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        logger.warning("Ignoring %s=%r (not a valid %s), using %s", name, raw,
+                       cast.__name__, default)
+        return default
+
+
+class StackSampler:
+    """Background thread that samples one thread's stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.active = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sampling thread."""
+        self._thread = threading.Thread(target=self._run, name='bot-profiler-sampler',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[_collapse_frame(frame)] += 1
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse_frame(frame) -> str:
+    """Render a frame chain as a root-first, semicolon-separated stack."""
+    names = []
+    while frame is not None:
+        names.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _pstats_label(func) -> str:
+    filename, lineno, name = func
+    if filename == '~':
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def collapse_pstats(stats: pstats.Stats, unit: float = 1e6) -> Counter:
+    """
+    Convert cProfile statistics into collapsed stacks.
+
+    cProfile only records caller/callee pairs, so each function's own time is
+    attributed to the path formed by following its heaviest caller up to a
+    root. Weights are in microseconds.
+    """
+    raw = stats.stats
+    stacks = Counter()
+    for func, (_, _, tottime, _, callers) in raw.items():
+        weight = int(tottime * unit)
+        if weight <= 0:
+            continue
+        path = [_pstats_label(func)]
+        seen = {func}
+        current = callers
+        while current:
+            parent = max(current, key=lambda f: current[f][3])
+            if parent in seen:
+                break
+            seen.add(parent)
+            path.append(_pstats_label(parent))
+            current = raw.get(parent, (0, 0, 0, 0, {}))[4]
+        stacks[';'.join(reversed(path))] += weight
+    return stacks
+
+
+class BotProfiler:
+    """
+    Collects per-item stage timings and an optional CPU profile for a run.
+
+    When disabled, ``item()`` and ``stage()`` are no-ops so the hooks can stay
+    in the hot path permanently.
+    """
+
+    def __init__(self, enabled: bool = False, mode: str = 'sample',
+                 item_sample_rate: float = 1.0, top_n: int = 10,
+                 interval: float = 0.005, name: str = 'bot'):
+        """
+        Initialize the profiler.
+
+        Args:
+            enabled: Whether profiling is active at all
+            mode: 'sample' for the stack sampler, 'cprofile' for cProfile
+            item_sample_rate: Fraction of items (0-1) to CPU-profile
+            top_n: Number of slowest items to report
+            interval: Sampling interval in seconds (sample mode only)
+            name: Prefix for the files written by write_reports()
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode!r} (expected one of {PROFILE_MODES})")
+        self.enabled = enabled
+        self.mode = mode
+        self.item_sample_rate = max(0.0, min(1.0, item_sample_rate))
+        self.top_n = top_n
+        self.interval = interval
+        self.name = name
+        self.items: List[Dict] = []
+        self._current = None
+        self._profiler = None
+        self._sampler = None
+        self._started = None
+        self._wall_time = 0.0
+
+    @classmethod
+    def from_args(cls, profile: Optional[str] = None, sample_rate: Optional[float] = None,
+                  top_n: Optional[int] = None, name: str = 'bot') -> 'BotProfiler':
+        """
+        Build a profiler from CLI options, falling back to environment variables.
+
+        Args:
+            profile: Mode given on the command line (None if --profile was not passed)
+            sample_rate: Per-item sampling rate from the command line
+            top_n: Slowest-item count from the command line
+            name: Bot name used in report filenames
+        """
+        env_mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+        mode = profile
+        if mode is None and env_mode and env_mode not in ('0', 'false', 'off', 'no'):
+            mode = env_mode if env_mode in PROFILE_MODES else 'sample'
+
+        if sample_rate is None:
+            sample_rate = _env_number(SAMPLE_RATE_ENV, 1.0)
+        if top_n is None:
+            top_n = _env_number(TOP_N_ENV, 10, int)
+        interval = _env_number(INTERVAL_ENV, 0.005)
+
+        return cls(enabled=mode is not None, mode=mode or 'sample',
+                   item_sample_rate=sample_rate, top_n=top_n,
+                   interval=interval, name=name)
+
+    def start(self):
+        """Start the run-level profiler."""
+        if not self.enabled:
+            return
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop the run-level profiler."""
+        if not self.enabled or self._started is None:
+            return
+        self._wall_time += time.perf_counter() - self._started
+        self._started = None
+        if self._sampler:
+            self._sampler.stop()
+
+    @contextmanager
+    def session(self, output_dir: str):
+        """
+        Profile a whole run: start now, then write and log the reports on exit.
+
+        Args:
+            output_dir: Directory the report files are written to
+        """
+        self.start()
+        try:
+            yield self
+        finally:
+            if self.enabled:
+                self.write_reports(output_dir)
+                self.log_report()
+
+    def _should_sample(self, item_name: str) -> bool:
+        if self.item_sample_rate >= 1.0:
+            return True
+        # Deterministic per item so reruns profile the same subset
+        bucket = zlib.crc32(item_name.encode('utf-8')) / 0xFFFFFFFF
+        return bucket < self.item_sample_rate
+
+    @contextmanager
+    def item(self, item_name: str):
+        """Time one item and CPU-profile it if it falls in the sample."""
+        if not self.enabled:
+            yield
+            return
+
+        sampled = self._should_sample(item_name)
+        record = {'item_name': item_name, 'profiled': sampled, 'stages': {}}
+        self._current = record
+        if sampled:
+            if self._profiler:
+                self._profiler.enable()
+            elif self._sampler:
+                self._sampler.active = True
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['total_seconds'] = time.perf_counter() - start
+            if sampled:
+                if self._profiler:
+                    self._profiler.disable()
+                elif self._sampler:
+                    self._sampler.active = False
+            self.items.append(record)
+            self._current = None
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        """Time one stage of the current item."""
+        if not self.enabled or self._current is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = self._current['stages']
+            stages[stage_name] = stages.get(stage_name, 0.0) + time.perf_counter() - start
+
+    def slowest_items(self) -> List[Dict]:
+        """Return the top N slowest items, slowest first."""
+        ranked = sorted(self.items, key=lambda r: r.get('total_seconds', 0.0), reverse=True)
+        return ranked[:self.top_n]
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Return total seconds spent in each stage across all items."""
+        totals: Dict[str, float] = {}
+        for record in self.items:
+            for stage_name, seconds in record['stages'].items():
+                totals[stage_name] = totals.get(stage_name, 0.0) + seconds
+        return totals
+
+    def collapsed_stacks(self) -> Counter:
+        """Return the captured profile as collapsed stacks."""
+        if self._profiler:
+            return collapse_pstats(pstats.Stats(self._profiler))
+        if self._sampler:
+            return self._sampler.stacks
+        return Counter()
+
+    def write_reports(self, output_dir: str) -> Dict[str, str]:
+        """
+        Write profile artefacts to output_dir.
+
+        Returns: Dictionary mapping artefact kind to file path
+        """
+        if not self.enabled:
+            return {}
+
+        self.stop()
+        os.makedirs(output_dir, exist_ok=True)
+        written = {}
+
+        collapsed_path = os.path.join(output_dir, f"{self.name}_profile.collapsed")
+        with open(collapsed_path, 'w') as f:
+            for stack, count in sorted(self.collapsed_stacks().items()):
+                f.write(f"{stack} {count}\n")
+        written['collapsed'] = collapsed_path
+
+        if self._profiler:
+            pstats_path = os.path.join(output_dir, f"{self.name}_profile.pstats")
+            self._profiler.dump_stats(pstats_path)
+            written['pstats'] = pstats_path
+
+        report_path = os.path.join(output_dir, f"{self.name}_profile_report.json")
+        with open(report_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        written['report'] = report_path
+
+        return written
+
+    def report(self) -> Dict:
+        """Return the timing report as a JSON-serialisable dictionary."""
+        return {
+            'mode': self.mode,
+            'item_sample_rate': self.item_sample_rate,
+            'wall_seconds': self._wall_time,
+            'items': len(self.items),
+            'profiled_items': sum(1 for r in self.items if r['profiled']),
+            'stage_totals': self.stage_totals(),
+            'slowest_items': self.slowest_items()
+        }
+
+    def log_report(self):
+        """Log the slowest items with their per-stage breakdown."""
+        if not self.enabled:
+            return
+
+        slowest = self.slowest_items()
+        lines = [f"Profile - top {len(slowest)} slowest items ({self.mode})"]
+        for record in slowest:
+            lines.append(f"{record['item_name']}: {record['total_seconds']*1000:.1f} ms")
+            for stage_name, seconds in record['stages'].items():
+                lines.append(f"  {stage_name:<20} {seconds*1000:8.1f} ms")
+        logger.info("\n".join(lines), extra={'profile': slowest})
+
+
+def add_profile_arguments(parser):
+    """Add the shared --profile options to a bot's argument parser."""
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES,
+                        default=None,
+                        help=f'Profile the run (default mode: sample). '
+                             f'Also enabled by the {PROFILE_ENV} environment variable')
+    parser.add_argument('--profile-sample-rate', type=float, default=None,
+                        help='Fraction of items to CPU-profile (0-1, default 1.0)')
+    parser.add_argument('--profile-top', type=int, default=None,
+                        help='Number of slowest items to report (default 10)')
@@ -17,13 +17,21 @@ from typing import List, Optional, Dict, Any
 import argparse
 from datetime import datetime
 
+from bot_logging import ProgressReporter, add_logging_arguments, configure_from_args, get_logger
+from bot_profiler import BotProfiler, add_profile_arguments
+from image_input import batch_input, find_images
+
+logger = get_logger('description_generator')
+
 
 class DescriptionGeneratorBot:
     """Automated description generation bot for auction listings."""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None,
+                 profiler: Optional[BotProfiler] = None):
         """Initialize the bot with configuration."""
         self.config = self._load_config(config_path)
+        self.profiler = profiler or BotProfiler(name='description_generator')
         self.generated_count = 0
         
     def _load_config(self, config_path: Optional[str]) -> dict:
@@ -62,7 +70,7 @@ class DescriptionGeneratorBot:
         Note: This is a placeholder for actual AI analysis.
         In production, this would use advanced AI models.
         """
-        print(f"  Analyzing item: {os.path.basename(image_path)}")
+        logger.debug("Analyzing item: %s", os.path.basename(image_path))
         
         # Placeholder: In production, implement actual AI analysis
         # For example using:
@@ -223,16 +231,18 @@ class DescriptionGeneratorBot:
             return "No description available."
         
         # Analyze item
-        item_info = self.analyze_item(image_path, metadata)
+        with self.profiler.stage('analyze'):
+            item_info = self.analyze_item(image_path, metadata)
         
         # Generate description sections
         sections = self.config.get('sections', ['overview'])
         description_parts = []
         
-        for section_name in sections:
-            section_text = self.generate_section(section_name, item_info)
-            if section_text:
-                description_parts.append(section_text)
+        with self.profiler.stage('compose'):
+            for section_name in sections:
+                section_text = self.generate_section(section_name, item_info)
+                if section_text:
+                    description_parts.append(section_text)
         
         # Combine sections
         description = "\n".join(description_parts)
@@ -256,55 +266,56 @@ class DescriptionGeneratorBot:
         Generate descriptions for all images in a directory.
         
         Args:
-            input_dir: Directory containing images
+            input_dir: Directory (or ZIP/TAR archive) containing images
             output_dir: Directory to save generated descriptions
             
         Returns: Dictionary with generation statistics
         """
-        print(f"\n{'='*60}")
-        print(f"DESCRIPTION GENERATOR BOT - BATCH PROCESSING")
-        print(f"{'='*60}")
-        print(f"Input directory: {input_dir}")
-        print(f"Output directory: {output_dir}")
-        print(f"{'='*60}\n")
+        logger.info("DESCRIPTION GENERATOR BOT - BATCH PROCESSING")
+        logger.info("Input directory: %s", input_dir)
+        logger.info("Output directory: %s", output_dir)
         
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
         
-        # Supported image extensions
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        
-        # Find all images
-        input_path = Path(input_dir)
-        image_files = [f for f in input_path.iterdir() 
-                      if f.is_file() and f.suffix.lower() in image_extensions]
+        # Find all images (archive members are read in place)
+        with batch_input(input_dir):
+            image_files = find_images(input_dir)
         
         if not image_files:
-            print("No image files found in input directory.")
+            logger.warning("No image files found in input directory.")
             return {'generated': 0, 'total': 0}
         
-        print(f"Found {len(image_files)} images to process\n")
+        logger.info("Found %d images to process", len(image_files))
         
         # Generate descriptions
+        self.profiler.start()
+        progress = ProgressReporter(logger, len(image_files), 'images')
         for image_file in image_files:
-            print(f"\nProcessing: {image_file.name}")
-            description = self.generate_description(str(image_file))
+            logger.debug("Processing: %s", image_file.name)
+            with self.profiler.item(image_file.stem):
+                description = self.generate_description(str(image_file))
+                
+                # Save description
+                output_file = Path(output_dir) / f"{image_file.stem}_description.txt"
+                with self.profiler.stage('write'):
+                    with open(output_file, 'w') as f:
+                        f.write(description)
             
-            # Save description
-            output_file = Path(output_dir) / f"{image_file.stem}_description.txt"
-            with open(output_file, 'w') as f:
-                f.write(description)
-            
-            print(f"  ✓ Description saved to: {output_file.name}")
-            print(f"  Length: {len(description)} characters")
+            logger.debug("Description saved to: %s (%d characters)", output_file.name,
+                         len(description), extra={'item': image_file.stem,
+                                                  'characters': len(description)})
+            progress.update()
+        progress.finish()
+        
+        if self.profiler.enabled:
+            self.profiler.write_reports(output_dir)
+            self.profiler.log_report()
         
-        # Print summary
-        print(f"\n{'='*60}")
-        print(f"DESCRIPTION GENERATION COMPLETE")
-        print(f"{'='*60}")
-        print(f"Generated: {self.generated_count}")
-        print(f"Results saved to: {output_dir}")
-        print(f"{'='*60}\n")
+        # Log summary
+        logger.info("DESCRIPTION GENERATION COMPLETE", extra={'generated': self.generated_count})
+        logger.info("Generated: %d", self.generated_count)
+        logger.info("Results saved to: %s", output_dir)
         
         return {
             'generated': self.generated_count,
@@ -317,17 +328,22 @@ def main():
     parser = argparse.ArgumentParser(
         description='Description Generator Bot - Automatically generate auction listing descriptions'
     )
-    parser.add_argument('input', help='Input image file or directory')
+    parser.add_argument('input', help='Input image file, directory or ZIP/TAR archive')
     parser.add_argument('output', help='Output file or directory for descriptions')
     parser.add_argument('--config', help='Path to config file', default=None)
     parser.add_argument('--batch', action='store_true', 
                        help='Process entire directory (batch mode)')
     parser.add_argument('--metadata', help='Path to metadata JSON file', default=None)
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
     
     args = parser.parse_args()
+    configure_from_args(args)
     
     # Initialize bot
-    bot = DescriptionGeneratorBot(config_path=args.config)
+    profiler = BotProfiler.from_args(args.profile, args.profile_sample_rate,
+                                     args.profile_top, name='description_generator')
+    bot = DescriptionGeneratorBot(config_path=args.config, profiler=profiler)
     
     # Load metadata if provided
     metadata = None
@@ -340,7 +356,9 @@ def main():
         bot.generate_batch(args.input, args.output)
     else:
         # Single image mode
-        description = bot.generate_description(args.input, metadata)
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        with profiler.session(output_dir), profiler.item(Path(args.input).stem):
+            description = bot.generate_description(args.input, metadata)
         print(f"\nGenerated Description:\n{description}")
         
         # Save to file
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Frame Store - Shares decoded image frames between processes without copying.
+
+This module can:
+- Publish a frame once into a multiprocessing.shared_memory segment
+- Map it by a small, picklable handle in any other process, zero-copy
+- Reference-count frames across processes and unlink them at zero
+- Reclaim references held by workers that crashed
+
+Each segment starts with a holder table of (pid, count) pairs followed by
+the pixel data. Updates to the table are serialised with a lock file, so
+any process on the host can take part without inheriting a lock. A process
+only ever releases references it took itself (create or acquire).
+"""
+
+import os
+import re
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+MAX_HOLDERS = 16
+_SLOT = struct.Struct('<qq')
+HEADER_BYTES = 256  # MAX_HOLDERS * _SLOT.size, also keeps pixel data 64-byte aligned
+
+_SHM_DIR = '/dev/shm'
+
+# Whether the store can be used at all (it needs NumPy)
+AVAILABLE = np is not None
+
+
+class FrameHandle(NamedTuple):
+    """Picklable reference to a frame in the store."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # The store manages segment lifetimes itself; without this the resource
+    # tracker unlinks segments when the creating (or, before Python 3.13,
+    # any attaching) process exits, even while other processes use them
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class FrameStore:
+    """Reference-counted shared-memory frames, usable from many processes."""
+
+    def __init__(self, namespace: str = 'rooster_frames', lock_dir: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            namespace: Prefix for segment names; processes using the same
+                namespace share frames, locks and crash cleanup
+            lock_dir: Directory for the lock file (defaults to the temp dir)
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for the frame store")
+        self.namespace = namespace
+        # Segment names are <namespace>_<pid>_<counter>; matching the whole
+        # name keeps namespace 'a' away from namespace 'a_b'
+        self._name_pattern = re.compile(re.escape(namespace) + r'_\d+_\d+')
+        self.lock_path = os.path.join(lock_dir or tempfile.gettempdir(), f'{namespace}.lock')
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+        self._mapped: Dict[str, shared_memory.SharedMemory] = {}
+        self._counter = 0
+        self.stats = {
+            'published': 0,
+            'published_bytes': 0,
+            'mapped': 0,
+            'released': 0,
+            'unlinked': 0,
+            'reclaimed': 0
+        }
+
+    # -- locking -----------------------------------------------------------
+
+    def _file_lock(self):
+        # Reopen after fork so parent and child don't share one lock description
+        if self._lock_file is None or self._lock_pid != os.getpid():
+            self._lock_file = open(self.lock_path, 'a+b')
+            self._lock_pid = os.getpid()
+        return self._lock_file
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_file = self._file_lock()
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # -- holder table --------------------------------------------------------
+
+    @staticmethod
+    def _holders(buf) -> Dict[int, int]:
+        holders = {}
+        for i in range(MAX_HOLDERS):
+            pid, count = _SLOT.unpack_from(buf, i * _SLOT.size)
+            if pid and count:
+                holders[pid] = count
+        return holders
+
+    @staticmethod
+    def _write_holders(buf, holders: Dict[int, int]):
+        if len(holders) > MAX_HOLDERS:
+            raise RuntimeError(f"Frame held by more than {MAX_HOLDERS} processes")
+        slots = list(holders.items()) + [(0, 0)] * (MAX_HOLDERS - len(holders))
+        for i, (pid, count) in enumerate(slots):
+            _SLOT.pack_into(buf, i * _SLOT.size, pid, count)
+
+    # -- segments ----------------------------------------------------------
+
+    def _attach(self, name: str) -> shared_memory.SharedMemory:
+        shm = self._mapped.get(name)
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=name)
+            _untrack(shm)
+            self._mapped[name] = shm
+        return shm
+
+    def _unmap(self, name: str):
+        shm = self._mapped.pop(name, None)
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                # Arrays still view the segment; the mapping closes when they go
+                pass
+
+    def _unlink(self, name: str):
+        try:
+            shm = self._mapped.get(name) or shared_memory.SharedMemory(name=name)
+            # unlink() unregisters the segment, so hand it back to the tracker first
+            resource_tracker.register(shm._name, 'shared_memory')
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._unmap(name)
+        self.stats['unlinked'] += 1
+
+    def create(self, shape: Tuple[int, ...], dtype='uint8'):
+        """
+        Allocate a new frame, held once by this process.
+
+        Write pixels straight into the returned array to avoid any copy.
+
+        Returns: (handle, writable array)
+        """
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        with self._thread_lock:
+            self._counter += 1
+            name = f'{self.namespace}_{os.getpid()}_{self._counter}'
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_BYTES + max(nbytes, 1))
+        _untrack(shm)
+        self._write_holders(shm.buf, {os.getpid(): 1})
+        self._mapped[name] = shm
+        self.stats['published'] += 1
+        self.stats['published_bytes'] += nbytes
+        handle = FrameHandle(name, tuple(shape), dtype.str)
+        return handle, np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=HEADER_BYTES)
+
+    def publish(self, array) -> FrameHandle:
+        """Copy an array into a new frame once and return its handle."""
+        handle, frame = self.create(array.shape, array.dtype)
+        frame[...] = array
+        return handle
+
+    def map(self, handle: FrameHandle, writable: bool = False):
+        """
+        Map a frame into this process without copying.
+
+        The caller should hold a reference (acquire) for as long as it uses
+        the array, unless an upstream holder outlives the use.
+        """
+        shm = self._attach(handle.name)
+        array = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype),
+                           buffer=shm.buf, offset=HEADER_BYTES)
+        if not writable:
+            array.flags.writeable = False
+        self.stats['mapped'] += 1
+        return array
+
+    def acquire(self, handle: FrameHandle):
+        """Take a reference to a frame for this process."""
+        with self._locked():
+            shm = self._attach(handle.name)
+            holders = self._holders(shm.buf)
+            if not holders:
+                raise ValueError(f"Frame {handle.name} has already been released")
+            pid = os.getpid()
+            holders[pid] = holders.get(pid, 0) + 1
+            self._write_holders(shm.buf, holders)
+
+    def release(self, handle: FrameHandle) -> bool:
+        """
+        Drop one of this process's references to a frame.
+
+        A process passing a frame downstream keeps its own reference until
+        it is done; the receiving process acquires and releases its own.
+
+        Returns: True if this was the last reference and the frame was unlinked
+
+        Raises:
+            ValueError: If this process holds no reference to the frame
+        """
+        with self._locked():
+            try:
+                shm = self._attach(handle.name)
+            except FileNotFoundError:
+                return False
+            holders = self._holders(shm.buf)
+            pid = os.getpid()
+            if pid not in holders:
+                self._unmap(handle.name)
+                raise ValueError(f"Process {pid} holds no reference to frame {handle.name}")
+            holders[pid] -= 1
+            if holders[pid] <= 0:
+                del holders[pid]
+            self._write_holders(shm.buf, holders)
+            self.stats['released'] += 1
+            if holders:
+                self._unmap(handle.name)
+                return False
+            self._unlink(handle.name)
+            return True
+
+    def refcount(self, handle: FrameHandle) -> int:
+        """Return the total number of references to a frame (0 if gone)."""
+        with self._locked():
+            try:
+                shm = self._attach(handle.name)
+            except FileNotFoundError:
+                return 0
+            return sum(self._holders(shm.buf).values())
+
+    # -- crash cleanup -----------------------------------------------------
+
+    def segment_names(self):
+        """Return the names of this namespace's segments on the host."""
+        names = os.listdir(_SHM_DIR) if os.path.isdir(_SHM_DIR) else self._mapped
+        return sorted(n for n in names if self._name_pattern.fullmatch(n))
+
+    def _reclaim(self, should_drop) -> int:
+        freed = 0
+        with self._locked():
+            for name in self.segment_names():
+                try:
+                    shm = self._attach(name)
+                except FileNotFoundError:
+                    continue
+                holders = self._holders(shm.buf)
+                dropped = {pid for pid in holders if should_drop(pid)}
+                if not dropped:
+                    self._unmap(name)
+                    continue
+                self.stats['reclaimed'] += sum(holders[pid] for pid in dropped)
+                holders = {pid: c for pid, c in holders.items() if pid not in dropped}
+                self._write_holders(shm.buf, holders)
+                if holders:
+                    self._unmap(name)
+                else:
+                    self._unlink(name)
+                    freed += 1
+        return freed
+
+    def release_process(self, pid: int) -> int:
+        """
+        Drop every reference held by a process, e.g. a worker that crashed.
+
+        Returns: Number of frames unlinked as a result
+        """
+        return self._reclaim(lambda holder: holder == pid)
+
+    def sweep(self) -> int:
+        """
+        Drop references held by processes that no longer exist.
+
+        Returns: Number of frames unlinked as a result
+        """
+        return self._reclaim(lambda holder: not _pid_alive(holder))
+
+    def close(self):
+        """Unmap every frame mapped by this process (references are kept)."""
+        for name in list(self._mapped):
+            self._unmap(name)
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
@@ -7,24 +7,74 @@ This bot can:
 - Crop images with smart padding
 - Optimize image quality for web
 - Batch process multiple images
+- Report the peak RSS of a batch (with NumPy and Pillow)
 """
 
 import json
 import os
 import sys
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import argparse
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Pillow 9.1 moved the filters into Image.Resampling
+RESAMPLE = getattr(getattr(Image, 'Resampling', Image), 'LANCZOS', None) if Image else None
+
+# Longest side of the thumbnail object detection looks at
+DETECTION_SIDE = 512
+
+from bot_logging import ProgressReporter, add_logging_arguments, configure_from_args, get_logger
+from bot_profiler import BotProfiler, add_profile_arguments
+from frame_store import FrameHandle, FrameStore
+from image_input import batch_input, find_images, image_exists, open_image, probe_item, probe_items
+from image_probe import ProbeResult, screen
+
+logger = get_logger('image_cropper')
+
+
+def rss_high_water_mb() -> Optional[float]:
+    """Return this process's peak resident set size in MB, if known."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
 
 class ImageCropperBot:
     """Automated image cropping and optimization bot."""
     
-    def __init__(self, config_path: Optional[str] = None):
-        """Initialize the bot with configuration."""
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path: Optional[str] = None,
+                 profiler: Optional[BotProfiler] = None,
+                 config: Optional[Dict] = None):
+        """
+        Initialize the bot with configuration.
+        
+        Args:
+            config_path: Config file whose image_cropper section is loaded
+            profiler: Profiler to record stages with
+            config: Already-loaded image_cropper section to use instead of
+                loading config_path
+        """
+        self.config = config if config is not None else self._load_config(config_path)
+        self.profiler = profiler or BotProfiler(name='image_cropper')
         self.processed_count = 0
         self.failed_count = 0
+        self.skipped_count = 0
         
     def _load_config(self, config_path: Optional[str]) -> dict:
         """Load configuration from file or use defaults."""
@@ -37,33 +87,105 @@ class ImageCropperBot:
         return {
             "enabled": True,
             "auto_detect_objects": True,
+            "detection_threshold": 40,
             "padding_percent": 5,
             "min_width": 800,
             "min_height": 800,
             "output_format": "jpg",
-            "quality": 95
+            "quality": 95,
+            "max_output_side": 2000
         }
     
-    def detect_object_bounds(self, image_path: str) -> Optional[Tuple[int, int, int, int]]:
+    def detect_object_bounds(self, frame) -> Optional[Tuple[int, int, int, int]]:
         """
-        Detect the bounds of the main object (coin) in the image.
+        Detect the bounds of the main object (coin) in a decoded frame.
         
-        Returns: (x, y, width, height) or None if detection fails
+        The background colour is taken as the median of the border pixels;
+        rows and columns where enough pixels differ from it by more than
+        detection_threshold (on any channel) belong to the object. Detection
+        runs on a strided thumbnail, so its bounds are exact to a few pixels.
         
-        Note: This is a placeholder for actual computer vision implementation.
-        In production, this would use OpenCV, PIL, or an AI model to detect objects.
+        Args:
+            frame: (height, width, 3) uint8 array
+            
+        Returns: (x, y, width, height), or None if no object stands out from
+        the background or it already fills the frame
+        """
+        height, width = frame.shape[:2]
+        if height < 3 or width < 3:
+            return None
+        step = max(1, max(height, width) // DETECTION_SIDE)
+        thumb = frame[::step, ::step].astype(np.int16)
+        border = np.concatenate([thumb[0], thumb[-1], thumb[:, 0], thumb[:, -1]])
+        background = np.median(border, axis=0).astype(np.int16)
+        threshold = self.config.get('detection_threshold', 40)
+        mask = (np.abs(thumb - background).max(axis=2) > threshold)
+        
+        # Ignore specks: a row or column needs 1% of its pixels to count
+        rows = np.flatnonzero(mask.sum(axis=1) >= max(1, mask.shape[1] // 100))
+        cols = np.flatnonzero(mask.sum(axis=0) >= max(1, mask.shape[0] // 100))
+        if rows.size == 0 or cols.size == 0:
+            return None
+        y0, y1 = rows[0] * step, min(height, (rows[-1] + 1) * step)
+        x0, x1 = cols[0] * step, min(width, (cols[-1] + 1) * step)
+        if (x1 - x0) * (y1 - y0) >= 0.98 * width * height:
+            return None
+        return (int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+    
+    def crop_area(self, frame, size: Optional[Tuple[int, int]] = None) -> Tuple[int, int, int, int]:
+        """
+        Return the (x, y, width, height) to keep from a decoded frame.
+        
+        The frame is only cropped when auto_detect_objects is on and an
+        object is detected; otherwise the whole frame is kept.
+        
+        Args:
+            frame: (height, width, 3) uint8 array
+            size: (width, height) of the full image when frame is a reduced
+                copy of it; the area is scaled up to that size
         """
-        print(f"  Detecting object bounds in: {os.path.basename(image_path)}")
+        height, width = frame.shape[:2]
+        full_width, full_height = size or (width, height)
+        bounds = None
+        if self.config.get('auto_detect_objects', True):
+            bounds = self.detect_object_bounds(frame)
+        if bounds is None:
+            logger.debug("No object detected, keeping the whole frame")
+            return (0, 0, full_width, full_height)
+        if (full_width, full_height) != (width, height):
+            x, y, box_width, box_height = bounds
+            x0, y0 = x * full_width // width, y * full_height // height
+            x1 = min(full_width, -(-(x + box_width) * full_width // width))
+            y1 = min(full_height, -(-(y + box_height) * full_height // height))
+            bounds = (x0, y0, x1 - x0, y1 - y0)
+        return self.calculate_crop_area(bounds, full_width, full_height)
+    
+    def image_crop_area(self, img) -> Tuple[int, int, int, int]:
+        """
+        Return crop_area for a Pillow image without copying its pixels.
         
-        # Placeholder: In production, implement actual object detection
-        # For example using:
-        # - OpenCV contour detection
-        # - YOLO/SSD object detection
-        # - Edge detection algorithms
-        # - AI vision models
+        Detection runs on a box-averaged copy of about DETECTION_SIDE pixels
+        on its longest side, so only that small copy becomes an array.
+        """
+        factor = max(1, max(img.size) // DETECTION_SIDE)
+        reduced = img.reduce(factor) if factor > 1 else img
+        return self.crop_area(np.asarray(reduced), img.size)
+    
+    def check_dimensions(self, image_path: str,
+                         probe: Optional[ProbeResult] = None) -> Optional[str]:
+        """
+        Check an image against min_width/min_height using only its header.
         
-        # Simulated detection result
-        return (100, 100, 800, 800)
+        Args:
+            image_path: Path to the image file
+            probe: Already-probed header (probed here if None)
+            
+        Returns: None if the image is large enough (or its header is not
+        recognised), otherwise the reason it is undersized
+        """
+        if probe is None:
+            probe = probe_item(image_path)
+        return screen(probe, self.config.get('min_width', 0), self.config.get('min_height', 0))
     
     def calculate_crop_area(self, bounds: Tuple[int, int, int, int], 
                           image_width: int, image_height: int) -> Tuple[int, int, int, int]:
@@ -92,102 +214,197 @@ class ImageCropperBot:
         
         return (new_x, new_y, new_width, new_height)
     
-    def crop_image(self, input_path: str, output_path: str) -> bool:
+    def crop_image(self, input_path: str, output_path: str, check_size: bool = True) -> bool:
         """
         Crop a single image.
         
         Args:
             input_path: Path to input image
             output_path: Path to save cropped image
+            check_size: Skip images below min_width/min_height (batch_process
+                screens the whole batch up front and passes False)
             
         Returns: True if successful, False otherwise
         """
         try:
-            print(f"\nProcessing: {os.path.basename(input_path)}")
+            logger.debug("Processing: %s", os.path.basename(input_path))
             
             if not self.config.get('enabled', True):
-                print("  Cropper disabled in config, skipping...")
+                logger.info("Cropper disabled in config, skipping...")
                 return False
             
             # Check if file exists
-            if not os.path.exists(input_path):
-                print(f"  Error: File not found: {input_path}")
+            if not image_exists(input_path):
+                logger.error("File not found: %s", input_path)
+                return False
+            
+            reason = self.check_dimensions(input_path) if check_size else None
+            if reason:
+                logger.info("Skipping %s: %s", os.path.basename(input_path), reason)
                 return False
             
-            # Placeholder for actual image processing
-            # In production, this would use PIL/Pillow or OpenCV:
-            # from PIL import Image
-            # img = Image.open(input_path)
-            # bounds = self.detect_object_bounds(input_path)
-            # crop_area = self.calculate_crop_area(bounds, img.width, img.height)
-            # cropped = img.crop((crop_area[0], crop_area[1], 
-            #                     crop_area[0] + crop_area[2], 
-            #                     crop_area[1] + crop_area[3]))
-            # cropped.save(output_path, quality=self.config.get('quality', 95))
+            if np is not None and Image is not None:
+                self._crop_pixels(input_path, output_path)
+            # Without NumPy and Pillow this remains a placeholder
             
-            print(f"  ✓ Cropped and saved to: {output_path}")
-            print(f"  Quality: {self.config.get('quality', 95)}%")
-            print(f"  Format: {self.config.get('output_format', 'jpg')}")
+            logger.debug("Cropped and saved to: %s (quality %s%%, format %s)", output_path,
+                         self.config.get('quality', 95), self.config.get('output_format', 'jpg'),
+                         extra={'output': output_path})
             
             self.processed_count += 1
             return True
             
         except Exception as e:
-            print(f"  ✗ Error processing {input_path}: {str(e)}")
+            logger.error("Error processing %s: %s", input_path, e)
             self.failed_count += 1
             return False
     
+    def output_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Return the output size for a crop, bounded by max_output_side."""
+        max_side = self.config.get('max_output_side')
+        if not max_side or max(width, height) <= max_side:
+            return width, height
+        scale = max_side / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    
+    def _crop_pixels(self, input_path: str, output_path: str):
+        """
+        Decode, crop, resize and save an image.
+        
+        Only the decoded image and the output are full-size buffers: the
+        object is detected on a reduced copy, and the crop box is resized
+        straight from the decoded image with a Lanczos filter (or copied
+        out when it needs no resizing). The decode, crop and save stages
+        are timed by the profiler.
+        """
+        with open_image(input_path) as stream, Image.open(stream) as img:
+            with self.profiler.stage('decode'):
+                if img.mode != 'RGB':
+                    # Drop the source pixels as soon as the RGB copy exists
+                    rgb = img.convert('RGB')
+                    img.close()
+                    img = rgb
+                img.load()
+            
+            with self.profiler.stage('crop'):
+                x, y, crop_width, crop_height = self.image_crop_area(img)
+                out_size = self.output_size(crop_width, crop_height)
+                box = (x, y, x + crop_width, y + crop_height)
+                if out_size == (crop_width, crop_height):
+                    out = img.crop(box)
+                else:
+                    out = img.resize(out_size, resample=RESAMPLE, box=box)
+            img.close()
+            
+            with self.profiler.stage('save'):
+                output_format = self.config.get('output_format', 'jpg').upper()
+                out.save(
+                    output_path,
+                    format='JPEG' if output_format in ('JPG', 'JPEG') else output_format,
+                    quality=self.config.get('quality', 95)
+                )
+    
+    def publish_frame(self, input_path: str, store: FrameStore) -> Optional[FrameHandle]:
+        """
+        Decode an image once into shared memory for downstream stages.
+        
+        Other processes map the frame by handle without copying. The frame
+        starts with one reference held by this process; whoever finishes
+        with the handle releases it.
+        
+        Returns: Handle of the decoded frame, or None when NumPy or Pillow
+        is not installed
+        """
+        if np is None or Image is None:
+            return None
+        
+        with open_image(input_path) as stream, Image.open(stream) as img:
+            if img.mode != 'RGB':
+                rgb = img.convert('RGB')
+                img.close()
+                img = rgb
+            width, height = img.size
+            handle, frame = store.create((height, width, 3))
+            try:
+                frame[...] = np.asarray(img)
+            except BaseException:
+                del frame
+                store.release(handle)
+                raise
+        return handle
+    
     def batch_process(self, input_dir: str, output_dir: str) -> dict:
         """
-        Process all images in a directory.
+        Process all images in a directory or archive.
         
         Args:
-            input_dir: Directory containing input images
+            input_dir: Directory (or ZIP/TAR archive) containing input images
             output_dir: Directory to save processed images
             
         Returns: Dictionary with processing statistics
         """
-        print(f"\n{'='*60}")
-        print(f"IMAGE CROPPER BOT - BATCH PROCESSING")
-        print(f"{'='*60}")
-        print(f"Input directory: {input_dir}")
-        print(f"Output directory: {output_dir}")
-        print(f"{'='*60}\n")
+        with batch_input(input_dir):
+            return self._run_batch(input_dir, output_dir)
+    
+    def _run_batch(self, input_dir: str, output_dir: str) -> dict:
+        """Process a batch whose archive, if any, is held by batch_process."""
+        logger.info("IMAGE CROPPER BOT - BATCH PROCESSING")
+        logger.info("Input directory: %s", input_dir)
+        logger.info("Output directory: %s", output_dir)
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
-        # Supported image extensions
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        
-        # Find all images
-        input_path = Path(input_dir)
-        image_files = [f for f in input_path.iterdir() 
-                      if f.is_file() and f.suffix.lower() in image_extensions]
+        # Find all images (archive members are read in place)
+        image_files = find_images(input_dir)
         
         if not image_files:
-            print("No image files found in input directory.")
+            logger.warning("No image files found in input directory.")
             return {'processed': 0, 'failed': 0, 'skipped': 0}
         
-        print(f"Found {len(image_files)} images to process\n")
+        logger.info("Found %d images to process", len(image_files))
+        
+        # Skip undersized images before decoding anything
+        probes = probe_items(image_files)
         
         # Process each image
-        for image_file in image_files:
+        self.profiler.start()
+        progress = ProgressReporter(logger, len(image_files), 'images')
+        for image_file, probe in zip(image_files, probes):
+            reason = self.check_dimensions(str(image_file), probe)
+            if reason:
+                logger.info("Skipping %s: %s", image_file.name, reason)
+                self.skipped_count += 1
+                progress.update(skipped=1)
+                continue
             output_file = Path(output_dir) / f"cropped_{image_file.name}"
-            self.crop_image(str(image_file), str(output_file))
+            with self.profiler.item(image_file.stem):
+                ok = self.crop_image(str(image_file), str(output_file), check_size=False)
+            progress.update(failed=0 if ok else 1)
+        progress.finish()
+        
+        if self.profiler.enabled:
+            self.profiler.write_reports(output_dir)
+            self.profiler.log_report()
+        
+        memory = {'rss_high_water_mb': rss_high_water_mb()}
         
-        # Print summary
-        print(f"\n{'='*60}")
-        print(f"PROCESSING COMPLETE")
-        print(f"{'='*60}")
-        print(f"Processed: {self.processed_count}")
-        print(f"Failed: {self.failed_count}")
-        print(f"{'='*60}\n")
+        # Log summary
+        logger.info("PROCESSING COMPLETE",
+                    extra={'processed': self.processed_count, 'failed': self.failed_count,
+                           'skipped': self.skipped_count, 'memory': memory})
+        logger.info("Processed: %d", self.processed_count)
+        logger.info("Failed: %d", self.failed_count)
+        logger.info("Skipped: %d", self.skipped_count)
+        if memory['rss_high_water_mb'] is not None:
+            logger.info("Peak RSS: %s MB", memory['rss_high_water_mb'])
         
         return {
             'processed': self.processed_count,
             'failed': self.failed_count,
-            'total': len(image_files)
+            'skipped': self.skipped_count,
+            'total': len(image_files),
+            'memory': memory
         }
 
 
@@ -196,22 +413,29 @@ def main():
     parser = argparse.ArgumentParser(
         description='Image Cropper Bot - Automatically crop and optimize images for auctions'
     )
-    parser.add_argument('input', help='Input image file or directory')
+    parser.add_argument('input', help='Input image file, directory or ZIP/TAR archive')
     parser.add_argument('output', help='Output file or directory')
     parser.add_argument('--config', help='Path to config file', default=None)
     parser.add_argument('--batch', action='store_true', 
                        help='Process entire directory (batch mode)')
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
     
     args = parser.parse_args()
+    configure_from_args(args)
     
     # Initialize bot
-    bot = ImageCropperBot(config_path=args.config)
+    profiler = BotProfiler.from_args(args.profile, args.profile_sample_rate,
+                                     args.profile_top, name='image_cropper')
+    bot = ImageCropperBot(config_path=args.config, profiler=profiler)
     
     # Process images
     if args.batch:
         bot.batch_process(args.input, args.output)
     else:
-        bot.crop_image(args.input, args.output)
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        with profiler.session(output_dir), profiler.item(Path(args.input).stem):
+            bot.crop_image(args.input, args.output)
 
 
 if __name__ == '__main__':
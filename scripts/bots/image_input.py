@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Image Input - Finds and opens batch images in directories, ZIP and TAR archives.
+
+This module can:
+- List the images in a directory, a ZIP archive or a (compressed) TAR archive
+- Filter candidates by extension and by magic bytes, the same way for all three
+- Open archive members by a pseudo path ("batch.zip!/coins/1921.jpg") without
+  extracting anything to disk
+- Probe image headers through the same opener
+
+ZIP members and uncompressed TAR members are read with random access.
+A compressed TAR (.tar.gz, .tgz, .tar.bz2, .tar.xz) is streamed: members
+are decompressed in archive order, the batch reads them in that order, and
+the last few are kept in memory for the stages that read an item more than
+once. Reading further back starts the stream again. A batch that needs
+random access can instead spool the archive, decompressing it once into a
+temporary file.
+
+A batch holds its archive's reader with batch_input(); the reader (and any
+spool) is closed when the last batch using it ends.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from bot_logging import get_logger
+from image_probe import ProbeResult, probe_stream, sniff_format
+
+logger = get_logger('image_input')
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Separates the archive path from the member name in a pseudo path
+MEMBER_SEPARATOR = '!/'
+
+# Decompressors for compressed TARs, keyed by their magic bytes
+TAR_COMPRESSION = (
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+)
+
+# Decompressed members a streamed TAR keeps for reads that come back to them
+STREAM_WINDOW = 64
+
+
+class ArchiveMember:
+    """An image inside an archive, usable wherever the pipeline takes a Path."""
+
+    __slots__ = ('archive', 'member', 'size')
+
+    def __init__(self, archive: str, member: str, size: int = 0):
+        self.archive = archive
+        self.member = member
+        self.size = size
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.member).stem
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.member).suffix
+
+    def __str__(self) -> str:
+        return f"{self.archive}{MEMBER_SEPARATOR}{self.member}"
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember({str(self)!r})"
+
+
+ImageItem = Union[Path, ArchiveMember]
+
+
+def archive_kind(path: str) -> Optional[str]:
+    """Return 'zip' or 'tar' if path names an archive file, otherwise None."""
+    lower = str(path).lower()
+    if lower.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if lower.endswith(TAR_SUFFIXES):
+        return 'tar'
+    return None
+
+
+def split_member_path(path: str) -> Optional[Tuple[str, str]]:
+    """Split an archive pseudo path into (archive, member), or None for plain paths."""
+    path = str(path)
+    if MEMBER_SEPARATOR not in path:
+        return None
+    archive, member = path.split(MEMBER_SEPARATOR, 1)
+    if archive_kind(archive) is None:
+        return None
+    return archive, member
+
+
+def _is_image_name(name: str) -> bool:
+    return PurePosixPath(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def _tar_decompressor(archive: str):
+    """Return the opener for a compressed TAR, or None if it is uncompressed."""
+    with open(archive, 'rb') as f:
+        head = f.read(6)
+    for magic, opener in TAR_COMPRESSION:
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+class _ZipReader:
+    """Random-access member reads from one ZIP archive."""
+
+    def __init__(self, archive: str):
+        self.zip = zipfile.ZipFile(archive)
+
+    def open(self, member: str) -> BinaryIO:
+        # ZipFile serialises reads of the shared file handle internally
+        return self.zip.open(member)
+
+    def close(self):
+        self.zip.close()
+
+
+class _MemberSection(io.RawIOBase):
+    """A seekable window onto one TAR member's data, with its own file handle."""
+
+    def __init__(self, path: str, offset: int, size: int):
+        self._file = open(path, 'rb', buffering=0)
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self._size - self._position)
+        if count <= 0:
+            return 0
+        self._file.seek(self._offset + self._position)
+        read = self._file.readinto(memoryview(buffer)[:count])
+        self._position += read
+        return read
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class _TarReader:
+    """Random-access member reads from one TAR archive, via a spool file if compressed."""
+
+    def __init__(self, archive: str):
+        self.archive = archive
+        self.spools = 0
+        self._path = None
+        self._spool = None
+        self._index: Optional[Dict[str, tarfile.TarInfo]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, tarfile.TarInfo]:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            opener = _tar_decompressor(self.archive)
+            path = self.archive
+            if opener is not None:
+                # One decompression pass; every later read seeks in the spool
+                fd, path = tempfile.mkstemp(prefix='rooster-tar-', suffix='.tar')
+                with os.fdopen(fd, 'wb') as spool, opener(self.archive, 'rb') as source:
+                    shutil.copyfileobj(source, spool, 1024 * 1024)
+                self._spool = path
+                self.spools += 1
+            with tarfile.open(path, mode='r:') as tar:
+                # Reading the index only walks the headers
+                index = {info.name: info for info in tar.getmembers()
+                         if info.isfile() and _is_image_name(info.name)}
+            self._path = path
+            self._index = index
+            return index
+
+    def members(self) -> List[tarfile.TarInfo]:
+        """Return the image members in archive order."""
+        return list(self._load().values())
+
+    def open(self, member: str) -> BinaryIO:
+        info = self._load().get(member)
+        if info is None:
+            raise FileNotFoundError(f"{member} not found in {self.archive}")
+        if info.issparse():
+            with tarfile.open(self._path, mode='r:') as tar:
+                return io.BytesIO(tar.extractfile(tar.getmember(member)).read())
+        return io.BufferedReader(_MemberSection(self._path, info.offset_data, info.size))
+
+    def close(self):
+        """Remove the spool file; the archive is re-read on next use."""
+        with self._lock:
+            if self._spool is not None:
+                try:
+                    os.unlink(self._spool)
+                except FileNotFoundError:
+                    pass
+            self._spool = None
+            self._path = None
+            self._index = None
+
+
+class _TarStream:
+    """Sequential member reads from a compressed TAR, in archive order."""
+
+    def __init__(self, archive: str, window: int = STREAM_WINDOW):
+        self.archive = archive
+        self.window = max(1, window)
+        self.passes = 0
+        self.probes: Dict[str, Optional[ProbeResult]] = {}
+        self._tar = None
+        self._members = iter(())
+        self._position = 0
+        self._order: Optional[Dict[str, int]] = None
+        self._images: Optional[List[Tuple[str, int]]] = None
+        self._recent: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _restart(self):
+        if self._tar is not None:
+            self._tar.close()
+        if self.passes == 2:
+            # Listing and one reading pass are expected; more means reads went back
+            logger.warning("Re-reading %s from the start for an earlier member; set "
+                           "archive_input.spool for batches that read out of order",
+                           self.archive)
+        self._tar = tarfile.open(self.archive, mode='r|*')
+        self._members = iter(self._tar)
+        self._position = 0
+        self.passes += 1
+
+    def _next_image(self) -> Optional[Tuple[tarfile.TarInfo, bytes]]:
+        """Decompress the next image member, keeping it in the recent window."""
+        for info in self._members:
+            if info.isfile() and _is_image_name(info.name):
+                data = self._tar.extractfile(info).read()
+                self._position += 1
+                self._recent[info.name] = data
+                self._recent.move_to_end(info.name)
+                while len(self._recent) > self.window:
+                    self._recent.popitem(last=False)
+                return info, data
+        return None
+
+    def images(self) -> List[Tuple[str, int]]:
+        """Return (name, size) of the image members in archive order, sniffed and probed."""
+        with self._lock:
+            if self._images is None:
+                self._restart()
+                images = []
+                order = {}
+                while True:
+                    entry = self._next_image()
+                    if entry is None:
+                        break
+                    info, data = entry
+                    order[info.name] = self._position - 1
+                    if sniff_format(data[:16]) is None:
+                        continue
+                    images.append((info.name, info.size))
+                    path = f"{self.archive}{MEMBER_SEPARATOR}{info.name}"
+                    self.probes[info.name] = probe_stream(io.BytesIO(data), path)
+                self._images = images
+                self._order = order
+            return self._images
+
+    def open(self, member: str) -> BinaryIO:
+        with self._lock:
+            data = self._recent.get(member)
+            if data is None:
+                data = self._read(member)
+            else:
+                self._recent.move_to_end(member)
+        return io.BytesIO(data)
+
+    def _read(self, member: str) -> bytes:
+        behind = self._order is not None and self._order.get(member, -1) < self._position
+        if self._tar is None or behind:
+            self._restart()
+        restarted = behind
+        while True:
+            entry = self._next_image()
+            if entry is not None:
+                if entry[0].name == member:
+                    return entry[1]
+                continue
+            if restarted:
+                raise FileNotFoundError(f"{member} not found in {self.archive}")
+            # The member may lie before where the stream was
+            self._restart()
+            restarted = True
+
+    def close(self):
+        with self._lock:
+            if self._tar is not None:
+                self._tar.close()
+            self._tar = None
+            self._members = iter(())
+            self._recent.clear()
+
+
+Reader = Union[_ZipReader, _TarReader, _TarStream]
+
+_readers: Dict[str, Reader] = {}
+_sessions: Dict[str, int] = {}
+_readers_lock = threading.Lock()
+
+
+def _new_reader(archive: str, spool: bool = False) -> Reader:
+    if archive_kind(archive) == 'zip':
+        return _ZipReader(archive)
+    if spool or _tar_decompressor(archive) is None:
+        return _TarReader(archive)
+    return _TarStream(archive)
+
+
+def _reader(archive: str) -> Reader:
+    with _readers_lock:
+        reader = _readers.get(archive)
+        if reader is None:
+            reader = _new_reader(archive)
+            _readers[archive] = reader
+        return reader
+
+
+@contextmanager
+def batch_input(input_path: str, spool: bool = False):
+    """
+    Hold an archive's reader open for one batch.
+
+    Batches over the same archive share its reader; it is closed (and its
+    spool removed) when the last of them ends. Directories need nothing.
+
+    Args:
+        input_path: The batch's input directory or archive
+        spool: Decompress a compressed TAR once into a temporary file for
+            random access, instead of streaming it in archive order. Only
+            applies if no other batch is already reading the archive.
+    """
+    archive = str(input_path)
+    if not os.path.isfile(archive) or archive_kind(archive) is None:
+        yield
+        return
+    with _readers_lock:
+        if archive not in _readers:
+            _readers[archive] = _new_reader(archive, spool)
+        _sessions[archive] = _sessions.get(archive, 0) + 1
+    try:
+        yield
+    finally:
+        with _readers_lock:
+            _sessions[archive] -= 1
+            reader = None
+            if not _sessions[archive]:
+                del _sessions[archive]
+                reader = _readers.pop(archive, None)
+        if reader is not None:
+            reader.close()
+
+
+def close_archives():
+    """Close every archive reader, including those held by batches (they reopen on demand)."""
+    with _readers_lock:
+        readers = list(_readers.values())
+        _readers.clear()
+        _sessions.clear()
+    for reader in readers:
+        reader.close()
+
+
+def _forget_readers():
+    """Give a forked child its own readers; the parent's share file offsets and locks."""
+    global _readers_lock
+    _readers_lock = threading.Lock()
+    _sessions.clear()
+    for archive, reader in list(_readers.items()):
+        if isinstance(reader, _TarReader):
+            # Each open has its own handle; the parent owns (and removes) the spool
+            reader._lock = threading.Lock()
+            reader._spool = None
+        else:
+            del _readers[archive]
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_readers)
+
+
+def open_image(path: Union[str, ImageItem]) -> BinaryIO:
+    """
+    Open an image file or archive member for binary reading.
+
+    Args:
+        path: A filesystem path or an archive pseudo path ("a.zip!/x.jpg")
+
+    Returns: A readable, seekable binary stream
+    """
+    split = split_member_path(str(path))
+    if split is None:
+        return open(path, 'rb', buffering=8192)
+    archive, member = split
+    try:
+        return _reader(archive).open(member)
+    except KeyError:
+        raise FileNotFoundError(f"{member} not found in {archive}")
+
+
+def image_exists(path: Union[str, ImageItem]) -> bool:
+    """Return True if the file or archive (for a pseudo path) exists."""
+    split = split_member_path(str(path))
+    return os.path.isfile(split[0]) if split else os.path.exists(path)
+
+
+def _zip_images(archive: str) -> List[ArchiveMember]:
+    reader = _reader(archive)
+    members = []
+    for info in reader.zip.infolist():
+        if info.is_dir() or not _is_image_name(info.filename):
+            continue
+        with reader.open(info.filename) as f:
+            if sniff_format(f.read(16)) is None:
+                continue
+        members.append(ArchiveMember(archive, info.filename, info.file_size))
+    return members
+
+
+def _tar_images(archive: str) -> List[ArchiveMember]:
+    reader = _reader(archive)
+    if isinstance(reader, _TarStream):
+        return [ArchiveMember(archive, name, size) for name, size in reader.images()]
+    members = []
+    for info in reader.members():
+        with reader.open(info.name) as f:
+            if sniff_format(f.read(16)) is None:
+                continue
+        members.append(ArchiveMember(archive, info.name, info.size))
+    return members
+
+
+def _dir_images(input_dir: str) -> List[Path]:
+    images = []
+    for f in Path(input_dir).iterdir():
+        if not f.is_file() or f.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        try:
+            with open(f, 'rb') as handle:
+                if sniff_format(handle.read(16)) is None:
+                    continue
+        except OSError:
+            continue
+        images.append(f)
+    return images
+
+
+def find_images(input_path: str) -> List[ImageItem]:
+    """
+    List the images in a directory or archive.
+
+    Candidates need an image extension and recognised magic bytes.
+
+    Args:
+        input_path: A directory, a .zip archive or a .tar[.gz|.bz2|.xz] archive
+
+    Returns: Paths for directory files, ArchiveMembers (in archive order) for archives
+    """
+    kind = archive_kind(input_path) if os.path.isfile(input_path) else None
+    if kind == 'zip':
+        return _zip_images(str(input_path))
+    if kind == 'tar':
+        return _tar_images(str(input_path))
+    return _dir_images(input_path)
+
+
+def probe_item(path: Union[str, ImageItem]) -> Optional[ProbeResult]:
+    """Probe the header of a file or archive member (None if unreadable or unknown)."""
+    split = split_member_path(str(path))
+    if split is not None:
+        # A streamed TAR probed its members while listing them
+        reader = _readers.get(split[0])
+        if isinstance(reader, _TarStream) and split[1] in reader.probes:
+            return reader.probes[split[1]]
+    try:
+        with open_image(path) as f:
+            return probe_stream(f, str(path))
+    except OSError:
+        return None
+
+
+def probe_items(paths: Iterable[Union[str, ImageItem]], workers: int = 16) -> List[Optional[ProbeResult]]:
+    """Probe many files or archive members concurrently; results are in input order."""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-probe') as pool:
+        return list(pool.map(probe_item, paths))
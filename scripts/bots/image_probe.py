@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Image Probe - Reads image dimensions and EXIF orientation from file headers.
+
+This module can:
+- Parse JPEG SOF, PNG IHDR, WebP (VP8/VP8L/VP8X), TIFF and BMP headers
+- Read EXIF orientation from JPEG APP1, PNG eXIf, WebP EXIF and TIFF IFD0
+- Probe thousands of files concurrently without decoding any pixels
+
+Only segment and chunk headers are read; large EXIF blocks or pixel data
+are skipped with seeks, so probing stays I/O-bound.
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+
+# EXIF orientations that swap width and height when displayed
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+_TIFF_TYPE_SIZES = {1: 1, 3: 2, 4: 4}
+_TIFF_WIDTH, _TIFF_HEIGHT, _TIFF_ORIENTATION = 256, 257, 274
+
+
+class ProbeResult:
+    """Dimensions and orientation read from an image header."""
+
+    __slots__ = ('path', 'format', 'width', 'height', 'orientation')
+
+    def __init__(self, path: str, fmt: str, width: int, height: int,
+                 orientation: Optional[int] = None):
+        self.path = path
+        self.format = fmt
+        self.width = width
+        self.height = height
+        self.orientation = orientation
+
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        """(width, height) after applying the EXIF orientation."""
+        if self.orientation in TRANSPOSED_ORIENTATIONS:
+            return (self.height, self.width)
+        return (self.width, self.height)
+
+    @property
+    def rotated(self) -> bool:
+        """True if the EXIF orientation is anything other than normal."""
+        return self.orientation not in (None, 1)
+
+    def to_dict(self) -> Dict:
+        """Convert the probe result to a dictionary."""
+        display_width, display_height = self.display_size
+        return {
+            'path': self.path,
+            'format': self.format,
+            'width': self.width,
+            'height': self.height,
+            'orientation': self.orientation,
+            'display_width': display_width,
+            'display_height': display_height
+        }
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated image header")
+    return data
+
+
+def _tiff_orientation_and_size(f: BinaryIO, base: int = 0) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Read width, height and orientation from the first IFD of a TIFF structure.
+
+    Args:
+        f: File positioned anywhere; offsets are relative to base
+        base: File offset of the TIFF byte-order mark
+
+    Returns: (width, height, orientation), any of which may be None
+    """
+    f.seek(base)
+    header = _read_exact(f, 8)
+    if header[:2] == b'II':
+        endian = '<'
+    elif header[:2] == b'MM':
+        endian = '>'
+    else:
+        raise ValueError("Bad TIFF byte order")
+    magic, ifd_offset = struct.unpack(endian + 'HI', header[2:8])
+    if magic != 42:
+        raise ValueError("Bad TIFF magic")
+
+    f.seek(base + ifd_offset)
+    (count,) = struct.unpack(endian + 'H', _read_exact(f, 2))
+    entries = _read_exact(f, 12 * count)
+
+    values = {}
+    for i in range(count):
+        tag, value_type, value_count = struct.unpack(endian + 'HHI', entries[i * 12:i * 12 + 8])
+        if tag not in (_TIFF_WIDTH, _TIFF_HEIGHT, _TIFF_ORIENTATION) or value_count != 1:
+            continue
+        raw = entries[i * 12 + 8:i * 12 + 12]
+        if value_type == 3:
+            values[tag] = struct.unpack(endian + 'H', raw[:2])[0]
+        elif value_type == 4:
+            values[tag] = struct.unpack(endian + 'I', raw)[0]
+        elif value_type == 1:
+            values[tag] = raw[0]
+    return values.get(_TIFF_WIDTH), values.get(_TIFF_HEIGHT), values.get(_TIFF_ORIENTATION)
+
+
+def _exif_orientation(payload: bytes) -> Optional[int]:
+    """Read the orientation from an EXIF payload (with or without the Exif\\0\\0 prefix)."""
+    if payload.startswith(b'Exif\x00\x00'):
+        payload = payload[6:]
+    try:
+        return _tiff_orientation_and_size(io.BytesIO(payload))[2]
+    except (ValueError, struct.error):
+        return None
+
+
+def _probe_jpeg(f: BinaryIO) -> Tuple[int, int, Optional[int]]:
+    f.seek(2)
+    orientation = None
+    while True:
+        byte = _read_exact(f, 1)
+        if byte != b'\xff':
+            raise ValueError("Bad JPEG marker")
+        marker = _read_exact(f, 1)[0]
+        while marker == 0xFF:
+            marker = _read_exact(f, 1)[0]
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xDA:
+            raise ValueError("JPEG scan data before frame header")
+        (length,) = struct.unpack('>H', _read_exact(f, 2))
+        if marker in _JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack('>BHH', _read_exact(f, 5))
+            return width, height, orientation
+        if marker == 0xE1 and orientation is None:
+            segment = _read_exact(f, length - 2)
+            if segment.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(segment)
+            continue
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _probe_png(f: BinaryIO) -> Tuple[int, int, Optional[int]]:
+    f.seek(8)
+    length, chunk_type = struct.unpack('>I4s', _read_exact(f, 8))
+    if chunk_type != b'IHDR':
+        raise ValueError("PNG missing IHDR")
+    width, height = struct.unpack('>II', _read_exact(f, 8))
+    f.seek(length - 8 + 4, os.SEEK_CUR)
+
+    # eXIf must precede IDAT; stop at the first image data chunk
+    orientation = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        if chunk_type == b'eXIf':
+            orientation = _exif_orientation(_read_exact(f, length))
+            break
+        f.seek(length + 4, os.SEEK_CUR)
+    return width, height, orientation
+
+
+def _probe_webp(f: BinaryIO) -> Tuple[int, int, Optional[int]]:
+    f.seek(12)
+    chunk_type, size = struct.unpack('<4sI', _read_exact(f, 8))
+    data = _read_exact(f, min(size, 30))
+    if chunk_type == b'VP8 ':
+        if data[3:6] != b'\x9d\x01\x2a':
+            raise ValueError("Bad VP8 start code")
+        width, height = struct.unpack('<HH', data[6:10])
+        return width & 0x3FFF, height & 0x3FFF, None
+    if chunk_type == b'VP8L':
+        if data[0] != 0x2F:
+            raise ValueError("Bad VP8L signature")
+        (bits,) = struct.unpack('<I', data[1:5])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, None
+    if chunk_type == b'VP8X':
+        flags = data[0]
+        width = int.from_bytes(data[4:7], 'little') + 1
+        height = int.from_bytes(data[7:10], 'little') + 1
+        orientation = None
+        if flags & 0x08:
+            offset = 20 + size + (size & 1)
+            while True:
+                f.seek(offset)
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                chunk_type, chunk_size = struct.unpack('<4sI', header)
+                if chunk_type == b'EXIF':
+                    orientation = _exif_orientation(_read_exact(f, chunk_size))
+                    break
+                offset += 8 + chunk_size + (chunk_size & 1)
+        return width, height, orientation
+    raise ValueError(f"Unknown WebP chunk {chunk_type!r}")
+
+
+def _probe_tiff(f: BinaryIO) -> Tuple[int, int, Optional[int]]:
+    width, height, orientation = _tiff_orientation_and_size(f)
+    if width is None or height is None:
+        raise ValueError("TIFF missing dimensions")
+    return width, height, orientation
+
+
+def _probe_bmp(f: BinaryIO) -> Tuple[int, int, Optional[int]]:
+    f.seek(14)
+    (header_size,) = struct.unpack('<I', _read_exact(f, 4))
+    if header_size == 12:
+        width, height = struct.unpack('<HH', _read_exact(f, 4))
+    else:
+        width, height = struct.unpack('<ii', _read_exact(f, 8))
+    # Negative height marks a top-down bitmap
+    return abs(width), abs(height), None
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Return the image format from the first 16 bytes of a file, or None."""
+    if head[:2] == b'\xff\xd8':
+        return 'jpeg'
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    if head[:2] == b'BM':
+        return 'bmp'
+    return None
+
+
+_PROBERS = {
+    'jpeg': _probe_jpeg,
+    'png': _probe_png,
+    'webp': _probe_webp,
+    'tiff': _probe_tiff,
+    'bmp': _probe_bmp
+}
+
+
+def detect_format(path: str) -> Optional[str]:
+    """Return the image format from the file's magic bytes, or None."""
+    with open(path, 'rb') as f:
+        return sniff_format(f.read(16))
+
+
+def probe_stream(f: BinaryIO, path: str = '') -> Optional[ProbeResult]:
+    """
+    Probe an open, seekable binary stream.
+
+    Returns: ProbeResult, or None if the format is unknown or the header is corrupt
+    """
+    fmt = sniff_format(f.read(16))
+    if fmt is None:
+        return None
+    try:
+        width, height, orientation = _PROBERS[fmt](f)
+    except (ValueError, struct.error):
+        return None
+    return ProbeResult(path, fmt, width, height, orientation)
+
+
+def probe_image(path: str) -> Optional[ProbeResult]:
+    """
+    Probe an image file's header.
+
+    Returns: ProbeResult, or None if the file is unreadable, of an unknown
+    format or has a corrupt header
+    """
+    try:
+        with open(path, 'rb', buffering=8192) as f:
+            return probe_stream(f, path)
+    except OSError:
+        return None
+
+
+def probe_many(paths: Iterable[str], workers: int = 16) -> List[Optional[ProbeResult]]:
+    """Probe many files concurrently; results are in input order."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-probe') as pool:
+        return list(pool.map(probe_image, paths))
+
+
+def screen(probe: Optional[ProbeResult], min_width: int, min_height: int) -> Optional[str]:
+    """
+    Check a probe result against minimum dimensions.
+
+    Returns: None if the image passes, otherwise a reason string
+    """
+    if probe is None:
+        return None
+    width, height = probe.display_size
+    if width < min_width or height < min_height:
+        return f"undersized ({width}x{height} < {min_width}x{min_height})"
+    return None
+
+
+def main():
+    """Main entry point for probing images from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Image Probe - Read image dimensions and orientation from headers'
+    )
+    parser.add_argument('paths', nargs='+', help='Image files to probe')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent probes')
+
+    args = parser.parse_args()
+
+    for path, probe in zip(args.paths, probe_many(args.paths, args.workers)):
+        print(json.dumps(probe.to_dict() if probe else {'path': path, 'format': None}))
+
+
+if __name__ == '__main__':
+    main()
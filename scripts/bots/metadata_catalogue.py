@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Metadata Catalogue - Compact, column-wise storage for item metadata files.
+
+This module can:
+- Load a metadata JSON file ({item_name: {field: value}}) into columns
+- Dictionary-encode low-cardinality fields (type, denomination, metal_content,
+  designer, ...) as small integer code arrays over one copy of each value
+- Hand out record views that behave like the original per-item dicts, so
+  code written against info.get(...) works unchanged
+- Group and count items by a field straight from the code arrays
+
+Metadata feeds repeat the same long strings on every item. As dicts, every
+record carries its own hash table and references to them; as columns, an
+encoded field costs one to four bytes per item.
+"""
+
+import argparse
+import json
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Fields with at most this share of distinct values are dictionary-encoded
+DEFAULT_MAX_DISTINCT_RATIO = 0.5
+
+_MISSING = object()
+
+
+def _code_typecode(size: int) -> str:
+    """Smallest unsigned array typecode that can index a dictionary of size entries."""
+    if size <= 0xff:
+        return 'B'
+    if size <= 0xffff:
+        return 'H'
+    return 'I'
+
+
+class _Column:
+    """One field: either codes into a value dictionary, or one value per item."""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, values: List, codes: Optional[array] = None):
+        # Encoded: values[0] is _MISSING and codes holds one entry per item.
+        # Plain: values holds one entry per item (_MISSING where absent).
+        self.values = values
+        self.codes = codes
+
+    @property
+    def encoded(self) -> bool:
+        return self.codes is not None
+
+    def value(self, row: int):
+        if self.codes is not None:
+            return self.values[self.codes[row]]
+        return self.values[row]
+
+
+class _ColumnBuilder:
+    """Assigns dictionary codes to a field's values while records are scanned."""
+
+    __slots__ = ('codes', 'lookup', 'values')
+
+    def __init__(self):
+        self.codes = array('I')
+        self.lookup: Dict[Tuple[type, Any], int] = {}
+        self.values: List = [_MISSING]
+
+    def add(self, row: int, value):
+        if len(self.codes) < row:
+            self.codes.extend([0] * (row - len(self.codes)))
+        # Keyed by type too, so 38 and 38.0 or 1 and True keep their own codes
+        key = (type(value), value)
+        try:
+            code = self.lookup.get(key)
+        except TypeError:
+            # Unhashable (list/dict) values are stored once per item
+            code = None
+            hashable = False
+        else:
+            hashable = True
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            if hashable:
+                self.lookup[key] = code
+        self.codes.append(code)
+
+    def finish(self, rows: int, max_distinct_ratio: float) -> _Column:
+        if len(self.codes) < rows:
+            self.codes.extend([0] * (rows - len(self.codes)))
+        distinct = len(self.values) - 1
+        if distinct <= max(1, max_distinct_ratio * rows):
+            return _Column(self.values, array(_code_typecode(len(self.values)), self.codes))
+        values = self.values
+        return _Column([values[code] for code in self.codes])
+
+
+class RecordView(Mapping):
+    """Read-only, dict-like view of one item's metadata in a catalogue."""
+
+    __slots__ = ('_catalogue', '_row')
+
+    def __init__(self, catalogue: 'MetadataCatalogue', row: int):
+        self._catalogue = catalogue
+        self._row = row
+
+    def __getitem__(self, field: str):
+        column = self._catalogue._columns.get(field)
+        value = _MISSING if column is None else column.value(self._row)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def get(self, field: str, default=None):
+        column = self._catalogue._columns.get(field)
+        value = _MISSING if column is None else column.value(self._row)
+        return default if value is _MISSING else value
+
+    def __contains__(self, field) -> bool:
+        return self.get(field, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._row
+        return (field for field, column in self._catalogue._columns.items()
+                if column.value(row) is not _MISSING)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as a plain dict (e.g. for json.dump)."""
+        return dict(self)
+
+    def __reduce__(self):
+        # Pickle (e.g. to worker processes) as a plain dict, not the whole catalogue
+        return (dict, (self.to_dict(),))
+
+    def __repr__(self) -> str:
+        return f"RecordView({dict(self)!r})"
+
+
+class MetadataCatalogue(Mapping):
+    """Item metadata stored column-wise, readable as {item_name: record view}."""
+
+    def __init__(self, keys: List[str], columns: Dict[str, _Column]):
+        self.item_names = keys
+        self._columns = columns
+        self._index = {key: row for row, key in enumerate(keys)}
+
+    @classmethod
+    def from_dict(cls, metadata: Dict[str, Dict],
+                  max_distinct_ratio: float = DEFAULT_MAX_DISTINCT_RATIO) -> 'MetadataCatalogue':
+        """
+        Build a catalogue from a metadata dictionary keyed by item name.
+
+        Args:
+            metadata: Item metadata as loaded from a metadata JSON file
+            max_distinct_ratio: Fields whose distinct values are at most this
+                share of the items are dictionary-encoded
+        """
+        keys = list(metadata)
+        builders: Dict[str, _ColumnBuilder] = {}
+        for row, key in enumerate(keys):
+            record = metadata[key]
+            if not isinstance(record, dict):
+                continue
+            for field, value in record.items():
+                builder = builders.get(field)
+                if builder is None:
+                    builder = builders[field] = _ColumnBuilder()
+                builder.add(row, value)
+        columns = {field: builder.finish(len(keys), max_distinct_ratio)
+                   for field, builder in builders.items()}
+        return cls(keys, columns)
+
+    @classmethod
+    def load(cls, path: str,
+             max_distinct_ratio: float = DEFAULT_MAX_DISTINCT_RATIO) -> 'MetadataCatalogue':
+        """Load a metadata JSON file into a catalogue."""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f), max_distinct_ratio)
+
+    # -- mapping interface -------------------------------------------------
+
+    def __getitem__(self, key: str) -> RecordView:
+        return RecordView(self, self._index[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.item_names)
+
+    def __len__(self) -> int:
+        return len(self.item_names)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def row(self, row: int) -> RecordView:
+        """Return the record view at a row position."""
+        return RecordView(self, row)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Return the catalogue as plain nested dicts."""
+        return {key: self.row(row).to_dict() for row, key in enumerate(self.item_names)}
+
+    # -- columnar access ---------------------------------------------------
+
+    def codes(self, field: str, keys: Optional[Iterable[str]] = None) -> Tuple[Any, List]:
+        """
+        Return a field as (codes, values): codes[i] indexes values for item i.
+
+        values[0] is None and stands for a missing value or item. Plain
+        (high-cardinality) fields are factorized on the fly.
+
+        Args:
+            field: Field name
+            keys: Item names to return codes for (defaults to every item, in order)
+        """
+        column = self._columns.get(field)
+        if column is None:
+            codes, values = array('B', bytes(len(self))), [_MISSING]
+        elif column.encoded:
+            codes, values = column.codes, column.values
+        else:
+            builder = _ColumnBuilder()
+            for row, value in enumerate(column.values):
+                if value is not _MISSING:
+                    builder.add(row, value)
+            encoded = builder.finish(len(self), 1.0)
+            codes, values = encoded.codes, encoded.values
+        if keys is not None:
+            index = self._index
+            rows = [index.get(key) for key in keys]
+            codes = array('I', (0 if row is None else codes[row] for row in rows))
+        return codes, [None] + values[1:]
+
+    def value_counts(self, field: str) -> Dict[Any, int]:
+        """Count items per value of a field (missing values are not counted)."""
+        codes, values = self.codes(field)
+        if np is not None:
+            counts = np.bincount(np.frombuffer(codes, dtype=np.dtype(codes.typecode)),
+                                 minlength=len(values)).tolist()
+        else:
+            counts = [0] * len(values)
+            for code in codes:
+                counts[code] += 1
+        # Equal values of different types (38 and 38.0) have separate codes
+        # but share one key here
+        totals: Dict[Any, int] = {}
+        for code, count in enumerate(counts):
+            if code and count:
+                totals[values[code]] = totals.get(values[code], 0) + count
+        return totals
+
+    def group_by(self, field: str, keys: Optional[Iterable[str]] = None) -> Dict[Any, List[str]]:
+        """Group item names by the value of a field (items missing it are left out)."""
+        keys = list(self.item_names if keys is None else keys)
+        codes, values = self.codes(field, keys)
+        groups: Dict[int, List[str]] = {}
+        for key, code in zip(keys, codes):
+            if code:
+                groups.setdefault(code, []).append(key)
+        grouped: Dict[Any, List[str]] = {}
+        for code, members in groups.items():
+            grouped.setdefault(values[code], []).extend(members)
+        return grouped
+
+    def stats(self) -> Dict:
+        """Return per-field cardinality and encoding, plus column storage in bytes."""
+        fields = {}
+        for field, column in self._columns.items():
+            if column.encoded:
+                fields[field] = {'encoded': True, 'distinct': len(column.values) - 1,
+                                 'code_bytes': column.codes.itemsize * len(column.codes)}
+            else:
+                fields[field] = {'encoded': False,
+                                 'distinct': len({repr(v) for v in column.values
+                                                  if v is not _MISSING})}
+        return {'items': len(self), 'fields': fields}
+
+
+def main():
+    """Main entry point for inspecting a metadata file as a catalogue."""
+    parser = argparse.ArgumentParser(
+        description='Metadata Catalogue - Inspect and group a metadata file'
+    )
+    parser.add_argument('metadata', help='Path to metadata JSON file')
+    parser.add_argument('--group-by', help='Count items per value of this field', default=None)
+
+    args = parser.parse_args()
+
+    catalogue = MetadataCatalogue.load(args.metadata)
+    if args.group_by:
+        counts = catalogue.value_counts(args.group_by)
+        for value, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"{count:>8}  {value}")
+    else:
+        print(json.dumps(catalogue.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Quality Gate - Rejects blurry and badly exposed photos before analysis.
+
+This module can:
+- Decode a downscaled copy of an image (Pillow's JPEG draft mode)
+- Area-average an already-decoded full-size frame down to the same scale
+- Measure sharpness as the variance of the Laplacian
+- Measure shadow and highlight clipping from the luminance histogram
+- Measure glare as the share of bright, colourless (specular) pixels
+- Check the metrics against thresholds from the "quality_gate" config section
+
+All metrics are vectorized NumPy operations over the whole frame. Without
+NumPy or Pillow the gate passes every image through unmeasured.
+"""
+
+import argparse
+import json
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from image_input import open_image
+
+
+DEFAULT_QUALITY_SETTINGS = {
+    'enabled': True,
+    'max_side': 512,
+    'min_sharpness': 60.0,
+    'shadow_level': 5,
+    'highlight_level': 250,
+    'max_shadow_clip': 0.25,
+    'max_highlight_clip': 0.10,
+    'glare_level': 240,
+    'glare_max_spread': 16,
+    'max_glare': 0.05
+}
+
+# ITU-R BT.601 luma weights
+_LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+class QualityRejected(Exception):
+    """Raised by the pipeline's quality stage when a photo fails the gate."""
+
+    def __init__(self, reasons: List[str], metrics: Dict):
+        super().__init__('; '.join(reasons))
+        self.reasons = reasons
+        self.metrics = metrics
+
+
+def decode_downscaled(image_path: str, max_side: int):
+    """
+    Decode an image to an RGB uint8 array no larger than max_side on either side.
+
+    JPEGs are decoded at a reduced DCT scale, so large photos are never
+    fully decoded.
+
+    Returns: (height, width, 3) array, or None if NumPy/Pillow are missing
+    or the file can't be decoded
+    """
+    if np is None or Image is None:
+        return None
+    try:
+        with Image.open(open_image(image_path)) as img:
+            img.draft('RGB', (max_side, max_side))
+            img = img.convert('RGB')
+            img.thumbnail((max_side, max_side))
+            return np.asarray(img, dtype=np.uint8)
+    except (OSError, ValueError):
+        return None
+
+
+def area_downscale(frame, max_side: int):
+    """
+    Average a (height, width[, channels]) frame over square blocks to at most max_side.
+
+    Blocks are an integer number of pixels across; the few rows and columns
+    left over at the bottom and right edges are dropped. Like the draft
+    decode, averaging removes the sensor noise a strided subsample keeps,
+    so sharpness is measured on the same scale either way.
+
+    Returns: The averaged frame as float32, or the frame itself if it is
+    already small enough
+    """
+    height, width = frame.shape[:2]
+    factor = -(-max(height, width) // max_side)
+    if factor <= 1:
+        return frame
+    rows, cols = height // factor, width // factor
+    blocks = frame[:rows * factor, :cols * factor].reshape(
+        (rows, factor, cols, factor) + frame.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+def measure(pixels, settings: Optional[Dict] = None) -> Dict[str, float]:
+    """
+    Compute quality metrics for an image.
+
+    Args:
+        pixels: (height, width, 3) RGB or (height, width) grayscale array
+        settings: Quality gate settings (levels used by the metrics)
+
+    Returns: Dictionary with sharpness, shadow_clip, highlight_clip and glare
+    """
+    merged = dict(DEFAULT_QUALITY_SETTINGS)
+    merged.update(settings or {})
+
+    pixels = np.asarray(pixels)
+    if pixels.ndim == 3:
+        rgb = pixels[..., :3].astype(np.float32)
+        luma = rgb @ np.asarray(_LUMA_WEIGHTS, dtype=np.float32)
+        spread = rgb.max(axis=2) - rgb.min(axis=2)
+    else:
+        luma = pixels.astype(np.float32)
+        spread = np.zeros_like(luma)
+
+    # 4-neighbour Laplacian over the interior, as one array expression
+    laplacian = (luma[:-2, 1:-1] + luma[2:, 1:-1] + luma[1:-1, :-2] + luma[1:-1, 2:]
+                 - 4.0 * luma[1:-1, 1:-1])
+    sharpness = float(laplacian.var()) if laplacian.size else 0.0
+
+    histogram = np.bincount(np.clip(luma, 0, 255).astype(np.uint8).ravel(), minlength=256)
+    total = max(int(histogram.sum()), 1)
+    shadow_clip = histogram[:merged['shadow_level'] + 1].sum() / total
+    highlight_clip = histogram[merged['highlight_level']:].sum() / total
+
+    specular = (luma >= merged['glare_level']) & (spread <= merged['glare_max_spread'])
+    glare = float(specular.mean()) if specular.size else 0.0
+
+    return {
+        'sharpness': round(sharpness, 2),
+        'shadow_clip': round(float(shadow_clip), 4),
+        'highlight_clip': round(float(highlight_clip), 4),
+        'glare': round(glare, 4)
+    }
+
+
+class QualityGate:
+    """Checks photos against blur, clipping and glare thresholds."""
+
+    def __init__(self, settings: Optional[Dict] = None):
+        """
+        Initialize the gate.
+
+        Args:
+            settings: The quality_gate section of the config
+        """
+        self.settings = dict(DEFAULT_QUALITY_SETTINGS)
+        self.settings.update(settings or {})
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'QualityGate':
+        """Create a gate from the full autopilot config."""
+        return cls(config.get('quality_gate', {}))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings['enabled'])
+
+    @property
+    def available(self) -> bool:
+        """True if NumPy and Pillow are installed, so images can be measured."""
+        return np is not None and Image is not None
+
+    def failures(self, metrics: Dict[str, float]) -> List[str]:
+        """Return a reason for every threshold the metrics violate."""
+        s = self.settings
+        reasons = []
+        if metrics['sharpness'] < s['min_sharpness']:
+            reasons.append(f"blurry (sharpness {metrics['sharpness']:.1f} < {s['min_sharpness']})")
+        if metrics['shadow_clip'] > s['max_shadow_clip']:
+            reasons.append(f"underexposed ({metrics['shadow_clip']:.1%} of pixels crushed)")
+        if metrics['highlight_clip'] > s['max_highlight_clip']:
+            reasons.append(f"overexposed ({metrics['highlight_clip']:.1%} of pixels blown)")
+        if metrics['glare'] > s['max_glare']:
+            reasons.append(f"glare ({metrics['glare']:.1%} of pixels specular)")
+        return reasons
+
+    def evaluate_pixels(self, pixels) -> Dict:
+        """Evaluate an already-decoded image."""
+        metrics = measure(pixels, self.settings)
+        reasons = self.failures(metrics)
+        return {'passed': not reasons, 'reasons': reasons, 'metrics': metrics}
+
+    def evaluate_frame(self, frame) -> Dict:
+        """
+        Evaluate a full-size decoded frame (e.g. mapped from a FrameStore).
+
+        The frame is area-averaged down to about max_side, so the metrics
+        match those of a downscaled decode and nothing is decoded again.
+        """
+        if not self.enabled:
+            return {'passed': True, 'reasons': [], 'skipped': 'quality gate disabled'}
+        return self.evaluate_pixels(area_downscale(frame, self.settings['max_side']))
+
+    def evaluate(self, image_path: str) -> Dict:
+        """
+        Evaluate an image file.
+
+        Returns: Dictionary with passed, reasons and metrics; images that
+        can't be measured pass with a "skipped" reason instead of metrics
+        """
+        if not self.enabled:
+            return {'passed': True, 'reasons': [], 'skipped': 'quality gate disabled'}
+        if not self.available:
+            return {'passed': True, 'reasons': [], 'skipped': 'numpy/Pillow not installed'}
+        pixels = decode_downscaled(image_path, self.settings['max_side'])
+        if pixels is None:
+            return {'passed': True, 'reasons': [], 'skipped': 'image could not be decoded'}
+        return self.evaluate_pixels(pixels)
+
+
+def main():
+    """Main entry point for checking photos from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Quality Gate - Check photos for blur, clipping and glare'
+    )
+    parser.add_argument('paths', nargs='+', help='Image files to check')
+    parser.add_argument('--config', help='Path to autopilot config file')
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    gate = QualityGate.from_config(config)
+
+    for path in args.paths:
+        print(json.dumps(dict(gate.evaluate(path), path=path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -17,13 +17,22 @@ from typing import List, Optional, Dict
 import argparse
 import re
 
+from bot_logging import ProgressReporter, add_logging_arguments, configure_from_args, get_logger
+from bot_profiler import BotProfiler, add_profile_arguments
+from image_input import batch_input, find_images
+from metadata_catalogue import MetadataCatalogue
+
+logger = get_logger('title_generator')
+
 
 class TitleGeneratorBot:
     """Automated title generation bot for auction listings."""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None,
+                 profiler: Optional[BotProfiler] = None):
         """Initialize the bot with configuration."""
         self.config = self._load_config(config_path)
+        self.profiler = profiler or BotProfiler(name='title_generator')
         self.generated_count = 0
         
     def _load_config(self, config_path: Optional[str]) -> dict:
@@ -58,7 +67,7 @@ class TitleGeneratorBot:
         Note: This is a placeholder for actual AI vision implementation.
         In production, this would use computer vision or AI models.
         """
-        print(f"  Analyzing image: {os.path.basename(image_path)}")
+        logger.debug("Analyzing image: %s", os.path.basename(image_path))
         
         # Placeholder: In production, implement actual image analysis
         # For example using:
@@ -95,7 +104,8 @@ class TitleGeneratorBot:
             return "Untitled Listing"
         
         # Analyze image to extract information
-        info = self.analyze_image(image_path)
+        with self.profiler.stage('analyze'):
+            info = self.analyze_image(image_path)
         
         # Merge with provided metadata
         if metadata:
@@ -128,51 +138,50 @@ class TitleGeneratorBot:
         Generate titles for all images in a directory.
         
         Args:
-            input_dir: Directory containing images
+            input_dir: Directory (or ZIP/TAR archive) containing images
             output_file: File to save generated titles (JSON format)
             
         Returns: Dictionary with generation statistics
         """
-        print(f"\n{'='*60}")
-        print(f"TITLE GENERATOR BOT - BATCH PROCESSING")
-        print(f"{'='*60}")
-        print(f"Input directory: {input_dir}")
-        print(f"Output file: {output_file}")
-        print(f"{'='*60}\n")
-        
-        # Supported image extensions
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+        logger.info("TITLE GENERATOR BOT - BATCH PROCESSING")
+        logger.info("Input directory: %s", input_dir)
+        logger.info("Output file: %s", output_file)
         
-        # Find all images
-        input_path = Path(input_dir)
-        image_files = [f for f in input_path.iterdir() 
-                      if f.is_file() and f.suffix.lower() in image_extensions]
+        # Find all images (archive members are read in place)
+        with batch_input(input_dir):
+            image_files = find_images(input_dir)
         
         if not image_files:
-            print("No image files found in input directory.")
+            logger.warning("No image files found in input directory.")
             return {'generated': 0, 'total': 0}
         
-        print(f"Found {len(image_files)} images to process\n")
+        logger.info("Found %d images to process", len(image_files))
         
         # Generate titles
         results = {}
+        self.profiler.start()
+        progress = ProgressReporter(logger, len(image_files), 'images')
         for image_file in image_files:
-            print(f"\nProcessing: {image_file.name}")
-            title = self.generate_title(str(image_file))
+            logger.debug("Processing: %s", image_file.name)
+            with self.profiler.item(image_file.stem):
+                title = self.generate_title(str(image_file))
             results[image_file.name] = title
-            print(f"  Generated title: {title}")
+            logger.debug("Generated title: %s", title, extra={'item': image_file.stem})
+            progress.update()
+        progress.finish()
         
         # Save results
         with open(output_file, 'w') as f:
             json.dump(results, f, indent=2)
         
-        # Print summary
-        print(f"\n{'='*60}")
-        print(f"TITLE GENERATION COMPLETE")
-        print(f"{'='*60}")
-        print(f"Generated: {self.generated_count}")
-        print(f"Results saved to: {output_file}")
-        print(f"{'='*60}\n")
+        if self.profiler.enabled:
+            self.profiler.write_reports(os.path.dirname(os.path.abspath(output_file)))
+            self.profiler.log_report()
+        
+        # Log summary
+        logger.info("TITLE GENERATION COMPLETE", extra={'generated': self.generated_count})
+        logger.info("Generated: %d", self.generated_count)
+        logger.info("Results saved to: %s", output_file)
         
         return {
             'generated': self.generated_count,
@@ -189,49 +198,53 @@ class TitleGeneratorBot:
             
         Returns: Dictionary with generation statistics
         """
-        print(f"\n{'='*60}")
-        print(f"TITLE GENERATOR BOT - FROM METADATA")
-        print(f"{'='*60}")
+        logger.info("TITLE GENERATOR BOT - FROM METADATA")
         
-        # Load metadata
-        with open(metadata_file, 'r') as f:
-            metadata_items = json.load(f)
+        # Load metadata (repeated field values are stored once)
+        metadata_items = MetadataCatalogue.load(metadata_file)
         
         results = {}
+        self.profiler.start()
+        progress = ProgressReporter(logger, len(metadata_items), 'items')
         for item_id, metadata in metadata_items.items():
             # Get image path if available
             image_path = metadata.get('image_path', '')
             
             # Generate title
-            print(f"\nGenerating title for: {item_id}")
+            logger.debug("Generating title for: %s", item_id)
             
-            # Use metadata directly without image analysis
-            templates = self.config.get('templates', [])
-            template = templates[0] if templates else "{year} {type} {denomination} {condition}"
+            with self.profiler.item(item_id):
+                # Use metadata directly without image analysis
+                templates = self.config.get('templates', [])
+                template = templates[0] if templates else "{year} {type} {denomination} {condition}"
             
-            try:
-                title = template.format(**metadata)
-            except KeyError as e:
-                # Fallback if template has missing keys
-                title = f"{metadata.get('year', '')} {metadata.get('type', '')} {metadata.get('denomination', '')}"
+                try:
+                    title = template.format(**metadata)
+                except KeyError as e:
+                    # Fallback if template has missing keys
+                    title = f"{metadata.get('year', '')} {metadata.get('type', '')} {metadata.get('denomination', '')}"
             
-            title = re.sub(r'\s+', ' ', title).strip()
+                title = re.sub(r'\s+', ' ', title).strip()
             
-            max_length = self.config.get('max_length', 80)
-            if len(title) > max_length:
-                title = title[:max_length-3] + '...'
+                max_length = self.config.get('max_length', 80)
+                if len(title) > max_length:
+                    title = title[:max_length-3] + '...'
             
             results[item_id] = title
-            print(f"  Title: {title}")
+            logger.debug("Title: %s", title, extra={'item': item_id})
             self.generated_count += 1
+            progress.update()
+        progress.finish()
         
         # Save results
         with open(output_file, 'w') as f:
             json.dump(results, f, indent=2)
         
-        print(f"\n{'='*60}")
-        print(f"Results saved to: {output_file}")
-        print(f"{'='*60}\n")
+        if self.profiler.enabled:
+            self.profiler.write_reports(os.path.dirname(os.path.abspath(output_file)))
+            self.profiler.log_report()
+        
+        logger.info("Results saved to: %s", output_file)
         
         return {
             'generated': self.generated_count,
@@ -244,18 +257,23 @@ def main():
     parser = argparse.ArgumentParser(
         description='Title Generator Bot - Automatically generate auction listing titles'
     )
-    parser.add_argument('input', help='Input image/directory or metadata file')
+    parser.add_argument('input', help='Input image, directory, ZIP/TAR archive or metadata file')
     parser.add_argument('output', help='Output file for generated titles (JSON)')
     parser.add_argument('--config', help='Path to config file', default=None)
     parser.add_argument('--batch', action='store_true', 
                        help='Process entire directory (batch mode)')
     parser.add_argument('--from-metadata', action='store_true',
                        help='Generate titles from metadata file')
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
     
     args = parser.parse_args()
+    configure_from_args(args)
     
     # Initialize bot
-    bot = TitleGeneratorBot(config_path=args.config)
+    profiler = BotProfiler.from_args(args.profile, args.profile_sample_rate,
+                                     args.profile_top, name='title_generator')
+    bot = TitleGeneratorBot(config_path=args.config, profiler=profiler)
     
     # Generate titles
     if args.from_metadata:
@@ -264,7 +282,9 @@ def main():
         bot.generate_batch(args.input, args.output)
     else:
         # Single image mode
-        title = bot.generate_title(args.input)
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        with profiler.session(output_dir), profiler.item(Path(args.input).stem):
+            title = bot.generate_title(args.input)
         print(f"\nGenerated Title: {title}")
         
         # Save to file
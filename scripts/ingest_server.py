@@ -0,0 +1,641 @@
+#!/usr/bin/env python3
+"""
+Ingest Server - HTTP front end that keeps the autopilot pipeline warm.
+
+This module can:
+- Accept photo uploads (with metadata) over HTTP and return the listing JSON
+- Stream uploads to a spool directory in chunks, never holding one in memory
+- Queue work in a bounded queue and answer 429 when it is full
+- Take batches of images already on disk (under batch_roots) in one request
+- Report queue depth, latencies and counters on /metrics (Prometheus text format)
+
+Each worker thread builds one AutopilotBot when it starts and keeps it, so
+config loading and bot construction are paid once, not once per photo as
+with the CLI. Only the standard library is used (asyncio streams).
+
+Endpoints:
+    POST /listings?name=&metadata=&wait=   body: image bytes
+    POST /batch                            body: {"items": [{"image_path", "metadata", "name"}]}
+    GET  /jobs/<id>
+    GET  /batches/<id>
+    GET  /metrics
+    GET  /healthz
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from autopilot_bot import AutopilotBot, WorkerItemHandler
+from bot_logging import add_logging_arguments, configure_from_args, get_logger
+
+logger = get_logger('ingest_server')
+
+
+DEFAULT_INGEST_SETTINGS = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'workers': 2,
+    'queue_size': 32,
+    'max_upload_mb': 100,
+    'spool_dir': None,
+    'keep_uploads': False,
+    'request_timeout_seconds': 300,
+    'max_batch_items': 1000,
+    'max_finished_jobs': 10000,
+    'batch_roots': []
+}
+
+CHUNK_SIZE = 1024 * 1024
+# Rejected uploads up to this size are read and discarded so the connection
+# can be reused; larger ones are refused by closing it
+DRAIN_LIMIT = 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+MAX_JSON_BYTES = 8 * 1024 * 1024
+
+CONTENT_TYPE_SUFFIXES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/tiff': '.tif',
+    'image/bmp': '.bmp'
+}
+
+STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+    429: 'Too Many Requests', 431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error'
+}
+
+# Item names become file names in the spool and output directories
+_SAFE_NAME_RE = re.compile(r'[^\w.-]+')
+
+
+class HTTPError(Exception):
+    """A request that is answered with an error status."""
+
+    def __init__(self, status: int, message: str, close: bool = False, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.close = close
+        self.headers = headers or {}
+
+
+class Job:
+    """One item submitted to the service."""
+
+    __slots__ = ('job_id', 'name', 'image_path', 'metadata', 'upload', 'batch_id', 'state',
+                 'result', 'submitted', 'started', 'finished', 'done')
+
+    def __init__(self, job_id: str, name: str, image_path: str, metadata: Optional[Dict],
+                 upload: bool, batch_id: Optional[str] = None):
+        self.job_id = job_id
+        self.name = name
+        self.image_path = image_path
+        self.metadata = metadata
+        self.upload = upload
+        self.batch_id = batch_id
+        self.state = 'queued'
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict:
+        data = {'job_id': self.job_id, 'name': self.name, 'state': self.state,
+                'submitted': self.submitted, 'started': self.started, 'finished': self.finished}
+        if self.batch_id:
+            data['batch_id'] = self.batch_id
+        if self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class LatencyWindow:
+    """Recent latencies for /metrics quantiles, plus running count and sum."""
+
+    def __init__(self, size: int = 1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class IngestService:
+    """Bounded job queue in front of warm AutopilotBot worker threads."""
+
+    def __init__(self, output_dir: str, settings: Optional[Dict] = None,
+                 config_path: Optional[str] = None,
+                 handler_factory: Optional[Callable] = None,
+                 config: Optional[Dict] = None):
+        """
+        Initialize the service.
+
+        Args:
+            output_dir: Directory for listing outputs (one subdirectory per job)
+            settings: The ingest_server section of the config
+            config_path: Autopilot config file the worker bots load
+            handler_factory: Builds one item handler per worker thread
+                (defaults to a WorkerItemHandler for config, or config_path)
+            config: Already-loaded autopilot config the worker bots use
+        """
+        self.settings = dict(DEFAULT_INGEST_SETTINGS)
+        self.settings.update(settings or {})
+        self.output_dir = os.path.abspath(output_dir)
+        self.spool_dir = os.path.abspath(self.settings['spool_dir'] or
+                                         os.path.join(self.output_dir, 'uploads'))
+        self.max_upload_bytes = int(self.settings['max_upload_mb'] * 1024 * 1024)
+        self.batch_roots = [os.path.realpath(root) for root in self.settings['batch_roots']]
+        self.handler_factory = handler_factory or WorkerItemHandler(config_path, config)
+        self.workers = max(1, int(self.settings['workers']))
+        self.queue_size = max(1, int(self.settings['queue_size']))
+
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self.batches: 'OrderedDict[str, List[str]]' = OrderedDict()
+        self.metrics = {
+            'requests': {}, 'jobs_submitted': 0, 'jobs_completed': 0, 'jobs_failed': 0,
+            'rejected_overload': 0, 'upload_bytes': 0, 'bot_counters': {}
+        }
+        self.queue_latency = LatencyWindow()
+        self.processing_latency = LatencyWindow()
+        self.running = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._reserved = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._consumers: List[asyncio.Task] = []
+        self._server = None
+        self.started = time.time()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def _init_worker(self):
+        self._local.handle = self.handler_factory()
+
+    def _handle(self, payload) -> Dict:
+        return self._local.handle(payload)
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None):
+        """Build the worker bots, then start listening."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ingest-worker',
+                                            initializer=self._init_worker)
+        # Start every worker thread now, so no request pays for building a bot
+        barrier = threading.Barrier(self.workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, barrier.wait)
+                               for _ in range(self.workers)))
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(
+            self._serve_connection,
+            host if host is not None else self.settings['host'],
+            port if port is not None else self.settings['port'],
+            limit=MAX_HEADER_BYTES)
+        return self._server
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stop listening, finish queued jobs and shut the workers down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._queue is not None:
+            await self._queue.join()
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    # -- jobs --------------------------------------------------------------
+
+    def free_slots(self) -> int:
+        """Return how many more jobs the queue can take (uploads in progress hold a slot)."""
+        return self.queue_size - self._queue.qsize() - self._reserved
+
+    def _reserve(self, count: int = 1):
+        if self.free_slots() < count:
+            self.metrics['rejected_overload'] += 1
+            raise HTTPError(429, 'Queue is full, retry later',
+                            headers={'Retry-After': str(self._retry_after())})
+        self._reserved += count
+
+    def _retry_after(self) -> int:
+        average = (self.processing_latency.total / self.processing_latency.count
+                   if self.processing_latency.count else 1.0)
+        return max(1, int(average * (self.queue_size - self.free_slots()) / self.workers))
+
+    def _submit(self, job: Job):
+        # Only called with a reserved slot, so the queue has room
+        self._reserved -= 1
+        self.jobs[job.job_id] = job
+        self.metrics['jobs_submitted'] += 1
+        self._queue.put_nowait(job)
+
+    def _forget_finished(self):
+        limit = self.settings['max_finished_jobs']
+        while len(self.jobs) > limit:
+            job_id, job = next(iter(self.jobs.items()))
+            if job.state in ('queued', 'running'):
+                break
+            del self.jobs[job_id]
+        # Jobs are forgotten oldest first, so once a batch's last job is gone so are the rest
+        while self.batches:
+            batch_id, job_ids = next(iter(self.batches.items()))
+            if job_ids[-1] in self.jobs:
+                break
+            del self.batches[batch_id]
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.state = 'running'
+            job.started = time.time()
+            self.queue_latency.add(job.started - job.submitted)
+            self.running += 1
+            output_dir = os.path.join(self.output_dir, job.job_id)
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+                result = await loop.run_in_executor(
+                    self._executor, self._handle, (job.image_path, output_dir, job.metadata))
+            except Exception as e:
+                result = {'item_name': job.name, 'success': False, 'error': str(e)}
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+            for key, count in result.pop('counters', {}).items():
+                counters = self.metrics['bot_counters']
+                counters[key] = counters.get(key, 0) + count
+            job.finished = time.time()
+            self.processing_latency.add(job.finished - job.started)
+            job.result = result
+            job.state = 'done' if result.get('success') else 'failed'
+            self.metrics['jobs_completed' if job.state == 'done' else 'jobs_failed'] += 1
+            if job.upload and not self.settings['keep_uploads']:
+                shutil.rmtree(os.path.dirname(job.image_path), ignore_errors=True)
+            job.done.set()
+            self._forget_finished()
+
+    # -- HTTP --------------------------------------------------------------
+
+    async def _serve_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {'error': 'Headers too large'}, close=True)
+                    break
+                endpoint = 'malformed'
+                try:
+                    method, target, headers = self._parse_head(head)
+                    path = urlsplit(target).path
+                    endpoint = path if path in ('/listings', '/batch', '/metrics', '/healthz') \
+                        else '/' + path.strip('/').split('/')[0]
+                    status, body, extra = await self._route(method, target, headers, reader)
+                    close = headers.get('connection', '').lower() == 'close'
+                except HTTPError as e:
+                    status, body, extra = e.status, {'error': str(e)}, e.headers
+                    close = e.close
+                except Exception as e:
+                    status, body, extra, close = 500, {'error': str(e)}, {}, True
+                key = f'{endpoint} {status}'
+                self.metrics['requests'][key] = self.metrics['requests'].get(key, 0) + 1
+                await self._respond(writer, status, body, close=close, headers=extra)
+                if close:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line', close=True)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body,
+                       close: bool = False, headers: Optional[Dict] = None):
+        if isinstance(body, (dict, list)):
+            payload = json.dumps(body, default=str).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            payload = body.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        lines = [f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}',
+                 f'Content-Type: {content_type}',
+                 f'Content-Length: {len(payload)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        if close:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> int:
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, 'Chunked uploads are not supported; send Content-Length',
+                            close=True)
+        try:
+            length = int(headers['content-length'])
+        except (KeyError, ValueError):
+            raise HTTPError(411, 'Content-Length required', close=True)
+        if length < 0:
+            raise HTTPError(400, 'Bad Content-Length', close=True)
+        return length
+
+    async def _read_json(self, headers: Dict[str, str], reader: asyncio.StreamReader):
+        length = self._content_length(headers)
+        if length > MAX_JSON_BYTES:
+            raise HTTPError(413, 'Request body too large', close=True)
+        try:
+            return json.loads(await reader.readexactly(length))
+        except ValueError:
+            raise HTTPError(400, 'Body is not valid JSON')
+
+    async def _route(self, method: str, target: str, headers: Dict[str, str],
+                     reader: asyncio.StreamReader):
+        parts = urlsplit(target)
+        path = parts.path.rstrip('/') or '/'
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+        if path == '/listings':
+            if method != 'POST':
+                raise HTTPError(405, 'Use POST', close=True)
+            return await self._post_listing(query, headers, reader)
+        if path == '/batch':
+            if method != 'POST':
+                raise HTTPError(405, 'Use POST', close=True)
+            return await self._post_batch(headers, reader)
+        if method != 'GET':
+            raise HTTPError(405, 'Use GET', close=True)
+        if path == '/metrics':
+            return 200, self.render_metrics(), {}
+        if path == '/healthz':
+            return 200, {'status': 'ok', 'workers': self.workers,
+                         'free_slots': self.free_slots()}, {}
+        if path.startswith('/jobs/'):
+            job = self.jobs.get(unquote(path[len('/jobs/'):]))
+            if job is None:
+                raise HTTPError(404, 'Unknown job')
+            return 200, job.to_dict(), {}
+        if path.startswith('/batches/'):
+            return 200, self.batch_status(unquote(path[len('/batches/'):])), {}
+        raise HTTPError(404, 'Not found')
+
+    def _metadata(self, query: Dict[str, str], headers: Dict[str, str]) -> Optional[Dict]:
+        raw = query.get('metadata') or headers.get('x-item-metadata')
+        if not raw:
+            return None
+        try:
+            metadata = json.loads(raw)
+        except ValueError:
+            raise HTTPError(400, 'metadata is not valid JSON', close=True)
+        if not isinstance(metadata, dict):
+            raise HTTPError(400, 'metadata must be a JSON object', close=True)
+        return metadata
+
+    async def _post_listing(self, query: Dict[str, str], headers: Dict[str, str],
+                            reader: asyncio.StreamReader):
+        # Refuse before reading the body: an overloaded server shouldn't
+        # spend its bandwidth and disk on uploads it can't take
+        length = self._content_length(headers)
+        if length > self.max_upload_bytes:
+            raise HTTPError(413, f'Upload exceeds {self.settings["max_upload_mb"]} MB', close=True)
+        metadata = self._metadata(query, headers)
+        try:
+            self._reserve()
+        except HTTPError as e:
+            if length <= DRAIN_LIMIT:
+                await reader.readexactly(length)
+            else:
+                e.close = True
+            raise
+        try:
+            job_id = uuid.uuid4().hex
+            name = _SAFE_NAME_RE.sub('_', query.get('name') or headers.get('x-item-name') or job_id)
+            name = name.strip('._') or job_id
+            suffix = CONTENT_TYPE_SUFFIXES.get(
+                headers.get('content-type', '').split(';')[0].strip().lower(), '')
+            if not suffix and Path(name).suffix.lower() in CONTENT_TYPE_SUFFIXES.values():
+                name, suffix = Path(name).stem, Path(name).suffix.lower()
+            upload_dir = os.path.join(self.spool_dir, job_id)
+            os.makedirs(upload_dir)
+            image_path = os.path.join(upload_dir, name + (suffix or '.jpg'))
+            try:
+                await self._spool(reader, length, image_path)
+            except BaseException:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+                raise
+        except BaseException:
+            self._reserved -= 1
+            raise
+        job = Job(job_id, name, image_path, metadata, upload=True)
+        self._submit(job)
+
+        if query.get('wait', '1') in ('0', 'false', 'no'):
+            return 202, job.to_dict(), {'Location': f'/jobs/{job_id}'}
+        try:
+            await asyncio.wait_for(job.done.wait(), self.settings['request_timeout_seconds'])
+        except asyncio.TimeoutError:
+            return 202, job.to_dict(), {'Location': f'/jobs/{job_id}'}
+        return 200, job.to_dict(), {}
+
+    async def _spool(self, reader: asyncio.StreamReader, length: int, path: str):
+        """Copy length body bytes to path, one chunk at a time."""
+        remaining = length
+        with open(path, 'wb') as f:
+            while remaining:
+                chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise HTTPError(400, 'Upload ended early', close=True)
+                f.write(chunk)
+                remaining -= len(chunk)
+                self.metrics['upload_bytes'] += len(chunk)
+
+    def _batch_path(self, image_path) -> str:
+        if not isinstance(image_path, str) or not image_path:
+            raise HTTPError(400, 'Each item needs an image_path')
+        if not self.batch_roots:
+            raise HTTPError(403, 'Batches are disabled; set ingest_server.batch_roots')
+        real = os.path.realpath(image_path)
+        if not any(real == root or real.startswith(root + os.sep) for root in self.batch_roots):
+            raise HTTPError(403, f'{image_path} is outside the allowed batch roots')
+        if not os.path.isfile(real):
+            raise HTTPError(400, f'{image_path} does not exist')
+        return real
+
+    async def _post_batch(self, headers: Dict[str, str], reader: asyncio.StreamReader):
+        body = await self._read_json(headers, reader)
+        items = body.get('items') if isinstance(body, dict) else None
+        if not isinstance(items, list) or not items:
+            raise HTTPError(400, 'Body needs a non-empty "items" list')
+        if len(items) > self.settings['max_batch_items']:
+            raise HTTPError(413, f'At most {self.settings["max_batch_items"]} items per batch')
+        if len(items) > self.queue_size:
+            # Taken whole, a batch larger than the queue could never be admitted
+            raise HTTPError(413, f'At most {self.queue_size} items fit the queue (queue_size); '
+                                 'split the batch')
+        jobs = []
+        batch_id = uuid.uuid4().hex
+        for item in items:
+            if not isinstance(item, dict):
+                raise HTTPError(400, 'Each item must be an object')
+            metadata = item.get('metadata')
+            if metadata is not None and not isinstance(metadata, dict):
+                raise HTTPError(400, 'metadata must be a JSON object')
+            image_path = self._batch_path(item.get('image_path'))
+            name = item.get('name') or Path(image_path).stem
+            jobs.append(Job(uuid.uuid4().hex, name, image_path, metadata, upload=False,
+                            batch_id=batch_id))
+        # A batch is taken whole or not at all
+        self._reserve(len(jobs))
+        for job in jobs:
+            self._submit(job)
+        self.batches[batch_id] = [job.job_id for job in jobs]
+        return 202, {'batch_id': batch_id, 'jobs': [job.job_id for job in jobs]}, \
+            {'Location': f'/batches/{batch_id}'}
+
+    def batch_status(self, batch_id: str) -> Dict:
+        """Return a batch's progress and the results of its finished jobs."""
+        job_ids = self.batches.get(batch_id)
+        if job_ids is None:
+            raise HTTPError(404, 'Unknown batch')
+        states: Dict[str, int] = {}
+        jobs = []
+        for job_id in job_ids:
+            job = self.jobs.get(job_id)
+            state = job.state if job is not None else 'expired'
+            states[state] = states.get(state, 0) + 1
+            jobs.append(job.to_dict() if job is not None else {'job_id': job_id, 'state': state})
+        complete = not states.get('queued') and not states.get('running')
+        return {'batch_id': batch_id, 'complete': complete, 'states': states, 'jobs': jobs}
+
+    # -- metrics -----------------------------------------------------------
+
+    def render_metrics(self) -> str:
+        """Return the service metrics in the Prometheus text format."""
+        m = self.metrics
+        lines = [
+            '# TYPE rooster_ingest_queue_depth gauge',
+            f'rooster_ingest_queue_depth {self._queue.qsize()}',
+            '# TYPE rooster_ingest_queue_capacity gauge',
+            f'rooster_ingest_queue_capacity {self.queue_size}',
+            '# TYPE rooster_ingest_uploads_in_progress gauge',
+            f'rooster_ingest_uploads_in_progress {self._reserved}',
+            '# TYPE rooster_ingest_jobs_running gauge',
+            f'rooster_ingest_jobs_running {self.running}',
+            '# TYPE rooster_ingest_workers gauge',
+            f'rooster_ingest_workers {self.workers}',
+            '# TYPE rooster_ingest_jobs_total counter',
+            f'rooster_ingest_jobs_total{{state="submitted"}} {m["jobs_submitted"]}',
+            f'rooster_ingest_jobs_total{{state="done"}} {m["jobs_completed"]}',
+            f'rooster_ingest_jobs_total{{state="failed"}} {m["jobs_failed"]}',
+            '# TYPE rooster_ingest_rejected_total counter',
+            f'rooster_ingest_rejected_total{{reason="overload"}} {m["rejected_overload"]}',
+            '# TYPE rooster_ingest_upload_bytes_total counter',
+            f'rooster_ingest_upload_bytes_total {m["upload_bytes"]}',
+            '# TYPE rooster_ingest_requests_total counter',
+        ]
+        for key, count in sorted(m['requests'].items()):
+            endpoint, status = key.rsplit(' ', 1)
+            lines.append(f'rooster_ingest_requests_total{{endpoint="{endpoint}",'
+                         f'status="{status}"}} {count}')
+        for name, window in (('queue_wait', self.queue_latency),
+                             ('processing', self.processing_latency)):
+            metric = f'rooster_ingest_{name}_seconds'
+            lines.append(f'# TYPE {metric} summary')
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'{metric}{{quantile="{q}"}} {window.quantile(q):.6f}')
+            lines.append(f'{metric}_sum {window.total:.6f}')
+            lines.append(f'{metric}_count {window.count}')
+        lines.append('# TYPE rooster_ingest_bot_items_total counter')
+        for key, count in sorted(m['bot_counters'].items()):
+            lines.append(f'rooster_ingest_bot_items_total{{counter="{key}"}} {count}')
+        lines.append('# TYPE rooster_ingest_uptime_seconds gauge')
+        lines.append(f'rooster_ingest_uptime_seconds {time.time() - self.started:.1f}')
+        return '\n'.join(lines) + '\n'
+
+
+async def serve(service: IngestService, host: Optional[str] = None, port: Optional[int] = None):
+    """Run the service until cancelled."""
+    await service.start(host, port)
+    bound_host, bound_port = service.address
+    logger.info("Ingest server listening on http://%s:%d (%d workers, queue of %d)",
+                bound_host, bound_port, service.workers, service.queue_size)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main():
+    """Main entry point for the ingest server."""
+    parser = argparse.ArgumentParser(
+        description='Ingest Server - HTTP service around a warm autopilot pipeline'
+    )
+    parser.add_argument('output', help='Output directory for listings')
+    parser.add_argument('--config', help='Path to config file', default=None)
+    parser.add_argument('--host', default=None, help='Address to bind (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=None, help='Port to bind (default 8765)')
+    parser.add_argument('--workers', type=int, default=None, help='Warm worker bots')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args()
+
+    config = AutopilotBot(config_path=args.config).config
+    configure_from_args(args, config.get('logging'))
+    settings = dict(config.get('ingest_server', {}))
+    if args.workers:
+        settings['workers'] = args.workers
+    service = IngestService(args.output, settings, config_path=args.config, config=config)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Shares batch items between several autopilot processes or hosts.
+
+This module can:
+- Keep one queue of items in a SQLite database that every worker opens
+- Hand items out under leases, so each item has at most one live owner
+- Renew leases with heartbeats while an item is being processed
+- Take back items whose worker died once their lease expires
+- Record each item's completion exactly once (late or duplicate
+  completions from a worker that lost its lease are refused)
+
+Every worker enqueues the same item list (enqueueing is idempotent) and then
+claims items until none are left. In WAL mode the database must live on a
+local filesystem, i.e. the workers are processes on one host. For workers on
+several hosts sharing a network volume, use the rollback journal
+(journal_mode 'delete'), which only needs working POSIX file locks. Lease
+times come from each worker's clock, so hosts need roughly synchronized
+clocks (well within lease_seconds).
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_JOB_QUEUE_SETTINGS = {
+    'enabled': False,
+    'path': None,
+    'journal_mode': 'wal',
+    'lease_seconds': 120.0,
+    'heartbeat_seconds': 30.0,
+    'max_attempts': 3,
+    'backoff_seconds': 5.0,
+    'busy_timeout_seconds': 30.0
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (state, available_at);
+CREATE TABLE IF NOT EXISTS completions (
+    job_id TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL,
+    lease_token INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL,
+    heartbeat_at REAL,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class Lease:
+    """An item claimed by this worker. token fences out stale owners."""
+
+    __slots__ = ('job_id', 'payload', 'token', 'attempts')
+
+    def __init__(self, job_id: str, payload: Any, token: int, attempts: int):
+        self.job_id = job_id
+        self.payload = payload
+        self.token = token
+        self.attempts = attempts
+
+    def __repr__(self) -> str:
+        return f"Lease({self.job_id!r}, token={self.token}, attempts={self.attempts})"
+
+
+class JobQueue:
+    """Lease-based work queue in a SQLite database shared by every worker."""
+
+    def __init__(self, path: str, worker_id: Optional[str] = None,
+                 lease_seconds: float = 120.0, heartbeat_seconds: Optional[float] = None,
+                 max_attempts: int = 3, backoff_seconds: float = 5.0,
+                 journal_mode: str = 'wal', busy_timeout_seconds: float = 30.0,
+                 clock=time.time):
+        """
+        Initialize the queue (the database is created on first use).
+
+        Args:
+            path: SQLite database file
+            worker_id: Unique id of this worker (defaults to host:pid:random)
+            lease_seconds: How long a claim lasts without a heartbeat
+            heartbeat_seconds: Interval of the background heartbeat
+                (defaults to a quarter of the lease)
+            max_attempts: Claims an item gets before it is marked failed;
+                expired leases count, so an item that keeps killing its
+                worker doesn't circulate forever
+            backoff_seconds: Delay before a failed item can be claimed again
+            journal_mode: 'wal' (one host) or 'delete' (hosts sharing a filesystem)
+            busy_timeout_seconds: How long to wait for another worker's write lock
+            clock: Wall-clock time source (injectable for tests)
+        """
+        if journal_mode not in ('wal', 'delete', 'truncate'):
+            raise ValueError(f"Unsupported journal mode: {journal_mode}")
+        self.path = path
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = float(lease_seconds)
+        self.heartbeat_seconds = float(heartbeat_seconds or self.lease_seconds / 4)
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_seconds = float(backoff_seconds)
+        self.journal_mode = journal_mode
+        self.busy_timeout = float(busy_timeout_seconds)
+        self.clock = clock
+        self.stats = {'claimed': 0, 'completed': 0, 'failed': 0, 'released': 0,
+                      'reclaimed': 0, 'stale_completions': 0, 'heartbeats': 0}
+        self._local = threading.local()
+        self._heartbeat_stop = None
+        self._heartbeat_thread = None
+        self._held: Dict[str, int] = {}
+        self._held_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, settings: Dict, default_path: str,
+                    worker_id: Optional[str] = None) -> 'JobQueue':
+        """Create a queue from the job_queue section of the config."""
+        merged = dict(DEFAULT_JOB_QUEUE_SETTINGS)
+        merged.update(settings or {})
+        return cls(merged['path'] or default_path,
+                   worker_id=worker_id,
+                   lease_seconds=merged['lease_seconds'],
+                   heartbeat_seconds=merged['heartbeat_seconds'],
+                   max_attempts=merged['max_attempts'],
+                   backoff_seconds=merged['backoff_seconds'],
+                   journal_mode=merged['journal_mode'],
+                   busy_timeout_seconds=merged['busy_timeout_seconds'])
+
+    # -- connections -------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (the heartbeat runs on its own thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            conn.execute("PRAGMA synchronous=NORMAL" if self.journal_mode == 'wal'
+                         else "PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    class _Transaction:
+        def __init__(self, conn: sqlite3.Connection):
+            self.conn = conn
+
+        def __enter__(self) -> sqlite3.Connection:
+            # IMMEDIATE takes the write lock up front, so two workers can't
+            # both read an item as claimable and then both claim it
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+    def _transaction(self) -> '_Transaction':
+        return self._Transaction(self._conn())
+
+    def close(self):
+        """Stop the heartbeat and close this thread's connection."""
+        self.stop_heartbeat()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __enter__(self) -> 'JobQueue':
+        self.start_heartbeat()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release_all()
+        self.close()
+        return False
+
+    # -- producing ---------------------------------------------------------
+
+    def enqueue(self, jobs: Iterable[Tuple[str, Any]]) -> int:
+        """
+        Add (job_id, payload) items. Items already in the queue, in any
+        state, are left alone, so every worker can enqueue the full list.
+
+        Returns: Number of items added
+        """
+        now = self.clock()
+        rows = [(job_id, json.dumps(payload), now) for job_id, payload in jobs]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (job_id, payload, created_at) "
+                             "VALUES (?, ?, ?)", rows)
+            return conn.total_changes - before
+
+    # -- consuming ---------------------------------------------------------
+
+    def claim(self, limit: int = 1) -> List[Lease]:
+        """
+        Lease up to limit claimable items: pending ones that are due, and
+        leased ones whose lease has expired (their worker is presumed dead).
+
+        Returns: Leases, oldest items first (empty when nothing is claimable)
+        """
+        now = self.clock()
+        leases = []
+        failed = []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT job_id, payload, state, attempts, lease_token FROM jobs "
+                "WHERE (state = 'pending' AND available_at <= ?) "
+                "   OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY available_at, created_at, job_id LIMIT ?",
+                (now, now, max(1, limit) * 2)).fetchall()
+            for job_id, payload, state, attempts, token in rows:
+                if state == 'leased':
+                    if attempts >= self.max_attempts:
+                        conn.execute("UPDATE jobs SET state = 'failed', lease_owner = NULL, "
+                                     "lease_expires = NULL, error = ? WHERE job_id = ?",
+                                     (f"Lease expired on attempt {attempts} of {self.max_attempts}",
+                                      job_id))
+                        failed.append(job_id)
+                        continue
+                if len(leases) >= limit:
+                    continue
+                if state == 'leased':
+                    self.stats['reclaimed'] += 1
+                conn.execute("UPDATE jobs SET state = 'leased', lease_owner = ?, lease_token = ?, "
+                             "lease_expires = ?, attempts = ? WHERE job_id = ?",
+                             (self.worker_id, token + 1, now + self.lease_seconds, attempts + 1,
+                              job_id))
+                leases.append(Lease(job_id, json.loads(payload), token + 1, attempts + 1))
+            if leases:
+                conn.execute("INSERT OR IGNORE INTO workers (worker_id, host, pid, started_at) "
+                             "VALUES (?, ?, ?, ?)",
+                             (self.worker_id, socket.gethostname(), os.getpid(), now))
+                conn.execute("UPDATE workers SET claimed = claimed + ?, heartbeat_at = ? "
+                             "WHERE worker_id = ?", (len(leases), now, self.worker_id))
+        self.stats['claimed'] += len(leases)
+        self.stats['failed'] += len(failed)
+        with self._held_lock:
+            for lease in leases:
+                self._held[lease.job_id] = lease.token
+        return leases
+
+    def _forget(self, lease: Lease):
+        with self._held_lock:
+            if self._held.get(lease.job_id) == lease.token:
+                del self._held[lease.job_id]
+
+    def complete(self, lease: Lease, result: Any = None) -> bool:
+        """
+        Record an item as done, if this worker still holds its lease.
+
+        The completion record is written in the same transaction that checks
+        the lease token, and completions are keyed by item, so an item is
+        recorded as done exactly once.
+
+        Returns: False if the lease was lost (expired and taken over) or the
+            item was already completed; the result is then discarded
+        """
+        now = self.clock()
+        self._forget(lease)
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'done', lease_owner = NULL, lease_expires = NULL, "
+                "error = NULL WHERE job_id = ? AND state = 'leased' AND lease_token = ?",
+                (lease.job_id, lease.token)).rowcount
+            if updated:
+                conn.execute("INSERT INTO completions (job_id, worker_id, lease_token, "
+                             "completed_at, result) VALUES (?, ?, ?, ?, ?)",
+                             (lease.job_id, self.worker_id, lease.token, now,
+                              json.dumps(result, default=str)))
+                conn.execute("UPDATE workers SET completed = completed + 1, heartbeat_at = ? "
+                             "WHERE worker_id = ?", (now, self.worker_id))
+        if updated:
+            self.stats['completed'] += 1
+        else:
+            self.stats['stale_completions'] += 1
+        return bool(updated)
+
+    def fail(self, lease: Lease, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Give an item back after an error.
+
+        It becomes claimable again after backoff_seconds, or is marked failed
+        once it has used max_attempts (or if retry is False).
+
+        Returns: The item's new state ('pending' or 'failed'), or None if the
+            lease was already lost
+        """
+        now = self.clock()
+        self._forget(lease)
+        state = 'pending' if retry and lease.attempts < self.max_attempts else 'failed'
+        delay = self.backoff_seconds * (2 ** (lease.attempts - 1))
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, "
+                "available_at = ?, error = ? WHERE job_id = ? AND state = 'leased' "
+                "AND lease_token = ?",
+                (state, now + delay, str(error), lease.job_id, lease.token)).rowcount
+        if not updated:
+            return None
+        if state == 'failed':
+            self.stats['failed'] += 1
+        return state
+
+    def release(self, lease: Lease) -> bool:
+        """Give an unstarted item back immediately, without using up an attempt."""
+        self._forget(lease)
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires = NULL WHERE job_id = ? AND state = 'leased' AND lease_token = ?",
+                (lease.job_id, lease.token)).rowcount
+        self.stats['released'] += updated
+        return bool(updated)
+
+    def release_all(self) -> int:
+        """Release every lease this worker still holds (e.g. on shutdown)."""
+        with self._held_lock:
+            held = list(self._held.items())
+        return sum(self.release(Lease(job_id, None, token, 0)) for job_id, token in held)
+
+    # -- heartbeats --------------------------------------------------------
+
+    def heartbeat(self) -> int:
+        """
+        Extend the leases this worker holds.
+
+        Returns: Number of leases extended
+        """
+        now = self.clock()
+        with self._held_lock:
+            held = list(self._held.items())
+        extended = 0
+        with self._transaction() as conn:
+            for job_id, token in held:
+                extended += conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND state = 'leased' "
+                    "AND lease_token = ?", (now + self.lease_seconds, job_id, token)).rowcount
+            conn.execute("UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?",
+                         (now, self.worker_id))
+        self.stats['heartbeats'] += 1
+        return extended
+
+    def start_heartbeat(self):
+        """Renew this worker's leases every heartbeat_seconds on a background thread."""
+        if self._heartbeat_thread is not None:
+            return
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    self.heartbeat()
+                except sqlite3.Error:
+                    # A busy database delays one beat; the lease has slack for it
+                    pass
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None:
+                conn.close()
+
+        self._heartbeat_stop = stop
+        self._heartbeat_thread = threading.Thread(target=beat, name='job-queue-heartbeat',
+                                                  daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop_heartbeat(self):
+        """Stop the background heartbeat."""
+        if self._heartbeat_thread is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+    # -- reporting ---------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of items in each state."""
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for state, count in self._conn().execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def remaining(self) -> int:
+        """Return the number of items not yet done or failed."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def next_available(self) -> Optional[float]:
+        """Return when the next pending or leased item becomes claimable, or None."""
+        row = self._conn().execute(
+            "SELECT MIN(CASE state WHEN 'pending' THEN available_at ELSE lease_expires END) "
+            "FROM jobs WHERE state IN ('pending', 'leased')").fetchone()
+        return row[0]
+
+    def completions(self) -> Dict[str, Dict]:
+        """Return {job_id: completion record} for every completed item."""
+        return {job_id: {'worker_id': worker_id, 'lease_token': token, 'completed_at': completed_at,
+                         'result': json.loads(result) if result is not None else None}
+                for job_id, worker_id, token, completed_at, result in self._conn().execute(
+                    "SELECT job_id, worker_id, lease_token, completed_at, result FROM completions")}
+
+    def failures(self) -> Dict[str, str]:
+        """Return {job_id: last error} for items marked failed."""
+        return dict(self._conn().execute(
+            "SELECT job_id, error FROM jobs WHERE state = 'failed'"))
+
+    def retry_failed(self) -> int:
+        """Make failed items claimable again with a fresh set of attempts."""
+        with self._transaction() as conn:
+            return conn.execute("UPDATE jobs SET state = 'pending', attempts = 0, available_at = 0 "
+                                "WHERE state = 'failed'").rowcount
+
+    def workers(self) -> List[Dict]:
+        """Return every worker that has claimed items, with its last heartbeat."""
+        columns = ('worker_id', 'host', 'pid', 'started_at', 'heartbeat_at', 'claimed', 'completed')
+        return [dict(zip(columns, row)) for row in self._conn().execute(
+            f"SELECT {', '.join(columns)} FROM workers ORDER BY started_at")]
+
+    def summary(self) -> Dict:
+        """Return queue-wide item counts plus this worker's counters."""
+        return {'path': self.path, 'worker_id': self.worker_id, 'items': self.counts(),
+                'worker': dict(self.stats)}
+
+
+def main():
+    """Main entry point for inspecting a job queue."""
+    parser = argparse.ArgumentParser(
+        description='Job Queue - Inspect a shared batch job queue'
+    )
+    parser.add_argument('queue', help='Path to the queue database')
+    parser.add_argument('command', nargs='?', default='stats',
+                        choices=['stats', 'workers', 'failures', 'retry-failed'])
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.queue):
+        print(f"Error: {args.queue} does not exist")
+        return
+    queue = JobQueue(args.queue, worker_id=f"inspect:{os.getpid()}")
+    if args.command == 'stats':
+        print(json.dumps(queue.counts(), indent=2))
+    elif args.command == 'workers':
+        now = time.time()
+        for worker in queue.workers():
+            print(f"{worker['worker_id']:<40} claimed {worker['claimed']:>6}  "
+                  f"completed {worker['completed']:>6}  "
+                  f"last seen {now - worker['heartbeat_at']:.0f}s ago")
+    elif args.command == 'failures':
+        for job_id, error in queue.failures().items():
+            print(f"{job_id}: {error}")
+    else:
+        print(f"Requeued {queue.retry_failed()} failed items")
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+Listing Index - Searchable inverted index over generated listings.
+
+This module can:
+- Index listing titles, descriptions and structured fields (year,
+  denomination, mint_mark, condition) as the autopilot produces them
+- Answer word, prefix ("morg*") and field-filtered ("mint_mark:S") queries
+- Find listings whose titles are duplicates of each other
+- Persist the index on disk as immutable segments with incremental merges
+
+Each flush writes a new segment: a sorted term dictionary, flat postings
+arrays of listing ids and the stored listings. Once merge_factor segments of
+the same size tier accumulate they are merged into one, so a growing index
+keeps a logarithmic number of segments. Replacing a listing tombstones its
+old id; merges drop tombstoned ids for good. A manifest, replaced
+atomically, names the live segments.
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import re
+import struct
+import tempfile
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_INDEX_SETTINGS = {
+    'enabled': False,
+    'path': None,
+    'fields': ['year', 'denomination', 'mint_mark', 'condition'],
+    'merge_factor': 10,
+    'flush_docs': 50000
+}
+
+MANIFEST = 'manifest.json'
+SEGMENT_SUFFIXES = ('.post', '.json', '.docs')
+
+# Structured field terms, title fingerprints and listing keys share the
+# term dictionary with words; the marker characters never occur in tokens,
+# so they sort apart from words and can't match word prefixes
+FIELD_MARK = '\x01'
+TITLE_MARK = '\x02'
+KEY_MARK = '\x03'
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_HEADER = struct.Struct('<QQQ')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return _TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Return the form of a title used for duplicate detection."""
+    return ' '.join(tokenize(title))
+
+
+def field_term(field: str, value) -> str:
+    """Return the term indexing a structured field value."""
+    return f"{FIELD_MARK}{field}:{' '.join(tokenize(value))}"
+
+
+def title_term(title: Optional[str]) -> str:
+    """Return the term fingerprinting a normalized title."""
+    return TITLE_MARK + normalize_title(title)
+
+
+def key_term(key: str) -> str:
+    """Return the term indexing a listing key, used to find the listing it replaces."""
+    return KEY_MARK + key
+
+
+def _id_array(values=()):
+    """Return listing ids as a uint32 array (NumPy if available)."""
+    if np is not None:
+        return np.asarray(values, dtype=np.uint32)
+    return array('I', values)
+
+
+def _intersect(small, large):
+    """Ids present in both sorted arrays; cost is O(len(small) * log(len(large)))."""
+    if not len(small) or not len(large):
+        return _id_array()
+    if np is not None:
+        idx = np.minimum(np.searchsorted(large, small), len(large) - 1)
+        return small[large[idx] == small]
+    found = []
+    for doc_id in small:
+        i = bisect.bisect_left(large, doc_id)
+        if i < len(large) and large[i] == doc_id:
+            found.append(doc_id)
+    return _id_array(found)
+
+
+def _union(parts: List):
+    """Sorted, distinct ids present in any of the arrays."""
+    parts = [p for p in parts if len(p)]
+    if len(parts) <= 1:
+        return parts[0] if parts else _id_array()
+    if np is not None:
+        # Scatter into a bitmap over the id span instead of sorting
+        ids = np.concatenate(parts)
+        lo = int(ids.min())
+        seen = np.zeros(int(ids.max()) - lo + 1, dtype=bool)
+        seen[ids - lo] = True
+        return (np.flatnonzero(seen) + lo).astype(np.uint32)
+    return _id_array(sorted(set().union(*parts)))
+
+
+def _without(ids, deleted: set):
+    """Drop tombstoned ids from a sorted array."""
+    if not deleted or not len(ids):
+        return ids
+    if np is not None:
+        return ids[~np.isin(ids, np.fromiter(deleted, dtype=np.uint32, count=len(deleted)))]
+    return _id_array(doc_id for doc_id in ids if doc_id not in deleted)
+
+
+class Segment:
+    """An immutable run of listings: term dictionary, postings and stored fields."""
+
+    __slots__ = ('name', 'terms', 'offsets', 'postings', 'ids', '_docs', '_directory')
+
+    def __init__(self, name: str, terms: List[str], offsets, postings, ids,
+                 docs: Optional[List[Dict]] = None, directory: Optional[str] = None):
+        self.name = name
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.ids = ids
+        self._docs = docs
+        self._directory = directory
+
+    @property
+    def docs(self) -> List[Dict]:
+        """Stored listings in id order (loaded from disk on first use)."""
+        if self._docs is None:
+            with open(os.path.join(self._directory, f'{self.name}.docs'), 'r') as f:
+                self._docs = json.load(f)
+        return self._docs
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, name: str, entries: Iterable[Tuple[Dict, Iterable[str]]]) -> 'Segment':
+        """
+        Build a segment in memory.
+
+        Args:
+            name: Segment name (also its file stem)
+            entries: (stored listing, terms) pairs in ascending listing id order
+        """
+        docs = []
+        inverted: Dict[str, List[int]] = {}
+        for doc, terms in entries:
+            docs.append(doc)
+            for term in terms:
+                inverted.setdefault(term, []).append(doc['id'])
+        return cls._from_inverted(name, inverted, docs)
+
+    @classmethod
+    def _from_inverted(cls, name: str, inverted: Dict[str, List[int]], docs: List[Dict]) -> 'Segment':
+        terms = sorted(inverted)
+        offsets = array('Q', [0])
+        postings = array('I')
+        for term in terms:
+            postings.extend(inverted[term])
+            offsets.append(len(postings))
+        ids = array('I', (doc['id'] for doc in docs))
+        if np is not None:
+            postings = np.frombuffer(postings, dtype=np.uint32)
+            ids = np.frombuffer(ids, dtype=np.uint32)
+        return cls(name, terms, offsets, postings, ids, docs)
+
+    @classmethod
+    def merge(cls, name: str, segments: List['Segment'], deleted: set) -> 'Segment':
+        """Merge consecutive segments into one, dropping tombstoned listings."""
+        inverted: Dict[str, List] = {}
+        docs = []
+        for segment in segments:
+            docs.extend(doc for doc in segment.docs if doc['id'] not in deleted)
+            for i, term in enumerate(segment.terms):
+                inverted.setdefault(term, []).append(
+                    segment.postings[segment.offsets[i]:segment.offsets[i + 1]])
+        merged = {}
+        for term, parts in inverted.items():
+            # Segments hold ascending, disjoint id ranges, so concatenation stays sorted
+            ids = _without(np.concatenate(parts) if np is not None else
+                           _id_array(i for part in parts for i in part), deleted)
+            if len(ids):
+                merged[term] = ids.tolist()
+        return cls._from_inverted(name, merged, docs)
+
+    # -- persistence -------------------------------------------------------
+
+    def write(self, directory: str):
+        """Write the segment's .post (binary arrays), .json (terms) and .docs (listings) files."""
+        with open(os.path.join(directory, f'{self.name}.post'), 'wb') as f:
+            f.write(_HEADER.pack(len(self.terms), len(self.postings), len(self.ids)))
+            f.write(self.offsets.tobytes())
+            f.write(bytes(self.postings))
+            f.write(bytes(self.ids))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(os.path.join(directory, f'{self.name}.json'), 'w') as f:
+            json.dump(self.terms, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(os.path.join(directory, f'{self.name}.docs'), 'w') as f:
+            json.dump(self.docs, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> 'Segment':
+        """Load a segment written by write()."""
+        with open(os.path.join(directory, f'{name}.post'), 'rb') as f:
+            data = f.read()
+        n_terms, n_postings, n_ids = _HEADER.unpack_from(data)
+        pos = _HEADER.size
+        offsets = array('Q')
+        offsets.frombytes(data[pos:pos + (n_terms + 1) * 8])
+        pos += (n_terms + 1) * 8
+        if np is not None:
+            postings = np.frombuffer(data, dtype=np.uint32, count=n_postings, offset=pos)
+            ids = np.frombuffer(data, dtype=np.uint32, count=n_ids, offset=pos + n_postings * 4)
+        else:
+            postings, ids = array('I'), array('I')
+            postings.frombytes(data[pos:pos + n_postings * 4])
+            ids.frombytes(data[pos + n_postings * 4:pos + (n_postings + n_ids) * 4])
+        with open(os.path.join(directory, f'{name}.json'), 'r') as f:
+            terms = json.load(f)
+        return cls(name, terms, offsets, postings, ids, directory=directory)
+
+    # -- lookups -----------------------------------------------------------
+
+    def term_postings(self, term: str):
+        """Sorted listing ids containing an exact term."""
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return self.postings[self.offsets[i]:self.offsets[i + 1]]
+        return _id_array()
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Index range of the terms starting with prefix."""
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def prefix_postings(self, prefix: str):
+        """Sorted listing ids containing any term starting with prefix."""
+        lo, hi = self.prefix_range(prefix)
+        return _union([self.postings[self.offsets[i]:self.offsets[i + 1]] for i in range(lo, hi)])
+
+    def doc(self, doc_id: int) -> Dict:
+        """Return a stored listing by id."""
+        return self.docs[int(bisect.bisect_left(self.ids, doc_id))]
+
+
+class ListingIndex:
+    """Segmented inverted index over listing titles, descriptions and fields."""
+
+    def __init__(self, path: str, fields: Optional[List[str]] = None,
+                 merge_factor: int = 10, flush_docs: int = 50000):
+        """
+        Open (or create) an index directory.
+
+        Args:
+            path: Index directory
+            fields: Structured metadata fields to index for filtering
+            merge_factor: Number of same-tier segments merged into one
+            flush_docs: Buffered listings that trigger writing a segment
+        """
+        self.path = path
+        self.fields = list(fields or DEFAULT_INDEX_SETTINGS['fields'])
+        self.merge_factor = max(2, merge_factor)
+        self.flush_docs = flush_docs
+        self.segments: List[Segment] = []
+        self._deleted: set = set()
+        # Keys written since opening; older keys are looked up by their key term
+        self._keys: Dict[str, int] = {}
+        self._next_id = 0
+        self._seq = 0
+        self._pending: List[Tuple[Dict, List[str]]] = []
+        self._pending_segment: Optional[Segment] = None
+        self.stats = {'added': 0, 'replaced': 0, 'flushes': 0, 'merges': 0}
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict, default_path: Optional[str] = None) -> 'ListingIndex':
+        """Open the index named by the listing_index section of the config."""
+        settings = dict(DEFAULT_INDEX_SETTINGS)
+        settings.update(config.get('listing_index', {}))
+        return cls(settings['path'] or default_path, fields=settings['fields'],
+                   merge_factor=settings['merge_factor'], flush_docs=settings['flush_docs'])
+
+    # -- manifest ----------------------------------------------------------
+
+    def _load(self):
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            self._next_id = manifest['next_id']
+            self._seq = manifest['seq']
+            self._deleted = set(manifest['deleted'])
+            self.segments = [Segment.load(self.path, name) for name in manifest['segments']]
+        # Remove segments written or merged away by a run that died before its manifest
+        live = {s.name for s in self.segments}
+        for entry in os.listdir(self.path):
+            stem, suffix = os.path.splitext(entry)
+            if entry.startswith('seg_') and suffix in SEGMENT_SUFFIXES and stem not in live:
+                os.unlink(os.path.join(self.path, entry))
+
+    def _write_manifest(self):
+        manifest = {
+            'next_id': self._next_id,
+            'seq': self._seq,
+            'segments': [s.name for s in self.segments],
+            'deleted': sorted(self._deleted)
+        }
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=self.path)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _segment_name(self) -> str:
+        self._seq += 1
+        return f'seg_{self._seq:06d}'
+
+    def _remove_files(self, segments: List[Segment]):
+        for segment in segments:
+            for suffix in SEGMENT_SUFFIXES:
+                try:
+                    os.unlink(os.path.join(self.path, segment.name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    # -- writing -----------------------------------------------------------
+
+    def _live_id(self, key: str) -> Optional[int]:
+        """Return the id of the live listing stored under key, if any."""
+        if key in self._keys:
+            return self._keys[key]
+        term = key_term(key)
+        for segment in reversed(self.segments):
+            for doc_id in segment.term_postings(term).tolist():
+                if doc_id not in self._deleted:
+                    return doc_id
+        return None
+
+    def add(self, key: str, title: str, description: str = '',
+            fields: Optional[Dict] = None, item_name: Optional[str] = None) -> int:
+        """
+        Add a listing, replacing any earlier listing with the same key.
+
+        Args:
+            key: Unique listing key (the autopilot uses the image path)
+            title: Listing title
+            description: Listing description text
+            fields: Structured metadata; only the configured fields are indexed
+            item_name: Item name stored with the listing
+
+        Returns: The listing's id
+        """
+        previous = self._live_id(key)
+        if previous is not None:
+            self._deleted.add(previous)
+            self.stats['replaced'] += 1
+        doc_id = self._next_id
+        self._next_id += 1
+        self._keys[key] = doc_id
+
+        stored_fields = {f: fields[f] for f in self.fields if fields and fields.get(f) is not None}
+        terms = set(tokenize(title))
+        terms.update(tokenize(description))
+        terms.update(field_term(f, v) for f, v in stored_fields.items())
+        terms.add(title_term(title))
+        terms.add(key_term(key))
+        doc = {'id': doc_id, 'key': key, 'item_name': item_name, 'title': title,
+               'fields': stored_fields}
+        self._pending.append((doc, sorted(terms)))
+        self._pending_segment = None
+        self.stats['added'] += 1
+
+        if len(self._pending) >= self.flush_docs:
+            self.flush()
+        return doc_id
+
+    def add_listing(self, listing: Dict, metadata: Optional[Dict] = None) -> Optional[int]:
+        """
+        Add an autopilot listing result (one entry of processing_summary 'listings').
+
+        The description is read from the description file the pipeline wrote.
+
+        Returns: The listing's id, or None if the listing has no title
+        """
+        outputs = listing.get('outputs') or {}
+        title = outputs.get('title')
+        if not listing.get('success') or not title:
+            return None
+        description = ''
+        description_path = outputs.get('description')
+        if description_path and os.path.exists(description_path):
+            with open(description_path, 'r') as f:
+                description = f.read()
+        return self.add(listing.get('image_path') or listing['item_name'], title, description,
+                        metadata, listing.get('item_name'))
+
+    def add_listings(self, listings: Iterable[Dict], metadata: Optional[Dict] = None) -> List[int]:
+        """
+        Add autopilot listing results and flush them as a segment.
+
+        Args:
+            listings: Listing results from the autopilot
+            metadata: Item metadata keyed by item name
+
+        Returns: Ids of the listings indexed
+        """
+        metadata = metadata or {}
+        ids = []
+        for listing in listings:
+            doc_id = self.add_listing(listing, metadata.get(listing.get('item_name')))
+            if doc_id is not None:
+                ids.append(doc_id)
+        self.flush()
+        return ids
+
+    def _tier(self, segment: Segment) -> int:
+        return int(math.log(max(len(segment), 1), self.merge_factor))
+
+    def _maybe_merge(self) -> List[Segment]:
+        """Merge trailing runs of merge_factor same-tier segments; returns the replaced ones."""
+        replaced = []
+        while len(self.segments) >= self.merge_factor:
+            run = self.segments[-self.merge_factor:]
+            if len({self._tier(s) for s in run}) != 1:
+                break
+            replaced.extend(self._merge_run(run))
+        return replaced
+
+    def _merge_run(self, run: List[Segment]) -> List[Segment]:
+        merged = Segment.merge(self._segment_name(), run, self._deleted)
+        merged.write(self.path)
+        for segment in run:
+            self._deleted.difference_update(segment.ids.tolist())
+        self.segments[-len(run):] = [merged]
+        self.stats['merges'] += 1
+        return run
+
+    def flush(self):
+        """Write buffered listings as a new segment and merge segments as needed."""
+        if not self._pending:
+            return
+        entries = [(doc, terms) for doc, terms in self._pending if doc['id'] not in self._deleted]
+        self._deleted.difference_update(doc['id'] for doc, _ in self._pending)
+        self._pending = []
+        self._pending_segment = None
+        if not entries:
+            self._write_manifest()
+            return
+        segment = Segment.build(self._segment_name(), entries)
+        segment.write(self.path)
+        self.segments.append(segment)
+        self.stats['flushes'] += 1
+        replaced = self._maybe_merge()
+        self._write_manifest()
+        self._remove_files(replaced)
+
+    def optimize(self):
+        """Flush and merge every segment into one, dropping all tombstones."""
+        self.flush()
+        if len(self.segments) > 1 or self._deleted:
+            replaced = self._merge_run(list(self.segments)) if self.segments else []
+            self._write_manifest()
+            self._remove_files(replaced)
+
+    def close(self):
+        """Flush buffered listings."""
+        self.flush()
+
+    # -- queries -----------------------------------------------------------
+
+    def _searchable(self) -> List[Segment]:
+        if self._pending and self._pending_segment is None:
+            self._pending_segment = Segment.build('pending', self._pending)
+        return self.segments + ([self._pending_segment] if self._pending else [])
+
+    def parse_query(self, query: str = '', filters: Optional[Dict] = None) -> List[Tuple[str, str]]:
+        """
+        Turn a query into (kind, term) clauses, kind being 'term' or 'prefix'.
+
+        Words must all match. A trailing '*' makes a word a prefix, and
+        'field:value' (or a filters entry) restricts a structured field;
+        field values may also end in '*'.
+        """
+        clauses = []
+
+        def field_clause(field, value):
+            value = str(value)
+            if value.endswith('*'):
+                clauses.append(('prefix', field_term(field, value[:-1])))
+            else:
+                clauses.append(('term', field_term(field, value)))
+
+        for part in (query or '').split():
+            field, sep, value = part.partition(':')
+            if sep and field in self.fields:
+                field_clause(field, value)
+                continue
+            tokens = tokenize(part)
+            if part.endswith('*') and tokens:
+                clauses.extend(('term', t) for t in tokens[:-1])
+                clauses.append(('prefix', tokens[-1]))
+            else:
+                clauses.extend(('term', t) for t in tokens)
+        for field, value in (filters or {}).items():
+            field_clause(field, value)
+        return clauses
+
+    def _segment_matches(self, segment: Segment, clauses: List[Tuple[str, str]]):
+        if not clauses:
+            return segment.ids
+        lists = []
+        for kind, term in clauses:
+            ids = segment.term_postings(term) if kind == 'term' else segment.prefix_postings(term)
+            if not len(ids):
+                return _id_array()
+            lists.append(ids)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = _intersect(result, ids)
+            if not len(result):
+                break
+        return result
+
+    def _matches(self, clauses: List[Tuple[str, str]]):
+        """Yield (segment, matching ids) newest segment first."""
+        for segment in reversed(self._searchable()):
+            ids = self._segment_matches(segment, clauses)
+            if len(ids):
+                yield segment, ids
+
+    def search(self, query: str = '', filters: Optional[Dict] = None, limit: int = 50) -> List[Dict]:
+        """
+        Find listings, newest first.
+
+        Args:
+            query: Words, 'word*' prefixes and 'field:value' filters, e.g.
+                "1921 morg* mint_mark:S"
+            filters: Extra field filters, e.g. {'denomination': 'Morgan Dollar'}
+            limit: Maximum number of listings returned
+
+        Returns: Stored listings (id, key, item_name, title, fields)
+        """
+        found = []
+        for segment, ids in self._matches(self.parse_query(query, filters)):
+            for doc_id in reversed(ids.tolist()):
+                if doc_id in self._deleted:
+                    continue
+                found.append(segment.doc(doc_id))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def count(self, query: str = '', filters: Optional[Dict] = None) -> int:
+        """Return the number of listings matching a query."""
+        return sum(len(_without(ids, self._deleted))
+                   for _, ids in self._matches(self.parse_query(query, filters)))
+
+    def duplicates(self, title: str) -> List[Dict]:
+        """Return listings whose title normalizes to the same text as title."""
+        found = []
+        for segment, ids in self._matches([('term', title_term(title))]):
+            found.extend(segment.doc(i) for i in _without(ids, self._deleted).tolist())
+        return found
+
+    def title_count(self, title: str) -> int:
+        """Return the number of listings whose title normalizes like title."""
+        return sum(len(_without(ids, self._deleted))
+                   for _, ids in self._matches([('term', title_term(title))]))
+
+    def duplicate_titles(self, min_count: int = 2) -> List[Dict]:
+        """
+        Group listings that share a normalized title.
+
+        Reads only the title fingerprint terms, not the listings.
+
+        Returns: [{'title': normalized title, 'count': n, 'ids': [...]}],
+        largest groups first
+        """
+        groups: Dict[str, List[int]] = {}
+        for segment in self._searchable():
+            lo, hi = segment.prefix_range(TITLE_MARK)
+            for i in range(lo, hi):
+                ids = _without(segment.postings[segment.offsets[i]:segment.offsets[i + 1]],
+                               self._deleted)
+                groups.setdefault(segment.terms[i], []).extend(ids.tolist())
+        return sorted(({'title': term[1:], 'count': len(ids), 'ids': ids}
+                       for term, ids in groups.items() if len(ids) >= min_count),
+                      key=lambda g: (-g['count'], g['title']))
+
+    def statistics(self) -> Dict:
+        """Return index size, segment and write statistics."""
+        stored = sum(len(s) for s in self.segments) + len(self._pending)
+        return dict(self.stats,
+                    listings=stored - len(self._deleted),
+                    segments=[len(s) for s in self.segments],
+                    pending=len(self._pending),
+                    tombstones=len(self._deleted),
+                    terms=sum(len(s.terms) for s in self.segments))
+
+
+def main():
+    """Main entry point for building and querying the listing index."""
+    parser = argparse.ArgumentParser(
+        description='Listing Index - Search generated listings'
+    )
+    parser.add_argument('index', help='Index directory')
+    parser.add_argument('--config', help='Path to autopilot config file', default=None)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='Index the listings in a processing summary')
+    add_parser.add_argument('summary', help='processing_summary.json from the autopilot')
+    add_parser.add_argument('--metadata', help='Metadata JSON used for the batch', default=None)
+
+    search_parser = subparsers.add_parser('search', help='Search listings')
+    search_parser.add_argument('query', nargs='?', default='',
+                               help='Words, prefixes (morg*) and field:value filters')
+    search_parser.add_argument('--field', action='append', default=[], metavar='NAME=VALUE',
+                               help='Filter on a structured field (repeatable)')
+    search_parser.add_argument('--limit', type=int, default=20)
+
+    dup_parser = subparsers.add_parser('duplicates', help='List duplicate titles')
+    dup_parser.add_argument('--min-count', type=int, default=2)
+
+    subparsers.add_parser('optimize', help='Merge all segments into one')
+    subparsers.add_parser('stats', help='Show index statistics')
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    settings = dict(DEFAULT_INDEX_SETTINGS)
+    settings.update(config.get('listing_index', {}))
+    index = ListingIndex(args.index, fields=settings['fields'],
+                         merge_factor=settings['merge_factor'], flush_docs=settings['flush_docs'])
+
+    if args.command == 'add':
+        with open(args.summary, 'r') as f:
+            listings = json.load(f).get('listings', [])
+        metadata = {}
+        if args.metadata:
+            with open(args.metadata, 'r') as f:
+                metadata = json.load(f)
+        ids = index.add_listings(listings, metadata)
+        print(f"Indexed {len(ids)} of {len(listings)} listings")
+    elif args.command == 'search':
+        filters = dict(f.split('=', 1) for f in args.field)
+        print(f"{index.count(args.query, filters)} matching listings")
+        for doc in index.search(args.query, filters, limit=args.limit):
+            print(f"{doc['id']:>9}  {doc['title']}  ({doc['key']})")
+    elif args.command == 'duplicates':
+        for group in index.duplicate_titles(args.min_count):
+            print(f"{group['count']:>5}  {group['title']}")
+    elif args.command == 'optimize':
+        index.optimize()
+        print(f"Merged into {len(index.segments)} segment(s)")
+    elif args.command == 'stats':
+        print(json.dumps(index.statistics(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Source Scheduler - Priority and fairness scheduling across batch sources.
+
+This module can:
+- Queue items from several consignor sources at once
+- Serve higher-priority sources first
+- Share capacity between equal-priority sources by weight (weighted fair queuing)
+- Promote items whose deadline is close, regardless of priority
+- Cap how many items from one source are in flight at a time
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BatchSource:
+    """A named input source with its scheduling parameters."""
+
+    def __init__(self, name: str, priority: int = 0, weight: float = 1.0,
+                 max_concurrency: Optional[int] = None,
+                 deadline_seconds: Optional[float] = None, **extra):
+        """
+        Initialize a source.
+
+        Args:
+            name: Unique source name (e.g. the consignor)
+            priority: Higher values are served first
+            weight: Share of capacity relative to other sources of equal priority
+            max_concurrency: Maximum items from this source in flight (None for no cap)
+            deadline_seconds: Target latency per item; items close to it are promoted
+            extra: Source-specific settings such as input_dir or metadata_file
+        """
+        if weight <= 0:
+            raise ValueError(f"Source {name!r} weight must be positive")
+        self.name = name
+        self.priority = priority
+        self.weight = float(weight)
+        self.max_concurrency = max_concurrency
+        self.deadline_seconds = deadline_seconds
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BatchSource':
+        """Create a source from a sources-file entry."""
+        return cls(**data)
+
+
+class ScheduledItem:
+    """An item handed out by the scheduler."""
+
+    __slots__ = ('source', 'payload', 'enqueued_at', 'deadline', 'dequeued_at', 'promoted')
+
+    def __init__(self, source: str, payload: Any, enqueued_at: float, deadline: Optional[float]):
+        self.source = source
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+        self.deadline = deadline
+        self.dequeued_at = None
+        self.promoted = False
+
+
+class _SourceState:
+    """Queue and accounting for one source."""
+
+    def __init__(self, source: BatchSource):
+        self.source = source
+        self.queue = deque()
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self.stats = {
+            'enqueued': 0,
+            'dequeued': 0,
+            'completed': 0,
+            'promoted': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        }
+
+    def eligible(self) -> bool:
+        cap = self.source.max_concurrency
+        return bool(self.queue) and (cap is None or self.in_flight < cap)
+
+
+class FairScheduler:
+    """Thread-safe multi-queue scheduler with weighted-fair, deadline-aware dequeuing."""
+
+    def __init__(self, sources: List[BatchSource], promotion_window: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            sources: Sources that items may be queued under
+            promotion_window: Items within this many seconds of their deadline
+                (or past it) jump ahead of priority and weight ordering
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.promotion_window = promotion_window
+        self.clock = clock
+        self._states: Dict[str, _SourceState] = {s.name: _SourceState(s) for s in sources}
+        self._virtual_clock = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def add(self, source_name: str, payload: Any):
+        """Queue an item under a source."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            state = self._states[source_name]
+            now = self.clock()
+            deadline = None
+            if state.source.deadline_seconds is not None:
+                deadline = now + state.source.deadline_seconds
+            if not state.queue and state.in_flight == 0:
+                # A source becoming active starts at the current virtual time so
+                # it can't claim credit for the time it was idle
+                state.virtual_time = max(state.virtual_time, self._virtual_clock)
+            state.queue.append(ScheduledItem(source_name, payload, now, deadline))
+            state.stats['enqueued'] += 1
+            self._cond.notify()
+
+    def close(self):
+        """Signal that no more items will be added."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _select(self, now: float) -> Optional[_SourceState]:
+        eligible = [s for s in self._states.values() if s.eligible()]
+        if not eligible:
+            return None
+
+        # Deadline-aware promotion: earliest urgent deadline wins outright
+        urgent = [s for s in eligible
+                  if s.queue[0].deadline is not None
+                  and s.queue[0].deadline - now <= self.promotion_window]
+        if urgent:
+            chosen = min(urgent, key=lambda s: s.queue[0].deadline)
+            chosen.queue[0].promoted = True
+            return chosen
+
+        # Strict priority, then lowest virtual time within the top tier
+        top = max(s.source.priority for s in eligible)
+        tier = [s for s in eligible if s.source.priority == top]
+        return min(tier, key=lambda s: (s.virtual_time, s.queue[0].enqueued_at))
+
+    def next(self, timeout: Optional[float] = None) -> Optional[ScheduledItem]:
+        """
+        Dequeue the next item to run, waiting for one if necessary.
+
+        Returns: The next item, or None when the scheduler is closed and
+        drained (or the timeout expired)
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = self.clock()
+                state = self._select(now)
+                if state is not None:
+                    break
+                if self._closed and not any(s.queue for s in self._states.values()):
+                    return None
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+            item = state.queue.popleft()
+            item.dequeued_at = now
+            state.in_flight += 1
+            state.virtual_time += 1.0 / state.source.weight
+            self._virtual_clock = min(s.virtual_time for s in self._states.values()
+                                      if s.queue or s.in_flight)
+
+            stats = state.stats
+            wait = now - item.enqueued_at
+            stats['dequeued'] += 1
+            stats['total_wait_seconds'] += wait
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], wait)
+            if item.promoted:
+                stats['promoted'] += 1
+            return item
+
+    def complete(self, item: ScheduledItem):
+        """Mark a dequeued item as finished, freeing its source's concurrency slot."""
+        with self._cond:
+            state = self._states[item.source]
+            state.in_flight -= 1
+            state.stats['completed'] += 1
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """Return the number of queued (not yet dequeued) items."""
+        with self._cond:
+            return sum(len(s.queue) for s in self._states.values())
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return per-source scheduling statistics."""
+        with self._cond:
+            report = {}
+            for name, state in self._states.items():
+                stats = dict(state.stats)
+                dequeued = stats['dequeued']
+                stats['mean_wait_seconds'] = stats['total_wait_seconds'] / dequeued if dequeued else 0.0
+                stats['priority'] = state.source.priority
+                stats['weight'] = state.source.weight
+                report[name] = stats
+            return report
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Stage Graph - Declarative per-item pipeline stages with concurrent execution.
+
+Each stage declares the values it reads (inputs) and the values it produces
+(outputs). The graph runs every stage as soon as its inputs exist, so
+independent stages such as title and description generation overlap and an
+item's latency is its critical path rather than the sum of all stages.
+"""
+
+import asyncio
+import importlib
+import inspect
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+# Stage graph used when the config has no "pipeline" section
+DEFAULT_STAGES = [
+    {'name': 'frames', 'kind': 'cpu', 'inputs': ['image_path'],
+     'outputs': ['frame'], 'publish': False},
+    {'name': 'quality', 'kind': 'cpu', 'inputs': ['image_path', 'frame'], 'outputs': ['quality']},
+    {'name': 'crop', 'kind': 'cpu', 'inputs': ['image_path', 'item_name', 'output_dir'],
+     'outputs': ['cropped_image']},
+    {'name': 'analyze', 'kind': 'analysis', 'inputs': ['image_path', 'cropped_image', 'quality', 'metadata'],
+     'outputs': ['analysis'], 'publish': False},
+    {'name': 'title', 'kind': 'analysis', 'inputs': ['analysis', 'item_name'],
+     'outputs': ['title']},
+    {'name': 'description', 'kind': 'analysis', 'inputs': ['analysis', 'item_name', 'output_dir'],
+     'outputs': ['description']}
+]
+
+# Stage kinds tell asynchronous runners how to schedule a stage:
+# cpu stages go to an executor, analysis stages are bounded remote/model
+# calls, and io stages are bounded file operations
+STAGE_KINDS = ('cpu', 'analysis', 'io')
+
+# Values available to every graph before any stage runs
+INITIAL_VALUES = ('image_path', 'item_name', 'output_dir', 'metadata')
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+class StageGraphError(ValueError):
+    """Raised when a stage graph is invalid."""
+
+
+class Stage:
+    """One node of the graph."""
+
+    def __init__(self, name: str, handler: Callable[[Dict], Dict],
+                 inputs: Iterable[str], outputs: Iterable[str], publish: bool = True,
+                 kind: str = 'analysis'):
+        """
+        Initialize a stage.
+
+        Args:
+            name: Unique stage name
+            handler: Callable taking a dict of inputs and returning a dict of outputs
+            inputs: Names of the values the stage reads
+            outputs: Names of the values the stage produces
+            publish: Whether the outputs belong in the listing result
+            kind: One of STAGE_KINDS
+        """
+        if kind not in STAGE_KINDS:
+            raise StageGraphError(f"Stage {name!r} has unknown kind {kind!r}")
+        self.name = name
+        self.handler = handler
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.publish = publish
+        self.kind = kind
+
+
+def resolve_handler(spec: str, builtins: Dict[str, Callable]) -> Callable:
+    """
+    Resolve a handler spec from config.
+
+    Args:
+        spec: A built-in stage name, or "module:function" for a custom stage
+        builtins: Built-in handlers keyed by name
+
+    Returns: The handler callable
+    """
+    if spec in builtins:
+        return builtins[spec]
+    if ':' not in spec:
+        raise StageGraphError(f"Unknown stage handler {spec!r}; "
+                              f"use a built-in ({', '.join(sorted(builtins))}) or 'module:function'")
+    module_name, function_name = spec.split(':', 1)
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+
+class StageGraph:
+    """A validated DAG of stages."""
+
+    def __init__(self, stages: List[Stage], initial: Iterable[str]):
+        """
+        Build and validate the graph.
+
+        Args:
+            stages: Stages in any order
+            initial: Names of values available before any stage runs
+
+        Raises:
+            StageGraphError: On duplicate names or outputs, missing inputs, or cycles
+        """
+        self.stages = stages
+        self.initial = set(initial)
+        self.producers: Dict[str, Stage] = {}
+
+        names = set()
+        for stage in stages:
+            if stage.name in names:
+                raise StageGraphError(f"Duplicate stage name {stage.name!r}")
+            names.add(stage.name)
+            for output in stage.outputs:
+                if output in self.producers or output in self.initial:
+                    raise StageGraphError(f"Value {output!r} is produced more than once")
+                self.producers[output] = stage
+
+        for stage in stages:
+            for needed in stage.inputs:
+                if needed not in self.producers and needed not in self.initial:
+                    raise StageGraphError(f"Stage {stage.name!r} needs {needed!r}, "
+                                          f"which no stage produces")
+
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_config(cls, stage_configs: List[Dict], builtins: Dict[str, Callable],
+                    initial: Iterable[str] = INITIAL_VALUES, owner: Any = None) -> 'StageGraph':
+        """
+        Build a graph from the "stages" list of the pipeline config.
+
+        Each entry has a name, inputs and outputs, and optionally a handler
+        (defaults to the stage name), kind, publish flag and enabled flag. Custom
+        "module:function" handlers are called as function(owner, inputs).
+        """
+        stages = []
+        for entry in stage_configs:
+            if not entry.get('enabled', True):
+                continue
+            spec = entry.get('handler', entry['name'])
+            handler = resolve_handler(spec, builtins)
+            if spec not in builtins:
+                handler = partial(handler, owner)
+            stages.append(Stage(entry['name'], handler, entry.get('inputs', []),
+                                entry.get('outputs', []), entry.get('publish', True),
+                                entry.get('kind', 'analysis')))
+        return cls(stages, initial)
+
+    def _dependencies(self, stage: Stage) -> List[Stage]:
+        return [self.producers[name] for name in stage.inputs if name in self.producers]
+
+    def _topological_order(self) -> List[Stage]:
+        order: List[Stage] = []
+        state: Dict[str, int] = {}
+
+        def visit(stage: Stage, path: List[str]):
+            mark = state.get(stage.name)
+            if mark == 2:
+                return
+            if mark == 1:
+                raise StageGraphError(f"Cycle in stage graph: {' -> '.join(path + [stage.name])}")
+            state[stage.name] = 1
+            for dependency in self._dependencies(stage):
+                visit(dependency, path + [stage.name])
+            state[stage.name] = 2
+            order.append(stage)
+
+        for stage in self.stages:
+            visit(stage, [])
+        return order
+
+    def published_outputs(self) -> List[str]:
+        """Return the output names that belong in the listing result."""
+        return [name for stage in self.order if stage.publish for name in stage.outputs]
+
+    def run(self, context: Dict[str, Any], executor: Optional[Executor] = None,
+            wrap: Optional[Callable[[Stage, Callable], Callable]] = None) -> Dict[str, Any]:
+        """
+        Run every stage, starting each one as soon as its inputs are ready.
+
+        Args:
+            context: Initial values; stage outputs are added to it in place
+            executor: Executor used to run independent stages concurrently
+                (stages run inline, in topological order, when None)
+            wrap: Optional hook wrapping each stage call, e.g. for timing
+
+        Returns: The context with every stage's outputs
+
+        Raises:
+            The first exception raised by a stage; stages not yet started are skipped
+        """
+        def call(stage: Stage):
+            inputs = {name: context.get(name) for name in stage.inputs}
+            handler = stage.handler
+            if wrap is not None:
+                handler = wrap(stage, handler)
+            outputs = handler(inputs)
+            if inspect.isawaitable(outputs):
+                # Coroutine stages written for the asyncio runner
+                outputs = asyncio.run(_await(outputs))
+            outputs = outputs or {}
+            return {name: outputs.get(name) for name in stage.outputs}
+
+        if executor is None:
+            for stage in self.order:
+                context.update(call(stage))
+            return context
+
+        available = set(self.initial) | set(context)
+        pending = list(self.order)
+        running = {}
+        while pending or running:
+            for stage in [s for s in pending if all(i in available for i in s.inputs)]:
+                pending.remove(stage)
+                running[executor.submit(call, stage)] = stage
+            if not running:
+                raise StageGraphError("Stage graph stalled with unmet inputs")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    wait(running)
+                    raise error
+                context.update(future.result())
+                available.update(stage.outputs)
+        return context
+
+    async def run_async(self, context: Dict[str, Any],
+                        call_stage: Callable[[Stage, Dict[str, Any]], Awaitable[Dict]]) -> Dict[str, Any]:
+        """
+        Run every stage as a coroutine, starting each one as soon as its inputs are ready.
+
+        Args:
+            context: Initial values; stage outputs are added to it in place
+            call_stage: Coroutine function taking (stage, inputs) and returning
+                the stage's outputs; it decides where the stage actually runs
+
+        Returns: The context with every stage's outputs
+
+        Raises:
+            The first exception raised by a stage; stages still running are cancelled
+        """
+        async def call(stage: Stage):
+            inputs = {name: context.get(name) for name in stage.inputs}
+            outputs = await call_stage(stage, inputs) or {}
+            return {name: outputs.get(name) for name in stage.outputs}
+
+        available = set(self.initial) | set(context)
+        pending = list(self.order)
+        running = {}
+        while pending or running:
+            for stage in [s for s in pending if all(i in available for i in s.inputs)]:
+                pending.remove(stage)
+                running[asyncio.ensure_future(call(stage))] = stage
+            if not running:
+                raise StageGraphError("Stage graph stalled with unmet inputs")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                error = task.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                    raise error
+                context.update(task.result())
+                available.update(stage.outputs)
+        return context
@@ -0,0 +1,235 @@
+"""Unit tests for the adaptive concurrency controller."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from adaptive_concurrency import AdaptiveConcurrency
+
+MB = 1024 * 1024
+
+
+class Simulation:
+    """Deterministic batch: every round runs `limit` items side by side."""
+
+    def __init__(self, cores=4, item_seconds=1.0, rss_base=100 * MB, rss_per_item=0,
+                 cpu_share=None, **settings):
+        self.now = 0.0
+        self.cpu = 0.0
+        self.cores = cores
+        self.item_seconds = item_seconds
+        self.rss_base = rss_base
+        self.rss_per_item = rss_per_item
+        self.cpu_share = cpu_share
+        # When set, items take item_seconds per MB and report their size
+        self.item_mb = None
+        self.running = 0
+        settings.setdefault('interval_seconds', 1.0)
+        settings.setdefault('min_samples', 1)
+        settings.setdefault('max_workers', 32)
+        settings.setdefault('memory_ceiling_mb', 10 ** 6)
+        self.controller = AdaptiveConcurrency(rss_reader=self.rss, cpu_reader=lambda: self.cpu,
+                                              clock=lambda: self.now, **settings)
+        self.controller.cpus = cores
+
+    def rss(self):
+        return self.rss_base + self.rss_per_item * self.running
+
+    def round(self):
+        limit = self.controller.limit
+        for _ in range(limit):
+            self.controller.acquire()
+        self.running = limit
+        # Items share the cores, so beyond `cores` each one gets slower
+        latency = self.item_seconds * max(1.0, limit / self.cores) * (self.item_mb or 1)
+        self.now += latency
+        share = self.cpu_share if self.cpu_share is not None else min(1.0, limit / self.cores)
+        self.cpu += share * self.cores * latency
+        size = int(self.item_mb * MB) if self.item_mb else None
+        for _ in range(limit):
+            self.controller.release(latency, size)
+        self.running = 0
+
+    def run(self, rounds):
+        limits = []
+        for _ in range(rounds):
+            self.round()
+            limits.append(self.controller.limit)
+        return limits
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    """Test cases for the AIMD decisions."""
+
+    def test_grows_while_there_is_headroom(self):
+        """Test the limit climbs one step per window up to max_workers."""
+        sim = Simulation(cores=64, max_workers=6, cpu_ceiling=2.0)
+        self.assertEqual(sim.run(6), [3, 4, 5, 6, 6, 6])
+        self.assertEqual(sim.controller.decisions[-1]['reason'], 'max_workers')
+
+    def test_latency_overload_is_cut_back(self):
+        """Test the limit saws around the point where items start queueing."""
+        sim = Simulation(cores=4, cpu_ceiling=2.0)
+        limits = sim.run(60)
+        self.assertTrue(all(3 <= limit <= 9 for limit in limits[10:]), limits)
+        reasons = {d['reason'] for d in sim.controller.decisions if d['action'] == 'decrease'}
+        self.assertIn('no_throughput_gain', reasons)
+
+    def test_memory_headroom_caps_growth(self):
+        """Test the limit stops where one more item would cross the memory ceiling."""
+        sim = Simulation(cores=64, rss_per_item=50 * MB, memory_ceiling_mb=400, cpu_ceiling=2.0)
+        limits = sim.run(20)
+        self.assertEqual(max(limits), 5)
+        self.assertEqual(sim.controller.decisions[-1]['reason'], 'memory_headroom')
+
+    def test_memory_overload_decreases(self):
+        """Test crossing the memory ceiling cuts the limit multiplicatively."""
+        sim = Simulation(cores=64, memory_ceiling_mb=400, initial_workers=10, cpu_ceiling=2.0)
+        sim.rss_base = 500 * MB
+        sim.run(1)
+        decision = sim.controller.decisions[-1]
+        self.assertEqual((decision['action'], decision['reason']), ('decrease', 'memory'))
+        self.assertEqual(decision['limit_to'], 7)
+        sim.run(10)
+        self.assertEqual(sim.controller.limit, 1)
+        self.assertEqual(sim.controller.decisions[-1]['action'], 'hold')
+
+    def test_cpu_ceiling(self):
+        """Test saturated cores stop the limit growing without cutting it."""
+        sim = Simulation(cores=8, cpu_share=0.95, cpu_ceiling=0.9, initial_workers=8)
+        sim.run(3)
+        decision = sim.controller.decisions[-1]
+        self.assertEqual((decision['action'], decision['reason']), ('hold', 'cpu'))
+        self.assertEqual(sim.controller.limit, 8)
+
+    def test_large_items_are_not_overload(self):
+        """Test latency is judged per MB, so bigger photos don't cut the limit."""
+        sim = Simulation(cores=64, cpu_ceiling=2.0, max_workers=64)
+        sim.item_mb = 1
+        sim.run(5)
+        sim.item_mb = 20
+        limits = sim.run(5)
+        self.assertEqual(limits, sorted(limits))
+        self.assertEqual(sim.controller.stats['decreases'], 0)
+        decision = sim.controller.decisions[-1]
+        self.assertEqual((decision['median_latency_s'], decision['median_cost_s']), (20.0, 1.0))
+
+    def test_baseline_follows_slower_items(self):
+        """Test a batch of slower items is not mistaken for overload for long."""
+        sim = Simulation(cores=64, cpu_ceiling=2.0, max_workers=64)
+        sim.run(5)
+        sim.item_seconds = 3.0
+        limits = sim.run(40)
+        self.assertGreater(limits[-1], limits[5])
+
+    def test_summary(self):
+        """Test the summary carries the decision log and counters."""
+        sim = Simulation(cores=64, cpu_ceiling=2.0, max_decisions=3)
+        sim.run(5)
+        summary = sim.controller.summary()
+        self.assertEqual(len(summary['decisions']), 3)
+        self.assertEqual(summary['stats']['increases'], 5)
+        self.assertEqual(summary['stats']['peak_limit'], 7)
+        decision = summary['decisions'][-1]
+        for key in ('throughput', 'median_latency_s', 'rss_mb', 'cpu', 'limit_from', 'limit_to'):
+            self.assertIn(key, decision)
+
+    def test_permits_bound_running_threads(self):
+        """Test no more than limit threads hold a permit at once."""
+        controller = AdaptiveConcurrency(initial_workers=2, max_workers=8, interval_seconds=3600)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(5):
+                controller.acquire()
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(0.002)
+                with lock:
+                    running.pop()
+                controller.release(0.002)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(controller.stats['completed'], 30)
+
+
+class FakeHandler:
+    """Stands in for WorkerItemHandler: records items instead of processing them."""
+
+    seen = []
+
+    def __init__(self, config_path=None, config=None):
+        FakeHandler.config = config
+
+    def __call__(self):
+        def handle(payload):
+            image_path = payload[0]
+            FakeHandler.seen.append(image_path)
+            return {'item_name': os.path.basename(image_path), 'success': True,
+                    'counters': {'processed_images': 1}}
+        return handle
+
+
+class TestAutopilotAdaptive(unittest.TestCase):
+    """Test the autopilot batch loop under the controller."""
+
+    def test_batch_runs_every_item_in_order(self):
+        """Test every item is processed once and the summary has the controller's log."""
+        import autopilot_bot
+        from image_input import find_images
+
+        tmp = tempfile.mkdtemp()
+        try:
+            for i in range(20):
+                with open(os.path.join(tmp, f'coin{i:02d}.jpg'), 'wb') as f:
+                    f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+            bot = autopilot_bot.AutopilotBot()
+            bot.config['adaptive_concurrency'] = {'enabled': True, 'max_workers': 4,
+                                                  'interval_seconds': 0, 'min_samples': 2}
+            FakeHandler.seen = []
+            with mock.patch.object(autopilot_bot, 'WorkerItemHandler', FakeHandler):
+                bot._process_adaptive(sorted(find_images(tmp)), tmp, {}, {})
+            names = [listing['item_name'] for listing in bot.results['listings']]
+            self.assertEqual(names, [f'coin{i:02d}.jpg' for i in range(20)])
+            self.assertEqual(len(FakeHandler.seen), 20)
+            self.assertEqual(bot.results['processed_images'], 20)
+            self.assertTrue(bot.results['concurrency']['decisions'])
+            # Workers are built from the in-memory config, overrides included
+            self.assertEqual(FakeHandler.config['adaptive_concurrency']['max_workers'], 4)
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_worker_bots_keep_overrides(self):
+        """Test WorkerItemHandler builds each bot from its own copy of the given config."""
+        import autopilot_bot
+
+        bot = autopilot_bot.AutopilotBot()
+        bot.config['title_generator'] = {'enabled': False}
+        factory = autopilot_bot.WorkerItemHandler(config=bot.config)
+        built = []
+        with mock.patch.object(autopilot_bot.AutopilotBot, 'process_single_item',
+                               lambda worker, *args: built.append(worker) or {}):
+            factory()(('coin.jpg', '/tmp', None))
+            factory()(('coin.jpg', '/tmp', None))
+        self.assertEqual(built[0].config['title_generator'], {'enabled': False})
+        self.assertIsNot(built[0].config, bot.config)
+        self.assertIsNot(built[0].config, built[1].config)
+
+
+if __name__ == "__main__":
+    unittest.main()
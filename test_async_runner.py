@@ -0,0 +1,196 @@
+"""Unit tests for the asyncio pipeline runner."""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+import autopilot_bot
+from async_runner import AsyncPipelineRunner
+from autopilot_bot import AutopilotBot
+
+
+class Probe:
+    """Counts how many callers are inside a section at once."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        with self.lock:
+            self.current -= 1
+
+
+class RunnerTestCase(unittest.TestCase):
+    """An AutopilotBot whose pipeline is load (io) -> render (cpu) -> analyze -> finish."""
+
+    def setUp(self):
+        self.bot = AutopilotBot()
+        self.items = Probe()
+        self.analysis = Probe()
+        self.threads = {}
+        self.bot.register_stage('load', self.load)
+        self.bot.register_stage('render', self.render)
+        self.bot.register_stage('analyze_remote', self.analyze)
+        self.bot.register_stage('finish', self.finish)
+        self.bot.config['pipeline'] = {'stages': [
+            {'name': 'load', 'kind': 'io', 'inputs': ['image_path'], 'outputs': ['raw']},
+            {'name': 'render', 'kind': 'cpu', 'inputs': ['raw'], 'outputs': ['rendered']},
+            {'name': 'analyze', 'handler': 'analyze_remote', 'kind': 'analysis',
+             'inputs': ['rendered'], 'outputs': ['analysis']},
+            {'name': 'finish', 'kind': 'io', 'inputs': ['analysis'], 'outputs': ['title']},
+        ]}
+        self.analysis_seconds = 0.02
+
+    def record_thread(self, stage):
+        self.threads.setdefault(stage, set()).add(threading.current_thread().name)
+
+    def load(self, inputs):
+        self.items.enter()
+        self.record_thread('load')
+        if 'bad' in inputs['image_path']:
+            self.items.leave()
+            raise ValueError('unreadable')
+        return {'raw': inputs['image_path']}
+
+    def render(self, inputs):
+        self.record_thread('render')
+        return {'rendered': inputs['raw'].upper()}
+
+    async def analyze(self, inputs):
+        self.record_thread('analyze')
+        self.analysis.enter()
+        try:
+            await asyncio.sleep(self.analysis_seconds)
+        finally:
+            self.analysis.leave()
+        return {'analysis': inputs['rendered']}
+
+    def finish(self, inputs):
+        self.record_thread('finish')
+        self.items.leave()
+        return {'title': inputs['analysis']}
+
+    def run_batch(self, count, **settings):
+        runner = AsyncPipelineRunner(self.bot, settings)
+        items = [(f'coin{i:03d}.jpg', '/tmp', None) for i in range(count)]
+        return runner, runner.run(iter(items))
+
+
+class TestAsyncPipelineRunner(RunnerTestCase):
+    """Test cases for the AsyncPipelineRunner class."""
+
+    def test_items_overlap(self):
+        """Test items waiting on analysis run concurrently rather than one at a time."""
+        started = time.perf_counter()
+        _, results = self.run_batch(40, max_in_flight_items=40, cpu_workers=2)
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 40 * self.analysis_seconds / 2)
+        self.assertGreater(self.analysis.peak, 1)
+        self.assertEqual([r['outputs']['title'] for r in results],
+                         [f'COIN{i:03d}.JPG' for i in range(40)])
+        self.assertEqual(self.bot.results['processed_images'], 40)
+
+    def test_in_flight_items_are_bounded(self):
+        """Test no more than max_in_flight_items items are in progress at once."""
+        self.run_batch(30, max_in_flight_items=3, cpu_workers=2)
+        self.assertEqual(self.items.peak, 3)
+
+    def test_analysis_calls_are_bounded(self):
+        """Test concurrent analysis calls never exceed max_analysis_calls."""
+        self.run_batch(30, max_in_flight_items=30, max_analysis_calls=2, cpu_workers=2)
+        self.assertEqual(self.analysis.peak, 2)
+
+    def test_open_file_slots_are_bounded(self):
+        """Test io and cpu stages share the max_open_files slots."""
+        files = Probe()
+
+        def load(inputs):
+            files.enter()
+            time.sleep(0.005)
+            files.leave()
+            return {'raw': inputs['image_path']}
+
+        self.bot.register_stage('load', load)
+        self.bot.config['pipeline']['stages'][-1]['handler'] = 'finish_quiet'
+        self.bot.register_stage('finish_quiet', lambda inputs: {'title': inputs['analysis']})
+        self.run_batch(20, max_in_flight_items=20, max_open_files=1, cpu_workers=4)
+        self.assertEqual(files.peak, 1)
+
+    def test_blocking_stages_are_offloaded(self):
+        """Test cpu and io stages run off the loop and coroutine stages run on it."""
+        self.run_batch(5, cpu_workers=2)
+        loop_thread = threading.current_thread().name
+        self.assertTrue(all(name.startswith('async-cpu') for name in self.threads['render']))
+        self.assertTrue(all(name.startswith('async-io') for name in self.threads['load']))
+        self.assertEqual(self.threads['analyze'], {loop_thread})
+
+    def test_given_executor_is_used_and_kept(self):
+        """Test a caller's cpu executor runs cpu stages and is left open."""
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='mine') as executor:
+            runner = AsyncPipelineRunner(self.bot, {}, cpu_executor=executor)
+            runner.run([('coin.jpg', '/tmp', None)])
+            self.assertEqual(executor.submit(lambda: 7).result(), 7)
+        self.assertTrue(all(name.startswith('mine') for name in self.threads['render']))
+
+    def test_failures_are_recorded_in_order(self):
+        """Test a failing item is recorded without stopping the others."""
+        runner = AsyncPipelineRunner(self.bot, {'max_in_flight_items': 4})
+        results = runner.run([('a.jpg', '/tmp', None), ('bad.jpg', '/tmp', None),
+                              ('c.jpg', '/tmp', None)])
+        self.assertEqual([r['item_name'] for r in results], ['a', 'bad', 'c'])
+        self.assertEqual([r['success'] for r in results], [True, False, True])
+        self.assertEqual(results[1]['error'], 'unreadable')
+        self.assertEqual(self.bot.results['failed'], 1)
+
+
+class TestAsyncCli(unittest.TestCase):
+    """Test the --async command-line path."""
+
+    def test_async_flag_uses_runner(self):
+        """Test --batch --async processes the batch through the async runner."""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        input_dir = os.path.join(root, 'in')
+        output_dir = os.path.join(root, 'out')
+        os.makedirs(input_dir)
+        for i in range(3):
+            with open(os.path.join(input_dir, f'coin{i}.jpg'), 'wb') as f:
+                f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+
+        runners = []
+
+        class RecordingRunner(AsyncPipelineRunner):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                runners.append(self)
+
+        argv = ['autopilot_bot.py', '--batch', '--async', '--quiet', input_dir, output_dir]
+        with mock.patch.object(autopilot_bot, 'AsyncPipelineRunner', RecordingRunner), \
+                mock.patch.object(sys, 'argv', argv):
+            autopilot_bot.main()
+        self.assertEqual(len(runners), 1)
+        with open(os.path.join(output_dir, 'processing_summary.json')) as f:
+            summary = json.load(f)
+        self.assertEqual(len(summary['listings']), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
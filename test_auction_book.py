@@ -0,0 +1,151 @@
+"""Unit tests for the Python auction engine."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from auction_book import AuctionBook, AuctionError, SECONDS_PER_DAY
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestAuctionBook(unittest.TestCase):
+    """Test cases for auction rules, expiry, indexes and persistence."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log = os.path.join(self.tmp, 'auctions.jsonl')
+        self.clock = FakeClock()
+        self.book = AuctionBook(self.log, duration_days=7, clock=self.clock)
+
+    def tearDown(self):
+        self.book.close()
+        shutil.rmtree(self.tmp)
+
+    def create(self, seller='seller', **kwargs):
+        return self.book.create_auction(seller, 'Morgan Dollar', 'A fine coin', 10.0, **kwargs)
+
+    def test_bid_rules(self):
+        """Test the bidding rules match auctionSystem.js."""
+        auction = self.create()
+        with self.assertRaises(AuctionError):
+            self.book.place_bid(auction.id, 'seller', 20)
+        self.book.place_bid(auction.id, 'alice', 15)
+        with self.assertRaises(AuctionError):
+            self.book.place_bid(auction.id, 'bob', 15)
+        self.book.place_bid(auction.id, 'bob', 16)
+        self.assertEqual((auction.current_bid, auction.highest_bidder), (16, 'bob'))
+        self.assertEqual([a.id for a in self.book.leading_auctions('bob')], [auction.id])
+        self.assertEqual(self.book.leading_auctions('alice'), [])
+        self.assertEqual([a.id for a in self.book.bidder_auctions('alice')], [auction.id])
+        with self.assertRaises(AuctionError):
+            self.book.cancel_auction(auction.id, 'seller')
+
+    def test_expiry_closes_only_due_auctions(self):
+        """Test close_expired pops due auctions from the heap in end-time order."""
+        short = self.create(duration=60)
+        long = self.create(duration=3600)
+        cancelled = self.create(duration=30)
+        self.book.cancel_auction(cancelled.id, 'seller')
+
+        self.clock.now += 120
+        closed = self.book.close_expired()
+        self.assertEqual([a.id for a in closed], [short.id])
+        self.assertEqual([a.id for a in self.book.active_auctions()], [long.id])
+        self.assertEqual(self.book.statistics()['completed_auctions'], 1)
+
+        with self.assertRaises(AuctionError):
+            self.clock.now += 7200
+            self.book.place_bid(long.id, 'alice', 50)
+        self.assertEqual(long.status, 'completed')
+
+    def test_active_listing_order_and_limit(self):
+        """Test active auctions are listed newest first, up to the limit."""
+        ids = []
+        for _ in range(5):
+            ids.append(self.create().id)
+            self.clock.now += 1
+        self.assertEqual([a.id for a in self.book.active_auctions(limit=2)], ids[:-3:-1])
+
+    def test_auto_relist_in_bulk(self):
+        """Test unsold auto_relist auctions are relisted and sold ones are not."""
+        unsold = [self.create(auto_relist=True, duration=60) for _ in range(100)]
+        sold = self.create(auto_relist=True, duration=60)
+        self.book.place_bid(sold.id, 'alice', 11)
+
+        self.clock.now += 61
+        self.book.close_expired()
+        self.assertTrue(all(a.status == 'active' and a.relist_count == 1 for a in unsold))
+        self.assertEqual(sold.status, 'completed')
+        self.assertEqual(unsold[0].end_time, self.clock.now + 60)
+        self.assertEqual(self.book.statistics()['relisted'], 100)
+
+    def test_log_replay(self):
+        """Test the append-only log rebuilds the same state, before and after compaction."""
+        a = self.create(auto_relist=True, duration=60)
+        b = self.create(duration=60)
+        self.book.place_bid(b.id, 'alice', 12)
+        self.clock.now += 61
+        self.book.close_expired()
+        c = self.create()
+        self.book.cancel_auction(c.id, 'seller')
+        expected = {x.id: x.to_dict() for x in (a, b, c)}
+        stats = self.book.statistics()
+        self.book.close()
+
+        replayed = AuctionBook(self.log, clock=self.clock)
+        self.assertEqual({k: v.to_dict() for k, v in replayed.auctions.items()}, expected)
+        self.assertEqual(replayed.statistics(), stats)
+        self.assertEqual([x.id for x in replayed.leading_auctions('alice')], [])
+
+        replayed.compact()
+        replayed.close()
+        compacted = AuctionBook(self.log, clock=self.clock)
+        self.assertEqual({k: v.to_dict() for k, v in compacted.auctions.items()}, expected)
+        self.assertEqual(compacted.statistics(), stats)
+        self.clock.now += 61
+        self.assertEqual([x.id for x in compacted.close_expired()], [a.id])
+        compacted.close()
+
+    def test_torn_tail_is_dropped(self):
+        """Test a half-written final event is cut off and the book still loads."""
+        a = self.create()
+        self.book.place_bid(a.id, 'alice', 12)
+        expected = a.to_dict()
+        self.book.close()
+        with open(self.log, 'a') as f:
+            f.write('{"op": "bid", "id": "%s", "bid": {"bidder_id": "bob", "amo' % a.id)
+
+        replayed = AuctionBook(self.log, clock=self.clock)
+        self.assertEqual(replayed.auctions[a.id].to_dict(), expected)
+        replayed.place_bid(a.id, 'bob', 14)
+        replayed.close()
+        again = AuctionBook(self.log, clock=self.clock)
+        self.assertEqual(again.auctions[a.id].to_dict()['current_bid'], 14)
+        again.close()
+
+    def test_add_listings_from_autopilot(self):
+        """Test autopilot listing results become auctions priced from pricing."""
+        listings = [
+            {'item_name': 'coin1', 'success': True, 'outputs': {'title': '1921 Morgan'},
+             'pricing': {'starting_price': 28.0}},
+            {'item_name': 'coin2', 'success': False, 'outputs': {}, 'pricing': {'starting_price': 5.0}},
+            {'item_name': 'coin3', 'success': True, 'outputs': {}, 'pricing': None}
+        ]
+        created = self.book.add_listings(listings, 'consignor')
+        self.assertEqual([(a.title, a.starting_bid) for a in created], [('1921 Morgan', 28.0)])
+        self.assertEqual(created[0].end_time - created[0].created_at, 7 * SECONDS_PER_DAY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Unit tests for the auction pricing module."""
+
+import math
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from auction_pricing import AuctionPricer, PriceColumns, parse_value_range
+
+
+class TestParseValueRange(unittest.TestCase):
+    """Test cases for free-text value parsing."""
+
+    def test_dollar_range(self):
+        """Test the compact "$25-35" form used in the metadata."""
+        self.assertEqual(parse_value_range("$25-35"), (25.0, 35.0))
+
+    def test_range_with_separators(self):
+        """Test ranges with thousands separators and 'to'."""
+        self.assertEqual(parse_value_range("$1,200 to $1,500"), (1200.0, 1500.0))
+
+    def test_single_value(self):
+        """Test a single value becomes a degenerate range."""
+        self.assertEqual(parse_value_range("$40"), (40.0, 40.0))
+
+    def test_unparseable(self):
+        """Test missing or non-numeric values become NaN."""
+        for text in (None, "", "Market dependent"):
+            low, high = parse_value_range(text)
+            self.assertTrue(math.isnan(low) and math.isnan(high))
+
+
+class TestAuctionPricer(unittest.TestCase):
+    """Test cases for the AuctionPricer class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.metadata = {
+            'coin_a': {'estimated_value': '$25-35'},
+            'coin_b': {'estimated_value': '$200-300'},
+            'coin_c': {'year': '1921'}
+        }
+        self.pricer = AuctionPricer({'starting_price_multiplier': 0.8,
+                                     'reserve_price_multiplier': 1.2})
+
+    def test_listing_prices(self):
+        """Test starting and reserve prices are based on the range midpoint."""
+        prices = self.pricer.listing_prices(PriceColumns.from_metadata(self.metadata))
+        self.assertEqual(prices['coin_a']['starting_price'], 24.0)
+        self.assertEqual(prices['coin_a']['reserve_price'], 36.0)
+        self.assertEqual(prices['coin_b']['starting_price'], 200.0)
+        self.assertIsNone(prices['coin_c'])
+
+    def test_reprice(self):
+        """Test repricing with new multipliers."""
+        columns = PriceColumns.from_metadata(self.metadata)
+        starting, reserve = self.pricer.reprice(columns, 0.5, 1.0)
+        self.assertEqual(float(starting[0]), 15.0)
+        self.assertEqual(float(reserve[1]), 250.0)
+        self.assertEqual(self.pricer.starting_multiplier, 0.5)
+
+    def test_reprice_million_items(self):
+        """Test a million-item catalogue reprices within seconds."""
+        values = ['$25-35', '$10-15', '$200-300', '$1,000-1,200'] * 250000
+        columns = PriceColumns.from_values([str(i) for i in range(len(values))], values)
+        start = time.perf_counter()
+        starting, _ = self.pricer.reprice(columns, 0.9, 1.1)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(len(starting), 1000000)
+        self.assertEqual(columns.position('3'), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
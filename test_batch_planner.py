@@ -0,0 +1,215 @@
+"""Unit tests for the sampling batch planner."""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from batch_planner import BatchPlanner, allocate, item_format, stratify
+
+JPEG = b'\xff\xd8\xff\xe0'
+
+
+class FakeBot:
+    """Takes time in proportion to the input size and writes a fixed-size output."""
+
+    def __init__(self, clock, seconds_per_kb=1.0, cpu_share=0.5, output_bytes=100):
+        self.clock = clock
+        self.seconds_per_kb = seconds_per_kb
+        self.cpu_share = cpu_share
+        self.output_bytes = output_bytes
+        self.items = []
+
+    def process_single_item(self, image_path, output_dir, metadata=None):
+        self.items.append(image_path)
+        seconds = os.path.getsize(image_path) / 1024 * self.seconds_per_kb
+        self.clock.now += seconds
+        self.clock.cpu += seconds * self.cpu_share
+        with open(os.path.join(output_dir, 'listing.txt'), 'wb') as f:
+            f.write(bytes(self.output_bytes))
+        return {'success': True}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.cpu = 0.0
+
+
+class PlannerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.clock = FakeClock()
+
+    def write(self, name, kb):
+        path = Path(self.tmp) / name
+        path.write_bytes(JPEG + bytes(kb * 1024 - len(JPEG)))
+        return path
+
+    def planner(self, bot=None, **settings):
+        bot = bot or FakeBot(self.clock)
+        settings.setdefault('warmup_items', 0)
+        settings.setdefault('memory_ceiling_mb', 10 ** 6)
+        planner = BatchPlanner(lambda: bot, clock=lambda: self.clock.now,
+                               cpu_clock=lambda: self.clock.cpu, **settings)
+        planner.cpus = 4
+        return planner
+
+
+class TestStratify(PlannerTestCase):
+
+    def test_format_and_size_bands(self):
+        items = [self.write(f'a{i}.jpg', i + 1) for i in range(8)]
+        items += [self.write('b.png', 1), self.write('c.JPEG', 2)]
+        strata = stratify(items, size_strata=4)
+        self.assertEqual([s.key for s in strata],
+                         ['jpg/0', 'jpg/1', 'jpg/2', 'jpg/3', 'png/0'])
+        self.assertEqual(sum(len(s.items) for s in strata), 10)
+        # Bands hold neighbouring sizes
+        self.assertEqual(sorted(p.name for p in strata[0].items), ['a0.jpg', 'a1.jpg'])
+        self.assertEqual(item_format(Path('x.tif')), 'tiff')
+
+    def test_allocation_is_proportional_with_one_each(self):
+        items = [self.write(f'a{i}.jpg', 1) for i in range(90)] + [self.write('b.png', 1)]
+        strata = stratify(items, size_strata=1)
+        allocate(strata, 10, random.Random(0))
+        self.assertEqual({s.key: len(s.sample) for s in strata}, {'jpg/0': 10, 'png/0': 1})
+
+
+class TestPlan(PlannerTestCase):
+
+    def batch(self):
+        return [self.write(f'small{i}.jpg', 1) for i in range(30)] + \
+               [self.write(f'large{i}.jpg', 10) for i in range(10)]
+
+    def test_full_sample_is_exact(self):
+        items = self.batch()
+        plan = self.planner(sample_size=1000, worker_counts=[1, 2]).plan(items)
+        self.assertEqual(plan['sampled_items'], 40)
+        self.assertAlmostEqual(plan['serial_seconds'], 30 * 1 + 10 * 10)
+        self.assertEqual(plan['serial_seconds_95'], [130.0, 130.0])
+        self.assertAlmostEqual(plan['cpu_hours'], round(65 / 3600, 3))
+        self.assertEqual(plan['output_bytes'], 40 * 100)
+        self.assertEqual(plan['input_bytes'], sum(os.path.getsize(p) for p in items))
+        self.assertEqual(plan['projections'][1]['output_bytes_per_worker'], 2000)
+        json.dumps(plan)
+
+    def test_stratified_sample_extrapolates(self):
+        items = [self.write(f'small{i}.jpg', 1) for i in range(20)] + \
+                [self.write(f'large{i}.jpg', 10) for i in range(20)]
+        bot = FakeBot(self.clock)
+        plan = self.planner(bot, sample_size=8, size_strata=2).plan(items)
+        self.assertEqual(len(bot.items), 8)
+        # Constant cost within each size band, so the estimate is exact
+        self.assertAlmostEqual(plan['serial_seconds'], 220.0)
+        self.assertEqual({s['stratum']: s['items'] for s in plan['strata']},
+                         {'jpg/0': 20, 'jpg/1': 20})
+
+    def test_warmup_is_not_measured(self):
+        bot = FakeBot(self.clock)
+        plan = self.planner(bot, sample_size=4, warmup_items=2).plan(self.batch())
+        warmup, sampled = bot.items[:2], bot.items[2:]
+        self.assertEqual(len(sampled), plan['sampled_items'])
+        self.assertFalse(set(warmup) & set(sampled))
+        self.assertEqual(len(set(bot.items)), len(bot.items))
+
+    def test_warmup_items_are_excluded_from_allocation(self):
+        items = [self.write(f'a{i}.jpg', 1) for i in range(5)] + [self.write('b.png', 1)]
+        strata = stratify(items, size_strata=1)
+        allocate(strata, 6, random.Random(0), exclude=items[:2] + items[5:])
+        self.assertEqual(sorted(p.name for p in strata[0].sample), ['a2.jpg', 'a3.jpg', 'a4.jpg'])
+        # A stratum made only of excluded items still gets its one sample
+        self.assertEqual([p.name for p in strata[1].sample], ['b.png'])
+
+    def test_process_projection_spreads_cpu_over_cores(self):
+        plan = self.planner(sample_size=1000, worker_counts=[1, 2, 4, 8]).plan(self.batch())
+        walls = {p['workers']: p['wall_seconds'] for p in plan['projections']}
+        self.assertEqual(walls[1], 130.0)
+        self.assertEqual(walls[2], 65.0)
+        self.assertEqual(walls[4], 32.5)
+        # Past the 4 cores the CPU half of the work (65s) no longer shrinks
+        self.assertEqual(walls[8], 16.2)
+        self.assertEqual(plan['recommended_workers'], 8)
+
+    def test_thread_projection_serialises_cpu(self):
+        plan = self.planner(sample_size=1000, worker_counts=[1, 2, 4],
+                            executor='threads').plan(self.batch())
+        walls = {p['workers']: p['wall_seconds'] for p in plan['projections']}
+        self.assertEqual(walls, {1: 130.0, 2: 65.0, 4: 65.0})
+        self.assertEqual(plan['recommended_workers'], 2)
+
+    def test_deadline_picks_fewest_workers(self):
+        plan = self.planner(sample_size=1000, worker_counts=[1, 2, 4],
+                            deadline_hours=70 / 3600).plan(self.batch())
+        self.assertEqual(plan['recommended_workers'], 2)
+        first = plan['projections'][0]
+        self.assertFalse(first['meets_deadline'])
+        self.assertEqual(first['items_by_deadline'], 21)
+
+    def test_memory_ceiling_excludes_worker_counts(self):
+        planner = self.planner(sample_size=1000, worker_counts=[1, 2, 4])
+        planner.memory_ceiling = 1
+        plan = planner.plan(self.batch())
+        self.assertFalse(any(p['fits_memory'] for p in plan['projections']))
+        self.assertIsNone(plan['recommended_workers'])
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            self.planner(executor='fibers')
+
+
+class TestAutopilotPlan(unittest.TestCase):
+
+    def test_plan_mode_does_not_process_batch(self):
+        from autopilot_bot import AutopilotBot
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        input_dir = os.path.join(tmp, 'in')
+        output_dir = os.path.join(tmp, 'out')
+        os.makedirs(input_dir)
+        for i in range(6):
+            with open(os.path.join(input_dir, f'coin{i}.jpg'), 'wb') as f:
+                f.write(JPEG + bytes(16 * (i + 1)))
+
+        bot = AutopilotBot()
+        bot.config['batch_planner'] = {'sample_size': 3, 'size_strata': 3,
+                                        'worker_counts': [1, 4]}
+        plan = bot.process_batch(input_dir, output_dir, plan=True)
+        self.assertEqual(plan['items'], 6)
+        self.assertEqual(plan['sampled_items'], 3)
+        self.assertEqual([p['workers'] for p in plan['projections']], [1, 4])
+        self.assertEqual(bot.results['listings'], [])
+        self.assertEqual(os.listdir(output_dir), ['batch_plan.json'])
+        with open(os.path.join(output_dir, 'batch_plan.json')) as f:
+            self.assertEqual(json.load(f)['items'], 6)
+
+    def test_plan_needs_batch(self):
+        import autopilot_bot
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        image = os.path.join(tmp, 'coin.jpg')
+        with open(image, 'wb') as f:
+            f.write(JPEG + bytes(16))
+        output_dir = os.path.join(tmp, 'out')
+        for extra in ([], ['--batch', '--sources']):
+            argv = ['autopilot_bot.py', '--plan', '--quiet', *extra, image, output_dir]
+            with mock.patch.object(sys, 'argv', argv), mock.patch('sys.stderr'), \
+                    self.assertRaises(SystemExit) as raised:
+                autopilot_bot.main()
+            self.assertEqual(raised.exception.code, 2)
+        # Refused before anything was processed
+        self.assertFalse(os.path.exists(output_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
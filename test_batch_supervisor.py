@@ -0,0 +1,157 @@
+"""Unit tests for the batch supervisor module."""
+
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from batch_supervisor import SupervisedScheduler
+from quality_gate import QualityRejected
+
+
+def quality_stage(bot, inputs):
+    """Custom pipeline stage that rejects every photo named 'blurry*'."""
+    if os.path.basename(inputs['image_path']).startswith('blurry'):
+        raise QualityRejected(['too blurry'], {'sharpness': 1.0})
+    return {'quality': {'sharpness': 500.0}}
+
+
+class FakeItemHandler:
+    """Handler factory whose behaviour is chosen by the task payload."""
+
+    def __call__(self):
+        def handle(payload):
+            action, arg = payload
+            if action == 'crash':
+                os.kill(os.getpid(), signal.SIGKILL)
+            if action == 'hang':
+                time.sleep(60)
+            if action == 'flaky' and not os.path.exists(arg):
+                open(arg, 'w').close()
+                return {'success': False, 'error': 'first attempt fails'}
+            if action == 'reject':
+                return {'success': False, 'retry': False, 'rejected': 'too blurry'}
+            return {'success': True, 'pid': os.getpid()}
+        return handle
+
+
+class TestSupervisedScheduler(unittest.TestCase):
+    """Test cases for the SupervisedScheduler class."""
+
+    def setUp(self):
+        """Set up a scratch directory."""
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.tmp)
+
+    def make_scheduler(self, **kwargs):
+        options = {'workers': 2, 'item_timeout': 1.0, 'max_attempts': 2,
+                   'backoff_seconds': 0.01, 'recycle_after': 0,
+                   'dead_letter_path': os.path.join(self.tmp, 'dead_letter.jsonl')}
+        options.update(kwargs)
+        return SupervisedScheduler(FakeItemHandler(), **options)
+
+    def test_crash_and_hang_are_contained(self):
+        """Test a hard crash and a hang dead-letter without stopping the batch."""
+        lost = []
+        scheduler = self.make_scheduler(on_worker_lost=lost.append)
+        results = scheduler.run([('ok1', ('ok', None)), ('crash', ('crash', None)),
+                                 ('hang', ('hang', None)), ('ok2', ('ok', None))])
+        self.assertTrue(results['ok1']['success'])
+        self.assertTrue(results['ok2']['success'])
+        self.assertTrue(results['crash']['dead_letter'])
+        self.assertTrue(results['hang']['dead_letter'])
+        self.assertEqual(results['crash']['attempts'], 2)
+        self.assertEqual(scheduler.stats['crashes'], 2)
+        self.assertEqual(scheduler.stats['timeouts'], 2)
+        self.assertEqual(len(set(lost)), 4)
+        with open(os.path.join(self.tmp, 'dead_letter.jsonl')) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_retry_succeeds(self):
+        """Test a failing item is retried and succeeds on its second attempt."""
+        scheduler = self.make_scheduler()
+        results = scheduler.run([('flaky', ('flaky', os.path.join(self.tmp, 'marker')))])
+        self.assertTrue(results['flaky']['success'])
+        self.assertEqual(results['flaky']['attempts'], 2)
+        self.assertEqual(scheduler.stats['retries'], 1)
+
+    def test_final_failure_is_not_retried(self):
+        """Test a failure marked retry=False is returned once, not dead-lettered."""
+        scheduler = self.make_scheduler(max_attempts=3)
+        results = scheduler.run([('blurry', ('reject', None)), ('ok', ('ok', None))])
+        self.assertEqual(results['blurry']['rejected'], 'too blurry')
+        self.assertEqual(results['blurry']['attempts'], 1)
+        self.assertNotIn('dead_letter', results['blurry'])
+        self.assertEqual((scheduler.stats['retries'], scheduler.stats['dead_lettered'],
+                          scheduler.stats['not_retried']), (0, 0, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'dead_letter.jsonl')))
+
+    def test_isolated_batch_counts_rejections(self):
+        """Test quality rejections in worker processes reach the parent's summary."""
+        from autopilot_bot import AutopilotBot
+        from image_input import find_images
+
+        for name in ('blurry1.jpg', 'sharp1.jpg', 'sharp2.jpg'):
+            with open(os.path.join(self.tmp, name), 'wb') as f:
+                f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+        bot = AutopilotBot()
+        bot.config['pipeline'] = {'stages': [
+            {'name': 'quality', 'handler': 'test_batch_supervisor:quality_stage', 'kind': 'cpu',
+             'inputs': ['image_path'], 'outputs': ['quality']}]}
+        bot.config['isolation'] = {'enabled': True, 'workers': 2, 'max_attempts': 3,
+                                   'backoff_seconds': 0.01}
+        bot._process_isolated(sorted(find_images(self.tmp)), self.tmp, {}, {})
+        self.assertEqual((bot.results['rejected'], bot.results['failed'],
+                          bot.results['processed_images']), (1, 0, 2))
+        self.assertEqual(bot.results['isolation']['retries'], 0)
+        rejected = bot.results['listings'][0]
+        self.assertEqual((rejected['item_name'], rejected['rejected'], rejected['attempts']),
+                         ('blurry1', 'too blurry', 1))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'dead_letter.jsonl')))
+
+    def test_isolated_batch_is_not_profiled(self):
+        """Test an isolated batch drops profiling instead of writing empty reports."""
+        from autopilot_bot import AutopilotBot
+        from bot_profiler import BotProfiler
+
+        input_dir = os.path.join(self.tmp, 'input')
+        output_dir = os.path.join(self.tmp, 'output')
+        os.makedirs(input_dir)
+        with open(os.path.join(input_dir, 'sharp1.jpg'), 'wb') as f:
+            f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+        bot = AutopilotBot(profiler=BotProfiler(enabled=True))
+        bot.config['pipeline'] = {'stages': [
+            {'name': 'quality', 'handler': 'test_batch_supervisor:quality_stage', 'kind': 'cpu',
+             'inputs': ['image_path'], 'outputs': ['quality']}]}
+        bot.config['isolation'] = {'enabled': True, 'workers': 1, 'backoff_seconds': 0.01}
+        with bot:
+            results = bot.process_batch(input_dir, output_dir)
+        self.assertFalse(bot.profiler.enabled)
+        self.assertNotIn('profile', results)
+        self.assertFalse([name for name in os.listdir(output_dir) if 'profile' in name])
+
+    def test_workers_are_recycled(self):
+        """Test workers are replaced after recycle_after items."""
+        scheduler = self.make_scheduler(workers=1, recycle_after=2)
+        results = scheduler.run([(str(i), ('ok', None)) for i in range(5)])
+        self.assertTrue(all(r['success'] for r in results.values()))
+        self.assertEqual(len({r['pid'] for r in results.values()}), 3)
+        self.assertEqual(scheduler.stats['workers_started'], 3)
+
+    def test_backoff_delay(self):
+        """Test the retry delay doubles up to its ceiling."""
+        scheduler = self.make_scheduler(backoff_seconds=1.0, backoff_max_seconds=5.0)
+        self.assertEqual([scheduler.backoff_delay(n) for n in (1, 2, 3, 4)], [1.0, 2.0, 4.0, 5.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,291 @@
+"""Unit tests for the shared bot logging setup."""
+
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+import bot_logging
+from bot_logging import (NonBlockingQueueHandler, ProgressReporter, add_logging_arguments,
+                         configure_from_args, configure_logging, get_logger, shutdown_logging)
+
+
+class ListHandler(logging.Handler):
+    """Keeps every record it is given."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LoggingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger(bot_logging.ROOT_LOGGER)
+        self.saved = (self.root.level, self.root.propagate, list(self.root.handlers))
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        shutdown_logging()
+        level, propagate, handlers = self.saved
+        self.root.setLevel(level)
+        self.root.propagate = propagate
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+        for handler in handlers:
+            self.root.addHandler(handler)
+
+    def lines(self):
+        shutdown_logging()
+        return self.stream.getvalue().splitlines()
+
+
+class TestConfigureLogging(LoggingTestCase):
+
+    def test_json_records_keep_extra_fields(self):
+        configure_logging('DEBUG', 'json', stream=self.stream)
+        get_logger('test').info("Saved %s", 'coin', extra={'item': 'coin', 'outcome': 'ok'})
+        record = json.loads(self.lines()[0])
+        self.assertEqual(record['msg'], 'Saved coin')
+        self.assertEqual(record['level'], 'info')
+        self.assertEqual(record['logger'], 'rooster.test')
+        self.assertEqual(record['item'], 'coin')
+        self.assertEqual(record['outcome'], 'ok')
+        self.assertIn('ts', record)
+
+    def test_json_exception_text(self):
+        configure_logging('INFO', 'json', stream=self.stream)
+        try:
+            raise ValueError('bad frame')
+        except ValueError:
+            get_logger('test').exception("Failed")
+        record = json.loads(self.lines()[0])
+        self.assertIn('ValueError: bad frame', record['exc'])
+
+    def test_text_marks_warnings(self):
+        configure_logging('INFO', 'text', stream=self.stream)
+        log = get_logger('test')
+        log.info("Found %d images", 3)
+        log.warning("No metadata")
+        self.assertEqual(self.lines(), ['Found 3 images', 'WARNING: No metadata'])
+
+    def test_levels_and_quiet(self):
+        configure_logging('INFO', stream=self.stream)
+        log = get_logger('test')
+        log.debug("per item")
+        log.info("summary")
+        self.assertEqual(self.lines(), ['summary'])
+
+        self.stream = io.StringIO()
+        configure_logging('DEBUG', quiet=True, stream=self.stream)
+        log.info("summary")
+        log.error("broken")
+        self.assertEqual(self.lines(), ['ERROR: broken'])
+
+    def test_message_resolved_when_logged(self):
+        configure_logging('INFO', stream=self.stream)
+        values = ['before']
+        get_logger('test').info("Value %s", values)
+        values[0] = 'after'
+        self.assertEqual(self.lines(), ["Value ['before']"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            configure_logging(fmt='xml', stream=self.stream)
+
+    def test_log_file(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'bot.log')
+        configure_logging('INFO', log_file=path)
+        get_logger('test').info("to file")
+        shutdown_logging()
+        with open(path) as f:
+            self.assertEqual(f.read(), 'to file\n')
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'needs fork')
+    def test_forked_worker_logs(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'bot.log')
+        configure_logging('INFO', log_file=path)
+        get_logger('test').info("parent")
+        worker = multiprocessing.get_context('fork').Process(
+            target=get_logger('test').warning, args=("item failed in worker",))
+        worker.start()
+        worker.join(10)
+        self.assertEqual(worker.exitcode, 0)
+        shutdown_logging()
+        with open(path) as f:
+            self.assertEqual(sorted(f.read().splitlines()),
+                             ['WARNING: item failed in worker', 'parent'])
+
+
+class TestNonBlockingQueueHandler(unittest.TestCase):
+
+    def test_full_queue_drops_and_counts(self):
+        handler = NonBlockingQueueHandler(queue.Queue(2))
+        log = logging.getLogger('rooster.test.drops')
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+        for i in range(5):
+            log.info("record %d", i)
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(handler.queue.get_nowait().msg, 'record 0')
+
+    def test_warnings_wait_for_room(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1), wait_seconds=5)
+        log = logging.getLogger('rooster.test.warnings')
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+        log.info("filler")
+        drained = []
+        reader = threading.Thread(target=lambda: [drained.append(handler.queue.get().msg)
+                                                  for _ in range(3)], daemon=True)
+        reader.start()
+        log.warning("disk full")
+        log.error("item failed")
+        reader.join(5)
+        self.assertEqual(drained, ['filler', 'disk full', 'item failed'])
+        self.assertEqual(handler.dropped, 0)
+
+        handler.wait_seconds = 0.01
+        log.info("filler")
+        log.error("nobody reading")
+        self.assertEqual(handler.dropped, 1)
+
+    def test_stalled_queue_waits_once(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1), wait_seconds=0.2)
+        log = logging.getLogger('rooster.test.stalled')
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+        log.info("filler")
+        log.warning("first")
+        start = time.monotonic()
+        for _ in range(5):
+            log.warning("nobody reading")
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertEqual(handler.dropped, 6)
+
+        # Waiting resumes once a record gets through
+        handler.queue.get_nowait()
+        log.warning("room again")
+        self.assertFalse(handler.stalled)
+        self.assertEqual(handler.queue.get_nowait().msg, 'room again')
+
+
+class TestArguments(LoggingTestCase):
+
+    def parse(self, argv):
+        parser = argparse.ArgumentParser()
+        add_logging_arguments(parser)
+        return parser.parse_args(argv)
+
+    def test_config_fills_unset_options(self):
+        args = self.parse([])
+        configure_from_args(args, {'level': 'WARNING'})
+        self.assertEqual(self.root.level, logging.WARNING)
+
+    def test_command_line_overrides_config(self):
+        args = self.parse(['--log-level', 'DEBUG'])
+        configure_from_args(args, {'level': 'WARNING'})
+        self.assertEqual(self.root.level, logging.DEBUG)
+
+    def test_quiet(self):
+        configure_from_args(self.parse(['-q']))
+        self.assertEqual(self.root.level, logging.WARNING)
+
+
+class TestProgressReporter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.handler = ListHandler()
+        self.logger = logging.getLogger('rooster.test.progress')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def reporter(self, total=None):
+        return ProgressReporter(self.logger, total, 'images', interval_seconds=5.0,
+                                clock=lambda: self.now)
+
+    def test_rate_limited(self):
+        progress = self.reporter(total=100)
+        for _ in range(40):
+            self.now += 0.5
+            progress.update()
+        # 20 seconds at one record per 5 seconds
+        self.assertEqual(len(self.handler.records), 4)
+        first = self.handler.records[0]
+        self.assertEqual(first.getMessage(), 'Progress: 10/100 images (2.0/s, ETA 45s)')
+        self.assertEqual(first.progress['done'], 10)
+        self.assertEqual(first.progress['eta_s'], 45.0)
+
+    def test_counters_and_finish(self):
+        progress = self.reporter()
+        progress.update(failed=1)
+        progress.update(failed=0)
+        self.now = 2.0
+        progress.finish()
+        self.assertEqual(len(self.handler.records), 1)
+        record = self.handler.records[0]
+        self.assertEqual(record.getMessage(), 'Finished: 2 images (1.0/s) failed 1')
+        self.assertEqual(record.progress['failed'], 1)
+
+    def test_silent_below_info(self):
+        self.logger.setLevel(logging.WARNING)
+        progress = self.reporter(total=1)
+        self.now = 10.0
+        progress.update()
+        progress.finish()
+        self.assertEqual(self.handler.records, [])
+
+
+class TestAutopilotLogging(LoggingTestCase):
+
+    def test_per_item_messages_are_debug(self):
+        from autopilot_bot import AutopilotBot
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        input_dir = os.path.join(tmp, 'in')
+        os.makedirs(input_dir)
+        for name in ('a', 'b', 'c'):
+            with open(os.path.join(input_dir, f'{name}.jpg'), 'wb') as f:
+                f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+
+        configure_logging('INFO', 'json', stream=self.stream)
+        AutopilotBot().process_batch(input_dir, os.path.join(tmp, 'out'))
+        records = [json.loads(line) for line in self.lines()]
+        self.assertTrue(records)
+        self.assertNotIn('Processing item: a', [r['msg'] for r in records])
+        self.assertTrue(all(r['level'] == 'info' for r in records))
+        finished = [r for r in records if r['msg'].startswith('Finished')]
+        self.assertEqual(finished[0]['progress']['done'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""Unit tests for the bot profiler."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from bot_profiler import (INTERVAL_ENV, PROFILE_ENV, SAMPLE_RATE_ENV, TOP_N_ENV,
+                          BotProfiler)
+
+
+def busy(seconds):
+    """Spin on the CPU for the given number of seconds."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def crop(seconds):
+    """Stand-in for a stage that calls into a hot helper."""
+    busy(seconds)
+
+
+class ProfilerTestCase(unittest.TestCase):
+    """Scratch output directory and a clean profiling environment per test."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        env = {k: v for k, v in os.environ.items()
+               if k not in (PROFILE_ENV, SAMPLE_RATE_ENV, TOP_N_ENV, INTERVAL_ENV)}
+        patcher = mock.patch.dict(os.environ, env, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestFromArgs(ProfilerTestCase):
+    """Test cases for the CLI and environment switches."""
+
+    def test_disabled_by_default(self):
+        """Test profiling is off without --profile or the environment variable."""
+        profiler = BotProfiler.from_args()
+        self.assertFalse(profiler.enabled)
+        with profiler.item('a'), profiler.stage('s'):
+            pass
+        self.assertEqual(profiler.items, [])
+        self.assertEqual(profiler.write_reports(self.root), {})
+
+    def test_env_switch(self):
+        """Test the environment variable enables profiling and picks the mode."""
+        os.environ[PROFILE_ENV] = 'cprofile'
+        self.assertEqual(BotProfiler.from_args().mode, 'cprofile')
+        os.environ[PROFILE_ENV] = '1'
+        profiler = BotProfiler.from_args()
+        self.assertTrue(profiler.enabled)
+        self.assertEqual(profiler.mode, 'sample')
+        os.environ[PROFILE_ENV] = 'off'
+        self.assertFalse(BotProfiler.from_args().enabled)
+        # The command line wins over the environment
+        self.assertEqual(BotProfiler.from_args(profile='sample').mode, 'sample')
+
+    def test_env_numbers(self):
+        """Test numeric settings are read from the environment."""
+        os.environ.update({PROFILE_ENV: '1', SAMPLE_RATE_ENV: '0.25', TOP_N_ENV: '3',
+                           INTERVAL_ENV: '0.01'})
+        profiler = BotProfiler.from_args()
+        self.assertEqual((profiler.item_sample_rate, profiler.top_n, profiler.interval),
+                         (0.25, 3, 0.01))
+        self.assertEqual(BotProfiler.from_args(sample_rate=0.5, top_n=2).top_n, 2)
+
+    def test_malformed_env_falls_back(self):
+        """Test a malformed number logs a warning and uses the default."""
+        os.environ.update({PROFILE_ENV: '1', SAMPLE_RATE_ENV: 'half', TOP_N_ENV: '3.5',
+                           INTERVAL_ENV: ''})
+        with self.assertLogs('rooster.profiler', level='WARNING') as logs:
+            profiler = BotProfiler.from_args()
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual((profiler.item_sample_rate, profiler.top_n, profiler.interval),
+                         (1.0, 10, 0.005))
+
+
+class TestItemSampling(ProfilerTestCase):
+    """Test cases for the per-item sampling rate."""
+
+    def test_sample_rate(self):
+        """Test roughly the requested fraction of items is profiled, deterministically."""
+        profiler = BotProfiler(enabled=True, item_sample_rate=0.3)
+        names = [f"item_{i}" for i in range(2000)]
+        picked = [name for name in names if profiler._should_sample(name)]
+        self.assertAlmostEqual(len(picked) / len(names), 0.3, delta=0.05)
+        self.assertEqual(picked, [name for name in names if profiler._should_sample(name)])
+        self.assertFalse(BotProfiler(enabled=True, item_sample_rate=0)._should_sample('a'))
+        self.assertEqual(BotProfiler(enabled=True, item_sample_rate=7).item_sample_rate, 1.0)
+
+    def test_unsampled_items_are_still_timed(self):
+        """Test items outside the sample keep their timings but are not profiled."""
+        profiler = BotProfiler(enabled=True, item_sample_rate=0)
+        with profiler.item('a'), profiler.stage('load'):
+            pass
+        self.assertEqual(len(profiler.items), 1)
+        self.assertFalse(profiler.items[0]['profiled'])
+        self.assertIn('load', profiler.items[0]['stages'])
+
+
+class TestReports(ProfilerTestCase):
+    """Test cases for the top-N report and collapsed stacks."""
+
+    def test_top_n_report(self):
+        """Test the report lists the slowest items first with stage totals."""
+        profiler = BotProfiler(enabled=True, top_n=2)
+        with profiler.session(self.root):
+            for name, seconds in (('fast', 0.001), ('slow', 0.03), ('mid', 0.01)):
+                with profiler.item(name):
+                    with profiler.stage('work'):
+                        time.sleep(seconds)
+                    with profiler.stage('work'):
+                        pass
+        report = profiler.report()
+        self.assertEqual([r['item_name'] for r in report['slowest_items']], ['slow', 'mid'])
+        self.assertEqual(report['items'], 3)
+        self.assertGreaterEqual(report['stage_totals']['work'], 0.041)
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         ['bot_profile.collapsed', 'bot_profile_report.json'])
+
+    def test_report_is_logged(self):
+        """Test the slowest items go to the profiler logger, not stdout."""
+        profiler = BotProfiler(enabled=True, top_n=1)
+        with profiler.item('only'), profiler.stage('work'):
+            pass
+        with self.assertLogs('rooster.profiler', level='INFO') as logs, \
+                mock.patch('sys.stdout') as stdout:
+            profiler.log_report()
+        self.assertIn('only', logs.output[0])
+        stdout.write.assert_not_called()
+
+    def test_sampled_collapsed_stacks(self):
+        """Test the stack sampler writes root-first stacks with sample counts."""
+        profiler = BotProfiler(enabled=True, interval=0.001, name='cropper')
+        profiler.start()
+        with profiler.item('a'):
+            busy(0.2)
+        written = profiler.write_reports(self.root)
+        with open(written['collapsed']) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any('busy (test_bot_profiler.py' in line.split(';')[-1]
+                            for line in lines))
+
+    def test_cprofile_collapsed_stacks(self):
+        """Test cProfile output is collapsed into caller paths and a pstats file."""
+        profiler = BotProfiler(enabled=True, mode='cprofile', name='cropper')
+        profiler.start()
+        with profiler.item('a'):
+            crop(0.05)
+        written = profiler.write_reports(self.root)
+        self.assertIn('pstats', written)
+        with open(written['collapsed']) as f:
+            stacks = dict(line.rsplit(' ', 1) for line in f.read().splitlines())
+        busy_stacks = [s for s in stacks if s.split(';')[-1].startswith('busy (')]
+        self.assertEqual(len(busy_stacks), 1)
+        self.assertTrue(busy_stacks[0].startswith('crop (test_bot_profiler.py'))
+        self.assertGreater(int(stacks[busy_stacks[0]]), 10000)
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected."""
+        with self.assertRaises(ValueError):
+            BotProfiler(enabled=True, mode='perf')
+
+
+if __name__ == "__main__":
+    unittest.main()
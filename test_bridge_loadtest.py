@@ -0,0 +1,123 @@
+"""Unit tests for the bridge load test harness."""
+
+import io
+import os
+import sys
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from bridge_loadtest import LatencyHistogram, LoadTest, load_bindings, parse_mix
+
+
+class FakeTheme:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def collect_coin(self, amount):
+        with self.lock:
+            self.calls += 1
+        return {'amount': amount}
+
+
+class FakeAPI:
+    def __init__(self):
+        self.mario = FakeTheme()
+
+    def combine(self, formulas):
+        raise RuntimeError('bridge down')
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test cases for the HDR-style histogram."""
+
+    def test_percentiles_within_precision(self):
+        """Test percentiles are kept to within the histogram's precision."""
+        hist = LatencyHistogram()
+        for value in range(1, 100001):
+            hist.record(value * 1000)
+        for percentile, expected in ((50, 50_000_000), (99, 99_000_000), (99.9, 99_900_000)):
+            self.assertAlmostEqual(hist.percentile(percentile) / expected, 1.0, delta=0.01)
+        self.assertEqual(hist.percentile(100), 100_000_000)
+        self.assertEqual(hist.count, 100000)
+
+    def test_small_values_are_exact(self):
+        """Test values below the sub-bucket count are exact."""
+        hist = LatencyHistogram()
+        for value in (3, 7, 7, 200):
+            hist.record(value)
+        self.assertEqual(hist.percentile(50), 7)
+        self.assertEqual(hist.percentile(100), 200)
+
+    def test_merge_and_clamp(self):
+        """Test merged histograms add up and huge values are clamped."""
+        a, b = LatencyHistogram(), LatencyHistogram()
+        a.record(1000)
+        b.record(10 ** 15)
+        a.merge(b)
+        self.assertEqual(a.count, 2)
+        self.assertEqual(a.max, a.max_value)
+        with self.assertRaises(ValueError):
+            a.merge(LatencyHistogram(sub_bits=6))
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test cases for mixes, schedules and runs."""
+
+    def test_parse_mix(self):
+        """Test weights default to 1 and bad mixes are rejected."""
+        self.assertEqual(parse_mix('mario.collect_coin=3, combine'),
+                         [('mario.collect_coin', 3.0), ('combine', 1.0)])
+        for spec in ('', 'combine=0', 'combine=-1'):
+            with self.assertRaises(ValueError):
+                parse_mix(spec)
+
+    def test_unknown_operation(self):
+        """Test an operation the API doesn't have is rejected up front."""
+        with self.assertRaises(ValueError):
+            LoadTest(FakeAPI(), parse_mix('mario.jump'))
+
+    def test_schedule_is_open_loop(self):
+        """Test the plan covers the duration at the rate and follows the weights."""
+        test = LoadTest(FakeAPI(), parse_mix('mario.collect_coin=3,combine=1'), seed=7)
+        plan = test.schedule(2000, 5.0)
+        self.assertAlmostEqual(len(plan) / 10000, 1.0, delta=0.05)
+        self.assertEqual(plan, test.schedule(2000, 5.0))
+        share = sum(1 for _, op in plan if op == 0) / len(plan)
+        self.assertAlmostEqual(share, 0.75, delta=0.03)
+        uniform = LoadTest(FakeAPI(), parse_mix('combine'), arrivals='uniform')
+        self.assertEqual(len(uniform.schedule(100, 1.0)), 99)
+
+    def test_runs_in_both_modes(self):
+        """Test threaded and asyncio runs complete every planned call and count errors."""
+        for mode in ('threads', 'asyncio'):
+            api = FakeAPI()
+            test = LoadTest(api, parse_mix('mario.collect_coin=1,combine=1'), concurrency=4,
+                            mode=mode, seed=3)
+            planned = len(test.schedule(500, 0.3))
+            result = test.run(500, 0.3)
+            self.assertEqual(result['completed'], planned)
+            self.assertEqual(result['errors'] + api.mario.calls, planned)
+            self.assertIn('bridge down', result['error_samples'][0])
+            self.assertGreater(result['response']['p99_ms'], 0)
+
+    def test_sweep_against_bindings(self):
+        """Test a sweep over the real bindings reports saturation."""
+        bindings = load_bindings()
+        with redirect_stdout(io.StringIO()):
+            api = bindings.RoosterAPI()
+        mix = parse_mix('mario.collect_coin=1,electronics.generate_signal=1,combine=1')
+        test = LoadTest(api, mix, concurrency=2, seed=1)
+        report = test.sweep([200, 0], 0.2)
+        self.assertEqual(report['max_sustained_rate'], 200)
+        self.assertEqual(report['runs'][1]['target_rate'], None)
+        self.assertGreater(report['saturation_throughput'], 200)
+        self.assertEqual(report['runs'][0]['errors'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""Unit tests for the theme command registry and Python theme proxies."""
+
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from command_registry import CommandRegistry, parse_theme, to_snake_case
+
+
+THEME_SOURCE = """
+/**
+ * Test Theme - braces { in comments } and strings must not confuse the parser
+ */
+const TestTheme = {
+  name: 'tester',
+  config: { emoji: '🧪', nested: { commands: { fake() {} } } },
+
+  commands: {
+    // shorthand method with defaults
+    measureThing(target = 'a{b', options = {}) {
+      console.log(`measuring ${target} {}`);
+      return { action: 'measureThing' };
+    },
+    async fetchData(url, ...rest) { return {}; },
+    arrowCommand: (x, y) => ({ x, y }),
+    singleArg: value => value,
+    classic: function (a) { return a; },
+    notACommand: 42,
+    label: 'text(with parens) {',
+  },
+
+  onActivate() {}
+};
+module.exports = TestTheme;
+"""
+
+
+def load_bindings():
+    spec = importlib.util.spec_from_file_location('python_bindings',
+                                                  os.path.join(ROOT, 'api', 'python-bindings.py'))
+    module = importlib.util.module_from_spec(spec)
+    with redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestParseTheme(unittest.TestCase):
+    """Test cases for reading commands out of theme sources."""
+
+    def test_parse_command_forms(self):
+        """Test every function property form is found, and only in commands."""
+        parsed = parse_theme(THEME_SOURCE, 'fallback')
+        self.assertEqual(parsed['name'], 'tester')
+        self.assertEqual(parsed['commands'], {
+            'measureThing': ['target', 'options'],
+            'fetchData': ['url', '...rest'],
+            'arrowCommand': ['x', 'y'],
+            'singleArg': ['value'],
+            'classic': ['a']
+        })
+
+    def test_snake_case(self):
+        """Test JS command names map to Python names."""
+        self.assertEqual(to_snake_case('collectCoin'), 'collect_coin')
+        self.assertEqual(to_snake_case('runPCR'), 'run_pcr')
+        self.assertEqual(to_snake_case('jump'), 'jump')
+
+    def test_repo_themes(self):
+        """Test the registry finds the shipped themes and their commands."""
+        registry = CommandRegistry(cache_path='')
+        self.assertIn('mario', registry.themes())
+        self.assertEqual(len(registry.themes()), 11)
+        self.assertIn('collectCoin', registry.commands('mario'))
+        self.assertEqual(registry.resolve('mario', 'collect_coin'), 'collectCoin')
+        self.assertEqual(registry.resolve('mario', 'collectCoin'), 'collectCoin')
+        self.assertIsNone(registry.resolve('mario', 'fly'))
+
+
+class TestManifestCache(unittest.TestCase):
+    """Test cases for the on-disk manifest cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.themes = os.path.join(self.tmp, 'themes')
+        os.makedirs(os.path.join(self.themes, 'tester'))
+        self.theme_file = os.path.join(self.themes, 'tester', 'index.js')
+        with open(self.theme_file, 'w') as f:
+            f.write(THEME_SOURCE)
+        self.cache = os.path.join(self.tmp, 'cache', 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache_reused_until_file_changes(self):
+        """Test theme files are parsed once and again only after they change."""
+        first = CommandRegistry(self.themes, self.cache)
+        self.assertEqual(first.themes(), ['tester'])
+        self.assertEqual(first.stats, {'parsed': 1, 'cached': 0})
+
+        second = CommandRegistry(self.themes, self.cache)
+        self.assertIn('classic', second.commands('tester'))
+        self.assertEqual(second.stats, {'parsed': 0, 'cached': 1})
+
+        with open(self.theme_file, 'a') as f:
+            f.write('\n// edited\n')
+        third = CommandRegistry(self.themes, self.cache)
+        third.load()
+        self.assertEqual(third.stats, {'parsed': 1, 'cached': 0})
+
+
+class TestThemeProxies(unittest.TestCase):
+    """Test cases for the RoosterAPI theme proxies."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bindings = load_bindings()
+
+    def setUp(self):
+        with redirect_stdout(io.StringIO()):
+            self.api = self.bindings.RoosterAPI()
+
+    def test_bound_commands_are_cached(self):
+        """Test snake_case calls dispatch the camelCase command and stay bound."""
+        with redirect_stdout(io.StringIO()):
+            result = self.api.mario.collect_coin(5)
+        self.assertEqual((result['theme'], result['command'], result['args']),
+                         ('mario', 'collectCoin', (5,)))
+        self.assertIs(self.api.mario.collect_coin, self.api.mario.collect_coin)
+        self.assertIn('collect_coin', self.api.mario.commands())
+
+    def test_unknown_command_fails_fast(self):
+        """Test unknown commands raise locally with suggestions."""
+        with self.assertRaises(AttributeError) as ctx:
+            self.api.mario.colect_coin
+        self.assertIn('collect_coin', str(ctx.exception))
+
+    def test_themes_come_from_registry(self):
+        """Test theme listing, switching and status use the discovered themes."""
+        self.assertEqual(self.api.theme.list(), self.api.registry.themes())
+        self.assertEqual(self.api.status()['themes'], 11)
+        with self.assertRaises(ValueError):
+            self.api.theme.switch('atlantis')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+"""Unit tests for the shared-memory frame store."""
+
+import multiprocessing
+import os
+import signal
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from frame_store import FrameStore, np
+
+
+def _read_frame(namespace, handle, queue):
+    store = FrameStore(namespace)
+    store.acquire(handle)
+    frame = store.map(handle)
+    queue.put(int(frame.sum()))
+    del frame
+    store.release(handle)
+    try:
+        store.release(handle)
+    except ValueError:
+        queue.put('not a holder')
+
+
+def _hold_and_crash(namespace, handle, ready):
+    store = FrameStore(namespace)
+    store.acquire(handle)
+    ready.set()
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestFrameStore(unittest.TestCase):
+    """Test cases for publishing, mapping and reference counting."""
+
+    def setUp(self):
+        self.namespace = f'rooster_test_{os.getpid()}'
+        self.store = FrameStore(self.namespace)
+
+    def tearDown(self):
+        for name in self.store.segment_names():
+            self.store._unlink(name)
+        self.store.close()
+
+    def test_map_is_zero_copy(self):
+        """Test mapped arrays view the same memory the publisher wrote."""
+        handle, frame = self.store.create((4, 5, 3))
+        frame[...] = 9
+        view = self.store.map(handle, writable=True)
+        view[0, 0, 0] = 1
+        self.assertEqual(frame[0, 0, 0], 1)
+        self.assertFalse(self.store.map(handle).flags.writeable)
+
+    def test_refcount_and_unlink(self):
+        """Test the frame is unlinked when the last reference is released."""
+        handle = self.store.publish(np.ones((8, 8), dtype=np.uint16))
+        self.store.acquire(handle)
+        self.assertEqual(self.store.refcount(handle), 2)
+        self.assertFalse(self.store.release(handle))
+        self.assertTrue(self.store.release(handle))
+        self.assertEqual(self.store.refcount(handle), 0)
+        self.assertNotIn(handle.name, self.store.segment_names())
+
+    def test_handle_crosses_processes(self):
+        """Test another process maps by handle and only drops its own reference."""
+        handle = self.store.publish(np.full((16, 16), 3, dtype=np.uint8))
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_read_frame, args=(self.namespace, handle, queue))
+        process.start()
+        self.assertEqual(queue.get(timeout=10), 3 * 256)
+        self.assertEqual(queue.get(timeout=10), 'not a holder')
+        process.join()
+        # The creator's reference survives the other process releasing twice
+        self.assertEqual(self.store.refcount(handle), 1)
+        self.assertTrue(self.store.release(handle))
+
+    def test_release_without_reference(self):
+        """Test releasing a frame this process holds no reference to is an error."""
+        handle = self.store.publish(np.zeros(4))
+        self.assertTrue(self.store.release(handle))
+        self.assertFalse(self.store.release(handle))
+        other = self.store.publish(np.zeros(4))
+        self.store._write_holders(self.store._attach(other.name).buf, {1: 1})
+        with self.assertRaises(ValueError):
+            self.store.release(other)
+        self.assertEqual(self.store.refcount(other), 1)
+
+    def test_namespaces_do_not_overlap(self):
+        """Test a namespace's cleanup never touches a namespace it is a prefix of."""
+        other = FrameStore(f'{self.namespace}_extra')
+        try:
+            theirs = other.publish(np.zeros(4))
+            mine = self.store.publish(np.zeros(4))
+            self.assertEqual(self.store.segment_names(), [mine.name])
+            self.assertEqual(self.store.release_process(os.getpid()), 1)
+            self.assertEqual(other.refcount(theirs), 1)
+        finally:
+            for name in other.segment_names():
+                other._unlink(name)
+            other.close()
+
+    def test_crashed_holder_is_reclaimed(self):
+        """Test references held by a killed worker are dropped by sweep."""
+        handle = self.store.publish(np.zeros((32, 32), dtype=np.uint8))
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_hold_and_crash, args=(self.namespace, handle, ready))
+        process.start()
+        process.join()
+        self.assertTrue(ready.is_set())
+        self.assertEqual(self.store.refcount(handle), 2)
+
+        self.assertEqual(self.store.sweep(), 0)
+        self.assertEqual(self.store.refcount(handle), 1)
+        self.assertTrue(self.store.release(handle))
+
+    def test_release_process(self):
+        """Test dropping every reference of one process unlinks its frames."""
+        handles = [self.store.publish(np.zeros(10)) for _ in range(3)]
+        self.assertEqual(self.store.release_process(os.getpid()), 3)
+        self.assertEqual([self.store.refcount(h) for h in handles], [0, 0, 0])
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestAutopilotFrames(unittest.TestCase):
+    """Test the frame store is part of the default pipeline when enabled."""
+
+    def test_default_pipeline_shares_frames(self):
+        """Test the default graph feeds the frames stage into quality and releases frames."""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+        from autopilot_bot import AutopilotBot
+
+        bot = AutopilotBot()
+        self.assertIsNone(bot.frame_store)
+        bot.config['frame_store'] = {'enabled': True,
+                                     'namespace': f'rooster_test_bot_{os.getpid()}'}
+        order = [stage.name for stage in bot.stage_graph.order]
+        self.assertLess(order.index('frames'), order.index('quality'))
+        self.assertIn('frame', bot.stage_graph.producers['frame'].outputs)
+
+        store = bot.frame_store
+        self.assertIsNotNone(store)
+        handle = store.publish(np.zeros((4, 4, 3), dtype=np.uint8))
+        bot.release_frames({'frame': handle, 'title': 'x'})
+        self.assertEqual(store.refcount(handle), 0)
+        store.close()
+
+    def test_failed_publish_releases_the_frame(self):
+        """Test a frame whose pixels can't be copied in is released, not leaked."""
+        import tempfile
+        from unittest import mock
+        import image_cropper_bot
+        from image_cropper_bot import ImageCropperBot
+
+        class Undecodable:
+            mode = 'RGB'
+            size = (4, 4)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def __array__(self, *args, **kwargs):
+                raise OSError('truncated image')
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as photo:
+            store = FrameStore(f'rooster_test_publish_{os.getpid()}')
+            with mock.patch.object(image_cropper_bot, 'Image', mock.Mock()) as image:
+                image.open.return_value = Undecodable()
+                with self.assertRaises(OSError):
+                    ImageCropperBot().publish_frame(photo.name, store)
+            self.assertEqual(store.segment_names(), [])
+            self.assertEqual(store.stats['unlinked'], 1)
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
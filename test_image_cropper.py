@@ -0,0 +1,114 @@
+"""Unit tests for the image cropper bot."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from image_cropper_bot import Image, ImageCropperBot, np
+
+
+@unittest.skipIf(np is None, 'numpy not installed')
+class TestObjectDetection(unittest.TestCase):
+    """Test cases for detecting the object to crop to."""
+
+    def setUp(self):
+        self.bot = ImageCropperBot()
+
+    def frame(self, height=300, width=400, background=(235, 235, 230)):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[...] = background
+        return frame
+
+    def test_detects_object_on_plain_background(self):
+        """Test a dark coin on a light background is found."""
+        frame = self.frame()
+        frame[60:200, 120:280] = (90, 70, 40)
+        self.assertEqual(self.bot.detect_object_bounds(frame), (120, 60, 160, 140))
+
+    def test_large_frames_are_detected_on_a_thumbnail(self):
+        """Test bounds from the strided thumbnail are within one stride of the object."""
+        frame = self.frame(2000, 3000)
+        frame[500:1500, 1000:2100] = (20, 20, 20)
+        x, y, width, height = self.bot.detect_object_bounds(frame)
+        step = 3000 // 512
+        self.assertLessEqual(abs(x - 1000), step)
+        self.assertLessEqual(abs(y - 500), step)
+        self.assertLessEqual(abs(x + width - 2100), step)
+        self.assertLessEqual(abs(y + height - 1500), step)
+
+    def test_specks_and_faint_shading_are_ignored(self):
+        """Test sensor specks and shading below the threshold are not an object."""
+        frame = self.frame()
+        frame[10, 10] = (0, 0, 0)
+        frame[:, 200:] = (225, 225, 220)
+        self.assertIsNone(self.bot.detect_object_bounds(frame))
+
+    def test_no_crop_without_detection(self):
+        """Test the whole frame is kept when nothing is detected or detection is off."""
+        frame = self.frame()
+        self.assertEqual(self.bot.crop_area(frame), (0, 0, 400, 300))
+
+        frame[60:200, 120:280] = (90, 70, 40)
+        self.assertEqual(self.bot.crop_area(frame), (112, 53, 176, 154))
+        self.bot.config['auto_detect_objects'] = False
+        self.assertEqual(self.bot.crop_area(frame), (0, 0, 400, 300))
+
+    def test_object_filling_frame_is_not_cropped(self):
+        """Test a photo that is all object is left whole."""
+        frame = self.frame()
+        frame[1:-1, 1:-1] = (10, 10, 10)
+        frame[0] = frame[-1] = (10, 10, 10)
+        self.assertIsNone(self.bot.detect_object_bounds(frame))
+
+    def test_area_on_reduced_frame_scales_up(self):
+        """Test bounds found on a reduced copy are scaled to the full image."""
+        frame = self.frame()
+        frame[60:200, 120:280] = (90, 70, 40)
+        self.assertEqual(self.bot.crop_area(frame[::2, ::2], (400, 300)), (112, 53, 176, 154))
+        self.assertEqual(self.bot.crop_area(self.frame(150, 200), (400, 300)), (0, 0, 400, 300))
+
+
+@unittest.skipIf(np is None or Image is None, 'numpy and Pillow not installed')
+class TestCropPixels(unittest.TestCase):
+    """Test cases for cropping and resizing real images."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.bot = ImageCropperBot()
+
+    def write_photo(self, width, height, box, mode='RGB'):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[...] = (235, 235, 230)
+        x0, y0, x1, y1 = box
+        frame[y0:y1, x0:x1] = (90, 70, 40)
+        path = os.path.join(self.tmp, 'coin.png')
+        Image.fromarray(frame).convert(mode).save(path)
+        return path
+
+    def test_crop_is_padded_object(self):
+        """Test the saved photo is the object plus padding."""
+        path = self.write_photo(400, 300, (120, 60, 280, 200))
+        output = os.path.join(self.tmp, 'out.png')
+        self.bot.config['output_format'] = 'png'
+        self.bot._crop_pixels(path, output)
+        with Image.open(output) as out:
+            self.assertEqual(out.size, (176, 154))
+
+    def test_large_crop_is_downscaled(self):
+        """Test a crop beyond max_output_side is resized from the decoded photo."""
+        path = self.write_photo(3000, 2000, (500, 400, 2500, 1400), mode='RGBA')
+        output = os.path.join(self.tmp, 'out.png')
+        self.bot.config.update({'output_format': 'png', 'max_output_side': 1000})
+        self.bot._crop_pixels(path, output)
+        with Image.open(output) as out:
+            self.assertEqual(max(out.size), 1000)
+            self.assertAlmostEqual(out.size[0] / out.size[1], 2200 / 1100, delta=0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
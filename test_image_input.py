@@ -0,0 +1,158 @@
+"""Unit tests for directory and archive image input."""
+
+import io
+import os
+import shutil
+import struct
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from image_input import (ArchiveMember, _reader, batch_input, close_archives, find_images, image_exists,
+                         open_image, probe_items)
+
+
+def png(width, height):
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sIIBBBBB', 13, b'IHDR', width, height, 8, 2, 0, 0, 0)
+            + b'\x00' * 4 + struct.pack('>I4s', 0, b'IDAT'))
+
+
+FILES = {
+    'coins/1921-morgan.png': png(1200, 1000),
+    'coins/1964-kennedy.png': png(400, 300),
+    'coins/notes.txt': b'not an image',
+    'coins/fake.jpg': b'text pretending to be a jpeg',
+}
+
+
+class TestImageInput(unittest.TestCase):
+    """Test cases for finding, opening and probing images in every input kind."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dir = os.path.join(self.tmp, 'dir')
+        for name, data in FILES.items():
+            path = os.path.join(self.dir, os.path.basename(name))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+        self.zip = os.path.join(self.tmp, 'batch.zip')
+        with zipfile.ZipFile(self.zip, 'w') as z:
+            for name, data in FILES.items():
+                z.writestr(name, data)
+
+        self.tar = os.path.join(self.tmp, 'batch.tar.gz')
+        with tarfile.open(self.tar, 'w:gz') as t:
+            for name, data in FILES.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                t.addfile(info, io.BytesIO(data))
+
+    def tearDown(self):
+        close_archives()
+        shutil.rmtree(self.tmp)
+
+    def test_same_filtering_for_every_input(self):
+        """Test extension and magic filtering match across directory, ZIP and TAR."""
+        for source in (self.dir, self.zip, self.tar):
+            names = sorted(item.name for item in find_images(source))
+            self.assertEqual(names, ['1921-morgan.png', '1964-kennedy.png'], source)
+
+    def test_archive_members_open_by_pseudo_path(self):
+        """Test archive members open in place through their pseudo path."""
+        for archive in (self.zip, self.tar):
+            members = find_images(archive)
+            self.assertIsInstance(members[0], ArchiveMember)
+            self.assertEqual(members[0].stem, '1921-morgan')
+            self.assertTrue(image_exists(str(members[0])))
+            with open_image(str(members[1])) as f:
+                self.assertEqual(f.read(), FILES['coins/1964-kennedy.png'])
+
+        with self.assertRaises(FileNotFoundError):
+            open_image(self.zip + '!/coins/missing.png')
+
+    def test_probe_items(self):
+        """Test header probing works for archive members."""
+        for archive in (self.zip, self.tar):
+            probes = probe_items(find_images(archive))
+            self.assertEqual([p.display_size for p in probes], [(1200, 1000), (400, 300)])
+
+    def test_spooled_tar_reads_in_any_order(self):
+        """Test a spooled TAR is read out of order and concurrently from one decompression."""
+        with batch_input(self.tar, spool=True):
+            first, second = (str(m) for m in find_images(self.tar))
+            reader = _reader(self.tar)
+            for path in (second, first, second, first):
+                with open_image(path) as f:
+                    self.assertEqual(f.read(), FILES[path.split('!/', 1)[1]])
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                reads = list(executor.map(lambda p: open_image(p).read(), [second, first] * 8))
+            self.assertEqual(reads, [FILES['coins/1964-kennedy.png'],
+                                     FILES['coins/1921-morgan.png']] * 8)
+            self.assertEqual(reader.spools, 1)
+
+    def test_streamed_tar_is_read_in_archive_order(self):
+        """Test a compressed TAR is listed, probed and read in two sequential passes."""
+        with batch_input(self.tar):
+            reader = _reader(self.tar)
+            reader.window = 1
+            members = find_images(self.tar)
+            self.assertEqual([p.display_size for p in probe_items(members)], [(1200, 1000), (400, 300)])
+            self.assertEqual(reader.passes, 1)
+            for member in members:
+                for _ in range(2):
+                    with open_image(member) as f:
+                        self.assertEqual(f.read(), FILES[member.member])
+            self.assertEqual(reader.passes, 2)
+
+    def test_stream_goes_back_only_past_its_window(self):
+        """Test recent members are re-read from memory and older ones restart the stream."""
+        archive = os.path.join(self.tmp, 'many.tgz')
+        with tarfile.open(archive, 'w:gz') as t:
+            for i in range(6):
+                data = png(10 + i, 10)
+                info = tarfile.TarInfo(f'{i}.png')
+                info.size = len(data)
+                t.addfile(info, io.BytesIO(data))
+        with batch_input(archive):
+            reader = _reader(archive)
+            reader.window = 2
+            members = find_images(archive)
+            for member in members[:5]:
+                open_image(member).close()
+            with open_image(members[3]) as f:
+                self.assertEqual(f.read(), png(13, 10))
+            self.assertEqual(reader.passes, 2)
+            with self.assertLogs('rooster.image_input', level='WARNING'):
+                with open_image(members[0]) as f:
+                    self.assertEqual(f.read(), png(10, 10))
+            self.assertEqual(reader.passes, 3)
+        self.assertIsNone(reader._tar)
+
+    def test_member_reads_are_bounded_and_seekable(self):
+        """Test a member handle stops at the member's end and seeks within it."""
+        with open_image(str(find_images(self.tar)[1])) as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+            f.seek(0)
+            self.assertEqual(f.read(), FILES['coins/1964-kennedy.png'])
+            self.assertEqual(f.read(), b'')
+
+    def test_last_batch_removes_spool(self):
+        """Test a spool outlives one batch while another still reads the archive."""
+        with batch_input(self.tar, spool=True):
+            with batch_input(self.tar):
+                find_images(self.tar)
+                spool = _reader(self.tar)._spool
+            self.assertTrue(os.path.exists(spool))
+            with open_image(str(find_images(self.tar)[0])) as f:
+                self.assertEqual(f.read(), FILES['coins/1921-morgan.png'])
+        self.assertFalse(os.path.exists(spool))
+
+if __name__ == "__main__":
+    unittest.main()
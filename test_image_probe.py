@@ -0,0 +1,100 @@
+"""Unit tests for the image probe module."""
+
+import io
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from image_probe import probe_stream, screen
+
+
+def exif_block(orientation, endian='<'):
+    """Build a minimal TIFF structure holding one Orientation entry."""
+    order = b'II' if endian == '<' else b'MM'
+    return (order + struct.pack(endian + 'HI', 42, 8) + struct.pack(endian + 'H', 1)
+            + struct.pack(endian + 'HHIHH', 274, 3, 1, orientation, 0) + b'\x00' * 4)
+
+
+def jpeg(width, height, orientation=None):
+    data = b'\xff\xd8'
+    data += b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    if orientation:
+        payload = b'Exif\x00\x00' + exif_block(orientation, '>')
+        data += b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+    data += b'\xff\xc2' + struct.pack('>HBHHB', 11, 8, height, width, 3) + b'\x00' * 6
+    return data + b'\xff\xda'
+
+
+def png(width, height, orientation=None):
+    data = b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sIIBBBBB', 13, b'IHDR', width, height, 8, 2, 0, 0, 0)
+    data += b'\x00' * 4
+    if orientation:
+        payload = exif_block(orientation)
+        data += struct.pack('>I4s', len(payload), b'eXIf') + payload + b'\x00' * 4
+    return data + struct.pack('>I4s', 0, b'IDAT')
+
+
+class TestImageProbe(unittest.TestCase):
+    """Test cases for header probing."""
+
+    def probe(self, data):
+        return probe_stream(io.BytesIO(data), 'test')
+
+    def test_jpeg_with_exif_orientation(self):
+        """Test a progressive JPEG with an EXIF rotate-90 orientation."""
+        result = self.probe(jpeg(4000, 3000, orientation=6))
+        self.assertEqual((result.format, result.width, result.height), ('jpeg', 4000, 3000))
+        self.assertEqual(result.orientation, 6)
+        self.assertTrue(result.rotated)
+        self.assertEqual(result.display_size, (3000, 4000))
+
+    def test_png(self):
+        """Test PNG IHDR dimensions and eXIf orientation."""
+        result = self.probe(png(1024, 768, orientation=3))
+        self.assertEqual((result.format, result.width, result.height), ('png', 1024, 768))
+        self.assertEqual(result.display_size, (1024, 768))
+        self.assertEqual(result.orientation, 3)
+
+    def test_webp_variants(self):
+        """Test lossy, lossless and extended WebP headers."""
+        vp8 = b'RIFF\x00\x00\x00\x00WEBPVP8 ' + struct.pack('<I', 10) + b'\x00\x00\x00\x9d\x01\x2a' + struct.pack('<HH', 640, 480)
+        self.assertEqual(self.probe(vp8).display_size, (640, 480))
+
+        bits = (640 - 1) | ((480 - 1) << 14)
+        vp8l = b'RIFF\x00\x00\x00\x00WEBPVP8L' + struct.pack('<I', 5) + b'\x2f' + struct.pack('<I', bits)
+        self.assertEqual(self.probe(vp8l).display_size, (640, 480))
+
+        vp8x = (b'RIFF\x00\x00\x00\x00WEBPVP8X' + struct.pack('<I', 10) + b'\x08\x00\x00\x00'
+                + (2000 - 1).to_bytes(3, 'little') + (1000 - 1).to_bytes(3, 'little'))
+        exif = exif_block(8)
+        vp8x += b'EXIF' + struct.pack('<I', len(exif)) + exif
+        result = self.probe(vp8x)
+        self.assertEqual((result.width, result.height, result.orientation), (2000, 1000, 8))
+
+    def test_tiff_and_bmp(self):
+        """Test TIFF IFD0 and BMP info headers."""
+        tiff = (b'II' + struct.pack('<HI', 42, 8) + struct.pack('<H', 2)
+                + struct.pack('<HHII', 256, 4, 1, 5000) + struct.pack('<HHIHH', 257, 3, 1, 3000, 0)
+                + b'\x00' * 4)
+        self.assertEqual(self.probe(tiff).display_size, (5000, 3000))
+
+        bmp = b'BM' + b'\x00' * 12 + struct.pack('<Iii', 40, 800, -600)
+        self.assertEqual(self.probe(bmp).display_size, (800, 600))
+
+    def test_unknown_and_corrupt(self):
+        """Test unknown formats and truncated headers return None."""
+        self.assertIsNone(self.probe(b'not an image'))
+        self.assertIsNone(self.probe(jpeg(10, 10)[:20]))
+
+    def test_screen(self):
+        """Test minimum dimensions apply to the displayed orientation."""
+        self.assertIsNone(screen(self.probe(jpeg(1000, 900)), 800, 800))
+        self.assertIn('undersized', screen(self.probe(jpeg(1000, 600, orientation=6)), 800, 800))
+        self.assertIsNone(screen(None, 800, 800))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""Unit tests for the index valuation module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from index_valuation import IndexValuation
+from rooster_token import Token, TokenColor
+
+
+class TestIndexValuation(unittest.TestCase):
+    """Test cases for the IndexValuation class."""
+
+    def setUp(self):
+        """Set up a scratch copy of the index files."""
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, 'index_value.json'), 'w') as f:
+            json.dump({'operator': 'test', 'mongoose_delta': 0, 'daily_growth': 5,
+                       'current_index_value': 110, 'last_update': '2025-12-23T00:00:00Z'}, f)
+        with open(os.path.join(self.root, 'c13b0_pricing.json'), 'w') as f:
+            json.dump({'base': 10, 'growth_multiplier': 1.0}, f)
+        self.origin = datetime(2025, 12, 23)
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.root)
+
+    def test_daily_growth(self):
+        """Test the index grows by daily_growth per day with no additions."""
+        valuation = IndexValuation(self.root)
+        self.assertEqual(valuation.value_at(self.origin), 110)
+        self.assertEqual(valuation.value_at(self.origin + timedelta(days=2)), 120)
+        self.assertIsNone(valuation.value_at(self.origin - timedelta(days=1)))
+
+    def test_incremental_additions(self):
+        """Test tokens and listings move the index by amount / base."""
+        valuation = IndexValuation(self.root)
+        token = Token(1054, 2593, TokenColor.RED, self.origin)
+        value = valuation.add_token(token, self.origin + timedelta(hours=1))
+        self.assertAlmostEqual(value, 110 + 5 / 24 + 259.3)
+        valuation.add_listing('silver_coin_1', 36.0, self.origin + timedelta(hours=2))
+        self.assertAlmostEqual(valuation.mongoose_delta, 262.9)
+
+        # Point-in-time queries see only the additions made before them
+        self.assertAlmostEqual(valuation.value_at(self.origin + timedelta(minutes=90)),
+                               110 + 5 * 1.5 / 24 + 259.3)
+
+    def test_token_defaults_to_its_datetime(self):
+        """Test a token is added at its own timestamp unless told otherwise."""
+        valuation = IndexValuation(self.root)
+        token = Token(1054, 100, TokenColor.RED, self.origin + timedelta(days=1))
+        self.assertEqual(valuation.add_token(token), 125)
+        self.assertEqual(valuation.value_at(self.origin + timedelta(hours=12)), 112.5)
+
+    def test_batch_is_one_append(self):
+        """Test a batch of tokens is checked as a whole and appended together."""
+        valuation = IndexValuation(self.root)
+        late = Token(2, 10, TokenColor.RED, self.origin + timedelta(hours=2))
+        early = Token(3, 10, TokenColor.RED, self.origin + timedelta(hours=1))
+        with self.assertRaises(ValueError):
+            valuation.add_tokens([late, early])
+        self.assertEqual(valuation.counts['token'], 0)
+        self.assertFalse(os.path.exists(valuation.log_path))
+        valuation.add_tokens([early, late])
+        self.assertEqual(IndexValuation(self.root).counts['token'], 2)
+
+    def test_opening_writes_nothing(self):
+        """Test loading and querying the index leave the directory untouched."""
+        before = sorted(os.listdir(self.root))
+        valuation = IndexValuation(self.root)
+        valuation.summary()
+        self.assertEqual(sorted(os.listdir(self.root)), before)
+
+    def test_append_only(self):
+        """Test additions earlier than the last one are rejected."""
+        valuation = IndexValuation(self.root)
+        valuation.add_listing('a', 10, self.origin + timedelta(hours=2))
+        with self.assertRaises(ValueError):
+            valuation.add_listing('b', 10, self.origin + timedelta(hours=1))
+
+    def test_reload_and_save(self):
+        """Test the log is replayed on load and saves preserve other keys."""
+        valuation = IndexValuation(self.root)
+        valuation.add_listing('a', 50, self.origin + timedelta(days=1))
+        valuation.save(self.origin + timedelta(days=1))
+
+        reloaded = IndexValuation(self.root)
+        self.assertEqual(reloaded.counts['listing'], 1)
+        self.assertEqual(reloaded.value_at(self.origin + timedelta(days=1)), 120)
+
+        with open(os.path.join(self.root, 'index_value.json')) as f:
+            data = json.load(f)
+        self.assertEqual(data['operator'], 'test')
+        self.assertEqual(data['current_index_value'], 120)
+        self.assertEqual(data['mongoose_delta'], 5)
+        with open(os.path.join(self.root, 'C13B0_STATE.json')) as f:
+            self.assertEqual(json.load(f)['current_index_value'], 120)
+
+    def test_torn_tail_is_truncated(self):
+        """Test a torn final record is cut off so later appends are replayed."""
+        valuation = IndexValuation(self.root)
+        valuation.add_listing('a', 50, self.origin + timedelta(hours=1))
+        log_path = valuation.log_path
+        with open(log_path, 'a') as f:
+            f.write('{"kind": "listing", "ts": 17')
+
+        size = os.path.getsize(log_path)
+        reopened = IndexValuation(self.root)
+        self.assertEqual(reopened.counts['listing'], 1)
+        self.assertEqual(os.path.getsize(log_path), size)
+        reopened.add_listing('b', 20, self.origin + timedelta(hours=2))
+
+        reloaded = IndexValuation(self.root)
+        self.assertEqual(reloaded.counts['listing'], 2)
+        self.assertAlmostEqual(reloaded.mongoose_delta, 7)
+        with open(log_path) as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+
+    def test_unterminated_record_is_torn(self):
+        """Test a complete record missing its newline is treated as torn."""
+        valuation = IndexValuation(self.root)
+        with open(valuation.log_path, 'a') as f:
+            f.write(json.dumps({'kind': 'listing', 'ts': valuation.origin_time, 'ref': 'x',
+                                'amount': 10.0, 'delta': 1.0}))
+        reopened = IndexValuation(self.root)
+        self.assertEqual(reopened.counts['listing'], 0)
+        reopened.add_listing('b', 20, self.origin + timedelta(hours=2))
+        self.assertEqual(IndexValuation(self.root).counts['listing'], 1)
+
+    def test_persisted_mongoose_delta(self):
+        """Test the recorded mongoose_delta carries on without moving the origin value."""
+        with open(os.path.join(self.root, 'index_value.json'), 'w') as f:
+            json.dump({'mongoose_delta': 12.5, 'daily_growth': 0,
+                       'current_index_value': 110, 'last_update': '2025-12-23T00:00:00Z'}, f)
+        valuation = IndexValuation(self.root)
+        self.assertEqual(valuation.mongoose_delta, 12.5)
+        self.assertEqual(valuation.add_listing('a', 50, self.origin + timedelta(hours=1)), 115)
+        self.assertEqual(valuation.mongoose_delta, 17.5)
+
+        reloaded = IndexValuation(self.root)
+        self.assertEqual(reloaded.mongoose_delta, 17.5)
+        self.assertEqual(reloaded.value_at(self.origin + timedelta(hours=1)), 115)
+
+    def test_save_before_origin(self):
+        """Test saving at a time before the origin persists the origin value."""
+        valuation = IndexValuation(self.root)
+        valuation.save(self.origin - timedelta(days=3))
+        with open(os.path.join(self.root, 'index_value.json')) as f:
+            data = json.load(f)
+        self.assertEqual(data['current_index_value'], 110)
+        self.assertEqual(data['last_update'], '2025-12-23T00:00:00Z')
+
+    def test_batch_listings_are_valued(self):
+        """Test the autopilot adds successful priced listings and saves the index."""
+        import sys
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+        from autopilot_bot import AutopilotBot
+
+        bot = AutopilotBot()
+        bot.config['index_valuation'] = {'enabled': True, 'root_dir': self.root}
+        bot.value_listings([
+            {'item_name': 'a', 'success': True, 'pricing': {'reserve_price': 30.0}},
+            {'item_name': 'b', 'success': True, 'pricing': None},
+            {'item_name': 'c', 'success': False, 'pricing': {'reserve_price': 99.0}}])
+        self.assertEqual(bot.results['index_valuation']['listings'], 1)
+        reloaded = IndexValuation(self.root)
+        self.assertEqual(reloaded.counts['listing'], 1)
+        self.assertEqual(reloaded.mongoose_delta, 3)
+        with open(os.path.join(self.root, 'index_value.json')) as f:
+            self.assertEqual(json.load(f)['mongoose_delta'], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+"""Unit tests for the HTTP ingest server."""
+
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from ingest_server import IngestService
+
+
+class FakeHandlerFactory:
+    """Builds handlers that record items and can be held to fill the queue."""
+
+    def __init__(self):
+        self.built = 0
+        self.items = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.built += 1
+
+        def handle(payload):
+            image_path, output_dir, metadata = payload
+            self.gate.wait(10)
+            with open(image_path, 'rb') as f:
+                size = len(f.read())
+            with self.lock:
+                self.items.append(payload)
+            return {'item_name': os.path.basename(image_path), 'success': True, 'size': size,
+                    'outputs': {'title': (metadata or {}).get('title', 'Untitled')},
+                    'counters': {'processed_images': 1}}
+        return handle
+
+
+class TestIngestServer(unittest.TestCase):
+    """Test cases for uploads, batches, backpressure and metrics."""
+
+    def setUp(self):
+        """Start a service on an ephemeral port in a background event loop."""
+        self.tmp = tempfile.mkdtemp()
+        self.factory = FakeHandlerFactory()
+        self.service = IngestService(
+            os.path.join(self.tmp, 'out'),
+            {'workers': 1, 'queue_size': 2, 'max_upload_mb': 8, 'batch_roots': [self.tmp]},
+            handler_factory=self.factory)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.service.start(port=0), self.loop).result(10)
+        self.port = self.service.address[1]
+
+    def tearDown(self):
+        """Stop the service and remove the scratch directory."""
+        self.factory.gate.set()
+        asyncio.run_coroutine_threadsafe(self.service.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+        self.loop.close()
+        shutil.rmtree(self.tmp)
+
+    def request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+            content_type = response.getheader('Content-Type', '')
+            payload = json.loads(data) if content_type.startswith('application/json') \
+                else data.decode()
+            return response.status, payload, dict(response.getheaders())
+        finally:
+            conn.close()
+
+    def wait_for(self, predicate):
+        deadline = time.time() + 10
+        while not predicate():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+    def test_upload_returns_listing(self):
+        """Test an upload is processed by a warm bot and its listing returned."""
+        body = os.urandom(3 * 1024 * 1024 + 7)
+        status, job, _ = self.request(
+            'POST', '/listings?name=morgan%201921',
+            body=body, headers={'Content-Type': 'image/jpeg',
+                                'X-Item-Metadata': json.dumps({'title': '1921 Morgan'})})
+        self.assertEqual(status, 200)
+        self.assertEqual(job['state'], 'done')
+        self.assertEqual(job['result']['size'], len(body))
+        self.assertEqual(job['result']['item_name'], 'morgan_1921.jpg')
+        self.assertEqual(job['result']['outputs']['title'], '1921 Morgan')
+        image_path, output_dir, _ = self.factory.items[0]
+        self.assertEqual(output_dir, os.path.join(self.service.output_dir, job['job_id']))
+        self.assertFalse(os.path.exists(image_path))
+        self.assertEqual(self.factory.built, 1)
+        self.assertEqual(self.request('GET', f"/jobs/{job['job_id']}")[1]['state'], 'done')
+
+    def test_bad_requests(self):
+        """Test oversized uploads, bad metadata and unknown paths are refused."""
+        # Refused from the headers alone, before any of the body is read
+        status, _, _ = self.request('POST', '/listings', body=b'x',
+                                    headers={'Content-Length': str(9 * 1024 * 1024)})
+        self.assertEqual(status, 413)
+        status, _, _ = self.request('POST', '/listings?metadata=[1]', body=b'x')
+        self.assertEqual(status, 400)
+        self.assertEqual(self.request('GET', '/jobs/nope')[0], 404)
+        self.assertEqual(self.request('GET', '/listings')[0], 405)
+
+    def test_malformed_request_line(self):
+        """Test a malformed request line is answered with 400 before the connection closes."""
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(b'NONSENSE\r\n\r\n')
+            reply = sock.makefile('rb').read()
+        self.assertTrue(reply.startswith(b'HTTP/1.1 400 '), reply)
+        self.assertEqual(self.service.metrics['requests'], {'malformed 400': 1})
+
+    def test_full_queue_answers_429(self):
+        """Test submissions beyond the queue are refused until it drains."""
+        self.factory.gate.clear()
+        jobs = []
+        for _ in range(3):
+            status, job, _ = self.request('POST', '/listings?wait=0', body=b'img')
+            self.assertEqual(status, 202)
+            jobs.append(job['job_id'])
+            # The first job leaves the queue for the worker, which is held
+            self.wait_for(lambda: self.service.running == 1)
+        status, body, headers = self.request('POST', '/listings?wait=0', body=b'img')
+        self.assertEqual(status, 429)
+        self.assertIn('Retry-After', headers)
+        self.factory.gate.set()
+        self.wait_for(lambda: self.service.metrics['jobs_completed'] == 3)
+        self.assertEqual(self.request('POST', '/listings', body=b'img')[0], 200)
+
+    def test_batch_submit(self):
+        """Test a batch of files on disk is queued whole and tracked."""
+        paths = []
+        for i in range(2):
+            paths.append(os.path.join(self.tmp, f'coin{i}.jpg'))
+            with open(paths[-1], 'wb') as f:
+                f.write(b'img' * (i + 1))
+        items = [{'image_path': path, 'metadata': {'title': f'Coin {i}'}}
+                 for i, path in enumerate(paths)]
+        status, batch, headers = self.request('POST', '/batch', body=json.dumps({'items': items}))
+        self.assertEqual(status, 202)
+        self.assertEqual(headers['Location'], f"/batches/{batch['batch_id']}")
+
+        def complete():
+            return self.request('GET', f"/batches/{batch['batch_id']}")[1]['complete']
+        self.wait_for(complete)
+        progress = self.request('GET', f"/batches/{batch['batch_id']}")[1]
+        self.assertEqual(progress['states'], {'done': 2})
+        self.assertEqual(sorted(job['result']['size'] for job in progress['jobs']), [3, 6])
+        # Inputs named by path are left in place
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        # More items than the queue holds could never fit, so they are not told to retry
+        too_many = json.dumps({'items': items * 2})
+        status, error, headers = self.request('POST', '/batch', body=too_many)
+        self.assertEqual(status, 413)
+        self.assertIn('queue_size', error['error'])
+        self.assertNotIn('Retry-After', headers)
+        outside = json.dumps({'items': [{'image_path': '/etc/hostname'}]})
+        self.assertEqual(self.request('POST', '/batch', body=outside)[0], 403)
+
+    def test_batches_need_roots(self):
+        """Test batches are refused while no batch roots are configured."""
+        path = os.path.join(self.tmp, 'coin.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'img')
+        self.service.batch_roots = []
+        body = json.dumps({'items': [{'image_path': path}]})
+        status, error, _ = self.request('POST', '/batch', body=body)
+        self.assertEqual(status, 403)
+        self.assertIn('batch_roots', error['error'])
+
+    def test_finished_batches_are_forgotten(self):
+        """Test a batch is dropped once its jobs have been forgotten."""
+        self.service.settings['max_finished_jobs'] = 1
+        path = os.path.join(self.tmp, 'coin.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'img')
+        body = json.dumps({'items': [{'image_path': path}]})
+        batches = []
+        for _ in range(3):
+            batch = self.request('POST', '/batch', body=body)[1]
+            self.wait_for(lambda: self.request(
+                'GET', f"/batches/{batch['batch_id']}")[1]['complete'])
+            batches.append(batch['batch_id'])
+        self.assertEqual(list(self.service.batches), batches[-1:])
+        self.assertEqual(self.request('GET', f'/batches/{batches[0]}')[0], 404)
+
+    def test_metrics(self):
+        """Test /metrics reports counters and latency summaries."""
+        self.request('POST', '/listings', body=b'img')
+        status, text, _ = self.request('GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn('rooster_ingest_jobs_total{state="done"} 1', text)
+        self.assertIn('rooster_ingest_requests_total{endpoint="/listings",status="200"} 1', text)
+        self.assertIn('rooster_ingest_processing_seconds_count 1', text)
+        self.assertIn('rooster_ingest_bot_items_total{counter="processed_images"} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
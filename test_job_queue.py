@@ -0,0 +1,354 @@
+"""Unit tests for the shared job queue."""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from job_queue import JobQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def queue_worker(path, worker_id, crash_after, done_path):
+    """Worker process: claim and complete until the queue is empty."""
+    queue = JobQueue(path, worker_id=worker_id, lease_seconds=0.5, heartbeat_seconds=0.1)
+    queue.start_heartbeat()
+    claimed = 0
+    with open(done_path, 'w') as done:
+        while True:
+            leases = queue.claim()
+            if not leases:
+                if not queue.remaining():
+                    break
+                time.sleep(0.05)
+                continue
+            claimed += 1
+            if claimed == crash_after:
+                # Die holding the lease: no release, no more heartbeats
+                done.flush()
+                os._exit(1)
+            if queue.complete(leases[0], {'worker': worker_id}):
+                done.write(leases[0].job_id + '\n')
+    queue.close()
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for leases, heartbeats, expiry and completions."""
+
+    def setUp(self):
+        """Set up a scratch queue shared by two workers on a fake clock."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'queue.sqlite3')
+        self.clock = FakeClock()
+        self.a = self.open('a')
+        self.b = self.open('b')
+
+    def tearDown(self):
+        """Close the queues and remove the scratch directory."""
+        self.a.close()
+        self.b.close()
+        shutil.rmtree(self.tmp)
+
+    def open(self, worker_id, **kwargs):
+        kwargs.setdefault('lease_seconds', 10)
+        kwargs.setdefault('backoff_seconds', 1)
+        return JobQueue(self.path, worker_id=worker_id, clock=self.clock, **kwargs)
+
+    def test_enqueue_is_idempotent(self):
+        """Test every worker can enqueue the same list without duplicates."""
+        jobs = [(f'item{i}', {'n': i}) for i in range(5)]
+        self.assertEqual(self.a.enqueue(jobs), 5)
+        self.assertEqual(self.b.enqueue(jobs), 0)
+        self.assertEqual(self.a.counts()['pending'], 5)
+
+    def test_claims_are_exclusive(self):
+        """Test two workers never hold the same item."""
+        self.a.enqueue([(f'item{i}', i) for i in range(4)])
+        first = self.a.claim(3)
+        second = self.b.claim(3)
+        self.assertEqual([lease.job_id for lease in first], ['item0', 'item1', 'item2'])
+        self.assertEqual([lease.job_id for lease in second], ['item3'])
+        self.assertEqual(second[0].payload, 3)
+        self.assertEqual(self.a.claim(), [])
+
+    def test_expired_lease_is_taken_over_and_fenced(self):
+        """Test a dead worker's item is reclaimed and its late completion refused."""
+        self.a.enqueue([('item', None)])
+        stale = self.a.claim()[0]
+        self.clock.now += 11
+        fresh = self.b.claim()[0]
+        self.assertEqual((fresh.token, fresh.attempts), (2, 2))
+        self.assertFalse(self.a.complete(stale, 'late'))
+        self.assertTrue(self.b.complete(fresh, 'on time'))
+        self.assertFalse(self.b.complete(fresh, 'again'))
+        completions = self.a.completions()
+        self.assertEqual(list(completions), ['item'])
+        self.assertEqual(completions['item']['worker_id'], 'b')
+        self.assertEqual(completions['item']['result'], 'on time')
+        self.assertEqual(self.b.stats['reclaimed'], 1)
+        self.assertEqual(self.a.stats['stale_completions'], 1)
+
+    def test_heartbeat_keeps_lease(self):
+        """Test heartbeats stop a slow item from being reclaimed."""
+        self.a.enqueue([('item', None)])
+        lease = self.a.claim()[0]
+        for _ in range(5):
+            self.clock.now += 8
+            self.assertEqual(self.a.heartbeat(), 1)
+            self.assertEqual(self.b.claim(), [])
+        self.assertTrue(self.a.complete(lease))
+        self.assertEqual(self.a.workers()[0]['completed'], 1)
+
+    def test_background_heartbeat(self):
+        """Test the heartbeat thread renews leases on its own connection."""
+        queue = JobQueue(self.path, worker_id='c', lease_seconds=0.4, heartbeat_seconds=0.05)
+        other = JobQueue(self.path, worker_id='d', lease_seconds=0.4)
+        try:
+            queue.enqueue([('item', None)])
+            with queue:
+                lease = queue.claim()[0]
+                time.sleep(1.0)
+                self.assertEqual(other.claim(), [])
+                self.assertTrue(queue.complete(lease))
+            self.assertGreater(queue.stats['heartbeats'], 5)
+        finally:
+            queue.close()
+            other.close()
+
+    def test_failures_back_off_then_fail(self):
+        """Test failed items are retried after backoff until max_attempts."""
+        self.a.enqueue([('item', None)])
+        self.assertEqual(self.a.fail(self.a.claim()[0], 'boom'), 'pending')
+        self.assertEqual(self.a.claim(), [])
+        self.clock.now += 1.5
+        self.assertEqual(self.a.fail(self.a.claim()[0], 'boom'), 'pending')
+        self.clock.now += 2.5
+        self.assertEqual(self.a.fail(self.a.claim()[0], 'boom again'), 'failed')
+        self.assertEqual(self.a.failures(), {'item': 'boom again'})
+        self.assertEqual(self.a.remaining(), 0)
+        self.assertEqual(self.a.retry_failed(), 1)
+        self.assertEqual(self.a.claim()[0].attempts, 1)
+
+    def test_repeatedly_expiring_item_fails(self):
+        """Test an item that keeps outliving its leases is eventually failed."""
+        queue = self.open('c', max_attempts=2)
+        try:
+            queue.enqueue([('poison', None)])
+            for _ in range(2):
+                self.assertEqual(len(queue.claim()), 1)
+                self.clock.now += 11
+            self.assertEqual(queue.claim(), [])
+            self.assertIn('Lease expired', queue.failures()['poison'])
+        finally:
+            queue.close()
+
+    def test_release_keeps_attempts(self):
+        """Test released items are claimable at once without using an attempt."""
+        self.a.enqueue([('item', None)])
+        self.a.claim()
+        self.assertEqual(self.a.release_all(), 1)
+        self.assertEqual(self.b.claim()[0].attempts, 1)
+
+
+class TestJobQueueProcesses(unittest.TestCase):
+    """Several processes standing in for nodes share one queue."""
+
+    def setUp(self):
+        """Set up a scratch directory."""
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.tmp)
+
+    def run_workers(self, journal_mode):
+        path = os.path.join(self.tmp, f'{journal_mode}.sqlite3')
+        jobs = [f'item{i:03d}' for i in range(200)]
+        queue = JobQueue(path, journal_mode=journal_mode, lease_seconds=0.5)
+        queue.enqueue((job_id, None) for job_id in jobs)
+        context = multiprocessing.get_context()
+        workers = []
+        for n in range(4):
+            done_path = os.path.join(self.tmp, f'{journal_mode}-{n}.txt')
+            # Worker 0 completes four items and dies holding its fifth
+            process = context.Process(target=queue_worker,
+                                      args=(path, f'w{n}', 5 if n == 0 else 0, done_path))
+            process.start()
+            if n == 0:
+                process.join(60)
+            workers.append((process, done_path))
+        done = []
+        for process, done_path in workers:
+            process.join(60)
+            with open(done_path) as f:
+                done.extend(f.read().split())
+        exit_codes = [process.exitcode for process, _ in workers]
+        self.assertEqual(exit_codes, [1, 0, 0, 0])
+        completions = queue.completions()
+        queue.close()
+        return jobs, done, completions
+
+    def test_each_item_completed_exactly_once(self):
+        """Test every item is completed once, including the dead worker's."""
+        for journal_mode in ('wal', 'delete'):
+            jobs, done, completions = self.run_workers(journal_mode)
+            self.assertEqual(sorted(done), jobs)
+            self.assertEqual(sorted(completions), jobs)
+            taken_over = [job_id for job_id, record in completions.items()
+                          if record['lease_token'] > 1]
+            self.assertEqual(len(taken_over), 1)
+            self.assertNotEqual(completions[taken_over[0]]['worker_id'], 'w0')
+
+
+class TestAutopilotQueue(unittest.TestCase):
+    """Test the autopilot batch loop on a shared queue."""
+
+    def setUp(self):
+        """Set up an input directory of fake photos."""
+        self.tmp = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.tmp, 'input')
+        os.makedirs(self.input_dir)
+        for i in range(6):
+            with open(os.path.join(self.input_dir, f'coin{i}.jpg'), 'wb') as f:
+                f.write(b'\xff\xd8\xff\xe0' + bytes(16))
+        self.queue_path = os.path.join(self.tmp, 'queue.sqlite3')
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.tmp)
+
+    def run_bot(self, process, input_dir=None, **settings):
+        from autopilot_bot import AutopilotBot
+        from image_input import find_images
+
+        input_dir = input_dir or self.input_dir
+        bot = AutopilotBot()
+        bot.config['job_queue'] = dict({'enabled': True, 'path': self.queue_path}, **settings)
+        bot.process_single_item = process
+        bot._process_queued(find_images(input_dir), self.tmp, {}, {}, input_dir)
+        return bot
+
+    def test_two_bots_split_a_batch(self):
+        """Test two bots on one queue process each item once between them."""
+        seen = []
+
+        def process(image_path, output_dir, metadata=None):
+            seen.append(image_path)
+            return {'item_name': os.path.basename(image_path), 'success': True,
+                    'outputs': {'title': 'Coin'}}
+
+        names = []
+        for _ in range(2):
+            bot = self.run_bot(process)
+            names.append([listing['item_name'] for listing in bot.results['listings']])
+            self.assertEqual(bot.results['job_queue']['items']['done'], 6)
+        self.assertEqual(len(names[0]), 6)
+        self.assertEqual(names[1], [])
+        self.assertEqual(len(seen), 6)
+
+    def test_items_are_keyed_by_relative_path(self):
+        """Test workers mounting the input at different paths share the same items."""
+        mirror = os.path.join(self.tmp, 'mount', 'input')
+        shutil.copytree(self.input_dir, mirror)
+
+        def process(image_path, output_dir, metadata=None):
+            return {'item_name': os.path.basename(image_path), 'success': True,
+                    'outputs': {'title': 'Coin'}}
+
+        self.run_bot(process)
+        bot = self.run_bot(process, input_dir=mirror)
+        self.assertEqual(bot.results['listings'], [])
+        queue = JobQueue(self.queue_path)
+        self.assertEqual(sorted(queue.completions()), [f'coin{i}.jpg' for i in range(6)])
+        queue.close()
+
+    def test_failures_are_retried_and_rejections_are_final(self):
+        """Test failed results use the queue's retries and rejected ones are not retried."""
+        attempts = {}
+
+        def process(image_path, output_dir, metadata=None):
+            name = os.path.basename(image_path)
+            attempts[name] = attempts.get(name, 0) + 1
+            result = {'item_name': name, 'success': True, 'outputs': {'title': 'Coin'}}
+            if name == 'coin0.jpg' and attempts[name] == 1:
+                bot.results['failed'] += 1
+                result.update(success=False, error='timeout')
+            elif name == 'coin1.jpg':
+                result.update(success=False, rejected='too blurry', retry=False)
+            elif name == 'coin2.jpg':
+                bot.results['failed'] += 1
+                result.update(success=False, error='corrupt')
+            return result
+
+        from autopilot_bot import AutopilotBot
+        from image_input import find_images
+
+        bot = AutopilotBot()
+        bot.config['job_queue'] = {'enabled': True, 'path': self.queue_path,
+                                   'backoff_seconds': 0, 'max_attempts': 3}
+        bot.process_single_item = process
+        bot._process_queued(find_images(self.input_dir), self.tmp, {}, {}, self.input_dir)
+
+        self.assertEqual(attempts, {'coin0.jpg': 2, 'coin1.jpg': 1, 'coin2.jpg': 3,
+                                    'coin3.jpg': 1, 'coin4.jpg': 1, 'coin5.jpg': 1})
+        self.assertEqual(bot.results['job_queue']['items'],
+                         {'pending': 0, 'leased': 0, 'done': 4, 'failed': 2})
+        outcomes = {listing['item_name']: listing['success'] for listing in bot.results['listings']}
+        self.assertEqual(outcomes, {'coin0.jpg': True, 'coin1.jpg': False, 'coin2.jpg': False,
+                                    'coin3.jpg': True, 'coin4.jpg': True, 'coin5.jpg': True})
+        self.assertEqual(bot.results['failed'], 1)
+
+    def test_lost_leases_are_not_counted(self):
+        """Test items whose lease was lost leave this worker's counters untouched."""
+        def process(image_path, output_dir, metadata=None):
+            name = os.path.basename(image_path)
+            if name == 'coin0.jpg':
+                bot.results['rejected'] += 1
+                return {'item_name': name, 'success': False, 'rejected': 'too blurry',
+                        'retry': False}
+            bot.results['processed_images'] += 1
+            bot.results['generated_titles'] += 1
+            return {'item_name': name, 'success': True, 'outputs': {'title': 'Coin'}}
+
+        from autopilot_bot import AutopilotBot
+        from image_input import find_images
+
+        bot = AutopilotBot()
+        bot.config['job_queue'] = {'enabled': True, 'path': self.queue_path}
+        bot.process_single_item = process
+        # Another worker records each item first, so this worker's lease is refused
+        complete, fail = JobQueue.complete, JobQueue.fail
+
+        def lost_complete(queue, lease, result=None):
+            complete(queue, lease, result)
+            return False
+
+        def lost_fail(queue, lease, error, retry=True):
+            fail(queue, lease, error, retry=False)
+            return None
+
+        with mock.patch.object(JobQueue, 'complete', lost_complete), \
+                mock.patch.object(JobQueue, 'fail', lost_fail):
+            bot._process_queued(find_images(self.input_dir)[:2], self.tmp, {}, {},
+                                self.input_dir)
+        self.assertEqual(bot.results['listings'], [])
+        self.assertEqual([bot.results[name] for name in
+                          ('processed_images', 'generated_titles', 'rejected', 'failed')],
+                         [0, 0, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Unit tests for the listing index."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+import listing_index
+from listing_index import ListingIndex, tokenize
+
+
+LISTINGS = [
+    ('a', '1921-S Morgan Silver Dollar Fine', 'Struck at San Francisco.',
+     {'year': '1921', 'denomination': 'Morgan Dollar', 'mint_mark': 'S', 'condition': 'Fine'}),
+    ('b', '1921 Morgan Silver Dollar Uncirculated', 'Philadelphia strike with full luster.',
+     {'year': '1921', 'denomination': 'Morgan Dollar', 'mint_mark': 'P', 'condition': 'Uncirculated'}),
+    ('c', '1923 Peace Silver Dollar', 'A Peace dollar from Denver.',
+     {'year': '1923', 'denomination': 'Peace Dollar', 'mint_mark': 'D'}),
+    ('d', '1921-S Morgan Silver Dollar, Fine', 'Another San Francisco Morgan.',
+     {'year': '1921', 'denomination': 'Morgan Dollar', 'mint_mark': 'S', 'condition': 'Fine'})
+]
+
+
+class TestListingIndex(unittest.TestCase):
+    """Test cases for queries, segments and persistence."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def build(self, **kwargs):
+        index = ListingIndex(self.tmp, **kwargs)
+        for key, title, description, fields in LISTINGS:
+            index.add(key, title, description, fields)
+            index.flush()
+        return index
+
+    def keys(self, docs):
+        return sorted(doc['key'] for doc in docs)
+
+    def check_queries(self, index):
+        self.assertEqual(self.keys(index.search('1921 morgan')), ['a', 'b', 'd'])
+        self.assertEqual(self.keys(index.search('morgan mint_mark:s')), ['a', 'd'])
+        self.assertEqual(self.keys(index.search('franc*')), ['a', 'd'])
+        self.assertEqual(self.keys(index.search('', {'denomination': 'Peace*'})), ['c'])
+        self.assertEqual(self.keys(index.search('dollar', {'year': 1923, 'mint_mark': 'D'})), ['c'])
+        self.assertEqual(index.search('1921 peace'), [])
+        self.assertEqual(index.count('silver dollar'), 4)
+
+    def test_tokenize(self):
+        """Test tokens are lowercase alphanumeric runs."""
+        self.assertEqual(tokenize('1921-S Morgan, 90% Silver'), ['1921', 's', 'morgan', '90', 'silver'])
+
+    def test_queries_across_segments(self):
+        """Test words, prefixes and field filters, newest first."""
+        index = self.build(merge_factor=10)
+        self.assertEqual(len(index.segments), 4)
+        self.check_queries(index)
+        self.assertEqual([d['key'] for d in index.search('morgan', limit=2)], ['d', 'b'])
+
+    def test_pending_listings_are_searchable(self):
+        """Test listings are searchable before they are flushed."""
+        index = ListingIndex(self.tmp)
+        for key, title, description, fields in LISTINGS:
+            index.add(key, title, description, fields)
+        self.assertEqual(index.segments, [])
+        self.check_queries(index)
+
+    def test_incremental_merges(self):
+        """Test same-tier segments merge and queries still match."""
+        index = self.build(merge_factor=2)
+        self.assertEqual([len(s) for s in index.segments], [4])
+        self.assertGreater(index.stats['merges'], 0)
+        self.check_queries(index)
+        names = {s.name for s in index.segments}
+        files = {os.path.splitext(f)[0] for f in os.listdir(self.tmp) if f.startswith('seg_')}
+        self.assertEqual(files, names)
+
+    def test_replace_and_reopen(self):
+        """Test replacing a key tombstones the old listing, across a reopen and optimize."""
+        index = self.build()
+        index.add('c', '1922 Peace Silver Dollar', '', {'year': '1922'})
+        index.close()
+
+        reopened = ListingIndex(self.tmp)
+        self.assertEqual(reopened.statistics()['listings'], 4)
+        self.assertEqual(self.keys(reopened.search('peace')), ['c'])
+        self.assertEqual(reopened.search('1923'), [])
+        self.assertEqual(self.keys(reopened.search('year:1922')), ['c'])
+
+        reopened.optimize()
+        self.assertEqual(len(reopened.segments), 1)
+        self.assertEqual(reopened.statistics()['tombstones'], 0)
+        self.assertEqual(reopened.count(), 4)
+
+    def test_replace_does_not_load_stored_listings(self):
+        """Test replacing a key after a reopen finds it by its key term, not the stored listings."""
+        self.build().close()
+        reopened = ListingIndex(self.tmp)
+        reopened.add('b', '1921 Morgan Silver Dollar AU', '', {'year': '1921'})
+        reopened.add('z', '1878 Morgan Silver Dollar', '', {'year': '1878'})
+        self.assertTrue(all(segment._docs is None for segment in reopened.segments))
+        self.assertEqual(reopened.stats['replaced'], 1)
+        self.assertEqual(reopened.count('morgan'), 4)
+        self.assertEqual(reopened.search('b*'), [])
+
+    def test_duplicate_titles(self):
+        """Test titles that differ only in punctuation and case are duplicates."""
+        index = self.build()
+        groups = index.duplicate_titles()
+        self.assertEqual([(g['title'], g['count']) for g in groups],
+                         [('1921 s morgan silver dollar fine', 2)])
+        self.assertEqual(index.title_count('1921-s MORGAN silver dollar fine'), 2)
+        self.assertEqual(self.keys(index.duplicates('1921 S Morgan Silver Dollar Fine')), ['a', 'd'])
+
+    def test_without_numpy(self):
+        """Test the pure-Python postings path gives the same answers."""
+        with mock.patch.object(listing_index, 'np', None):
+            index = self.build(merge_factor=2)
+            self.check_queries(index)
+            self.assertEqual(len(index.duplicate_titles()), 1)
+
+    def test_add_listings_from_summary(self):
+        """Test autopilot listing results are indexed with their description files."""
+        desc_path = os.path.join(self.tmp, 'coin1_description.txt')
+        with open(desc_path, 'w') as f:
+            f.write('Toned obverse with original luster.')
+        listings = [
+            {'image_path': 'in/coin1.jpg', 'item_name': 'coin1', 'success': True,
+             'outputs': {'title': '1921 Morgan Dollar', 'description': desc_path}},
+            {'image_path': 'in/coin2.jpg', 'item_name': 'coin2', 'success': False, 'outputs': {}}
+        ]
+        index = ListingIndex(os.path.join(self.tmp, 'index'))
+        ids = index.add_listings(listings, {'coin1': {'year': '1921', 'mint_mark': 'O'}})
+        self.assertEqual(len(ids), 1)
+        self.assertEqual([d['item_name'] for d in index.search('toned mint_mark:o')], ['coin1'])
+        with open(os.path.join(self.tmp, 'index', 'manifest.json')) as f:
+            self.assertEqual(len(json.load(f)['segments']), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""Unit tests for the dictionary-encoded metadata catalogue."""
+
+import json
+import math
+import os
+import pickle
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'scripts', 'bots'))
+
+import metadata_catalogue
+from auction_pricing import AuctionPricer, PriceColumns
+from metadata_catalogue import MetadataCatalogue, RecordView
+
+
+SAMPLE = os.path.join(ROOT, 'examples', 'sample_metadata.json')
+
+
+def sample_metadata():
+    with open(SAMPLE, 'r') as f:
+        return json.load(f)
+
+
+class TestMetadataCatalogue(unittest.TestCase):
+    """Test cases for record views, encoding and grouping."""
+
+    def setUp(self):
+        self.metadata = sample_metadata()
+        self.catalogue = MetadataCatalogue.from_dict(self.metadata)
+
+    def test_views_match_records(self):
+        """Test every record view reads like the original dict."""
+        self.assertEqual(list(self.catalogue), list(self.metadata))
+        for key, record in self.metadata.items():
+            view = self.catalogue[key]
+            self.assertEqual(dict(view), record)
+            self.assertEqual(view, record)
+            self.assertEqual(view.get('year'), record.get('year'))
+        self.assertEqual(self.catalogue.to_dict(), self.metadata)
+
+    def test_missing_fields_and_items(self):
+        """Test absent fields behave like absent dict keys."""
+        catalogue = MetadataCatalogue.from_dict({'a': {'year': '1921', 'story': 'x'},
+                                                 'b': {'year': '1921'}, 'c': None})
+        view = catalogue['b']
+        self.assertEqual(view.get('story', 'none'), 'none')
+        self.assertNotIn('story', view)
+        with self.assertRaises(KeyError):
+            view['story']
+        self.assertEqual(len(catalogue['c']), 0)
+        self.assertIsNone(catalogue.get('missing'))
+        self.assertEqual('{year} {story}'.format(**catalogue['a']), '1921 x')
+
+    def test_low_cardinality_fields_are_encoded(self):
+        """Test repeated fields become code arrays and unique ones stay plain."""
+        records = {f'item{i}': {'type': 'Silver Coin', 'mintage': str(i), 'tags': ['a']}
+                   for i in range(100)}
+        catalogue = MetadataCatalogue.from_dict(records)
+        stats = catalogue.stats()['fields']
+        self.assertEqual(stats['type'], {'encoded': True, 'distinct': 1, 'code_bytes': 100})
+        self.assertFalse(stats['mintage']['encoded'])
+        self.assertFalse(stats['tags']['encoded'])
+        self.assertEqual(catalogue['item7']['tags'], ['a'])
+        self.assertIs(catalogue['item1']['type'], catalogue['item2']['type'])
+
+    def test_equal_values_keep_their_types(self):
+        """Test values that compare equal across types are not merged by encoding."""
+        records = {'a': {'weight': 38, 'proof': 1}, 'b': {'weight': 38.0, 'proof': True},
+                   'c': {'weight': 38, 'proof': 1}}
+        catalogue = MetadataCatalogue.from_dict(records, max_distinct_ratio=1.0)
+        self.assertEqual(catalogue.stats()['fields']['weight']['distinct'], 2)
+        for key, record in records.items():
+            for field, value in record.items():
+                self.assertIs(type(catalogue[key][field]), type(value))
+        self.assertEqual(catalogue.value_counts('weight'), {38: 3})
+        self.assertEqual(sorted(catalogue.group_by('proof')[1]), ['a', 'b', 'c'])
+
+    def test_views_serialise_as_json(self):
+        """Test a view converts to a plain dict that json can write."""
+        key = next(iter(self.metadata))
+        view = self.catalogue[key]
+        self.assertIs(type(view.to_dict()), dict)
+        self.assertEqual(json.loads(json.dumps(view.to_dict())), self.metadata[key])
+
+    def test_views_pickle_as_dicts(self):
+        """Test views sent to worker processes carry only their own record."""
+        key = next(iter(self.metadata))
+        copy = pickle.loads(pickle.dumps(self.catalogue[key]))
+        self.assertIs(type(copy), dict)
+        self.assertEqual(copy, self.metadata[key])
+
+    def test_grouping(self):
+        """Test group_by and value_counts agree with a scan of the records."""
+        expected = {}
+        for key, record in self.metadata.items():
+            expected.setdefault(record['denomination'], []).append(key)
+        self.assertEqual(self.catalogue.group_by('denomination'), expected)
+        counts = {value: len(keys) for value, keys in expected.items()}
+        self.assertEqual(self.catalogue.value_counts('denomination'), counts)
+        with mock.patch.object(metadata_catalogue, 'np', None):
+            self.assertEqual(self.catalogue.value_counts('denomination'), counts)
+
+    def test_codes_for_selected_keys(self):
+        """Test codes follow the requested keys, with 0 for unknown items."""
+        keys = list(self.metadata)[:2] + ['not_there']
+        codes, values = self.catalogue.codes('condition', keys)
+        self.assertEqual([values[c] for c in codes],
+                         [self.metadata[keys[0]]['condition'],
+                          self.metadata[keys[1]]['condition'], None])
+
+
+class TestCataloguePricing(unittest.TestCase):
+    """Test cases for pricing from a catalogue."""
+
+    def test_price_columns_match_dict_path(self):
+        """Test catalogue pricing gives the same columns as the dict path."""
+        metadata = sample_metadata()
+        keys = list(metadata) + ['unknown']
+        expected = PriceColumns.from_metadata(metadata, keys)
+        columns = PriceColumns.from_metadata(MetadataCatalogue.from_dict(metadata), keys)
+        for got, want in ((columns.low, expected.low), (columns.high, expected.high)):
+            self.assertEqual([None if math.isnan(v) else v for v in got],
+                             [None if math.isnan(v) else v for v in want])
+
+    def test_group_totals(self):
+        """Test per-group totals match summing the per-item prices."""
+        metadata = sample_metadata()
+        catalogue = MetadataCatalogue.from_dict(metadata)
+        pricer = AuctionPricer()
+        columns = PriceColumns.from_metadata(catalogue)
+        prices = pricer.listing_prices(columns)
+        codes, groups = catalogue.codes('denomination')
+        totals = pricer.group_totals(columns, codes, groups)
+        for denomination, keys in catalogue.group_by('denomination').items():
+            priced = [prices[k] for k in keys if prices[k]]
+            self.assertEqual(totals[denomination]['items'], len(keys))
+            self.assertEqual(totals[denomination]['priced'], len(priced))
+            self.assertAlmostEqual(totals[denomination]['starting_total'],
+                                   sum(p['starting_price'] for p in priced), places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Unit tests for the photo quality gate."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from quality_gate import QualityGate, area_downscale, np
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestQualityGate(unittest.TestCase):
+    """Test cases for the quality metrics and thresholds."""
+
+    def setUp(self):
+        self.gate = QualityGate()
+        rng = np.random.default_rng(7)
+        # Mid-grey textured "coin" with plenty of fine detail
+        self.sharp = rng.integers(60, 190, size=(128, 128, 3), dtype=np.uint8)
+
+    def test_sharp_image_passes(self):
+        """Test a detailed, well-exposed image passes every check."""
+        verdict = self.gate.evaluate_pixels(self.sharp)
+        self.assertTrue(verdict['passed'], verdict['reasons'])
+        self.assertGreater(verdict['metrics']['sharpness'], 1000)
+
+    def test_blurry_image_fails(self):
+        """Test a smooth gradient is rejected as blurry."""
+        ramp = np.tile(np.linspace(60, 190, 128, dtype=np.float32), (128, 1))
+        verdict = self.gate.evaluate_pixels(np.dstack([ramp] * 3).astype(np.uint8))
+        self.assertFalse(verdict['passed'])
+        self.assertTrue(verdict['reasons'][0].startswith('blurry'))
+
+    def test_clipping_and_glare(self):
+        """Test crushed shadows, blown highlights and specular glare are detected."""
+        dark = self.sharp.copy()
+        dark[:64] = 0
+        self.assertIn('underexposed', ' '.join(self.gate.evaluate_pixels(dark)['reasons']))
+
+        bright = self.sharp.copy()
+        bright[:32] = 255
+        reasons = ' '.join(self.gate.evaluate_pixels(bright)['reasons'])
+        self.assertIn('overexposed', reasons)
+        self.assertIn('glare', reasons)
+
+        # Saturated highlights are clipping but not glare
+        red = self.sharp.copy()
+        red[:32] = (255, 255, 0)
+        metrics = self.gate.evaluate_pixels(red)['metrics']
+        self.assertEqual(metrics['glare'], 0.0)
+
+    def test_thresholds_from_config(self):
+        """Test thresholds come from the quality_gate config section."""
+        lenient = QualityGate.from_config({'quality_gate': {'max_shadow_clip': 0.9}})
+        dark = self.sharp.copy()
+        dark[:64] = 0
+        self.assertTrue(lenient.evaluate_pixels(dark)['passed'])
+
+    def test_noisy_blurred_frame_fails(self):
+        """Test sensor noise on a full-size blurred frame does not pass as sharpness."""
+        rng = np.random.default_rng(3)
+        ramp = np.tile(np.linspace(80, 170, 2048, dtype=np.float32), (2048, 1))
+        noisy = np.clip(ramp + rng.normal(0, 4, ramp.shape), 0, 255).astype(np.uint8)
+        frame = np.dstack([noisy] * 3)
+        verdict = self.gate.evaluate_frame(frame)
+        self.assertFalse(verdict['passed'])
+        self.assertTrue(verdict['reasons'][0].startswith('blurry'))
+        # A strided subsample would have kept the noise and passed it
+        self.assertTrue(self.gate.evaluate_pixels(frame[::4, ::4])['passed'])
+
+    def test_area_downscale(self):
+        """Test frames are block-averaged to max_side, dropping the ragged edge."""
+        frame = np.arange(5 * 7, dtype=np.uint8).reshape(5, 7)
+        small = area_downscale(frame, 3)
+        self.assertEqual(small.shape, (1, 2))
+        self.assertEqual(small[0, 0], frame[:3, :3].mean())
+        self.assertIs(area_downscale(self.sharp, 512), self.sharp)
+
+    def test_undecodable_file_passes_through(self):
+        """Test files that can't be measured are skipped, not rejected."""
+        verdict = self.gate.evaluate(__file__)
+        self.assertTrue(verdict['passed'])
+        self.assertIn('skipped', verdict)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Unit tests for the RoosterAPI result cache."""
+
+import importlib.util
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from result_cache import CachePolicy, ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+POLICIES = {
+    'status': CachePolicy('ttl', ttl=2.0, tags=('energy',)),
+    'list': CachePolicy('pure', tags=('themes',)),
+    'crow': CachePolicy('mutating', invalidates=('energy',))
+}
+
+
+class TestResultCache(unittest.TestCase):
+    """Test cases for cache policies, invalidation and stats."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResultCache(POLICIES, max_entries=3, clock=self.clock)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_ttl_entries_expire(self):
+        """Test TTL results are reused until they expire."""
+        self.assertEqual(self.cache.call('status', self.compute), {'calls': 1})
+        self.clock.now += 1.9
+        self.assertEqual(self.cache.call('status', self.compute), {'calls': 1})
+        self.clock.now += 0.2
+        self.assertEqual(self.cache.call('status', self.compute), {'calls': 2})
+        self.assertEqual(self.cache.stats()['expired'], 1)
+
+    def test_pure_entries_keyed_by_arguments(self):
+        """Test pure results never expire and depend on the arguments."""
+        self.cache.call('list', self.compute, ('a',))
+        self.clock.now += 10 ** 6
+        self.cache.call('list', self.compute, ('a',))
+        self.cache.call('list', self.compute, ('b',))
+        self.assertEqual(self.calls, 2)
+
+    def test_mutating_calls_invalidate_tags(self):
+        """Test a mutating call drops only the entries tagged with what it changes."""
+        self.cache.call('status', self.compute)
+        self.cache.call('list', self.compute)
+        self.cache.call('crow', self.compute)
+        self.cache.call('crow', self.compute)
+        self.cache.call('status', self.compute)
+        self.cache.call('list', self.compute)
+        self.assertEqual(self.calls, 5)
+        self.assertEqual(self.cache.stats()['invalidated'], 1)
+
+    def test_results_are_copied(self):
+        """Test callers can't modify the cached value."""
+        self.cache.call('status', self.compute)['calls'] = 99
+        self.assertEqual(self.cache.call('status', self.compute), {'calls': 1})
+
+    def test_uncacheable_and_unknown_calls_pass_through(self):
+        """Test unhashable arguments and calls without a policy are never cached."""
+        self.cache.call('list', self.compute, (['x'],))
+        self.cache.call('list', self.compute, (['x'],))
+        self.cache.call('other', self.compute)
+        self.cache.call('other', self.compute)
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(self.cache.stats()['uncacheable'], 2)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted beyond max_entries."""
+        for name in 'abcd':
+            self.cache.call('list', self.compute, (name,))
+        self.cache.call('list', self.compute, ('a',))
+        self.assertEqual(self.calls, 5)
+        self.assertEqual(self.cache.stats()['evicted'], 2)
+
+    def test_hit_rate(self):
+        """Test the hit rate and per-call counters."""
+        for _ in range(4):
+            self.cache.call('status', self.compute)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hit_rate'], 0.75)
+        self.assertEqual(stats['calls']['status'], {'hits': 3, 'misses': 1})
+
+
+class TestBindingsCache(unittest.TestCase):
+    """Test cases for caching in the Python bindings."""
+
+    @classmethod
+    def setUpClass(cls):
+        spec = importlib.util.spec_from_file_location(
+            'python_bindings', os.path.join(ROOT, 'api', 'python-bindings.py'))
+        cls.bindings = importlib.util.module_from_spec(spec)
+        with redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(cls.bindings)
+
+    def setUp(self):
+        with redirect_stdout(io.StringIO()):
+            self.api = self.bindings.RoosterAPI()
+
+    def test_polling_hits_the_cache(self):
+        """Test repeated read-only calls are served from the cache."""
+        for _ in range(10):
+            self.api.status()
+            self.api.theme.list()
+        stats = self.api.cache_stats()
+        self.assertEqual(stats['calls']['status'], {'hits': 9, 'misses': 1})
+        self.assertEqual(stats['calls']['theme.list'], {'hits': 9, 'misses': 1})
+
+    def test_mutations_invalidate(self):
+        """Test crow, switch and theme commands invalidate what they change."""
+        with redirect_stdout(io.StringIO()):
+            self.api.status()
+            self.api.theme.current()
+            self.api.crow()
+            self.api.status()
+            self.api.theme.current()
+            self.api.theme.switch('mario')
+            self.api.theme.current()
+            self.api.mario.jump('high')
+            self.api.theme.current()
+        calls = self.api.cache_stats()['calls']
+        self.assertEqual(calls['status'], {'hits': 0, 'misses': 2})
+        self.assertEqual(calls['theme.current'], {'hits': 1, 'misses': 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Unit tests for the source scheduler module."""
+
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from source_scheduler import BatchSource, FairScheduler
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFairScheduler(unittest.TestCase):
+    """Test cases for the FairScheduler class."""
+
+    def drain(self, scheduler, count):
+        order = []
+        for _ in range(count):
+            item = scheduler.next(timeout=0)
+            order.append(item.source)
+            scheduler.complete(item)
+        return order
+
+    def test_weighted_fair_share(self):
+        """Test equal-priority sources are served in proportion to weight."""
+        scheduler = FairScheduler([BatchSource('bulk', weight=1), BatchSource('vip', weight=3)],
+                                  clock=FakeClock())
+        for i in range(100):
+            scheduler.add('bulk', i)
+            scheduler.add('vip', i)
+        counts = Counter(self.drain(scheduler, 40))
+        self.assertEqual(counts['vip'], 30)
+        self.assertEqual(counts['bulk'], 10)
+
+    def test_priority_first(self):
+        """Test a higher-priority source is served before a bulk backlog."""
+        scheduler = FairScheduler([BatchSource('bulk'), BatchSource('urgent', priority=1)],
+                                  clock=FakeClock())
+        for i in range(50):
+            scheduler.add('bulk', i)
+        scheduler.add('urgent', 'a')
+        scheduler.add('urgent', 'b')
+        self.assertEqual(self.drain(scheduler, 3), ['urgent', 'urgent', 'bulk'])
+
+    def test_deadline_promotion(self):
+        """Test an item near its deadline jumps ahead of higher priority work."""
+        clock = FakeClock()
+        scheduler = FairScheduler([BatchSource('high', priority=5),
+                                   BatchSource('sla', deadline_seconds=60)],
+                                  promotion_window=10, clock=clock)
+        scheduler.add('sla', 'late')
+        for i in range(5):
+            scheduler.add('high', i)
+        self.assertEqual(self.drain(scheduler, 1), ['high'])
+        clock.now = 55
+        self.assertEqual(self.drain(scheduler, 1), ['sla'])
+        self.assertEqual(scheduler.stats()['sla']['promoted'], 1)
+
+    def test_concurrency_cap(self):
+        """Test a capped source yields to others while its slots are busy."""
+        scheduler = FairScheduler([BatchSource('bulk', priority=1, max_concurrency=1),
+                                   BatchSource('other')], clock=FakeClock())
+        for i in range(3):
+            scheduler.add('bulk', i)
+            scheduler.add('other', i)
+        first = scheduler.next(timeout=0)
+        second = scheduler.next(timeout=0)
+        self.assertEqual((first.source, second.source), ('bulk', 'other'))
+        scheduler.complete(first)
+        self.assertEqual(scheduler.next(timeout=0).source, 'bulk')
+
+    def test_close_drains(self):
+        """Test next() returns None once closed and empty."""
+        scheduler = FairScheduler([BatchSource('a')], clock=FakeClock())
+        scheduler.add('a', 1)
+        scheduler.close()
+        scheduler.complete(scheduler.next())
+        self.assertIsNone(scheduler.next())
+
+
+if __name__ == "__main__":
+    unittest.main()
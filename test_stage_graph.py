@@ -0,0 +1,196 @@
+"""Unit tests for the per-item stage graph."""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'bots'))
+
+from stage_graph import Stage, StageGraph, StageGraphError, resolve_handler
+
+
+def custom_stage(owner, inputs):
+    """Custom "module:function" stage used by the config tests."""
+    return {'shout': f"{owner}:{inputs['name'].upper()}"}
+
+
+def stage(name, inputs, outputs, handler=None, **kwargs):
+    """Build a stage whose default handler writes '<name>' to each output."""
+    if handler is None:
+        handler = lambda values: {output: name for output in outputs}
+    return Stage(name, handler, inputs, outputs, **kwargs)
+
+
+class TestValidation(unittest.TestCase):
+    """Test cases for graph validation."""
+
+    def test_topological_order(self):
+        """Test stages are ordered after the stages producing their inputs."""
+        graph = StageGraph([stage('c', ['b'], ['c']), stage('b', ['a'], ['b']),
+                            stage('a', ['x'], ['a'])], initial=['x'])
+        self.assertEqual([s.name for s in graph.order], ['a', 'b', 'c'])
+
+    def test_missing_input(self):
+        """Test a stage needing a value nothing produces is rejected."""
+        with self.assertRaisesRegex(StageGraphError, "needs 'y'"):
+            StageGraph([stage('a', ['y'], ['a'])], initial=['x'])
+
+    def test_cycle(self):
+        """Test a cycle is reported with its path."""
+        with self.assertRaisesRegex(StageGraphError, 'Cycle in stage graph: a -> b -> c -> a'):
+            StageGraph([stage('a', ['b'], ['a']), stage('b', ['c'], ['b']),
+                        stage('c', ['a', 'x'], ['c'])], initial=['x'])
+
+    def test_duplicates(self):
+        """Test duplicate stage names and outputs are rejected."""
+        with self.assertRaisesRegex(StageGraphError, 'Duplicate stage name'):
+            StageGraph([stage('a', [], ['a']), stage('a', [], ['b'])], initial=[])
+        with self.assertRaisesRegex(StageGraphError, 'produced more than once'):
+            StageGraph([stage('a', [], ['v']), stage('b', [], ['v'])], initial=[])
+        with self.assertRaisesRegex(StageGraphError, 'produced more than once'):
+            StageGraph([stage('a', [], ['x'])], initial=['x'])
+
+    def test_unknown_kind_and_handler(self):
+        """Test unknown stage kinds and handler specs are rejected."""
+        with self.assertRaises(StageGraphError):
+            stage('a', [], ['a'], kind='gpu')
+        with self.assertRaisesRegex(StageGraphError, 'Unknown stage handler'):
+            resolve_handler('nope', {'crop': print})
+
+    def test_from_config(self):
+        """Test config entries resolve built-ins and custom handlers, skipping disabled ones."""
+        builtins = {'greet': lambda inputs: {'greeting': f"hi {inputs['name']}"}}
+        graph = StageGraph.from_config([
+            {'name': 'greet', 'inputs': ['name'], 'outputs': ['greeting']},
+            {'name': 'shout', 'handler': 'test_stage_graph:custom_stage', 'inputs': ['name'],
+             'outputs': ['shout'], 'publish': False},
+            {'name': 'off', 'inputs': ['missing'], 'outputs': ['never'], 'enabled': False},
+        ], builtins, initial=['name'], owner='bot')
+        self.assertEqual(graph.published_outputs(), ['greeting'])
+        context = graph.run({'name': 'ada'})
+        self.assertEqual((context['greeting'], context['shout']), ('hi ada', 'bot:ADA'))
+
+
+class TestRun(unittest.TestCase):
+    """Test cases for running a graph."""
+
+    def diamond(self, make_handler):
+        """Return a graph where b and c both depend on a, and d on both."""
+        return StageGraph([stage('a', ['x'], ['a'], make_handler('a')),
+                           stage('b', ['a'], ['b'], make_handler('b')),
+                           stage('c', ['a'], ['c'], make_handler('c')),
+                           stage('d', ['b', 'c'], ['d'], make_handler('d'))], initial=['x'])
+
+    def test_inline_run(self):
+        """Test stages run in order and only declared outputs are kept."""
+        graph = StageGraph([stage('a', ['x'], ['a'], lambda v: {'a': v['x'] + 1, 'junk': 1}),
+                            stage('b', ['a'], ['b'], lambda v: {'b': v['a'] * 2})],
+                           initial=['x'])
+        self.assertEqual(graph.run({'x': 1}), {'x': 1, 'a': 2, 'b': 4})
+
+    def test_independent_stages_overlap(self):
+        """Test stages with ready inputs run at the same time on the executor."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def make_handler(name):
+            def handler(values):
+                if name in 'bc':
+                    # Only returns if b and c are running at the same time
+                    barrier.wait()
+                return {name: True}
+            return handler
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            context = self.diamond(make_handler).run({'x': 0}, executor)
+        self.assertTrue(all(context[key] for key in 'abcd'))
+
+    def test_dependencies_finish_first(self):
+        """Test a stage never starts before the stages it depends on finish."""
+        events = []
+        lock = threading.Lock()
+
+        def make_handler(name):
+            def handler(values):
+                with lock:
+                    events.append(('start', name))
+                time.sleep(0.01)
+                with lock:
+                    events.append(('end', name))
+                return {name: name}
+            return handler
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.diamond(make_handler).run({'x': 0}, executor)
+        position = {event: i for i, event in enumerate(events)}
+        for before, after in (('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')):
+            self.assertLess(position[('end', before)], position[('start', after)])
+
+    def test_failure_skips_later_stages(self):
+        """Test the first error is raised and stages after it never start."""
+        started = []
+
+        def make_handler(name):
+            def handler(values):
+                started.append(name)
+                if name == 'a':
+                    raise RuntimeError('boom')
+                return {}
+            return handler
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaisesRegex(RuntimeError, 'boom'):
+                self.diamond(make_handler).run({'x': 0}, executor)
+        self.assertEqual(started, ['a'])
+
+    def test_coroutine_stage_runs_inline(self):
+        """Test a coroutine handler is awaited when run by the threaded graph."""
+        async def handler(values):
+            return {'a': values['x'] * 3}
+
+        graph = StageGraph([stage('a', ['x'], ['a'], handler)], initial=['x'])
+        self.assertEqual(graph.run({'x': 2})['a'], 6)
+
+
+class TestAutopilotStages(unittest.TestCase):
+    """Test the autopilot's use of the stage thread pool."""
+
+    def test_profiling_runs_stages_inline(self):
+        """Test stages run on the profiled thread while profiling is on."""
+        from autopilot_bot import AutopilotBot
+        from bot_profiler import BotProfiler
+
+        bot = AutopilotBot()
+        bot.config.setdefault('pipeline', {})['max_parallel_stages'] = 4
+        self.assertIsNotNone(bot._stage_executor())
+        bot.close()
+        profiled = AutopilotBot(profiler=BotProfiler(enabled=True))
+        profiled.config.setdefault('pipeline', {})['max_parallel_stages'] = 4
+        self.assertIsNone(profiled._stage_executor())
+
+    def test_close_shuts_down_pool(self):
+        """Test close() shuts the stage pool down and a later run makes a new one."""
+        from autopilot_bot import AutopilotBot
+
+        with AutopilotBot() as bot:
+            bot.config.setdefault('pipeline', {})['max_parallel_stages'] = 2
+            executor = bot._stage_executor()
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+        self.assertIsNot(bot._stage_executor(), executor)
+        bot.close()
+
+    def test_cropper_uses_the_loaded_config(self):
+        """Test the cropper stage sees the autopilot's merged image_cropper section."""
+        from autopilot_bot import AutopilotBot
+
+        config = {'image_cropper': {'enabled': True, 'padding_percent': 12}}
+        with AutopilotBot(config=config) as bot:
+            self.assertIs(bot.cropper.config, config['image_cropper'])
+
+
+if __name__ == "__main__":
+    unittest.main()
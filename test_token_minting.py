@@ -0,0 +1,214 @@
+"""Unit tests for the token minting module."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from index_valuation import IndexValuation
+from rooster_token import Token, TokenColor
+from token_minting import NumberAllocator, TimestampSource, TokenMinter, benchmark
+from token_rollups import _to_epoch
+
+
+class MintingTestCase(unittest.TestCase):
+    """Scratch allocator database per test."""
+
+    def setUp(self):
+        """Create a scratch directory for the allocator."""
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'numbers.sqlite3')
+        self.now = 1000.0
+        self.allocator = NumberAllocator(self.path, first_number=1055, clock=lambda: self.now)
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.allocator.close()
+        shutil.rmtree(self.root)
+
+    def assert_accounted(self):
+        """Every leased number is issued, returned, abandoned or still outstanding."""
+        summary = self.allocator.summary()
+        self.assertEqual(summary['leased'], summary['issued'] + summary['returned']
+                         + summary['abandoned'] + summary['outstanding'])
+        self.assertTrue(self.allocator.verify())
+        return summary
+
+
+class TestNumberAllocator(MintingTestCase):
+    """Test cases for the NumberAllocator class."""
+
+    def test_leases_are_disjoint(self):
+        """Test consecutive leases hand out adjacent, non-overlapping ranges."""
+        first = self.allocator.lease('a', 100)
+        second = self.allocator.lease('b', 50)
+        self.assertEqual((first.start, first.end), (1055, 1155))
+        self.assertEqual((second.start, second.end), (1155, 1205))
+        with self.assertRaises(ValueError):
+            self.allocator.lease('a', 0)
+
+    def test_state_survives_reopening(self):
+        """Test a reopened database continues after the last lease."""
+        self.allocator.lease('a', 100)
+        self.allocator.close()
+        reopened = NumberAllocator(self.path, first_number=1)
+        self.assertEqual(reopened.lease('a', 1).start, 1155)
+        reopened.close()
+
+    def test_release_records_returned_gap(self):
+        """Test closing a lease returns its unused tail as a gap."""
+        lease = self.allocator.lease('a', 100)
+        self.assertTrue(self.allocator.release(lease.lease_id, 30))
+        self.assertFalse(self.allocator.release(lease.lease_id, 40))
+        self.assertEqual(self.allocator.gaps(), [{
+            'lease_id': lease.lease_id, 'worker_id': 'a', 'start': 1085, 'end': 1155,
+            'size': 70, 'kind': 'returned'}])
+        summary = self.assert_accounted()
+        self.assertEqual((summary['issued'], summary['returned']), (30, 70))
+
+    def test_abandon_stale(self):
+        """Test leases without a recent checkpoint are abandoned."""
+        old = self.allocator.lease('a', 10)
+        self.now += 100
+        fresh = self.allocator.lease('b', 10)
+        self.allocator.checkpoint(old.lease_id, 4)
+        self.now += 100
+        self.allocator.checkpoint(fresh.lease_id, 2)
+        self.assertEqual(self.allocator.abandon_stale(50), 1)
+        self.assertFalse(self.allocator.checkpoint(old.lease_id, 5))
+        summary = self.assert_accounted()
+        self.assertEqual(summary['abandoned'], 6)
+        self.assertEqual(summary['outstanding'], 8)
+
+
+class TestTimestampSource(unittest.TestCase):
+    """Test cases for the TimestampSource class."""
+
+    def test_never_goes_backwards(self):
+        """Test a clock stepping back repeats the last timestamp."""
+        times = iter([100.0, 200.0, 150.0, 250.0])
+        source = TimestampSource(clock=lambda: next(times))
+        stamps = [source.now() for _ in range(4)]
+        self.assertEqual(stamps[1], stamps[2])
+        self.assertEqual(stamps, sorted(stamps))
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'time.tzset not available')
+    def test_utc_under_any_local_zone(self):
+        """Test timestamps name the same instant whatever the local time zone."""
+        self.addCleanup(time.tzset)
+        if 'TZ' in os.environ:
+            self.addCleanup(os.environ.__setitem__, 'TZ', os.environ['TZ'])
+        else:
+            self.addCleanup(os.environ.pop, 'TZ', None)
+        for zone in ('America/New_York', 'Asia/Tokyo'):
+            os.environ['TZ'] = zone
+            time.tzset()
+            stamp = TimestampSource(clock=lambda: 1_700_000_000.0).now()
+            self.assertEqual(stamp.utcoffset(), timedelta(0))
+            self.assertEqual(_to_epoch(stamp), 1_700_000_000.0)
+
+
+class TestTokenMinter(MintingTestCase):
+    """Test cases for the TokenMinter class."""
+
+    def test_batch_shares_timestamp_and_numbers_in_order(self):
+        """Test a batch is numbered consecutively with one timestamp."""
+        minter = TokenMinter(self.allocator, 'w1', lease_size=1000)
+        tokens = minter.mint_batch([10, 20, 30], TokenColor.RED)
+        self.assertTrue(all(isinstance(t, Token) for t in tokens))
+        self.assertEqual([t.number for t in tokens], [1055, 1056, 1057])
+        self.assertEqual([t.value for t in tokens], [10, 20, 30])
+        self.assertEqual(len({t.token_datetime for t in tokens}), 1)
+        single = minter.mint(2593, TokenColor.BLUE, datetime(2025, 12, 5, 22, 33, 45))
+        self.assertEqual(single.number, 1058)
+        self.assertEqual(str(single).splitlines()[2], 'Token Color: BLUE')
+
+    def test_batch_spans_leases(self):
+        """Test a batch larger than the rest of a lease continues in a new one."""
+        minter = TokenMinter(self.allocator, 'w1', lease_size=4)
+        minter.mint_batch([1, 2, 3], TokenColor.RED)
+        colors = [TokenColor.GREEN, TokenColor.YELLOW] * 5
+        tokens = minter.mint_batch(list(range(10)), colors)
+        self.assertEqual([t.number for t in tokens], list(range(1058, 1068)))
+        self.assertEqual([t.color for t in tokens], colors)
+        self.assertEqual(minter.stats['leases'], 2)
+        with self.assertRaises(ValueError):
+            minter.mint_batch([1, 2], [TokenColor.RED])
+        self.assertEqual(minter.mint_batch([], TokenColor.RED), [])
+        # The refused batch used up no numbers
+        self.assertEqual(minter.mint(1, TokenColor.RED).number, 1068)
+
+    def test_minted_tokens_are_valued(self):
+        """Test a minter with a valuation adds each batch to the index."""
+        valuation = IndexValuation(self.root)
+        minter = TokenMinter(self.allocator, 'w1', lease_size=100, valuation=valuation)
+        tokens = minter.mint_batch([100, 250], TokenColor.RED)
+        self.assertEqual(valuation.counts['token'], 2)
+        self.assertAlmostEqual(valuation.amounts['token'], 350)
+        self.assertEqual(valuation.value_at(tokens[0].token_datetime), 35)
+        # A batch timestamped before the last addition is refused before numbering
+        with self.assertRaises(ValueError):
+            minter.mint(10, TokenColor.RED, datetime(2000, 1, 1))
+        self.assertEqual(minter.mint(10, TokenColor.RED).number, 1057)
+        self.assertEqual(IndexValuation(self.root).counts['token'], 3)
+
+    def test_close_returns_unused_numbers(self):
+        """Test closing the minter returns the rest of its lease."""
+        with TokenMinter(self.allocator, 'w1', lease_size=100) as minter:
+            minter.mint_batch([1] * 25, TokenColor.RED)
+        summary = self.assert_accounted()
+        self.assertEqual((summary['issued'], summary['returned']), (25, 75))
+        self.assertEqual(summary['active_leases'], 0)
+
+    def test_crash_recovery(self):
+        """Test a restarted worker abandons its old lease and never reuses its numbers."""
+        crashed = TokenMinter(self.allocator, 'w1', lease_size=100)
+        before = crashed.mint_batch([1] * 30, TokenColor.RED)
+        crashed.checkpoint()
+        before += crashed.mint_batch([1] * 10, TokenColor.RED)
+        # The process dies here without closing
+
+        other = TokenMinter(self.allocator, 'w2', lease_size=100)
+        restarted = TokenMinter(self.allocator, 'w1', lease_size=100)
+        self.assertEqual(restarted.stats['abandoned_on_start'], 1)
+        after = restarted.mint_batch([1] * 50, TokenColor.RED) + \
+            other.mint_batch([1] * 50, TokenColor.RED)
+        numbers = [t.number for t in before + after]
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+        summary = self.assert_accounted()
+        # Only the checkpointed 30 are known to be issued; 70 are in doubt
+        self.assertEqual(summary['abandoned'], 70)
+        gap = self.allocator.gaps()[-1]
+        self.assertEqual((gap['kind'], gap['start'], gap['size']), ('abandoned', 1085, 70))
+
+    def test_abandoned_lease_is_left_at_checkpoint(self):
+        """Test a minter moves to a new lease once its lease was abandoned."""
+        minter = TokenMinter(self.allocator, 'w1', lease_size=100)
+        first = minter.mint(1, TokenColor.RED)
+        self.allocator.abandon_worker('w1')
+        self.assertFalse(minter.checkpoint())
+        second = minter.mint(1, TokenColor.RED)
+        self.assertEqual(second.number, first.number + 100)
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test parallel minting across processes."""
+
+    def test_processes_mint_unique_numbers(self):
+        """Test workers minting concurrently never share a number."""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        result = benchmark(os.path.join(root, 'numbers.sqlite3'), workers=3,
+                           tokens_per_worker=5000, batch_size=700, lease_size=1000)
+        self.assertTrue(result['unique'])
+        self.assertEqual(result['minted'], 15000)
+        allocator = result['allocator']
+        self.assertEqual(allocator['issued'], 15000)
+        self.assertEqual(allocator['leased'], allocator['issued'] + allocator['returned'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""Unit tests for the token rollups module."""
+
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from rooster_token import Token, TokenColor
+from token_rollups import SLIDING, TUMBLING, TokenRollups, WindowSpec
+
+
+T0 = datetime(2025, 12, 5, 22, 0, 0)
+EPOCH0 = T0.replace(tzinfo=timezone.utc).timestamp()
+
+
+def token(number, value, color, seconds):
+    """Return a token minted the given number of seconds after T0."""
+    return Token(number, value, color, T0 + timedelta(seconds=seconds))
+
+
+class TestSlidingWindows(unittest.TestCase):
+    """Test cases for sliding window totals."""
+
+    def setUp(self):
+        """Keep a 60 second window in 10 second buckets."""
+        self.rollups = TokenRollups([WindowSpec('1m', SLIDING, 60, 10)], lateness=30)
+
+    def test_totals_per_color(self):
+        """Test values are summed per color."""
+        self.rollups.add_token(token(1, 100, TokenColor.RED, 0))
+        self.rollups.add_token(token(2, 50, TokenColor.RED, 5))
+        self.rollups.add_token(token(3, 7, TokenColor.BLUE, 12))
+        self.assertEqual(self.rollups.total('1m', TokenColor.RED), 150)
+        self.assertEqual(self.rollups.total('1m', 'BLUE'), 7)
+        self.assertEqual(self.rollups.count('1m', TokenColor.RED), 2)
+        self.assertEqual(self.rollups.totals('1m'),
+                         {'RED': 150, 'BLUE': 7, 'GREEN': 0, 'YELLOW': 0})
+
+    def test_buckets_leave_the_window(self):
+        """Test old buckets are subtracted as newer tokens arrive."""
+        self.rollups.add_token(token(1, 100, TokenColor.RED, 0))
+        self.rollups.add_token(token(2, 10, TokenColor.RED, 30))
+        self.assertEqual(self.rollups.total('1m', TokenColor.RED), 110)
+        # The window now covers buckets 10..60s, so the first token has left
+        self.rollups.add_token(token(3, 1, TokenColor.RED, 65))
+        self.assertEqual(self.rollups.total('1m', TokenColor.RED), 11)
+
+    def test_advance_ages_windows(self):
+        """Test advancing the clock empties a window with no new tokens."""
+        self.rollups.add_token(token(1, 100, TokenColor.GREEN, 0))
+        self.rollups.advance(T0 + timedelta(seconds=59))
+        self.assertEqual(self.rollups.total('1m', TokenColor.GREEN), 100)
+        self.rollups.advance(T0 + timedelta(hours=5))
+        self.assertEqual(self.rollups.total('1m', TokenColor.GREEN), 0)
+        self.rollups.add_token(token(2, 3, TokenColor.GREEN, 5 * 3600 + 1))
+        self.assertEqual(self.rollups.total('1m', TokenColor.GREEN), 3)
+
+    def test_late_tokens(self):
+        """Test tokens within the lateness bound count and older ones are dropped."""
+        self.rollups.add_token(token(1, 1, TokenColor.RED, 100))
+        self.assertTrue(self.rollups.add_token(token(2, 10, TokenColor.RED, 75)))
+        self.assertFalse(self.rollups.add_token(token(3, 100, TokenColor.RED, 60)))
+        self.assertEqual(self.rollups.total('1m', TokenColor.RED), 11)
+        self.assertEqual(self.rollups.stats, {'events': 2, 'late': 1})
+
+    def test_matches_recomputation(self):
+        """Test running totals match a full recomputation for shuffled arrivals."""
+        rng = random.Random(7)
+        rollups = TokenRollups([WindowSpec('5m', SLIDING, 300, 5)], lateness=20)
+        accepted = []
+        now = 0.0
+        for number in range(3000):
+            now += rng.uniform(0, 2)
+            ts = now - rng.uniform(0, 25)
+            color = rng.choice(list(TokenColor))
+            value = rng.randint(1, 1000)
+            if rollups.add(color, value, EPOCH0 + ts):
+                accepted.append((ts, color, value))
+            head = int((EPOCH0 + max(t for t, _, _ in accepted)) // 5)
+            if number % 250 == 0:
+                for color in TokenColor:
+                    expected = sum(v for t, c, v in accepted
+                                   if c == color and int((EPOCH0 + t) // 5) > head - 60)
+                    self.assertEqual(rollups.total('5m', color), expected)
+        self.assertGreater(rollups.stats['late'], 0)
+
+    def test_unknown_window(self):
+        """Test querying a window that is not kept raises KeyError."""
+        with self.assertRaises(KeyError):
+            self.rollups.total('1h', TokenColor.RED)
+
+
+class TestTumblingWindows(unittest.TestCase):
+    """Test cases for tumbling windows."""
+
+    def setUp(self):
+        """Keep one-minute tumbling windows with 15 seconds of lateness."""
+        self.closed = []
+        self.rollups = TokenRollups([WindowSpec('minutely', TUMBLING, 60, history=3)],
+                                    lateness=15,
+                                    on_close=lambda name, window: self.closed.append(window))
+
+    def test_window_closes_after_lateness(self):
+        """Test a window stays open for late tokens until the watermark passes it."""
+        self.rollups.add_token(token(1, 5, TokenColor.YELLOW, 50))
+        self.rollups.add_token(token(2, 1, TokenColor.YELLOW, 70))
+        self.assertEqual(self.closed, [])
+        # Late, but within the bound: still lands in the first minute
+        self.rollups.add_token(token(3, 2, TokenColor.YELLOW, 58))
+        self.rollups.add_token(token(4, 1, TokenColor.BLUE, 76))
+        self.assertEqual(len(self.closed), 1)
+        first = self.closed[0]
+        self.assertEqual(first['sums']['YELLOW'], 7)
+        self.assertEqual(first['counts']['YELLOW'], 2)
+        self.assertEqual(first['end'] - first['start'], 60)
+        self.assertTrue(first['closed'])
+
+        current = self.rollups.current('minutely')
+        self.assertFalse(current['closed'])
+        self.assertEqual(current['sums'], {'RED': 0, 'BLUE': 1, 'GREEN': 0, 'YELLOW': 1})
+
+    def test_closed_history(self):
+        """Test only the configured number of closed windows is kept."""
+        for minute in range(6):
+            self.rollups.add_token(token(minute, minute + 1, TokenColor.RED, minute * 60 + 1))
+        self.rollups.advance(T0 + timedelta(minutes=10))
+        closed = self.rollups.closed('minutely')
+        self.assertEqual(len(closed), 3)
+        # Newest first; the last three minutes after the final token are empty
+        self.assertEqual([w['sums']['RED'] for w in closed], [0, 0, 0])
+        self.assertEqual([w['sums']['RED'] for w in self.closed], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(len(self.rollups.closed('minutely', limit=1)), 1)
+
+    def test_snapshot(self):
+        """Test the snapshot holds every window and the counters."""
+        rollups = TokenRollups()
+        rollups.add_token(token(1054, 2593, TokenColor.RED, 0))
+        snapshot = rollups.snapshot()
+        self.assertEqual(snapshot['5m']['sums']['RED'], 2593)
+        self.assertEqual(snapshot['1d']['counts']['RED'], 1)
+        self.assertEqual(snapshot['hourly']['sums']['RED'], 2593)
+        self.assertEqual(snapshot['stats'], {'events': 1, 'late': 0})
+
+
+class TestWindowSpec(unittest.TestCase):
+    """Test cases for window validation."""
+
+    def test_invalid_windows(self):
+        """Test bad kinds, steps and duplicate names are rejected."""
+        with self.assertRaises(ValueError):
+            WindowSpec('x', 'hopping', 60, 10)
+        with self.assertRaises(ValueError):
+            WindowSpec('x', SLIDING, 60, 7)
+        with self.assertRaises(ValueError):
+            TokenRollups([WindowSpec('x', SLIDING, 60, 10), WindowSpec('x', TUMBLING, 60)])
+
+
+if __name__ == "__main__":
+    unittest.main()
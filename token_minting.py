@@ -0,0 +1,501 @@
+"""Token minting module for rooster.os
+
+This module mints ``rooster_token.Token`` objects with unique numbers when
+several processes (or hosts sharing a filesystem) mint at once.
+
+Numbers come from a persistent allocator in a SQLite database. A minter
+leases a contiguous range of numbers (e.g. 65536 at a time) in one short
+transaction and then numbers its tokens from that range in memory, so the
+database is touched once per lease rather than once per token. Ranges are
+never handed out twice, which makes numbers unique across workers and
+across restarts.
+
+Numbers can go unused. A minter that closes cleanly gives back its unused
+tail, and the allocator records it as a returned gap. A minter that crashes
+leaves its lease active. When the same worker starts again (or when an
+operator abandons stale leases) the numbers after the lease's last
+checkpoint are recorded as an abandoned gap: some of them may have been
+minted before the crash, so they are never reissued. Every leased number is
+therefore either issued, returned or abandoned.
+
+Tokens minted in one batch share a single timestamp from a
+``TimestampSource``, which never goes backwards and is timezone-aware UTC.
+A minter given an ``index_valuation.IndexValuation`` adds every batch it
+mints to the index.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Union
+
+from index_valuation import IndexValuation
+from rooster_token import Token, TokenColor
+
+
+ALLOCATOR_FILE = 'token_numbers.sqlite3'
+
+DEFAULT_LEASE_SIZE = 65536
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS allocator (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    next_number INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    lease_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    worker_id TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    issued INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'active',
+    leased_at REAL NOT NULL,
+    checkpoint_at REAL NOT NULL,
+    closed_at REAL
+);
+CREATE INDEX IF NOT EXISTS leases_worker ON leases (worker_id, state);
+"""
+
+
+class NumberRange:
+    """Numbers start (inclusive) to end (exclusive) leased to one minter."""
+
+    __slots__ = ('lease_id', 'start', 'end')
+
+    def __init__(self, lease_id: int, start: int, end: int):
+        self.lease_id = lease_id
+        self.start = start
+        self.end = end
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"NumberRange(lease_id={self.lease_id}, start={self.start}, end={self.end})"
+
+
+class NumberAllocator:
+    """Persistent allocator that leases disjoint number ranges to minters."""
+
+    def __init__(self, path: str = ALLOCATOR_FILE, first_number: int = 1,
+                 busy_timeout_seconds: float = 30.0, clock=time.time):
+        """
+        Open (or create) the allocator database.
+
+        Args:
+            path: SQLite database file
+            first_number: First number handed out by a new database
+            busy_timeout_seconds: How long to wait for another minter's write lock
+            clock: Wall-clock time source (injectable for tests)
+        """
+        self.path = path
+        self.busy_timeout = float(busy_timeout_seconds)
+        self.clock = clock
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO allocator (id, next_number) VALUES (1, ?)",
+                     (int(first_number),))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            # A lease must be durable before its numbers are used
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so two minters can't both
+        # read the same next_number
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def lease(self, worker_id: str, size: int) -> NumberRange:
+        """Lease the next size numbers to worker_id."""
+        if size < 1:
+            raise ValueError("Lease size must be at least 1")
+
+        def take(conn):
+            start = conn.execute("SELECT next_number FROM allocator WHERE id = 1").fetchone()[0]
+            conn.execute("UPDATE allocator SET next_number = ? WHERE id = 1", (start + size,))
+            now = self.clock()
+            cursor = conn.execute(
+                "INSERT INTO leases (worker_id, start, end, leased_at, checkpoint_at) "
+                "VALUES (?, ?, ?, ?, ?)", (worker_id, start, start + size, now, now))
+            return NumberRange(cursor.lastrowid, start, start + size)
+
+        return self._write(take)
+
+    def checkpoint(self, lease_id: int, issued: int) -> bool:
+        """
+        Record that the first issued numbers of an active lease have been used.
+
+        Returns: False if the lease is no longer active (it was abandoned)
+        """
+        def update(conn):
+            return conn.execute(
+                "UPDATE leases SET issued = MAX(issued, ?), checkpoint_at = ? "
+                "WHERE lease_id = ? AND state = 'active'",
+                (issued, self.clock(), lease_id)).rowcount == 1
+
+        return self._write(update)
+
+    def release(self, lease_id: int, issued: int) -> bool:
+        """
+        Close a lease after its first issued numbers were used.
+
+        The rest of the range is recorded as a returned gap.
+
+        Returns: False if the lease is no longer active (it was abandoned)
+        """
+        def update(conn):
+            return conn.execute(
+                "UPDATE leases SET issued = MAX(issued, ?), state = 'closed', closed_at = ? "
+                "WHERE lease_id = ? AND state = 'active'",
+                (issued, self.clock(), lease_id)).rowcount == 1
+
+        return self._write(update)
+
+    def abandon_worker(self, worker_id: str) -> int:
+        """
+        Abandon a worker's active leases, e.g. when it restarts after a crash.
+
+        Returns: The number of leases abandoned
+        """
+        def update(conn):
+            return conn.execute(
+                "UPDATE leases SET state = 'abandoned', closed_at = ? "
+                "WHERE worker_id = ? AND state = 'active'",
+                (self.clock(), worker_id)).rowcount
+
+        return self._write(update)
+
+    def abandon_stale(self, max_age_seconds: float) -> int:
+        """
+        Abandon active leases with no checkpoint for max_age_seconds.
+
+        Use an age well beyond any live minter's checkpoint interval. A live
+        minter whose lease is abandoned moves to a new lease at its next
+        checkpoint; what it minted in between stays unique but is counted as
+        abandoned.
+
+        Returns: The number of leases abandoned
+        """
+        def update(conn):
+            now = self.clock()
+            return conn.execute(
+                "UPDATE leases SET state = 'abandoned', closed_at = ? "
+                "WHERE state = 'active' AND checkpoint_at < ?",
+                (now, now - max_age_seconds)).rowcount
+
+        return self._write(update)
+
+    def gaps(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Return unused numbers of finished leases, newest first.
+
+        'returned' gaps were never issued. 'abandoned' gaps belong to a
+        crashed minter and may contain numbers it issued after its last
+        checkpoint.
+        """
+        query = ("SELECT lease_id, worker_id, start + issued, end, state FROM leases "
+                 "WHERE state != 'active' AND start + issued < end ORDER BY lease_id DESC")
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [{'lease_id': lease_id, 'worker_id': worker_id, 'start': start, 'end': end,
+                 'size': end - start, 'kind': 'returned' if state == 'closed' else 'abandoned'}
+                for lease_id, worker_id, start, end, state in self._conn().execute(query)]
+
+    def verify(self) -> bool:
+        """Return True if no two leases overlap and none runs past next_number."""
+        conn = self._conn()
+        next_number = conn.execute("SELECT next_number FROM allocator WHERE id = 1").fetchone()[0]
+        previous_end = None
+        for start, end in conn.execute("SELECT start, end FROM leases ORDER BY start"):
+            if previous_end is not None and start < previous_end:
+                return False
+            previous_end = end
+        return previous_end is None or previous_end <= next_number
+
+    def summary(self) -> Dict:
+        """Return how many numbers were leased, issued, returned and abandoned."""
+        conn = self._conn()
+        next_number = conn.execute("SELECT next_number FROM allocator WHERE id = 1").fetchone()[0]
+        data = {'next_number': next_number, 'leases': 0, 'active_leases': 0, 'leased': 0,
+                'issued': 0, 'returned': 0, 'abandoned': 0, 'outstanding': 0}
+        for state, leases, leased, issued in conn.execute(
+                "SELECT state, COUNT(*), SUM(end - start), SUM(issued) FROM leases GROUP BY state"):
+            data['leases'] += leases
+            data['leased'] += leased
+            data['issued'] += issued
+            unused = leased - issued
+            if state == 'closed':
+                data['returned'] += unused
+            elif state == 'abandoned':
+                data['abandoned'] += unused
+            else:
+                data['active_leases'] = leases
+                data['outstanding'] += unused
+        return data
+
+
+class TimestampSource:
+    """Timestamps for minting batches that never go backwards."""
+
+    def __init__(self, clock=time.time, tz=timezone.utc):
+        """
+        Initialize the source.
+
+        Args:
+            clock: Epoch-seconds time source
+            tz: Time zone of the (always timezone-aware) datetimes
+        """
+        self.clock = clock
+        self.tz = tz
+        self._last = None
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        """Return the current time, or the last time returned if the clock stepped back."""
+        with self._lock:
+            ts = self.clock()
+            if self._last is not None and ts < self._last:
+                ts = self._last
+            self._last = ts
+        return datetime.fromtimestamp(ts, self.tz)
+
+
+class TokenMinter:
+    """Mints tokens numbered from ranges leased by a NumberAllocator."""
+
+    def __init__(self, allocator: NumberAllocator, worker_id: Optional[str] = None,
+                 lease_size: int = DEFAULT_LEASE_SIZE,
+                 timestamps: Optional[TimestampSource] = None,
+                 valuation: Optional[IndexValuation] = None):
+        """
+        Initialize the minter.
+
+        A restarted worker should pass the same worker_id: the leases its
+        previous process left active are abandoned, so their unused numbers
+        are accounted for and never reissued.
+
+        Args:
+            allocator: Allocator the number ranges come from
+            worker_id: Stable id of this worker (defaults to host:pid:random)
+            lease_size: Numbers leased at a time; larger leases touch the
+                database less often but leave larger gaps after a crash
+            timestamps: Source of batch timestamps (a new one if None)
+            valuation: Index the minted tokens are added to (none if None)
+        """
+        self.allocator = allocator
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_size = max(1, int(lease_size))
+        self.timestamps = timestamps or TimestampSource()
+        self.valuation = valuation
+        self.stats = {'minted': 0, 'batches': 0, 'leases': 0,
+                      'abandoned_on_start': allocator.abandon_worker(self.worker_id)}
+        self._range: Optional[NumberRange] = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _take(self, count: int) -> List[range]:
+        """Reserve count numbers, leasing new ranges as needed."""
+        spans = []
+        with self._lock:
+            while count > 0:
+                if self._range is None or self._next >= self._range.end:
+                    self._renew(count)
+                stop = min(self._range.end, self._next + count)
+                spans.append(range(self._next, stop))
+                count -= stop - self._next
+                self._next = stop
+        return spans
+
+    def _renew(self, wanted: int):
+        if self._range is not None:
+            self.allocator.release(self._range.lease_id, self._range.size)
+        self._range = self.allocator.lease(self.worker_id, max(self.lease_size, wanted))
+        self._next = self._range.start
+        self.stats['leases'] += 1
+
+    def mint_batch(self, values: Sequence[int],
+                   colors: Union[TokenColor, Sequence[TokenColor]],
+                   when: Optional[datetime] = None) -> List[Token]:
+        """
+        Mint one token per value, all with the same timestamp.
+
+        Args:
+            values: Token values
+            colors: One color for every token, or one color per value
+            when: Timestamp for the batch (defaults to the timestamp source)
+
+        Returns: The tokens, numbered in order
+
+        Raises:
+            ValueError: If the timestamp is earlier than the valuation's last addition
+        """
+        count = len(values)
+        if not count:
+            return []
+        # Checked before any numbers are taken, so a bad call doesn't use them up
+        if isinstance(colors, TokenColor):
+            colors = repeat(colors)
+        elif len(colors) != count:
+            raise ValueError("Need one color per value")
+        token_datetime = when or self.timestamps.now()
+        if self.valuation is not None and not self.valuation.accepts(token_datetime):
+            raise ValueError(f"Index valuation already has additions after {token_datetime}")
+        spans = self._take(count)
+        numbers = spans[0] if len(spans) == 1 else [n for span in spans for n in span]
+        tokens = list(map(Token, numbers, values, colors, repeat(token_datetime)))
+        if self.valuation is not None:
+            with self._lock:
+                self.valuation.add_tokens(tokens)
+        self.stats['minted'] += count
+        self.stats['batches'] += 1
+        return tokens
+
+    def mint(self, value: int, color: TokenColor, when: Optional[datetime] = None) -> Token:
+        """Mint a single token."""
+        return self.mint_batch([value], color, when)[0]
+
+    def checkpoint(self) -> bool:
+        """
+        Record how many numbers of the current lease have been used.
+
+        Call it after the minted tokens have been stored: after a crash,
+        only numbers past the last checkpoint are in doubt.
+
+        Returns: False if the lease was abandoned (stop minting from it)
+        """
+        with self._lock:
+            if self._range is None:
+                return True
+            ok = self.allocator.checkpoint(self._range.lease_id, self._next - self._range.start)
+            if not ok:
+                self._range = None
+            return ok
+
+    def close(self):
+        """Give back the unused rest of the current lease."""
+        with self._lock:
+            if self._range is not None:
+                self.allocator.release(self._range.lease_id, self._next - self._range.start)
+                self._range = None
+
+    def __enter__(self) -> 'TokenMinter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _benchmark_worker(args) -> Dict:
+    path, worker, tokens, batch_size, lease_size = args
+    allocator = NumberAllocator(path)
+    minter = TokenMinter(allocator, f"bench-{worker}", lease_size)
+    values = list(range(batch_size))
+    colors = list(TokenColor)
+    started = time.perf_counter()
+    for i in range(0, tokens, batch_size):
+        minter.mint_batch(values[:min(batch_size, tokens - i)], colors[i % len(colors)])
+    minter.close()
+    return {'worker': worker, 'seconds': time.perf_counter() - started,
+            'minted': minter.stats['minted'], 'leases': minter.stats['leases']}
+
+
+def benchmark(path: str, workers: int = None, tokens_per_worker: int = 1000000,
+              batch_size: int = 10000, lease_size: int = DEFAULT_LEASE_SIZE) -> Dict:
+    """
+    Mint tokens in several processes at once and check the numbers are unique.
+
+    Returns: Throughput, per-worker timings and the allocator summary
+    """
+    workers = workers or os.cpu_count() or 1
+    NumberAllocator(path).close()
+    jobs = [(path, w, tokens_per_worker, batch_size, lease_size) for w in range(workers)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(_benchmark_worker, jobs)
+    elapsed = time.perf_counter() - started
+    allocator = NumberAllocator(path)
+    summary = allocator.summary()
+    minted = sum(r['minted'] for r in results)
+    return {
+        'workers': workers,
+        'minted': minted,
+        'seconds': round(elapsed, 3),
+        'mints_per_second': round(minted / elapsed),
+        'per_worker_mints_per_second': [round(r['minted'] / r['seconds']) for r in results],
+        'unique': allocator.verify() and summary['issued'] == minted,
+        'allocator': summary,
+    }
+
+
+def main():
+    """Inspect the allocator, recover after crashes, or benchmark minting."""
+    parser = argparse.ArgumentParser(description='Token number allocator')
+    parser.add_argument('--db', default=ALLOCATOR_FILE, help='Allocator database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='Numbers leased, issued, returned and abandoned')
+    gaps = commands.add_parser('gaps', help='Unused number ranges')
+    gaps.add_argument('--limit', type=int, default=20)
+    recover = commands.add_parser('recover', help='Abandon leases of crashed minters')
+    recover.add_argument('--worker', help='Abandon this worker\'s active leases')
+    recover.add_argument('--stale-seconds', type=float,
+                         help='Abandon leases with no checkpoint for this long')
+    bench = commands.add_parser('bench', help='Mint in parallel processes and check uniqueness')
+    bench.add_argument('--workers', type=int, default=None)
+    bench.add_argument('--tokens', type=int, default=1000000, help='Tokens per worker')
+    bench.add_argument('--batch', type=int, default=10000)
+    bench.add_argument('--lease', type=int, default=DEFAULT_LEASE_SIZE)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        result = benchmark(args.db, args.workers, args.tokens, args.batch, args.lease)
+    else:
+        allocator = NumberAllocator(args.db)
+        if args.command == 'stats':
+            result = allocator.summary()
+        elif args.command == 'gaps':
+            result = allocator.gaps(args.limit)
+        else:
+            result = {'abandoned': 0}
+            if args.worker:
+                result['abandoned'] += allocator.abandon_worker(args.worker)
+            if args.stale_seconds:
+                result['abandoned'] += allocator.abandon_stale(args.stale_seconds)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
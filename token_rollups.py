@@ -0,0 +1,356 @@
+"""Token rollups module for rooster.os
+
+This module keeps live totals of token ``value`` per ``TokenColor`` over
+time windows, e.g. "RED value minted in the last 5 minutes", as tokens are
+minted. Each token is folded into fixed-size ring buffers when it arrives,
+so a dashboard query reads a running total instead of rescanning every
+token ever minted.
+
+Two kinds of window are kept:
+
+- Sliding windows ("the last hour") are split into buckets of ``step``
+  seconds. A running total per color is updated as tokens arrive and as
+  buckets fall out of the window, so a query is O(1). The window moves one
+  bucket at a time, so its start is exact to within one step.
+- Tumbling windows ("each hour") are fixed, non-overlapping intervals. A
+  window is closed once the watermark passes its end; the most recent
+  closed windows are kept for queries and passed to ``on_close``.
+
+Tokens may arrive out of order by up to ``lateness`` seconds behind the
+newest token seen. Anything older is counted as late and dropped.
+"""
+
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from rooster_token import TokenColor
+
+
+COLORS = list(TokenColor)
+_COLOR_INDEX = {color: i for i, color in enumerate(COLORS)}
+
+SLIDING = 'sliding'
+TUMBLING = 'tumbling'
+
+
+def _to_epoch(when) -> float:
+    """Convert a datetime (naive values are UTC) or epoch seconds to epoch seconds."""
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return when.timestamp()
+    return float(when)
+
+
+def _color_index(color) -> int:
+    if not isinstance(color, TokenColor):
+        color = TokenColor(color)
+    return _COLOR_INDEX[color]
+
+
+class WindowSpec:
+    """Name, kind and size of a rollup window."""
+
+    def __init__(self, name: str, kind: str, size: float, step: Optional[float] = None,
+                 history: int = 24):
+        """
+        Describe a window.
+
+        Args:
+            name: Name the window is queried by (e.g. '5m')
+            kind: 'sliding' or 'tumbling'
+            size: Window length in seconds
+            step: Bucket length in seconds for sliding windows; must divide size
+            history: Closed windows kept for tumbling windows
+        """
+        if kind not in (SLIDING, TUMBLING):
+            raise ValueError(f"Unknown window kind: {kind}")
+        step = size if kind == TUMBLING or step is None else step
+        if size <= 0 or step <= 0 or size % step:
+            raise ValueError(f"Window {name}: step must be positive and divide size")
+        self.name = name
+        self.kind = kind
+        self.size = float(size)
+        self.step = float(step)
+        self.history = max(1, int(history))
+
+    def __repr__(self):
+        return (f"WindowSpec(name={self.name!r}, kind={self.kind!r}, size={self.size}, "
+                f"step={self.step})")
+
+
+DEFAULT_WINDOWS = (
+    WindowSpec('5m', SLIDING, 300, 5),
+    WindowSpec('1h', SLIDING, 3600, 60),
+    WindowSpec('1d', SLIDING, 86400, 900),
+    WindowSpec('hourly', TUMBLING, 3600, history=24),
+)
+
+
+class _Ring:
+    """Fixed number of buckets, each holding a sum and count per color."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.ids = array('q', [-1] * slots)
+        self.sums = [array('d', [0.0] * slots) for _ in COLORS]
+        self.counts = [array('q', [0] * slots) for _ in COLORS]
+
+    def slot(self, bucket: int) -> Optional[int]:
+        """Return the slot holding bucket, or None if it has been overwritten."""
+        slot = bucket % self.slots
+        return slot if self.ids[slot] == bucket else None
+
+    def claim(self, bucket: int) -> int:
+        """Reuse the slot for bucket, clearing whatever it held."""
+        slot = bucket % self.slots
+        self.ids[slot] = bucket
+        for c in range(len(COLORS)):
+            self.sums[c][slot] = 0.0
+            self.counts[c][slot] = 0
+        return slot
+
+
+class SlidingWindow:
+    """Running totals per color over the last size seconds, in step-second buckets."""
+
+    def __init__(self, spec: WindowSpec):
+        self.spec = spec
+        self.buckets = int(spec.size // spec.step)
+        self.ring = _Ring(self.buckets)
+        self.head = None
+        self.sums = [0.0] * len(COLORS)
+        self.counts = [0] * len(COLORS)
+
+    def advance(self, bucket: int):
+        """Move the window so it ends with bucket, dropping buckets that leave it."""
+        if self.head is not None and bucket <= self.head:
+            return
+        start = bucket - self.buckets + 1
+        ring = self.ring
+        if self.head is None or bucket - self.head >= self.buckets:
+            # Everything in the window has left it
+            self.sums = [0.0] * len(COLORS)
+            self.counts = [0] * len(COLORS)
+            for b in range(start, bucket + 1):
+                ring.claim(b)
+        else:
+            # Each new bucket takes the slot of the one leaving the window
+            for b in range(self.head + 1, bucket + 1):
+                slot = b % ring.slots
+                if 0 <= ring.ids[slot] < start:
+                    for c in range(len(COLORS)):
+                        self.sums[c] -= ring.sums[c][slot]
+                        self.counts[c] -= ring.counts[c][slot]
+                ring.claim(b)
+        self.head = bucket
+
+    def add(self, bucket: int, color: int, value: float):
+        if self.head is None or bucket > self.head:
+            self.advance(bucket)
+        elif bucket <= self.head - self.buckets:
+            return
+        slot = self.ring.slot(bucket)
+        if slot is None:
+            slot = self.ring.claim(bucket)
+        self.ring.sums[color][slot] += value
+        self.ring.counts[color][slot] += 1
+        self.sums[color] += value
+        self.counts[color] += 1
+
+
+class TumblingWindow:
+    """Totals per color for fixed, back-to-back windows of size seconds."""
+
+    def __init__(self, spec: WindowSpec, lateness: float,
+                 on_close: Optional[Callable[[str, Dict], None]] = None):
+        self.spec = spec
+        # Windows still open for late tokens, plus the closed history
+        self.open_windows = int(lateness // spec.size) + 2
+        self.ring = _Ring(spec.history + self.open_windows)
+        self.head = None
+        self.closed_through = None
+        self.on_close = on_close
+
+    def add(self, window: int, color: int, value: float):
+        if self.head is None or window > self.head:
+            self.head = window
+        slot = self.ring.slot(window)
+        if slot is None:
+            slot = self.ring.claim(window)
+        self.ring.sums[color][slot] += value
+        self.ring.counts[color][slot] += 1
+
+    def close_until(self, watermark: float):
+        """Close every window that ends at or before the watermark."""
+        if self.head is None:
+            return
+        last = int(watermark // self.spec.size) - 1
+        if self.closed_through is not None and last <= self.closed_through:
+            return
+        # Only windows still in the ring can hold tokens
+        first = self.head - self.ring.slots + 1
+        if self.closed_through is not None:
+            first = max(first, self.closed_through + 1)
+        self.closed_through = last
+        if self.on_close is not None:
+            for window in range(first, min(last, self.head) + 1):
+                if self.ring.slot(window) is not None:
+                    self.on_close(self.spec.name, self.window(window))
+
+    def window(self, window: int) -> Dict:
+        """Return one window's start, end and per-color sums and counts."""
+        slot = self.ring.slot(window)
+        sums = {color.value: (self.ring.sums[c][slot] if slot is not None else 0.0)
+                for c, color in enumerate(COLORS)}
+        counts = {color.value: (self.ring.counts[c][slot] if slot is not None else 0)
+                  for c, color in enumerate(COLORS)}
+        return {
+            'start': window * self.spec.size,
+            'end': (window + 1) * self.spec.size,
+            'closed': self.closed_through is not None and window <= self.closed_through,
+            'sums': sums,
+            'counts': counts,
+        }
+
+
+class TokenRollups:
+    """Windowed value totals per token color, maintained as tokens arrive."""
+
+    def __init__(self, windows: Sequence[WindowSpec] = DEFAULT_WINDOWS, lateness: float = 60.0,
+                 on_close: Optional[Callable[[str, Dict], None]] = None):
+        """
+        Set up the windows.
+
+        Args:
+            windows: Windows to maintain (names must be unique)
+            lateness: Seconds a token may arrive behind the newest token seen;
+                older tokens are dropped and counted in stats['late']
+            on_close: Called with (window name, window) when a tumbling
+                window closes
+        """
+        names = [spec.name for spec in windows]
+        if len(set(names)) != len(names):
+            raise ValueError("Window names must be unique")
+        self.lateness = float(lateness)
+        self.sliding: Dict[str, SlidingWindow] = {}
+        self.tumbling: Dict[str, TumblingWindow] = {}
+        for spec in windows:
+            if spec.kind == SLIDING:
+                self.sliding[spec.name] = SlidingWindow(spec)
+            else:
+                self.tumbling[spec.name] = TumblingWindow(spec, self.lateness, on_close)
+        self.newest: Optional[float] = None
+        self.stats = {'events': 0, 'late': 0}
+
+    @property
+    def watermark(self) -> Optional[float]:
+        """Time before which no more tokens are accepted."""
+        return None if self.newest is None else self.newest - self.lateness
+
+    def add(self, color, value: float, when) -> bool:
+        """
+        Fold one token event into every window.
+
+        Args:
+            color: TokenColor (or its value, e.g. 'RED')
+            value: Token value
+            when: Event time as a datetime (naive values are UTC) or epoch seconds
+
+        Returns: False if the event was later than the lateness bound and dropped
+        """
+        ts = _to_epoch(when)
+        c = _color_index(color)
+        if self.newest is not None and ts < self.newest - self.lateness:
+            self.stats['late'] += 1
+            return False
+        self.stats['events'] += 1
+        for window in self.sliding.values():
+            window.add(int(ts // window.spec.step), c, value)
+        for window in self.tumbling.values():
+            window.add(int(ts // window.spec.size), c, value)
+        if self.newest is None or ts > self.newest:
+            self.newest = ts
+            self._close_tumbling()
+        return True
+
+    def add_token(self, token) -> bool:
+        """Fold a rooster_token.Token into every window."""
+        return self.add(token.color, token.value, token.token_datetime)
+
+    def consume(self, tokens) -> int:
+        """Fold an iterable of tokens in arrival order. Returns how many were accepted."""
+        return sum(1 for token in tokens if self.add_token(token))
+
+    def advance(self, when):
+        """
+        Move every window forward to when (e.g. the current time) without a token.
+
+        Lets the windows age while nothing is being minted, so "last 5
+        minutes" falls to zero after a quiet spell.
+        """
+        ts = _to_epoch(when)
+        if self.newest is not None and ts <= self.newest:
+            return
+        self.newest = ts
+        for window in self.sliding.values():
+            window.advance(int(ts // window.spec.step))
+        self._close_tumbling()
+
+    def _close_tumbling(self):
+        watermark = self.watermark
+        for window in self.tumbling.values():
+            window.close_until(watermark)
+
+    def _sliding(self, name: str) -> SlidingWindow:
+        try:
+            return self.sliding[name]
+        except KeyError:
+            raise KeyError(f"No sliding window named {name!r}") from None
+
+    def _tumbling(self, name: str) -> TumblingWindow:
+        try:
+            return self.tumbling[name]
+        except KeyError:
+            raise KeyError(f"No tumbling window named {name!r}") from None
+
+    def total(self, window: str, color) -> float:
+        """Return the value minted in a sliding window for one color."""
+        return self._sliding(window).sums[_color_index(color)]
+
+    def count(self, window: str, color) -> int:
+        """Return the number of tokens in a sliding window for one color."""
+        return self._sliding(window).counts[_color_index(color)]
+
+    def totals(self, window: str) -> Dict[str, float]:
+        """Return the value minted in a sliding window per color."""
+        sums = self._sliding(window).sums
+        return {color.value: sums[c] for c, color in enumerate(COLORS)}
+
+    def current(self, window: str) -> Optional[Dict]:
+        """Return the tumbling window holding the newest token (still open), if any."""
+        tumbling = self._tumbling(window)
+        if self.newest is None:
+            return None
+        return tumbling.window(int(self.newest // tumbling.spec.size))
+
+    def closed(self, window: str, limit: Optional[int] = None) -> List[Dict]:
+        """Return the most recent closed tumbling windows, newest first."""
+        tumbling = self._tumbling(window)
+        if tumbling.closed_through is None:
+            return []
+        keep = min(tumbling.spec.history, limit or tumbling.spec.history)
+        return [tumbling.window(w) for w in
+                range(tumbling.closed_through, tumbling.closed_through - keep, -1)]
+
+    def snapshot(self) -> Dict:
+        """Return every sliding window's totals and every tumbling window's open totals."""
+        data = {name: {'sums': self.totals(name),
+                       'counts': {color.value: window.counts[c]
+                                  for c, color in enumerate(COLORS)}}
+                for name, window in self.sliding.items()}
+        for name in self.tumbling:
+            data[name] = self.current(name)
+        data['stats'] = dict(self.stats)
+        return data